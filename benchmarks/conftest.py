@@ -0,0 +1,45 @@
+"""
+fixtures shared by the benchmarks. Redis is a fakeredis server unless BENCHMARK_REDIS_HOST and
+BENCHMARK_REDIS_PORT point to a real one, and S3 is a moto stand in.
+"""
+import os
+import tempfile
+
+import pytest
+
+from monolithcaching.connection_pool import RedisConnectionPools
+
+
+@pytest.fixture
+def cache_root():
+    directory = tempfile.TemporaryDirectory()
+    yield directory.name
+    directory.cleanup()
+
+
+@pytest.fixture
+def redis_address():
+    if "BENCHMARK_REDIS_HOST" in os.environ:
+        yield os.environ["BENCHMARK_REDIS_HOST"], int(os.environ.get("BENCHMARK_REDIS_PORT", 6379))
+        return
+    fakeredis = pytest.importorskip("fakeredis", reason="install the benchmark extra")
+    redis = pytest.importorskip("redis")
+    key = (os.getpid(), "fakeredis", 6379, 0)
+    RedisConnectionPools._pools[key] = redis.ConnectionPool(
+        connection_class=fakeredis.FakeConnection, server=fakeredis.FakeServer()
+    )
+    yield "fakeredis", 6379
+    RedisConnectionPools._pools.pop(key, None)
+
+
+@pytest.fixture
+def s3_cache_path(monkeypatch):
+    moto = pytest.importorskip("moto", reason="install the benchmark extra")
+    import boto3
+
+    for name in ("AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY", "AWS_SESSION_TOKEN"):
+        monkeypatch.setenv(name, "benchmark")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    with moto.mock_aws():
+        boto3.client("s3").create_bucket(Bucket="benchmark")
+        yield "s3://benchmark/caches/"
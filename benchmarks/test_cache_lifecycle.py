@@ -0,0 +1,55 @@
+"""benchmarks of creating, attaching to and wiping local caches"""
+import pytest
+
+from monolithcaching import CacheManager
+
+pytest.importorskip("pytest_benchmark", reason="install the benchmark extra")
+
+
+def test_create_wipe(benchmark, cache_root):
+    manager = CacheManager(local_cache_path=cache_root)
+
+    def create_wipe():
+        manager.create_cache()
+        manager.wipe_cache()
+
+    benchmark(create_wipe)
+
+
+def test_attach_wipe(benchmark, cache_root):
+    owner = CacheManager(local_cache_path=cache_root)
+    owner.create_cache()
+    owner.lock_cache()
+    manager = CacheManager(local_cache_path=cache_root)
+
+    def attach_wipe():
+        manager.create_cache(existing_cache=owner.cache_path)
+        manager.wipe_cache()
+
+    benchmark(attach_wipe)
+    owner.unlock_cache()
+    owner.wipe_cache()
+
+
+@pytest.mark.parametrize("backend", ["local", "memory"])
+def test_put_get_bytes(benchmark, cache_root, backend):
+    manager = CacheManager(local_cache_path=cache_root, backend=backend)
+    manager.create_cache()
+    data = b"0" * 1024 * 1024
+
+    def put_get():
+        manager.worker.put_bytes(key="data.bin", data=data)
+        return manager.worker.get_bytes(key="data.bin")
+
+    assert benchmark(put_get) == data
+    manager.wipe_cache()
+
+
+def test_create_wipe_with_index(benchmark, cache_root):
+    manager = CacheManager(local_cache_path=cache_root, index=True, local_register=True)
+
+    def create_wipe():
+        manager.create_cache()
+        manager.wipe_cache()
+
+    benchmark(create_wipe)
@@ -0,0 +1,48 @@
+"""benchmarks of inserting and reading meta as the number of keys in the meta grows"""
+import pytest
+
+from monolithcaching import CacheManager
+
+pytest.importorskip("pytest_benchmark", reason="install the benchmark extra")
+
+KEY_COUNTS = [10, 100, 1000, 10000]
+
+
+@pytest.fixture
+def manager(cache_root):
+    manager = CacheManager(local_cache_path=cache_root)
+    manager.create_cache()
+    yield manager
+    manager.wipe_cache()
+
+
+def fill(manager, key_count):
+    manager.update_meta(data={"key {}".format(number): number for number in range(key_count)})
+
+
+@pytest.mark.parametrize("key_count", KEY_COUNTS)
+def test_insert_meta(benchmark, manager, key_count):
+    fill(manager=manager, key_count=key_count)
+    benchmark(manager.insert_meta, key="inserted", value=1)
+
+
+@pytest.mark.parametrize("key_count", KEY_COUNTS)
+def test_insert_meta_batched(benchmark, cache_root, key_count):
+    manager = CacheManager(local_cache_path=cache_root, meta_batch_size=100)
+    manager.create_cache()
+    fill(manager=manager, key_count=key_count)
+    benchmark(manager.insert_meta, key="inserted", value=1)
+    manager.wipe_cache()
+
+
+@pytest.mark.parametrize("key_count", KEY_COUNTS)
+def test_meta(benchmark, manager, key_count):
+    fill(manager=manager, key_count=key_count)
+    assert len(benchmark(lambda: manager.meta)) == key_count
+
+
+@pytest.mark.parametrize("key_count", KEY_COUNTS)
+def test_read_meta(benchmark, manager, key_count):
+    fill(manager=manager, key_count=key_count)
+    manager.flush()
+    assert len(benchmark(manager.worker.read_meta)) == key_count
@@ -0,0 +1,50 @@
+"""benchmarks of registering and deregistering caches in Redis and the local register under concurrency"""
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from monolithcaching.local_register import LocalRegister
+from monolithcaching.register import Register
+
+pytest.importorskip("pytest_benchmark", reason="install the benchmark extra")
+
+THREADS = [1, 4, 16]
+OPERATIONS = 100
+
+
+def register_deregister(make_register, cache_path):
+    register = make_register()
+    for _ in range(OPERATIONS):
+        register.register_cache(cache_path=cache_path)
+        register.deregister_cache(cache_path=cache_path, locked=False)
+
+
+def run_concurrently(make_register, threads):
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        futures = [
+            executor.submit(register_deregister, make_register, "/cache/{}/".format(number % 4))
+            for number in range(threads)
+        ]
+        for future in futures:
+            future.result()
+
+
+@pytest.mark.parametrize("threads", THREADS)
+def test_redis_register(benchmark, redis_address, threads):
+    host, port = redis_address
+    benchmark.pedantic(
+        run_concurrently,
+        kwargs={"make_register": lambda: Register(host=host, port=port), "threads": threads},
+        rounds=5,
+    )
+    assert Register(host=host, port=port).get_count(cache_path="/cache/0/") is None
+
+
+@pytest.mark.parametrize("threads", THREADS)
+def test_local_register(benchmark, cache_root, threads):
+    benchmark.pedantic(
+        run_concurrently,
+        kwargs={"make_register": lambda: LocalRegister(root=cache_root), "threads": threads},
+        rounds=5,
+    )
+    assert LocalRegister(root=cache_root).get_count(cache_path="/cache/0/") is None
@@ -0,0 +1,54 @@
+"""benchmarks of S3Worker operations against a moto stand in for S3"""
+import pytest
+
+from monolithcaching import CacheManager
+from monolithcaching.s3_worker import S3Worker
+
+pytest.importorskip("pytest_benchmark", reason="install the benchmark extra")
+
+SIZES = [1024, 1024 * 1024, 16 * 1024 * 1024]
+
+
+@pytest.fixture
+def worker(s3_cache_path):
+    worker = S3Worker(cache_path=s3_cache_path)
+    yield worker
+    worker.delete_directory_parallel()
+
+
+def test_create_cache(benchmark, s3_cache_path):
+    manager = CacheManager(s3=True, s3_cache_path=s3_cache_path)
+    benchmark(manager.create_cache)
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_put_get_bytes(benchmark, worker, size):
+    data = b"0" * size
+
+    def put_get():
+        worker.put_bytes(key="data.bin", data=data)
+        return worker.get_bytes(key="data.bin")
+
+    assert benchmark(put_get) == data
+
+
+def test_check_file(benchmark, worker):
+    worker.put_bytes(key="data.bin", data=b"0")
+    assert benchmark(worker.check_file, file="data.bin") is True
+
+
+def test_meta(benchmark, worker):
+    worker.update_meta(data={"key {}".format(number): number for number in range(1000)})
+    assert len(benchmark(worker.read_meta)) == 1000
+
+
+@pytest.mark.parametrize("key_count", [100, 2500])
+def test_delete_directory_parallel(benchmark, s3_cache_path, key_count):
+    def setup():
+        worker = S3Worker(cache_path=s3_cache_path)
+        for number in range(key_count):
+            worker.put_bytes(key="{}.bin".format(number), data=b"0")
+        return (worker,), {}
+
+    stats = benchmark.pedantic(S3Worker.delete_directory_parallel, setup=setup, rounds=3)
+    assert stats.deleted == key_count + 1
@@ -1,10 +1,35 @@
 """This module manages the cache directories"""
-import json
-from typing import Union, Optional, Dict
+import threading
+import time
+from typing import Any, Union, Optional, Dict, List
 
+from . import arrays
+from .backend import BACKENDS, CacheBackend, get_backend, register_backend
+from .cache_index import CacheIndex
+from .cache_root import CacheRoot, CacheRecord
+from .compression import CompressedBackend
+from .connection_pool import RedisConnectionPools
 from .errors import CacheManagerError
+from .instrumentation import (
+    HOOKS,
+    Event,
+    InstrumentedBackend,
+    OpenTelemetryHook,
+    PrometheusHook,
+    add_hook,
+    remove_hook,
+    timed,
+)
+from .local_register import LocalRegister
+from .manifest import Manifest, ManifestBackend, ManifestEntry, VerifyStats
+from .memoize import cached, register_hasher, stable_hash
+from .memory_worker import MemoryWorker
 from .worker import Worker
+from .reaper import EXPIRES_META_KEY, TTL_META_KEY, ExpiredCache, Reaper
 from .s3_worker import S3Worker
+from .trash import Trash, drain
+from .shm_worker import ShmWorker
+from .tiered_worker import PrefetchStats, TieredWorker
 from .root_directory import RootDirectory
 
 
@@ -13,10 +38,20 @@ class CacheManager:
     This is a class for managing workers and meta data to a local cache.
 
     Attributes:
-        worker (caching.worker.Worker): worker object that manages the access to the cache
+        worker (Optional[CacheBackend]): worker object that manages the access to the cache
+        backend (str): name of the registered backend the caches are stored with
         s3 (bool): if True, use S3 instead of local file storage
         s3_cache_path (Optional[str]): path to the cache in the s3
         local_cache_path (Optional[str]): path to the local cache
+        tiered (bool): if True, S3 caches are read and written through a local directory
+        max_local_bytes (Optional[int]): the most bytes held in the local directory of a tiered cache
+        index (Optional[CacheIndex]): index of the local caches under local_cache_path if enabled
+        shm_path (Optional[str]): directory in a tmpfs that caches of the "shm" backend are created in
+        max_shm_bytes (Optional[int]): the most bytes a cache of the "shm" backend holds in RAM before spilling
+        compression (Optional[str]): "zstd", "lz4" or "gzip" codec files are compressed with, None to not compress
+        access_interval (float): the fewest seconds between accesses of a local cache written to its access record
+        deferred_delete (bool): if True, local caches are deleted on a background thread through the trash
+        meta_lock (threading.RLock): lock held while the in memory meta is changed or written
     """
 
     def __init__(
@@ -26,6 +61,26 @@ class CacheManager:
         s3: bool = False,
         s3_cache_path: Optional[str] = None,
         local_cache_path: Optional[str] = None,
+        max_connections: Optional[int] = None,
+        health_check_interval: Optional[int] = None,
+        meta_batch_size: int = 1,
+        meta_flush_interval: Optional[float] = None,
+        tiered: bool = False,
+        max_local_bytes: Optional[int] = None,
+        max_root_bytes: Optional[int] = None,
+        max_root_caches: Optional[int] = None,
+        eviction_policy: str = "lru",
+        index: bool = False,
+        local_register: bool = False,
+        backend: Optional[str] = None,
+        shm_path: Optional[str] = None,
+        max_shm_bytes: Optional[int] = None,
+        compression: Optional[str] = None,
+        compression_level: Optional[int] = None,
+        compression_threshold: int = 1024,
+        access_interval: float = 0.0,
+        deferred_delete: bool = False,
+        manifest: bool = False,
     ) -> None:
         """
         The constructor for the CacheManager class.
@@ -35,8 +90,45 @@ class CacheManager:
         :param s3: (bool) is True, connect to s3
         :param s3_cache_path: (Optional[str]) path to the cache in the s3
         :param local_cache_path: (Optional[str]) path to the local cache
+        :param max_connections: (Optional[int]) max connections of the process wide Redis connection pool
+        :param health_check_interval: (Optional[int]) seconds before an idle Redis connection is health checked
+        :param meta_batch_size: (int) number of meta inserts held in memory before they are written to the cache
+        :param meta_flush_interval: (Optional[float]) seconds after which held meta inserts are written on insert
+        :param tiered: (bool) if True, S3 caches are read and written through a local directory
+        :param max_local_bytes: (Optional[int]) the most bytes held in the local directory of a tiered cache
+        :param max_root_bytes: (Optional[int]) the most bytes held by all local caches before old ones are evicted,
+                               needs Redis or local_register
+        :param max_root_caches: (Optional[int]) the most local caches before old ones are evicted, needs Redis or
+                                local_register
+        :param eviction_policy: (str) "lru" or "lfu" order in which unlocked local caches are evicted
+        :param index: (bool) if True, local caches are recorded in an index under local_cache_path
+        :param local_register: (bool) if True and no Redis is given, references to local caches are counted in a
+                               register under local_cache_path so processes on one machine can share caches
+        :param backend: (Optional[str]) name of the registered backend to store caches with, defaults to "tiered"
+                        if s3 and tiered are True, "s3" if s3 is True and "local" otherwise
+        :param shm_path: (Optional[str]) directory in a tmpfs that caches of the "shm" backend are created in,
+                         /dev/shm/monolithcaching if None
+        :param max_shm_bytes: (Optional[int]) the most bytes a cache of the "shm" backend holds in RAM before
+                              files are spilled to local_cache_path
+        :param compression: (Optional[str]) "zstd", "lz4" or "gzip" codec files put in the cache are compressed
+                            with, None to not compress
+        :param compression_level: (Optional[int]) the compression level, the default of the codec if None
+        :param compression_threshold: (int) the fewest bytes a file needs to be compressed
+        :param access_interval: (float) the fewest seconds between accesses of a local cache written to its
+                                access record, 0 to write every access
+        :param deferred_delete: (bool) if True, local caches are deregistered and deleted on a background thread
+                                through the trash under local_cache_path instead of when the worker is deleted
+        :param manifest: (bool) if True, the size and checksum of every file put in a cache are recorded in a
+                         manifest.json file in the cache that is written when the meta is flushed
         """
-        self.worker: Union[None, Worker, S3Worker] = None
+        self.worker: Optional[CacheBackend] = None
+        self.meta_batch_size: int = meta_batch_size
+        self.meta_flush_interval: Optional[float] = meta_flush_interval
+        self.meta_lock: threading.RLock = threading.RLock()
+        self._meta: Optional[Dict] = None
+        self._pending_meta_writes: int = 0
+        self._meta_held: bool = False
+        self._last_meta_flush: float = time.monotonic()
         # pylint: disable=invalid-name
         self.s3: bool = s3
         self._port: Optional[int] = port
@@ -45,49 +137,219 @@ class CacheManager:
         self.local_cache_path: Optional[str] = (
             RootDirectory().path if local_cache_path is None else local_cache_path
         )
+        self.tiered: bool = tiered
+        if backend is None:
+            backend = "local"
+            if self.s3 is True and self.s3_cache_path is not None:
+                backend = "tiered" if self.tiered is True else "s3"
+        self.backend: str = backend
+        self.shm_path: Optional[str] = shm_path
+        self.max_shm_bytes: Optional[int] = max_shm_bytes
+        self.compression: Optional[str] = compression
+        self.compression_level: Optional[int] = compression_level
+        self.compression_threshold: int = compression_threshold
+        self.access_interval: float = access_interval
+        self.deferred_delete: bool = deferred_delete
+        self.keep_manifest: bool = manifest
+        self.max_local_bytes: Optional[int] = max_local_bytes
+        self.index: Optional[CacheIndex] = (
+            CacheIndex(root=self.local_cache_path) if index is True else None  # type: ignore
+        )
+        self.local_register: bool = local_register
+        self.max_root_bytes: Optional[int] = max_root_bytes
+        self.max_root_caches: Optional[int] = max_root_caches
+        self.eviction_policy: str = eviction_policy
+        if (
+            self.max_root_bytes is not None or self.max_root_caches is not None
+        ) and not (
+            (self._port is not None and self._host is not None)
+            or self.local_register is True
+        ):
+            raise CacheManagerError(
+                message="max_root_bytes and max_root_caches need Redis or local_register to tell which caches "
+                "are in use"
+            )
+        if self._port is not None and self._host is not None:
+            RedisConnectionPools.get(
+                host=self._host,
+                port=self._port,
+                max_connections=max_connections,
+                health_check_interval=health_check_interval,
+            )
 
-    def create_cache(self, existing_cache: Optional[str] = None) -> None:
+    def create_cache(
+        self, existing_cache: Optional[str] = None, ttl: Optional[float] = None
+    ) -> None:
         """
-        Deletes the old worker and creates a new one.
+        Deletes the old worker and creates a new one. Attaching to an existing cache reads its meta, one GET for
+        S3 caches, to lock the worker if the cache is locked.
 
         :param existing_cache: (Optional[str]) path to existing cache
+        :param ttl: (Optional[float]) seconds from now after which the reaper deletes the cache, locked or not
         :return: None
         """
-        del self.worker
-        if self.s3 is True and self.s3_cache_path is not None:
-            self.worker = S3Worker(
-                cache_path=self.s3_cache_path, existing_cache=existing_cache
-            )
-        else:
-            self.worker = Worker(
-                port=self._port,
-                host=self._host,
-                existing_cache=existing_cache,
-                local_cache=self.local_cache_path,
+        self.flush()
+        if self.worker is not None:
+            with timed(operation="wipe", backend=self.backend):
+                del self.worker
+        self._meta = None
+        if existing_cache is None and (
+            self.max_root_bytes is not None or self.max_root_caches is not None
+        ):
+            self.evict_caches()
+        backend = get_backend(name=self.backend)
+        if self.keep_manifest is True:
+            backend = ManifestBackend
+        elif self.compression is not None:
+            backend = CompressedBackend
+        with timed(
+            operation="create" if existing_cache is None else "attach",
+            backend=self.backend,
+        ):
+            worker: CacheBackend = backend.from_manager(
+                manager=self, existing_cache=existing_cache
             )
-            if existing_cache is None:
-                self._create_meta()
-            else:
-                if self.meta.get("locked", False) is True:
-                    self.worker.lock()
+        if len(HOOKS) > 0:
+            worker = InstrumentedBackend(backend=worker, name=self.backend)
+        self.worker = worker
+        if existing_cache is None:
+            self._meta = {}
+        elif self.meta.get("locked", False) is True:
+            self.worker.lock()
+        if ttl is not None:
+            self.set_ttl(ttl=ttl)
+
+    def evict_caches(self, ttl: Optional[float] = None) -> List[CacheRecord]:
+        """
+        Deletes unlocked local caches that nothing points to until the cache root fits in max_root_bytes and
+        max_root_caches, and any that have not been accessed for ttl seconds.
+
+        :param ttl: (Optional[float]) seconds since last access after which a cache is deleted
+        :return: (List[CacheRecord]) the caches that were deleted
+        """
+        return CacheRoot(
+            path=self.local_cache_path,  # type: ignore
+            port=self._port,
+            host=self._host,
+            index=self.index,
+            local_register=self.local_register,
+        ).evict(
+            max_bytes=self.max_root_bytes,
+            max_count=self.max_root_caches,
+            policy=self.eviction_policy,
+            ttl=ttl,
+        )
 
-    def lock_cache(self) -> None:
+    def lock_cache(self, ttl: Optional[float] = None) -> None:
         """
-        Locks the cache so it doesn't get wiped when finished.
+        Locks the cache so it doesn't get wiped when finished. The lock is written to the meta straight away for
+        every backend, one PUT for S3 caches, so managers attaching later and the reaper see it.
 
+        :param ttl: (Optional[float]) seconds from now after which the reaper deletes the cache, forever if None
         :return: None
         """
         if self.worker is None:
             raise CacheManagerError(
                 message="cache worker is not defined so cannot be locked"
             )
-        if self.s3 is False:
-            self.worker.lock()
-            self.insert_meta(key="locked", value=True)
+        self.worker.lock()
+        self.insert_meta(key="locked", value=True)
+        if ttl is not None:
+            self.set_ttl(ttl=ttl)
+        self.flush()
+
+    def set_ttl(self, ttl: float) -> None:
+        """
+        Records in the meta that the cache expires ttl seconds from now so the reaper deletes it then, and
+        writes the meta straight away so the reaper sees it even if the process crashes.
+
+        :param ttl: (float) seconds from now after which the cache expires
+        :return: None
+        """
+        if self.worker is None:
+            raise CacheManagerError(
+                message="you are trying to set the ttl of a cache when no cache is made"
+            )
+        self.update_meta(data={TTL_META_KEY: ttl, EXPIRES_META_KEY: time.time() + ttl})
+        self.flush()
+
+    def prefetch(
+        self,
+        pattern: Optional[str] = None,
+        keys: Optional[List[str]] = None,
+        max_workers: int = 8,
+    ) -> PrefetchStats:
+        """
+        Downloads the objects of the cache in S3 into the local directory of the tiered backend in parallel,
+        skipping objects that already have an up to date local copy.
+
+        :param pattern: (Optional[str]) glob the keys need to match, eg "inputs/*.parquet", every key if None
+        :param keys: (Optional[List[str]]) the keys to download, every key if None
+        :param max_workers: (int) number of objects downloaded at once
+        :return: (PrefetchStats) the objects fetched, skipped and failed, bytes fetched and time taken
+        """
+        if self.worker is None:
+            raise CacheManagerError(
+                message="you are trying to prefetch a cache when no cache is made"
+            )
+        if getattr(self.worker, "prefetch", None) is None:
+            raise CacheManagerError(
+                message="prefetching needs the tiered backend, not {}".format(
+                    self.backend
+                )
+            )
+        return self.worker.prefetch(  # type: ignore
+            pattern=pattern, keys=keys, max_workers=max_workers
+        )
+
+    @property
+    def manifest(self) -> Manifest:
+        """
+        Dynamic property.
+
+        :return: (Manifest) the manifest of the cache, looking up the entry of a file in constant time
+        """
+        if self.worker is None or self.keep_manifest is False:
+            raise CacheManagerError(
+                message="the manifest needs a cache made by a manager with manifest set to True"
+            )
+        return self.worker.manifest  # type: ignore
+
+    def verify(self, max_workers: int = 8) -> VerifyStats:
+        """
+        Reads every file in the manifest of the cache in parallel, checking that it is present and that its size
+        and checksum match the manifest.
+
+        :param max_workers: (int) number of files read at once
+        :return: (VerifyStats) the number of files verified and the keys missing or mismatched
+        """
+        if self.worker is None or self.keep_manifest is False:
+            raise CacheManagerError(
+                message="verifying needs a cache made by a manager with manifest set to True"
+            )
+        return self.worker.verify(max_workers=max_workers)  # type: ignore
+
+    def reap_caches(self, force: bool = False) -> List[ExpiredCache]:
+        """
+        Deletes the local caches under local_cache_path, and the caches in s3_cache_path if given, whose ttl
+        has passed.
+
+        :param force: (bool) if True, expired caches are deleted even if the register counts them as pointed to
+        :return: (List[ExpiredCache]) the caches that were deleted
+        """
+        return Reaper(
+            local_cache_path=self.local_cache_path,
+            s3_cache_path=self.s3_cache_path,
+            port=self._port,
+            host=self._host,
+            index=self.index,
+            local_register=self.local_register,
+            force=force,
+        ).reap()
 
     def unlock_cache(self) -> None:
         """
-        Unlocks the cache so it will get wiped when finished.
+        Unlocks the cache so it will get wiped when finished, writing the unlock to the meta straight away.
 
         :return: None
         """
@@ -95,55 +357,161 @@ class CacheManager:
             raise CacheManagerError(
                 message="cache worker is not defined so cannot be unlocked"
             )
-        if self.s3 is False and isinstance(self.worker, Worker):
-            self.worker.unlock()
-            self.insert_meta(key="locked", value=False)
+        self.worker.unlock()
+        self.insert_meta(key="locked", value=False)
+        self.flush()
 
     def wipe_cache(self) -> None:
         """
-        Deletes the current worker.
+        Writes any held meta and deletes the current worker.
 
         :return: None
         """
-        del self.worker
+        self.flush()
+        if self.worker is not None:
+            with timed(operation="wipe", backend=self.backend):
+                del self.worker
         self.worker = None
+        self._meta = None
 
     def insert_meta(self, key: str, value: Union[str, int, float, dict, list]) -> None:
         """
-        Inserts meta into the meta file in the cache.
+        Inserts meta into the meta of the cache. The insert is held in memory and written once meta_batch_size
+        inserts are pending, meta_flush_interval has passed, or flush is called.
 
         :param key: (str) key the value to be stored
         :param value: (Union[str, int, float, dict, list]) data to be stored
         :return: None
         """
+        self.update_meta(data={key: value})
+
+    def update_meta(
+        self, data: Dict[str, Union[str, int, float, dict, list]], hold: bool = False
+    ) -> None:
+        """
+        Inserts all the keys of data into the meta of the cache with one read and one write of the meta.
+        The update counts as one pending insert towards meta_batch_size unless it is held.
+
+        :param data: (Dict[str, Union[str, int, float, dict, list]]) keys and values to be stored
+        :param hold: (bool) if True, the update is only written by the next flush, for frequent updates that
+                     can be lost if the process dies
+        :return: None
+        """
         if self.worker is None:
             raise CacheManagerError(
                 message="you are trying to insert meta data when no cache is made"
             )
-        path = self.worker.base_dir + "meta.json"
+        with self.meta_lock:
+            self._load_meta().update(data)
+            if hold is True:
+                self._meta_held = True
+                return
+            self._pending_meta_writes += 1
+            if self._pending_meta_writes >= self.meta_batch_size or (
+                self.meta_flush_interval is not None
+                and time.monotonic() - self._last_meta_flush >= self.meta_flush_interval
+            ):
+                self.flush()
 
-        if self.s3 is False and isinstance(self.worker, Worker):
-            with open(path) as meta_file:
-                data = json.load(meta_file)
+    def put_array(self, key: str, array: Any) -> None:
+        """
+        Stores a NumPy array or an Arrow table in the cache under the key so it can be memory mapped when it is
+        read, and records its format, dtype and shape under "arrays" in the meta.
+
+        :param key: (str) the key of the file relative to the cache
+        :param array: (Any) the numpy.ndarray, pyarrow.Table or pyarrow.RecordBatch to be stored
+        :return: None
+        """
+        if self.worker is None:
+            raise CacheManagerError(
+                message="you are trying to store an array when no cache is made"
+            )
+        stored: Dict = dict(self._load_meta().get(arrays.ARRAYS_META_KEY, {}))
+        stored[key] = arrays.put_array(backend=self.worker, key=key, array=array)
+        self.update_meta(data={arrays.ARRAYS_META_KEY: stored})
 
-            data[key] = value
+    def get_array(self, key: str, mmap_mode: Optional[str] = "r") -> Any:
+        """
+        Reads an array stored with put_array, as a numpy.memmap or a memory mapped Arrow table if the cache has
+        a local copy of it.
 
-            with open(path, "w") as meta_file:
-                json.dump(data, meta_file)
-        elif self.s3 is True and isinstance(self.worker, S3Worker):
-            self.worker.insert_meta(key=key, value=value)
-        else:
-            raise CacheManagerError(message="worker type is not consistent with setup")
+        :param key: (str) the key of the file relative to the cache
+        :param mmap_mode: (Optional[str]) mode NumPy arrays are mapped with, "r", "r+" or "c", None to read a copy
+        :return: (Any) the numpy.ndarray or pyarrow.Table
+        """
+        record: Optional[Dict] = self.meta.get(arrays.ARRAYS_META_KEY, {}).get(key)
+        if record is None:
+            raise CacheManagerError(
+                message="array {} is not recorded in the meta of the cache".format(key)
+            )
+        return arrays.get_array(
+            backend=self.worker,  # type: ignore
+            key=key,
+            record=record,
+            mmap_mode=mmap_mode,
+        )
 
-    def _create_meta(self) -> None:
+    def _load_meta(self) -> Dict:
         """
-        Writes an empty meta file.
+        Gets the in memory meta of the cache, reading it from the worker once if it is not loaded (private).
+
+        :return: (dict) the in memory meta
+        """
+        with self.meta_lock:
+            if self._meta is None:
+                self._meta = self.worker.read_meta()  # type: ignore
+            return self._meta  # type: ignore
+
+    def refresh_meta(self) -> Dict:
+        """
+        Writes any held meta and reads the meta of the cache again from the worker, picking up meta written by
+        other managers attached to the same cache since it was loaded.
+
+        :return: (dict) of meta data from cache
+        """
+        if self.worker is None:
+            raise CacheManagerError(message="worker is not present for meta data")
+        with self.meta_lock:
+            self.flush()
+            self._meta = None
+            return dict(self._load_meta())
+
+    def flush(self) -> None:
+        """
+        Writes the in memory meta to the cache if there are inserts pending.
 
         :return: None
         """
-        if self.s3 is False and isinstance(self.worker, Worker):
-            with open(self.worker.base_dir + "meta.json", "w") as meta_file:
-                json.dump({}, meta_file)
+        with self.meta_lock:
+            if (
+                (self._pending_meta_writes > 0 or self._meta_held is True)
+                and self._meta is not None
+                and self.worker is not None
+            ):
+                self.worker.write_meta(data=self._meta)
+            self._meta_held = False
+            if self.keep_manifest is True and self.worker is not None:
+                self.worker.save_manifest()  # type: ignore
+            self._pending_meta_writes = 0
+            self._last_meta_flush = time.monotonic()
+
+    @property
+    def port(self) -> Optional[int]:
+        """
+        Dynamic property.
+
+        :return: (Optional[int]) port for the Redis connection tracking caches
+        """
+        return self._port
+
+    @property
+    def host(self) -> Optional[str]:
+        """
+        Dynamic property.
+
+        :return: (Optional[str]) host for the Redis connection tracking caches
+        """
+        return self._host
 
     @property
     def cache_path(self):
@@ -159,16 +527,12 @@ class CacheManager:
     @property
     def meta(self) -> Dict:
         """
-        Dynamic property.
+        Dynamic property, the meta is read once and kept in memory, call refresh_meta to read it again.
 
         :return: (dict) of meta data from cache
         """
-        if self.s3 is False and isinstance(self.worker, Worker):
-            with open(self.worker.base_dir + "meta.json") as meta_file:
-                data = json.load(meta_file)
-            return data
-        elif isinstance(self.worker, S3Worker):
-            return self.worker.meta
+        if self.worker is not None:
+            return dict(self._load_meta())
         raise CacheManagerError(message="worker is not present for meta data")
 
     def __del__(self):
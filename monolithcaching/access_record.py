@@ -0,0 +1,143 @@
+"""this file defines the fixed size record of when a local cache was created and accessed"""
+import datetime
+import os
+import struct
+import time
+from typing import List, NamedTuple, Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None  # type: ignore
+
+
+class Access(NamedTuple):
+    """
+    The use of a local cache.
+
+    Attributes:
+        created (float): epoch seconds of when the cache was created
+        last_access (float): epoch seconds of when the cache was last created or attached to
+        access_count (int): number of times the cache was created or attached to
+    """
+
+    created: float
+    last_access: float
+    access_count: int
+
+
+class AccessRecord:
+    """
+    This class is responsible for the access.bin file of a local cache, a fixed 24 byte record of the created
+    time, last access time and access count. A touch reads and rewrites the record in place with one pread and
+    one pwrite under an exclusive lock, so the file never grows however long the cache lives and reading the
+    last access needs no parsing. Caches made by older versions keep a timestamp.txt log with a line for each
+    access, which is read when there is no record and replaced by a record on the next touch.
+    """
+
+    FILE_NAME = "access.bin"
+    LEGACY_FILE_NAME = "timestamp.txt"
+    FORMAT = struct.Struct("<ddQ")
+
+    @classmethod
+    def _read_legacy(cls, cache_path: str) -> Optional[Access]:
+        """
+        Reads the timestamp.txt log of a cache made by an older version (private).
+
+        :param cache_path: (str) path to the cache
+        :return: (Optional[Access]) the use of the cache, None if there is no log or it is empty
+        """
+        try:
+            with open(cache_path + cls.LEGACY_FILE_NAME) as file:
+                lines: List[str] = [line.strip() for line in file if line.strip()]
+        except OSError:
+            return None
+        if len(lines) == 0:
+            return None
+        return Access(
+            created=datetime.datetime.fromisoformat(lines[0]).timestamp(),
+            last_access=datetime.datetime.fromisoformat(lines[-1]).timestamp(),
+            access_count=len(lines),
+        )
+
+    @classmethod
+    def exists(cls, cache_path: str) -> bool:
+        """
+        Checks to see if a cache has a record or a timestamp.txt log.
+
+        :param cache_path: (str) path to the cache
+        :return: (bool) True if either file is present
+        """
+        return os.path.isfile(cache_path + cls.FILE_NAME) or os.path.isfile(
+            cache_path + cls.LEGACY_FILE_NAME
+        )
+
+    @classmethod
+    def read(cls, cache_path: str) -> Optional[Access]:
+        """
+        Reads the use of a cache from its record, or its timestamp.txt log if it has no record.
+
+        :param cache_path: (str) path to the cache
+        :return: (Optional[Access]) the use of the cache, None if it has neither
+        """
+        try:
+            with open(cache_path + cls.FILE_NAME, "rb") as file:
+                data: bytes = file.read(cls.FORMAT.size)
+        except FileNotFoundError:
+            return cls._read_legacy(cache_path=cache_path)
+        if len(data) < cls.FORMAT.size:
+            return None
+        return Access(*cls.FORMAT.unpack(data))
+
+    @classmethod
+    def create(cls, cache_path: str, now: Optional[float] = None) -> None:
+        """
+        Writes the record of a new cache.
+
+        :param cache_path: (str) path to the cache
+        :param now: (Optional[float]) epoch seconds of the creation, the current time if None
+        :return: None
+        """
+        now = time.time() if now is None else now
+        with open(cache_path + cls.FILE_NAME, "wb") as file:
+            file.write(cls.FORMAT.pack(now, now, 1))
+
+    @classmethod
+    def touch(
+        cls, cache_path: str, interval: float = 0.0, now: Optional[float] = None
+    ) -> None:
+        """
+        Records an access of a cache. Accesses within interval seconds of the last recorded access are not
+        written, so caches attached to many times a second are not written to on every attach at the cost of
+        the count missing those accesses. A timestamp.txt log is replaced by a record holding its use.
+
+        :param cache_path: (str) path to the cache
+        :param interval: (float) the fewest seconds between written accesses
+        :param now: (Optional[float]) epoch seconds of the access, the current time if None
+        :return: None
+        """
+        now = time.time() if now is None else now
+        descriptor: int = os.open(cache_path + cls.FILE_NAME, os.O_RDWR | os.O_CREAT)
+        try:
+            if fcntl is not None:
+                fcntl.flock(descriptor, fcntl.LOCK_EX)
+            data: bytes = os.pread(descriptor, cls.FORMAT.size, 0)
+            legacy: bool = len(data) < cls.FORMAT.size
+            access: Optional[Access] = (
+                cls._read_legacy(cache_path=cache_path)
+                if legacy
+                else Access(*cls.FORMAT.unpack(data))
+            )
+            if access is None:
+                access = Access(created=now, last_access=now, access_count=0)
+            elif legacy is False and now - access.last_access < interval:
+                return
+            os.pwrite(
+                descriptor,
+                cls.FORMAT.pack(access.created, now, access.access_count + 1),
+                0,
+            )
+        finally:
+            os.close(descriptor)
+        if legacy is True and os.path.isfile(cache_path + cls.LEGACY_FILE_NAME):
+            os.remove(cache_path + cls.LEGACY_FILE_NAME)
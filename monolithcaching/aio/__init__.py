@@ -0,0 +1,252 @@
+"""This module manages the cache directories without blocking the event loop"""
+import asyncio
+import functools
+import time
+from typing import Dict, Optional, Union
+
+from ..errors import CacheManagerError
+from ..root_directory import RootDirectory
+from .register import AsyncRegister
+from .s3_worker import AsyncS3Worker
+from .worker import AsyncWorker
+
+
+class AsyncCacheManager:
+    """
+    This is a class for managing workers and meta data to a cache from asyncio code.
+
+    Attributes:
+        worker (Union[None, AsyncWorker, AsyncS3Worker]): worker object that manages the access to the cache
+        s3 (bool): if True, use S3 instead of local file storage
+        s3_cache_path (Optional[str]): path to the cache in the s3
+        local_cache_path (Optional[str]): path to the local cache
+    """
+
+    def __init__(
+        self,
+        port: Optional[int] = None,
+        host: Optional[str] = None,
+        s3: bool = False,
+        s3_cache_path: Optional[str] = None,
+        local_cache_path: Optional[str] = None,
+        max_connections: Optional[int] = None,
+        meta_batch_size: int = 1,
+        meta_flush_interval: Optional[float] = None,
+    ) -> None:
+        """
+        The constructor for the AsyncCacheManager class.
+
+        :param port: (Optional[int]) port for the Redis connection to enable thread safe caching
+        :param host: (Optional[str]) host for the Redis connection to enable thread safe caching
+        :param s3: (bool) is True, connect to s3
+        :param s3_cache_path: (Optional[str]) path to the cache in the s3
+        :param local_cache_path: (Optional[str]) path to the local cache
+        :param max_connections: (Optional[int]) max connections of the Redis client of the manager
+        :param meta_batch_size: (int) number of meta inserts held in memory before they are written to the cache
+        :param meta_flush_interval: (Optional[float]) seconds after which held meta inserts are written on insert
+        """
+        self.worker: Union[None, AsyncWorker, AsyncS3Worker] = None
+        # pylint: disable=invalid-name
+        self.s3: bool = s3
+        self.s3_cache_path: Optional[str] = s3_cache_path
+        self.local_cache_path: Optional[str] = (
+            RootDirectory().path if local_cache_path is None else local_cache_path
+        )
+        self.meta_batch_size: int = meta_batch_size
+        self.meta_flush_interval: Optional[float] = meta_flush_interval
+        self._register: Optional[AsyncRegister] = (
+            AsyncRegister(host=host, port=port, max_connections=max_connections)
+            if port is not None and host is not None
+            else None
+        )
+        self._meta: Optional[Dict] = None
+        self._pending_meta_writes: int = 0
+        self._last_meta_flush: float = time.monotonic()
+
+    async def create_cache(self, existing_cache: Optional[str] = None) -> None:
+        """
+        Deletes the old worker and creates a new one.
+
+        :param existing_cache: (Optional[str]) path to existing cache
+        :return: None
+        """
+        if self.worker is not None:
+            await self.wipe_cache()
+        if self.s3 is True and self.s3_cache_path is not None:
+            s3_worker: AsyncS3Worker = AsyncS3Worker(
+                cache_path=self.s3_cache_path, existing_cache=existing_cache
+            )
+            await s3_worker.connect()
+            self.worker = s3_worker
+        else:
+            worker: AsyncWorker = AsyncWorker(
+                register=self._register,
+                existing_cache=existing_cache,
+                local_cache=self.local_cache_path,
+            )
+            await worker.connect()
+            self.worker = worker
+            if existing_cache is None:
+                self._meta = {}
+            elif (await self.get_meta()).get("locked", False) is True:
+                worker.lock()
+
+    async def lock_cache(self) -> None:
+        """
+        Locks the cache so it doesn't get wiped when finished.
+
+        :return: None
+        """
+        if self.worker is None:
+            raise CacheManagerError(
+                message="cache worker is not defined so cannot be locked"
+            )
+        if self.s3 is False and isinstance(self.worker, AsyncWorker):
+            self.worker.lock()
+            await self.insert_meta(key="locked", value=True)
+            await self.flush()
+
+    async def unlock_cache(self) -> None:
+        """
+        Unlocks the cache so it will get wiped when finished.
+
+        :return: None
+        """
+        if self.worker is None:
+            raise CacheManagerError(
+                message="cache worker is not defined so cannot be unlocked"
+            )
+        if self.s3 is False and isinstance(self.worker, AsyncWorker):
+            self.worker.unlock()
+            await self.insert_meta(key="locked", value=False)
+            await self.flush()
+
+    async def wipe_cache(self) -> None:
+        """
+        Writes any held meta and deletes the current worker.
+
+        :return: None
+        """
+        await self.flush()
+        worker = self.worker
+        self.worker = None
+        self._meta = None
+        if isinstance(worker, AsyncWorker):
+            await worker.delete_directory()
+        elif isinstance(worker, AsyncS3Worker):
+            await worker.close()
+
+    async def insert_meta(
+        self, key: str, value: Union[str, int, float, dict, list]
+    ) -> None:
+        """
+        Inserts meta into the meta of the cache.
+
+        :param key: (str) key the value to be stored
+        :param value: (Union[str, int, float, dict, list]) data to be stored
+        :return: None
+        """
+        await self.update_meta(data={key: value})
+
+    async def update_meta(
+        self, data: Dict[str, Union[str, int, float, dict, list]]
+    ) -> None:
+        """
+        Inserts all the keys of data into the meta of the cache with one read and one write of the meta.
+
+        :param data: (Dict[str, Union[str, int, float, dict, list]]) keys and values to be stored
+        :return: None
+        """
+        if self.worker is None:
+            raise CacheManagerError(
+                message="you are trying to insert meta data when no cache is made"
+            )
+        if self.s3 is False and isinstance(self.worker, AsyncWorker):
+            (await self._load_meta()).update(data)
+            self._pending_meta_writes += 1
+            if self._pending_meta_writes >= self.meta_batch_size or (
+                self.meta_flush_interval is not None
+                and time.monotonic() - self._last_meta_flush >= self.meta_flush_interval
+            ):
+                await self.flush()
+        elif self.s3 is True and isinstance(self.worker, AsyncS3Worker):
+            await self.worker.update_meta(data=data)
+        else:
+            raise CacheManagerError(message="worker type is not consistent with setup")
+
+    async def _load_meta(self) -> Dict:
+        """
+        Gets the in memory meta of the local cache, reading the meta file once in the default executor if it is
+        not loaded (private).
+
+        :return: (dict) the in memory meta
+        """
+        if self._meta is None:
+            meta = await asyncio.get_running_loop().run_in_executor(
+                None, self.worker.read_meta  # type: ignore
+            )
+            if self._meta is None:
+                self._meta = meta
+        return self._meta  # type: ignore
+
+    async def flush(self) -> None:
+        """
+        Writes the in memory meta to the meta file of the local cache in the default executor if there are inserts
+        pending. A copy of the meta is written so inserts made while the write runs are not torn.
+
+        :return: None
+        """
+        if (
+            self._pending_meta_writes > 0
+            and self._meta is not None
+            and isinstance(self.worker, AsyncWorker)
+        ):
+            self._pending_meta_writes = 0
+            self._last_meta_flush = time.monotonic()
+            await asyncio.get_running_loop().run_in_executor(
+                None, functools.partial(self.worker.write_meta, data=dict(self._meta))
+            )
+            return
+        self._pending_meta_writes = 0
+        self._last_meta_flush = time.monotonic()
+
+    async def get_meta(self) -> Dict:
+        """
+        Gets the meta data of the cache.
+
+        :return: (dict) of meta data from cache
+        """
+        if self.s3 is False and isinstance(self.worker, AsyncWorker):
+            return dict(await self._load_meta())
+        if isinstance(self.worker, AsyncS3Worker):
+            return await self.worker.get_meta()
+        raise CacheManagerError(message="worker is not present for meta data")
+
+    async def close(self) -> None:
+        """
+        Wipes the cache and closes the Redis connections of the manager.
+
+        :return: None
+        """
+        await self.wipe_cache()
+        if self._register is not None:
+            await self._register.close()
+
+    @property
+    def cache_path(self) -> Optional[str]:
+        """
+        Dynamic property.
+
+        :return: if self.worker => self.worker.base_dir else None
+        """
+        if self.worker:
+            return self.worker.base_dir
+        return None
+
+    async def __aenter__(self):
+        await self.create_cache()
+        return self
+
+    # pylint: disable=redefined-builtin
+    async def __aexit__(self, type, value, traceback):
+        await self.close()
@@ -0,0 +1,104 @@
+"""this file defines the register for tracking caches in Redis without blocking the event loop"""
+from typing import List, Optional
+
+from redis.asyncio import StrictRedis
+
+from ..errors import RegisterError
+from ..register import Register
+
+
+class AsyncRegister:
+    """
+    This class is responsible for logging caches to Redis and counting how many caches are pointing to the cache
+    using the asyncio Redis client.
+    """
+
+    TABLE = Register.TABLE
+
+    def __init__(
+        self, host: str, port: int, max_connections: Optional[int] = None
+    ) -> None:
+        """
+        The constructor for the AsyncRegister class.
+
+        :param host: (str) host for the Redis connection
+        :param port: (int) port for the Redis connection
+        :param max_connections: (Optional[int]) the max number of connections the client can open
+        """
+        self._connection: StrictRedis = StrictRedis(
+            host=host, port=port, db=0, max_connections=max_connections
+        )
+        self._register_script = self._connection.register_script(
+            Register.REGISTER_SCRIPT
+        )
+        self._deregister_script = self._connection.register_script(
+            Register.DEREGISTER_SCRIPT
+        )
+
+    async def get_count(self, cache_path: str) -> Optional[int]:
+        """
+        Gets the reference count for the cache.
+
+        :param cache_path: (str) the path to the cache
+        :return: (Optional[int]) number of count, or None if cache does not exist
+        """
+        count = await self._connection.hget(name=self.TABLE, key=cache_path)
+        if count is None:
+            return None
+        return int(count)
+
+    async def register_cache(self, cache_path: str) -> int:
+        """
+        Registers the cache path if there isn't an entry or increasing the count by one if there is, refusing
+        caches claimed for eviction.
+
+        :param cache_path: (str) the path to the cache
+        :return: (int) the count of the references after the register
+        """
+        count: int = int(
+            await self._register_script(keys=[self.TABLE], args=[cache_path])
+        )
+        if count < 0:
+            raise RegisterError(
+                message="cache {} is being evicted so it cannot be registered".format(
+                    cache_path
+                )
+            )
+        return count
+
+    async def deregister_cache(self, cache_path: str, locked: bool) -> int:
+        """
+        Deletes the cache path from Redis if the count goes to Zero or decreases the count by one if not zero.
+
+        :param cache_path: (str) the path to the cache
+        :param locked: (bool) is set to True prevents deleting of cache even if it has a count of zero
+        :return: (int) the count of the references after the deregister.
+        """
+        count: int = int(
+            await self._deregister_script(
+                keys=[self.TABLE], args=[cache_path, "1" if locked else "0"]
+            )
+        )
+        if count < 0:
+            raise RegisterError(
+                message="cache {} is not in cache register so it cannot be de-registered".format(
+                    cache_path
+                )
+            )
+        return count
+
+    async def get_all_records(self) -> List[dict]:
+        """
+        Get's all the key entries for the LOCAL_CLOUD.
+
+        :return: (List[dict]) all cache entries
+        """
+        return await self._connection.hgetall(name=self.TABLE)  # type: ignore
+
+    async def close(self) -> None:
+        """
+        Closes the connections of the register.
+
+        :return: None
+        """
+        await self._connection.close()
@@ -0,0 +1,169 @@
+"""this file defines the worker for pointing to caches in s3 buckets without blocking the event loop"""
+import json
+import os
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from ..errors import WorkerCacheError
+from ..s3_worker import S3Worker
+
+try:
+    from aiobotocore.session import get_session  # type: ignore
+except ImportError:  # pragma: no cover
+    get_session = None
+
+
+class AsyncS3Worker:
+    """
+    This is a class for managing a directory for temp files in S3 with an aiobotocore client.
+
+    Attributes:
+        id (str): unique id for the worker
+        base_dir (str): directory path for the cache
+    """
+
+    DELETE_BATCH_SIZE: int = 1000
+
+    def __init__(self, cache_path: str, existing_cache: Optional[str] = None) -> None:
+        """
+        The constructor for the AsyncS3Worker class. The client is opened when connect is awaited.
+
+        :param cache_path: (str) the root path for all caches
+        :param existing_cache: (Optional[str]) points to an existing cache if entered
+        """
+        # pylint: disable=invalid-name
+        if existing_cache is None:
+            self.id: str = str(UUID(bytes=os.urandom(16), version=4))
+        else:
+            self.id = S3Worker.extract_id(storage_path=existing_cache)
+        self.base_dir: str = cache_path + "{}/".format(self.id)
+        self._existing_cache: Optional[str] = existing_cache
+        self._client_context: Any = None
+        self._client: Any = None
+        self._locked: bool = False
+
+    async def connect(self) -> None:
+        """
+        Opens the S3 client and creates the meta file if this is a new cache.
+
+        :return: None
+        """
+        if get_session is None:
+            raise WorkerCacheError(
+                message="aiobotocore is required for async S3 caching, install monolithcaching[async]"
+            )
+        self._client_context = get_session().create_client("s3")
+        self._client = await self._client_context.__aenter__()
+        if self._existing_cache is None:
+            await self.create_meta()
+
+    async def close(self) -> None:
+        """
+        Closes the S3 client.
+
+        :return: None
+        """
+        if self._client_context is not None:
+            await self._client_context.__aexit__(None, None, None)
+            self._client_context = None
+            self._client = None
+
+    async def delete_directory(self) -> None:
+        """
+        Deletes cache directory.
+
+        :return: None
+        """
+        bucket, cache_path, _ = S3Worker._split_s3_path(storage_path=self.base_dir)
+        paginator = self._client.get_paginator("list_objects_v2")
+        async for page in paginator.paginate(Bucket=bucket, Prefix=cache_path):
+            keys: List[Dict[str, str]] = [
+                {"Key": item["Key"]} for item in page.get("Contents", [])
+            ]
+            for start in range(0, len(keys), self.DELETE_BATCH_SIZE):
+                await self._client.delete_objects(
+                    Bucket=bucket,
+                    Delete={
+                        "Objects": keys[start : start + self.DELETE_BATCH_SIZE],
+                        "Quiet": True,
+                    },
+                )
+
+    async def create_meta(self) -> None:
+        """
+        Creates the meta file for the cache.
+
+        :return: None
+        """
+        await self._put_meta(meta_data={})
+
+    async def insert_meta(self, key: str, value: Any) -> None:
+        """
+        Inserts a value into the meta data file of the cache.
+
+        :param key: (str) the key the value is denoted under
+        :param value: (Any) the value to be inserted
+        :return: None
+        """
+        await self.update_meta(data={key: value})
+
+    async def update_meta(self, data: Dict[str, Any]) -> None:
+        """
+        Inserts all the keys of data into the meta data file of the cache with one GET and one PUT.
+
+        :param data: (Dict[str, Any]) the keys and values to be inserted
+        :return: None
+        """
+        meta_data: Dict = await self.get_meta()
+        meta_data.update(data)
+        await self._put_meta(meta_data=meta_data)
+
+    async def get_meta(self) -> Dict:
+        """
+        Extracts the meta data from the meta.json file of the cache.
+
+        :return: (Dict) meta data of the cache
+        """
+        bucket, cache_path, _ = S3Worker._split_s3_path(storage_path=self.base_dir)
+        response = await self._client.get_object(
+            Bucket=bucket, Key=cache_path + "meta.json"
+        )
+        async with response["Body"] as stream:
+            return json.loads((await stream.read()).decode("utf-8"))
+
+    async def _put_meta(self, meta_data: Dict) -> None:
+        """
+        Writes the meta data to the meta.json file of the cache (private).
+
+        :param meta_data: (Dict) the meta data to be written
+        :return: None
+        """
+        bucket, cache_path, _ = S3Worker._split_s3_path(storage_path=self.base_dir)
+        await self._client.put_object(
+            Bucket=bucket,
+            Key=cache_path + "meta.json",
+            Body=bytes(json.dumps(meta_data).encode("UTF-8")),
+        )
+
+    def lock(self) -> None:
+        """
+        Placeholder for locking as all S3 is locked.
+
+        :return: None
+        """
+
+    async def check_file(self, file: str) -> bool:
+        """
+        Checks to see if a file is present in the cache.
+
+        :param file: (str) name of the file being checked
+        :return: True if present, False if not
+        """
+        bucket, cache_path, _ = S3Worker._split_s3_path(storage_path=self.base_dir)
+        try:
+            await self._client.head_object(Bucket=bucket, Key=cache_path + file)
+        except self._client.exceptions.ClientError as error:
+            if error.response["Error"]["Code"] == "404":
+                return False
+            raise
+        return True
@@ -0,0 +1,80 @@
+"""this file defines the worker for managing local cache directories without blocking the event loop"""
+import asyncio
+import shutil
+from typing import Optional
+
+from ..errors import RegisterError
+from ..worker import Worker
+from .register import AsyncRegister
+
+
+class AsyncWorker(Worker):
+    """
+    This is a class for managing a directory for temp files where the reference counting and deletion are awaited.
+
+    Attributes:
+        id (str): unique id for the worker
+    """
+
+    def __init__(
+        self,
+        register: Optional[AsyncRegister] = None,
+        existing_cache: Optional[str] = None,
+        local_cache: Optional[str] = None,
+    ) -> None:
+        """
+        The constructor for the AsyncWorker class. The cache is registered when connect is awaited.
+
+        :param register: (Optional[AsyncRegister]) register tracking the caches in Redis
+        :param existing_cache: (Optional[str]) path to existing cache
+        :param local_cache: (Optional[str]) path to the local cache
+        """
+        self._register: Optional[AsyncRegister] = register
+        self._deleted: bool = False
+        super().__init__(
+            port=None, host=None, existing_cache=existing_cache, local_cache=local_cache
+        )
+
+    async def connect(self) -> None:
+        """
+        Registers the cache with the register if there is one.
+
+        :return: None
+        """
+        if self._register is not None:
+            try:
+                await self._register.register_cache(cache_path=self.base_dir)
+            except RegisterError:
+                # the cache is being evicted so it is not this worker's to deregister or delete
+                self._deleted = True
+                raise
+
+    async def delete_directory(self) -> None:  # type: ignore
+        """
+        Deregisters the cache and deletes the directory in the default executor if nothing else points to it.
+
+        :return: None
+        """
+        if self._deleted is True:
+            return
+        self._deleted = True
+        if self._register is not None:
+            count: int = await self._register.deregister_cache(
+                cache_path=self.base_dir, locked=self._locked
+            )
+            if count != 0:
+                return
+        if self._locked is False:
+            await asyncio.get_running_loop().run_in_executor(
+                None, shutil.rmtree, self.base_dir
+            )
+
+    def _delete_directory(self) -> None:
+        """
+        Deletes an unlocked cache that was never deleted when there is no register to await (private).
+
+        :return: None
+        """
+        if self._deleted is False and self._register is None and self._locked is False:
+            self._deleted = True
+            shutil.rmtree(self.base_dir)
@@ -0,0 +1,121 @@
+"""this file defines storing NumPy arrays and Arrow tables in caches as files that can be memory mapped"""
+from io import BytesIO
+from typing import Any, Dict, Optional
+
+from .backend import CacheBackend
+from .errors import WorkerCacheError
+
+try:
+    import numpy as np  # type: ignore
+except ImportError:  # pragma: no cover
+    np = None  # type: ignore
+
+try:
+    import pyarrow as pa  # type: ignore
+except ImportError:  # pragma: no cover
+    pa = None  # type: ignore
+
+
+ARRAYS_META_KEY: str = "arrays"
+
+
+def _is_arrow(array: Any) -> bool:
+    """
+    Checks if an array is an Arrow table or record batch (private).
+
+    :param array: (Any) the array being checked
+    :return: (bool) True if pyarrow is installed and the array is a Table or RecordBatch
+    """
+    return pa is not None and isinstance(array, (pa.Table, pa.RecordBatch))
+
+
+def put_array(backend: CacheBackend, key: str, array: Any) -> Dict:
+    """
+    Writes a NumPy array as a .npy file, whose data starts on a 64 byte boundary, or an Arrow table or record
+    batch as an Arrow IPC file to the cache under the key. The file is written to a temp file and renamed so
+    arrays already mapped from the key are not changed.
+
+    :param backend: (CacheBackend) the backend of the cache
+    :param key: (str) the key of the file relative to the cache
+    :param array: (Any) the numpy.ndarray, pyarrow.Table or pyarrow.RecordBatch to be stored
+    :return: (Dict) the format, dtype and shape of the array to be recorded in the meta of the cache
+    """
+    if _is_arrow(array=array):
+        with backend.open_write(key=key) as file:
+            with pa.ipc.new_file(file, array.schema) as writer:
+                writer.write(array)
+        return {
+            "format": "arrow",
+            "dtype": {field.name: str(field.type) for field in array.schema},
+            "shape": [array.num_rows, array.num_columns],
+        }
+    if np is None or not isinstance(array, np.ndarray):
+        raise WorkerCacheError(
+            message="array {} is not a numpy.ndarray, pyarrow.Table or pyarrow.RecordBatch".format(
+                key
+            )
+        )
+    if array.dtype.hasobject:
+        raise WorkerCacheError(
+            message="array {} has an object dtype that cannot be memory mapped".format(
+                key
+            )
+        )
+    with backend.open_write(key=key) as file:
+        np.lib.format.write_array(file, array, allow_pickle=False)
+    return {"format": "npy", "dtype": str(array.dtype), "shape": list(array.shape)}
+
+
+def get_array(
+    backend: CacheBackend, key: str, record: Dict, mmap_mode: Optional[str] = "r"
+) -> Any:
+    """
+    Reads an array stored with put_array. If the backend has a local copy of the key a NumPy array is returned
+    as a numpy.memmap and an Arrow table is read from a memory map, so processes reading the same array share
+    the page cache. Otherwise the file is read into memory once and the array is a view over it.
+
+    :param backend: (CacheBackend) the backend of the cache
+    :param key: (str) the key of the file relative to the cache
+    :param record: (Dict) the record of the array returned by put_array
+    :param mmap_mode: (Optional[str]) mode NumPy arrays are mapped with, "r", "r+" or "c", None to read a copy
+    :return: (Any) the numpy.ndarray or pyarrow.Table
+    """
+    path: Optional[str] = backend.local_path(key=key)
+    if record["format"] == "arrow":
+        if pa is None:
+            raise WorkerCacheError(
+                message="pyarrow needs to be installed to read array {}".format(key)
+            )
+        if path is not None:
+            return pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+        return pa.ipc.open_file(pa.py_buffer(backend.get_bytes(key=key))).read_all()
+    if np is None:
+        raise WorkerCacheError(
+            message="numpy needs to be installed to read array {}".format(key)
+        )
+    if path is not None:
+        return np.load(path, mmap_mode=mmap_mode, allow_pickle=False)  # type: ignore
+    return _npy_view(data=backend.get_bytes(key=key))
+
+
+def _npy_view(data: bytes) -> Any:
+    """
+    Gets a read only view over the data of a .npy file in memory (private).
+
+    :param data: (bytes) the .npy file
+    :return: (numpy.ndarray) the array backed by data
+    """
+    stream: BytesIO = BytesIO(data)
+    version = np.lib.format.read_magic(stream)
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(stream)
+    elif version == (2, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(stream)
+    else:
+        return np.load(BytesIO(data), allow_pickle=False)
+    return np.frombuffer(
+        data,
+        dtype=dtype,
+        count=int(np.prod(shape, dtype=np.int64)),
+        offset=stream.tell(),
+    ).reshape(shape, order="F" if fortran_order else "C")
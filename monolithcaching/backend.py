@@ -0,0 +1,242 @@
+"""this file defines the interface every cache storage backend implements and the registry of backends"""
+from abc import ABC, abstractmethod
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    ContextManager,
+    Dict,
+    Optional,
+    Type,
+    TYPE_CHECKING,
+)
+
+from .errors import CacheManagerError
+
+if TYPE_CHECKING:  # pragma: no cover
+    from . import CacheManager
+
+
+class CacheBackend(ABC):
+    """
+    This is the interface for the storage of one cache. Backends create the cache and an empty meta when they
+    are constructed without an existing cache, and attach to the existing cache otherwise.
+
+    Attributes:
+        id (str): unique id for the worker
+        base_dir (str): path to the cache, the value passed as existing_cache to attach to it again
+    """
+
+    id: str
+
+    @classmethod
+    @abstractmethod
+    def from_manager(
+        cls, manager: "CacheManager", existing_cache: Optional[str] = None
+    ) -> "CacheBackend":
+        """
+        Creates or attaches to a cache with the settings of a manager.
+
+        :param manager: (CacheManager) the manager the cache is for
+        :param existing_cache: (Optional[str]) path to existing cache
+        :return: (CacheBackend) the backend pointing to the cache
+        """
+
+    @property
+    @abstractmethod
+    def locked(self) -> bool:
+        """
+        Dynamic property.
+
+        :return: (bool) True if the cache is kept when the backend is finished with it
+        """
+
+    @abstractmethod
+    def lock(self) -> None:
+        """
+        Prevents the cache from being deleted when the backend is finished with it.
+
+        :return: None
+        """
+
+    @abstractmethod
+    def unlock(self) -> None:
+        """
+        Allows the cache to be deleted when the backend is finished with it.
+
+        :return: None
+        """
+
+    @abstractmethod
+    def create_meta(self) -> None:
+        """
+        Writes an empty meta for the cache.
+
+        :return: None
+        """
+
+    @abstractmethod
+    def read_meta(self) -> Dict:
+        """
+        Reads the meta of the cache.
+
+        :return: (dict) the meta of the cache
+        """
+
+    @abstractmethod
+    def write_meta(self, data: Dict) -> None:
+        """
+        Replaces the meta of the cache.
+
+        :param data: (dict) the meta of the cache
+        :return: None
+        """
+
+    def update_meta(self, data: Dict[str, Any]) -> None:
+        """
+        Inserts all the keys of data into the meta of the cache with one read and one write.
+
+        :param data: (Dict[str, Any]) the keys and values to be inserted
+        :return: None
+        """
+        meta: Dict = self.read_meta()
+        meta.update(data)
+        self.write_meta(data=meta)
+
+    def insert_meta(self, key: str, value: Any) -> None:
+        """
+        Inserts a value into the meta of the cache.
+
+        :param key: (str) the key the value is denoted under
+        :param value: (Any) the value to be inserted
+        :return: None
+        """
+        self.update_meta(data={key: value})
+
+    @abstractmethod
+    def delete_directory(self) -> None:
+        """
+        Deletes the cache and everything in it.
+
+        :return: None
+        """
+
+    @abstractmethod
+    def check_file(self, file: str) -> bool:
+        """
+        Checks to see if a file is present in the cache.
+
+        :param file: (str) key of the file being checked
+        :return: True if present, False if not
+        """
+
+    @abstractmethod
+    def delete_file(self, key: str) -> None:
+        """
+        Deletes a file from the cache if it is there.
+
+        :param key: (str) the key of the file relative to the cache
+        :return: None
+        """
+
+    def local_path(self, key: str) -> Optional[str]:
+        """
+        Gets the path to a copy of a key on the local machine that can be opened or memory mapped directly.
+
+        :param key: (str) the key of the file relative to the cache
+        :return: (Optional[str]) path to the local copy, None if the backend has no local copy of the key
+        """
+        return None
+
+    @abstractmethod
+    def put_file(self, key: str, source_path: str) -> None:
+        """
+        Stores a file in the cache under the key.
+
+        :param key: (str) the key of the file relative to the cache
+        :param source_path: (str) path to the file being stored
+        :return: None
+        """
+
+    @abstractmethod
+    def get_file(self, key: str, destination_path: str) -> None:
+        """
+        Fetches a file of the cache to the destination path.
+
+        :param key: (str) the key of the file relative to the cache
+        :param destination_path: (str) path the file is written to
+        :return: None
+        """
+
+    @abstractmethod
+    def put_bytes(self, key: str, data: bytes) -> None:
+        """
+        Stores bytes in the cache under the key.
+
+        :param key: (str) the key of the file relative to the cache
+        :param data: (bytes) the data to be stored
+        :return: None
+        """
+
+    @abstractmethod
+    def get_bytes(self, key: str) -> bytes:
+        """
+        Fetches the bytes of a file in the cache.
+
+        :param key: (str) the key of the file relative to the cache
+        :return: (bytes) the data of the file
+        """
+
+    @abstractmethod
+    def open_read(self, key: str) -> ContextManager[BinaryIO]:
+        """
+        Opens a file in the cache for streaming reads.
+
+        :param key: (str) the key of the file relative to the cache
+        :return: (ContextManager[BinaryIO]) context manager yielding the readable file
+        """
+
+    @abstractmethod
+    def open_write(self, key: str) -> ContextManager[BinaryIO]:
+        """
+        Opens a file in the cache for streaming writes that is stored when the block exits without an error.
+
+        :param key: (str) the key of the file relative to the cache
+        :return: (ContextManager[BinaryIO]) context manager yielding the writable file
+        """
+
+
+BACKENDS: Dict[str, Type[CacheBackend]] = {}
+
+
+def register_backend(
+    name: str,
+) -> Callable[[Type[CacheBackend]], Type[CacheBackend]]:
+    """
+    Registers a backend class under a name so a CacheManager can be created with backend=name.
+
+    :param name: (str) the name of the backend
+    :return: (Callable[[Type[CacheBackend]], Type[CacheBackend]]) class decorator registering the backend
+    """
+
+    def decorator(backend: Type[CacheBackend]) -> Type[CacheBackend]:
+        BACKENDS[name] = backend
+        return backend
+
+    return decorator
+
+
+def get_backend(name: str) -> Type[CacheBackend]:
+    """
+    Gets the backend class registered under a name.
+
+    :param name: (str) the name of the backend
+    :return: (Type[CacheBackend]) the backend class
+    """
+    if name not in BACKENDS:
+        raise CacheManagerError(
+            message="backend {} is not one of the registered backends {}".format(
+                name, sorted(BACKENDS)
+            )
+        )
+    return BACKENDS[name]
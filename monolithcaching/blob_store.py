@@ -0,0 +1,199 @@
+"""this file defines the content addressed store that deduplicates files across the caches of a cache root"""
+import errno
+import hashlib
+import os
+import shutil
+import tempfile
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from .errors import WorkerCacheError
+
+try:
+    from blake3 import blake3  # type: ignore
+except ImportError:  # pragma: no cover
+    blake3 = None
+
+
+class BlobStore:
+    """
+    This is a class for managing files stored once under <root>/blobs/<algorithm>/ by the hash of their content.
+    Caches hold hard links to the blobs, so a blob is referenced by every cache holding it and it is garbage
+    collected once the store holds its only link. Blobs are read only as every link shares their content.
+
+    Attributes:
+        root (str): the cache root the store is under
+        algorithm (str): "sha256" or "blake3" hash the blobs are keyed by
+        path (str): directory of the blobs
+    """
+
+    DIRECTORY: str = "blobs"
+    BLOB_LIST: str = ".blobs"
+    CHUNK_SIZE: int = 8 * 1024 * 1024
+
+    def __init__(self, root: str, algorithm: str = "sha256") -> None:
+        """
+        The constructor for the BlobStore class.
+
+        :param root: (str) the cache root the store is under
+        :param algorithm: (str) "sha256" or "blake3" hash the blobs are keyed by, blake3 needs the blake3 package
+        """
+        hashers: Dict[str, Callable] = {"sha256": hashlib.sha256}
+        if blake3 is not None:
+            hashers["blake3"] = blake3
+        if algorithm not in hashers:
+            raise WorkerCacheError(
+                message="blob hash {} is not one of the available hashes {}".format(
+                    algorithm, sorted(hashers)
+                )
+            )
+        self.root: str = root
+        self.algorithm: str = algorithm
+        self._hasher: Callable = hashers[algorithm]
+        self.path: str = os.path.join(root, self.DIRECTORY, algorithm)
+
+    def hash_file(self, path: str) -> str:
+        """
+        Hashes the content of a file.
+
+        :param path: (str) path to the file
+        :return: (str) hex digest of the content
+        """
+        digest = self._hasher()
+        with open(path, "rb") as file:
+            for chunk in iter(lambda: file.read(self.CHUNK_SIZE), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def blob_path(self, digest: str) -> str:
+        """
+        Gets the path of a blob.
+
+        :param digest: (str) hex digest of the content of the blob
+        :return: (str) path to the blob
+        """
+        return os.path.join(self.path, digest[:2], digest)
+
+    def add(self, source_path: str) -> str:
+        """
+        Stores the content of a file as a blob if the store does not hold it already. Only the hash is read when
+        the blob exists.
+
+        :param source_path: (str) path to the file being stored
+        :return: (str) hex digest of the content
+        """
+        digest: str = self.hash_file(path=source_path)
+        path: str = self.blob_path(digest=digest)
+        if os.path.isfile(path):
+            return digest
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        file_descriptor, temp_path = tempfile.mkstemp(
+            dir=os.path.dirname(path), prefix=".blob-", suffix=".tmp"
+        )
+        os.close(file_descriptor)
+        try:
+            shutil.copyfile(source_path, temp_path)
+            os.chmod(temp_path, 0o444)
+            os.link(temp_path, path)
+        except FileExistsError:
+            pass
+        finally:
+            os.unlink(temp_path)
+        return digest
+
+    def link(self, digest: str, destination_path: str) -> None:
+        """
+        Hard links a blob to a path, copying it if the path is on another file system.
+
+        :param digest: (str) hex digest of the content of the blob
+        :param destination_path: (str) path the blob is linked to, must not exist
+        :return: None
+        """
+        try:
+            os.link(self.blob_path(digest=digest), destination_path)
+        except OSError as error:
+            if error.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK):
+                raise
+            shutil.copyfile(self.blob_path(digest=digest), destination_path)
+
+    def record(self, cache_path: str, digest: str, key: str) -> None:
+        """
+        Appends a blob to the .blobs list of the blobs a cache has linked.
+
+        :param cache_path: (str) path to the cache
+        :param digest: (str) hex digest of the content of the blob
+        :param key: (str) the key the blob is linked to in the cache
+        :return: None
+        """
+        with open(os.path.join(cache_path, self.BLOB_LIST), "a") as file:
+            file.write("{} {} {}\n".format(self.algorithm, digest, key))
+
+    @classmethod
+    def cache_blobs(cls, cache_path: str) -> List[Tuple[str, str]]:
+        """
+        Reads the blobs a cache has linked.
+
+        :param cache_path: (str) path to the cache
+        :return: (List[Tuple[str, str]]) the algorithm and digest of every blob, empty if there are none
+        """
+        try:
+            with open(os.path.join(cache_path, cls.BLOB_LIST)) as file:
+                return [
+                    (line.split(" ", 2)[0], line.split(" ", 2)[1])
+                    for line in file
+                    if line.strip()
+                ]
+        except FileNotFoundError:
+            return []
+
+    @classmethod
+    def release(cls, root: str, blobs: Iterable[Tuple[str, str]]) -> int:
+        """
+        Deletes the blobs of a removed cache that no other cache links to.
+
+        :param root: (str) the cache root the store is under
+        :param blobs: (Iterable[Tuple[str, str]]) the algorithm and digest of the blobs of the cache
+        :return: (int) number of blobs deleted
+        """
+        digests: Dict[str, List[str]] = {}
+        for algorithm, digest in blobs:
+            digests.setdefault(algorithm, []).append(digest)
+        return sum(
+            cls(root=root, algorithm=algorithm).collect(digests=algorithm_digests)
+            for algorithm, algorithm_digests in digests.items()
+        )
+
+    def collect(self, digests: Iterable[str]) -> int:
+        """
+        Deletes the blobs that no cache links to any more.
+
+        :param digests: (Iterable[str]) digests of the blobs to be checked
+        :return: (int) number of blobs deleted
+        """
+        deleted: int = 0
+        for digest in set(digests):
+            path: str = self.blob_path(digest=digest)
+            try:
+                if os.stat(path).st_nlink == 1:
+                    os.unlink(path)
+                    deleted += 1
+            except FileNotFoundError:
+                continue
+        return deleted
+
+    def collect_all(self) -> int:
+        """
+        Deletes every blob in the store that no cache links to, such as blobs of caches removed by a crashed
+        process.
+
+        :return: (int) number of blobs deleted
+        """
+        if not os.path.isdir(self.path):
+            return 0
+        return self.collect(
+            digests=[
+                name
+                for directory in os.listdir(self.path)
+                for name in os.listdir(os.path.join(self.path, directory))
+                if not name.startswith(".")
+            ]
+        )
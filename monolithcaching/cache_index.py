@@ -0,0 +1,296 @@
+"""this file defines the persistent index of the caches under a cache root"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from .cache_root import CacheRecord, CacheRoot
+
+
+class CacheIndex:
+    """
+    This class is responsible for recording the caches under a cache root in a SQLite database in WAL mode so
+    caches can be listed, searched and evicted without walking the cache directories.
+
+    Sizes are tracked for files written through the worker API, and set to the size of the cache directory,
+    including files written straight into the cache path, whenever a worker detaches from a cache it leaves in
+    place. Caches can only be evicted once nothing points to them, so evictions compare against measured sizes.
+    """
+
+    FILE_NAME = "index.sqlite3"
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS caches (
+        path TEXT PRIMARY KEY,
+        id TEXT NOT NULL,
+        size INTEGER NOT NULL DEFAULT 0,
+        created REAL NOT NULL,
+        last_access REAL NOT NULL,
+        access_count INTEGER NOT NULL DEFAULT 1,
+        locked INTEGER NOT NULL DEFAULT 0,
+        meta TEXT NOT NULL DEFAULT '{}'
+    );
+    CREATE INDEX IF NOT EXISTS caches_last_access ON caches (last_access);
+    """
+
+    def __init__(self, root: str) -> None:
+        """
+        The constructor for the CacheIndex class. The database is created at <root>/index.sqlite3.
+
+        :param root: (str) the path to the root holding the cache directory
+        """
+        self.root: str = str(root)
+        os.makedirs(self.root, exist_ok=True)
+        self._lock: threading.Lock = threading.Lock()
+        self._connection: sqlite3.Connection = sqlite3.connect(
+            os.path.join(self.root, self.FILE_NAME),
+            timeout=30,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(self.SCHEMA)
+
+    def _execute(self, statement: str, *parameters: Any) -> sqlite3.Cursor:
+        """
+        Runs a statement on the database (private).
+
+        :param statement: (str) the SQL statement
+        :param parameters: (Any) the parameters of the statement
+        :return: (sqlite3.Cursor) the cursor of the statement
+        """
+        with self._lock:
+            return self._connection.execute(statement, parameters)
+
+    @staticmethod
+    def _cache_id(path: str) -> str:
+        """
+        Gets the id of a cache from its path (private).
+
+        :param path: (str) the path to the cache
+        :return: (str) the name of the cache directory
+        """
+        return os.path.basename(os.path.normpath(path))
+
+    def add(self, path: str) -> None:
+        """
+        Records a newly created cache.
+
+        :param path: (str) the path to the cache
+        :return: None
+        """
+        now: float = time.time()
+        self._execute(
+            "INSERT OR IGNORE INTO caches (path, id, created, last_access) VALUES (?, ?, ?, ?)",
+            path,
+            self._cache_id(path=path),
+            now,
+            now,
+        )
+
+    def touch(self, path: str) -> None:
+        """
+        Records an access of a cache, adding it if it is not recorded.
+
+        :param path: (str) the path to the cache
+        :return: None
+        """
+        now: float = time.time()
+        self._execute(
+            "INSERT INTO caches (path, id, created, last_access) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (path) DO UPDATE SET last_access = excluded.last_access, "
+            "access_count = access_count + 1",
+            path,
+            self._cache_id(path=path),
+            now,
+            now,
+        )
+
+    def add_size(self, path: str, size: int) -> None:
+        """
+        Adds bytes to the recorded size of a cache.
+
+        :param path: (str) the path to the cache
+        :param size: (int) bytes added, negative if bytes were removed
+        :return: None
+        """
+        self._execute("UPDATE caches SET size = size + ? WHERE path = ?", size, path)
+
+    def set_size(self, path: str, size: int) -> None:
+        """
+        Records the measured size of a cache.
+
+        :param path: (str) the path to the cache
+        :param size: (int) the bytes held by the cache
+        :return: None
+        """
+        self._execute("UPDATE caches SET size = ? WHERE path = ?", size, path)
+
+    def set_locked(self, path: str, locked: bool) -> None:
+        """
+        Records the lock state of a cache.
+
+        :param path: (str) the path to the cache
+        :param locked: (bool) True if the cache is locked
+        :return: None
+        """
+        self._execute("UPDATE caches SET locked = ? WHERE path = ?", int(locked), path)
+
+    def set_meta(self, path: str, meta: Dict) -> None:
+        """
+        Records the meta of a cache.
+
+        :param path: (str) the path to the cache
+        :param meta: (dict) the meta of the cache
+        :return: None
+        """
+        self._execute(
+            "UPDATE caches SET meta = ?, locked = ? WHERE path = ?",
+            json.dumps(meta),
+            int(meta.get("locked", False) is True),
+            path,
+        )
+
+    def remove(self, path: str) -> None:
+        """
+        Removes a deleted cache from the index.
+
+        :param path: (str) the path to the cache
+        :return: None
+        """
+        self._execute("DELETE FROM caches WHERE path = ?", path)
+
+    @staticmethod
+    def _to_record(row: tuple) -> CacheRecord:
+        """
+        Converts a row of the caches table to a record (private).
+
+        :param row: (tuple) path, id, size, created, last_access, access_count and locked of the cache
+        :return: (CacheRecord) the record of the cache
+        """
+        return CacheRecord(
+            id=row[1],
+            path=row[0],
+            size=row[2],
+            created=row[3],
+            last_access=row[4],
+            access_count=row[5],
+            locked=bool(row[6]),
+        )
+
+    def get(self, path: str) -> Optional[CacheRecord]:
+        """
+        Gets the record of a cache.
+
+        :param path: (str) the path to the cache
+        :return: (Optional[CacheRecord]) the record of the cache, None if it is not in the index
+        """
+        row = self._execute(
+            "SELECT path, id, size, created, last_access, access_count, locked "
+            "FROM caches WHERE path = ?",
+            path,
+        ).fetchone()
+        return None if row is None else self._to_record(row=row)
+
+    def get_meta(self, path: str) -> Optional[Dict]:
+        """
+        Gets the recorded meta of a cache.
+
+        :param path: (str) the path to the cache
+        :return: (Optional[dict]) the meta of the cache, None if it is not in the index
+        """
+        row = self._execute("SELECT meta FROM caches WHERE path = ?", path).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def records(self) -> List[CacheRecord]:
+        """
+        Gets the records of all the caches in the index, least recently used first.
+
+        :return: (List[CacheRecord]) the records of the caches
+        """
+        rows = self._execute(
+            "SELECT path, id, size, created, last_access, access_count, locked "
+            "FROM caches ORDER BY last_access"
+        ).fetchall()
+        return [self._to_record(row=row) for row in rows]
+
+    def expired(self, now: float) -> List[CacheRecord]:
+        """
+        Finds the caches whose meta has an "expires" time at or before now.
+
+        :param now: (float) epoch seconds the expiry times are compared to
+        :return: (List[CacheRecord]) the records of the expired caches
+        """
+        rows = self._execute(
+            "SELECT path, id, size, created, last_access, access_count, locked "
+            "FROM caches WHERE json_extract(meta, '$.expires') <= ? "
+            "ORDER BY last_access",
+            now,
+        ).fetchall()
+        return [self._to_record(row=row) for row in rows]
+
+    def search(self, key: str, value: Any) -> List[CacheRecord]:
+        """
+        Finds the caches whose meta has the value under the key.
+
+        :param key: (str) the key in the meta
+        :param value: (Any) the value the key needs to have
+        :return: (List[CacheRecord]) the records of the matching caches
+        """
+        rows = self._execute(
+            "SELECT path, id, size, created, last_access, access_count, locked "
+            "FROM caches WHERE json_extract(meta, ?) = json_extract(?, '$') "
+            "ORDER BY last_access",
+            "$." + json.dumps(key),
+            json.dumps(value),
+        ).fetchall()
+        return [self._to_record(row=row) for row in rows]
+
+    def rebuild(self) -> None:
+        """
+        Replaces the index with the state read from the cache directories under the root.
+
+        :return: None
+        """
+        root: CacheRoot = CacheRoot(path=self.root)
+        rows: List[tuple] = []
+        for record in root.caches():
+            try:
+                with open(record.path + "meta.json") as meta_file:
+                    meta: str = json.dumps(json.load(meta_file))
+            except (OSError, ValueError):
+                meta = "{}"
+            rows.append(
+                (
+                    record.path,
+                    record.id,
+                    record.size,
+                    record.created,
+                    record.last_access,
+                    record.access_count,
+                    int(record.locked),
+                    meta,
+                )
+            )
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                self._connection.execute("DELETE FROM caches")
+                self._connection.executemany(
+                    "INSERT INTO caches VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows
+                )
+                self._connection.execute("COMMIT")
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+
+    def close(self) -> None:
+        """
+        Closes the connection to the database.
+
+        :return: None
+        """
+        self._connection.close()
@@ -0,0 +1,256 @@
+"""this file defines the manager of the root directory holding all the local caches"""
+import json
+import os
+import shutil
+import time
+from typing import List, NamedTuple, Optional, TYPE_CHECKING
+
+from .access_record import Access, AccessRecord
+from .blob_store import BlobStore
+from .errors import CacheRootError
+from .local_register import LocalRegister
+from .register import Register
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .cache_index import CacheIndex
+
+
+class CacheRecord(NamedTuple):
+    """
+    The state of a local cache under the cache root.
+
+    Attributes:
+        id (str): the id of the cache
+        path (str): the path to the cache
+        size (int): the bytes held by the cache
+        created (float): epoch seconds of when the cache was created
+        last_access (float): epoch seconds of when the cache was last created or attached to
+        access_count (int): number of times the cache was created or attached to
+        locked (bool): if True, the cache is locked
+    """
+
+    id: str
+    path: str
+    size: int
+    created: float
+    last_access: float
+    access_count: int
+    locked: bool
+
+
+class CacheRoot:
+    """
+    This class is responsible for tracking the size and use of the caches under a cache root and evicting
+    unlocked caches that nothing points to when the root is over a byte or count budget. Evicting needs Redis or
+    the local register, as without one there is no way of telling if a live manager points to a cache. A cache
+    is claimed in the register in the same step as its count is checked, so a manager attaching while it is
+    being deleted is refused instead of losing the cache.
+    """
+
+    POLICIES = ("lru", "lfu")
+
+    def __init__(
+        self,
+        path: str,
+        port: Optional[int] = None,
+        host: Optional[str] = None,
+        index: Optional["CacheIndex"] = None,
+        local_register: bool = False,
+    ) -> None:
+        """
+        The constructor for the CacheRoot class.
+
+        :param path: (str) the path to the root holding the cache directory
+        :param port: (Optional[int]) port for the Redis connection tracking caches
+        :param host: (Optional[str]) host for the Redis connection tracking caches
+        :param index: (Optional[CacheIndex]) index of the caches used instead of walking the cache directories
+        :param local_register: (bool) if True and no Redis is given, references are read from the local register
+        """
+        self.path: str = str(path)
+        self._port: Optional[int] = port
+        self._host: Optional[str] = host
+        self._index: Optional["CacheIndex"] = index
+        self._local_register: bool = local_register
+
+    @staticmethod
+    def _directory_size(path: str) -> int:
+        """
+        Sums the size of all the files under a directory (private).
+
+        :param path: (str) path to the directory
+        :return: (int) the bytes held under the directory
+        """
+        size: int = 0
+        for entry in os.scandir(path):
+            if entry.is_dir(follow_symlinks=False):
+                size += CacheRoot._directory_size(path=entry.path)
+            elif entry.is_file(follow_symlinks=False):
+                size += entry.stat(follow_symlinks=False).st_size
+        return size
+
+    @staticmethod
+    def _read_locked(path: str) -> bool:
+        """
+        Reads if the cache is locked from the meta.json file of a cache (private).
+
+        :param path: (str) path to the cache
+        :return: (bool) True if the cache is locked
+        """
+        try:
+            with open(path + "meta.json") as meta_file:
+                return json.load(meta_file).get("locked", False) is True
+        except (OSError, ValueError):
+            return False
+
+    def record(self, cache_id: str) -> CacheRecord:
+        """
+        Reads the state of a cache under the root.
+
+        :param cache_id: (str) the id of the cache
+        :return: (CacheRecord) the size, use and lock state of the cache
+        """
+        path: str = self.path + "/cache/{}/".format(cache_id)
+        access: Optional[Access] = AccessRecord.read(cache_path=path)
+        if access is None:
+            modified: float = os.stat(path).st_mtime
+            access = Access(created=modified, last_access=modified, access_count=1)
+        return CacheRecord(
+            id=cache_id,
+            path=path,
+            size=self._directory_size(path=path),
+            created=access.created,
+            last_access=access.last_access,
+            access_count=access.access_count,
+            locked=self._read_locked(path=path),
+        )
+
+    def caches(self) -> List[CacheRecord]:
+        """
+        Reads the state of all the caches under the root.
+
+        :return: (List[CacheRecord]) the caches under the root
+        """
+        if self._index is not None:
+            return self._index.records()
+        cache_dir: str = self.path + "/cache/"
+        if not os.path.isdir(cache_dir):
+            return []
+        records: List[CacheRecord] = []
+        for entry in os.scandir(cache_dir):
+            if entry.is_dir(follow_symlinks=False):
+                try:
+                    records.append(self.record(cache_id=entry.name))
+                except FileNotFoundError:
+                    continue
+        return records
+
+    def reference_count(self, path: str) -> Optional[int]:
+        """
+        Gets the number of managers the register counts as pointing to a cache.
+
+        :param path: (str) the path to the cache
+        :return: (Optional[int]) the count, None if there is no register or the cache is not in it
+        """
+        if self._port is not None and self._host is not None:
+            return Register(host=self._host, port=self._port).get_count(cache_path=path)
+        if self._local_register is True:
+            return LocalRegister(root=self.path).get_count(cache_path=path)
+        return None
+
+    @property
+    def has_register(self) -> bool:
+        """
+        Dynamic property.
+
+        :return: (bool) True if references to the caches are counted in Redis or the local register
+        """
+        return (
+            self._port is not None and self._host is not None
+        ) or self._local_register is True
+
+    def claim(self, path: str) -> bool:
+        """
+        Claims a cache for deletion in the register if nothing points to it, checking the count and claiming in
+        one atomic step so no manager can register the cache until it is deleted.
+
+        :param path: (str) the path to the cache
+        :return: (bool) True if the cache was claimed, always True if there is no register
+        """
+        if self._port is not None and self._host is not None:
+            return Register(host=self._host, port=self._port).claim_cache(
+                cache_path=path
+            )
+        if self._local_register is True:
+            return LocalRegister(root=self.path).claim_cache(cache_path=path)
+        return True
+
+    def delete(self, path: str) -> None:
+        """
+        Deletes a cache under the root, releasing its blobs and removing it from the index and the register.
+
+        :param path: (str) the path to the cache
+        :return: None
+        """
+        blobs = BlobStore.cache_blobs(cache_path=path)
+        shutil.rmtree(path, ignore_errors=True)
+        if len(blobs) > 0:
+            BlobStore.release(root=self.path, blobs=blobs)
+        if self._index is not None:
+            self._index.remove(path=path)
+        if self._port is not None and self._host is not None:
+            Register(host=self._host, port=self._port).delete_cache(cache_path=path)
+        elif self._local_register is True:
+            LocalRegister(root=self.path).delete_cache(cache_path=path)
+
+    def evict(
+        self,
+        max_bytes: Optional[int] = None,
+        max_count: Optional[int] = None,
+        policy: str = "lru",
+        ttl: Optional[float] = None,
+    ) -> List[CacheRecord]:
+        """
+        Deletes unlocked caches that nothing points to. Caches not accessed for ttl seconds are always deleted,
+        then caches are deleted in policy order until the root fits in max_bytes and max_count. Raises a
+        CacheRootError if there is no register to count the managers pointing to the caches.
+
+        :param max_bytes: (Optional[int]) the most bytes held by all the caches under the root
+        :param max_count: (Optional[int]) the most caches under the root
+        :param policy: (str) "lru" deletes the least recently used first, "lfu" the least frequently used first
+        :param ttl: (Optional[float]) seconds since last access after which a cache is deleted
+        :return: (List[CacheRecord]) the caches that were deleted
+        """
+        if policy not in self.POLICIES:
+            raise CacheRootError(
+                message="eviction policy {} is not one of {}".format(
+                    policy, self.POLICIES
+                )
+            )
+        if self.has_register is False:
+            raise CacheRootError(
+                message="evicting caches needs Redis or the local register to count the managers pointing to them"
+            )
+        records: List[CacheRecord] = self.caches()
+        total_bytes: int = sum(record.size for record in records)
+        total_count: int = len(records)
+        if policy == "lru":
+            records.sort(key=lambda record: record.last_access)
+        else:
+            records.sort(key=lambda record: (record.access_count, record.last_access))
+
+        now: float = time.time()
+        evicted: List[CacheRecord] = []
+        for record in records:
+            expired: bool = ttl is not None and now - record.last_access > ttl
+            over_budget: bool = (max_bytes is not None and total_bytes > max_bytes) or (
+                max_count is not None and total_count > max_count
+            )
+            if not expired and not over_budget:
+                continue
+            if record.locked is True or self.claim(path=record.path) is False:
+                continue
+            self.delete(path=record.path)
+            total_bytes -= record.size
+            total_count -= 1
+            evicted.append(record)
+        return evicted
@@ -0,0 +1,492 @@
+"""this file defines the backend that compresses the files of another backend on put and decompresses them on get"""
+import io
+import zlib
+from contextlib import contextmanager
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Dict,
+    Iterator,
+    Optional,
+    Tuple,
+    TYPE_CHECKING,
+)
+
+from .backend import CacheBackend, get_backend
+from .errors import WorkerCacheError
+
+if TYPE_CHECKING:  # pragma: no cover
+    from . import CacheManager
+
+try:
+    import zstandard  # type: ignore
+except ImportError:  # pragma: no cover
+    zstandard = None  # type: ignore
+
+try:
+    import lz4.frame as lz4_frame  # type: ignore
+except ImportError:  # pragma: no cover
+    lz4_frame = None
+
+
+MAGIC: bytes = b"\x89MCC"
+IDENTITY: str = "identity"
+CODEC_NAMES: Tuple[str, ...] = ("zstd", "lz4", "gzip", IDENTITY)
+CHUNK_SIZE: int = 1024 * 1024
+
+
+class _Lz4Compressor:
+    """
+    This is a class giving the LZ4 frame compressor the compress and flush interface of zlib (private).
+    """
+
+    def __init__(self, level: int) -> None:
+        """
+        The constructor for the _Lz4Compressor class.
+
+        :param level: (int) the compression level
+        """
+        self._compressor = lz4_frame.LZ4FrameCompressor(compression_level=level)
+        self._begun: bool = False
+
+    def _begin(self) -> bytes:
+        """
+        Starts the frame the first time it is called (private).
+
+        :return: (bytes) the frame header, empty after the first call
+        """
+        if self._begun is True:
+            return b""
+        self._begun = True
+        return self._compressor.begin()
+
+    def compress(self, data: bytes) -> bytes:
+        """
+        Compresses a chunk of data.
+
+        :param data: (bytes) the chunk
+        :return: (bytes) the compressed data ready to be written
+        """
+        return self._begin() + self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        """
+        Ends the frame.
+
+        :return: (bytes) the rest of the compressed data
+        """
+        return self._begin() + self._compressor.flush()
+
+
+CODECS: Dict[str, Dict[str, Callable[..., Any]]] = {
+    "gzip": {
+        "compressor": lambda level: zlib.compressobj(
+            6 if level is None else level, zlib.DEFLATED, 31
+        ),
+        "decompressor": lambda: zlib.decompressobj(31),
+    }
+}
+if zstandard is not None:
+    CODECS["zstd"] = {
+        "compressor": lambda level: zstandard.ZstdCompressor(
+            level=3 if level is None else level
+        ).compressobj(),
+        "decompressor": lambda: zstandard.ZstdDecompressor().decompressobj(),
+    }
+if lz4_frame is not None:
+    CODECS["lz4"] = {
+        "compressor": lambda level: _Lz4Compressor(level=0 if level is None else level),
+        "decompressor": lambda: lz4_frame.LZ4FrameDecompressor(),
+    }
+
+
+def _codec(name: str) -> Dict[str, Callable[..., Any]]:
+    """
+    Gets a codec, raising an error naming the package to install if it is missing (private).
+
+    :param name: (str) the name of the codec
+    :return: (Dict[str, Callable[..., Any]]) the compressor and decompressor factories of the codec
+    """
+    if name not in CODECS:
+        raise WorkerCacheError(
+            message="compression codec {} is not one of the available codecs {}, zstd needs zstandard and "
+            "lz4 needs lz4 to be installed".format(name, sorted(CODECS))
+        )
+    return CODECS[name]
+
+
+def header(codec: str) -> bytes:
+    """
+    Builds the header that starts every file written with compression enabled and records its codec.
+
+    :param codec: (str) the name of the codec, "identity" for files stored without compression
+    :return: (bytes) the magic bytes, the length of the codec name and the codec name
+    """
+    name: bytes = codec.encode("ascii")
+    return MAGIC + bytes([len(name)]) + name
+
+
+class _CompressingWriter(io.RawIOBase):
+    """
+    This is a class for writing a file through a compressor. Data is held in memory until it reaches the
+    threshold, and files that never reach it are written without compression after an "identity" header
+    (private).
+    """
+
+    def __init__(
+        self, file: BinaryIO, codec: str, level: Optional[int], threshold: int
+    ) -> None:
+        """
+        The constructor for the _CompressingWriter class.
+
+        :param file: (BinaryIO) the file of the backend being written to
+        :param codec: (str) the name of the codec
+        :param level: (Optional[int]) the compression level, the default of the codec if None
+        :param threshold: (int) the fewest bytes that are compressed
+        """
+        super().__init__()
+        self._file: BinaryIO = file
+        self._codec: str = codec
+        self._level: Optional[int] = level
+        self._threshold: int = threshold
+        self._pending: bytearray = bytearray()
+        self._compressor: Any = None
+
+    def writable(self) -> bool:
+        """
+        :return: (bool) True as the writer can be written to
+        """
+        return True
+
+    def write(self, data: Any) -> int:  # type: ignore
+        """
+        Writes data to the file, compressing it once the threshold is reached.
+
+        :param data: (Any) the bytes like data
+        :return: (int) the number of bytes taken
+        """
+        size: int = memoryview(data).nbytes
+        if self._compressor is None:
+            self._pending += data
+            if len(self._pending) < self._threshold:
+                return size
+            self._compressor = _codec(name=self._codec)["compressor"](self._level)
+            self._file.write(header(codec=self._codec))
+            data, self._pending = bytes(self._pending), bytearray()
+        self._file.write(self._compressor.compress(bytes(data)))
+        return size
+
+    def finish(self) -> None:
+        """
+        Writes the data held in memory or the end of the compressed data.
+
+        :return: None
+        """
+        if self._compressor is None:
+            self._file.write(header(codec=IDENTITY) + bytes(self._pending))
+        else:
+            self._file.write(self._compressor.flush())
+
+
+class _DecompressingReader(io.RawIOBase):
+    """
+    This is a class for reading a file of a backend that may have been compressed (private).
+    """
+
+    def __init__(self, file: BinaryIO) -> None:
+        """
+        The constructor for the _DecompressingReader class. The header is read straight away to find the codec.
+        Files without a header, or whose first bytes only look like one as they do not name a codec, are read as
+        they are.
+
+        :param file: (BinaryIO) the file of the backend being read from
+        """
+        super().__init__()
+        self._file: BinaryIO = file
+        self._buffer: bytes = b""
+        self._decompressor: Any = None
+        self._eof: bool = False
+        self.codec: Optional[str] = None
+        start: bytes = file.read(len(MAGIC) + 1)
+        if start[: len(MAGIC)] != MAGIC or len(start) != len(MAGIC) + 1:
+            self._buffer = start
+            return
+        name: bytes = file.read(start[-1])
+        codec: str = name.decode("ascii", errors="replace")
+        if codec not in CODEC_NAMES:
+            self._buffer = start + name
+        elif codec != IDENTITY:
+            self.codec = codec
+            self._decompressor = _codec(name=codec)["decompressor"]()
+
+    def readable(self) -> bool:
+        """
+        :return: (bool) True as the reader can be read from
+        """
+        return True
+
+    def readinto(self, buffer: Any) -> int:  # type: ignore
+        """
+        Reads decompressed data into a buffer.
+
+        :param buffer: (Any) the writable buffer
+        :return: (int) the number of bytes read, 0 at the end of the file
+        """
+        while not self._buffer and not self._eof:
+            chunk: bytes = self._file.read(CHUNK_SIZE)
+            if not chunk:
+                self._eof = True
+                if self._decompressor is not None and hasattr(
+                    self._decompressor, "flush"
+                ):
+                    self._buffer = self._decompressor.flush()
+            elif self._decompressor is None:
+                self._buffer = chunk
+            else:
+                self._buffer = self._decompressor.decompress(chunk)
+        size: int = min(len(buffer), len(self._buffer))
+        buffer[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+
+class CompressedBackend(CacheBackend):
+    """
+    This is a class for compressing the files of another backend when they are put and decompressing them when
+    they are read. Every file it writes starts with a header recording its codec, "identity" for files smaller
+    than the threshold, so files are read correctly whatever the settings of the reader and whatever their
+    first bytes are. Files written without compression have no header and are read as they are. Anything that is not part of the backend interface is passed to the wrapped backend.
+
+    Attributes:
+        backend (CacheBackend): the wrapped backend
+        codec (str): "zstd", "lz4" or "gzip" codec new files are compressed with
+        level (Optional[int]): the compression level, the default of the codec if None
+        threshold (int): the fewest bytes that are compressed
+    """
+
+    def __init__(
+        self,
+        backend: CacheBackend,
+        codec: str = "zstd",
+        level: Optional[int] = None,
+        threshold: int = 1024,
+    ) -> None:
+        """
+        The constructor for the CompressedBackend class.
+
+        :param backend: (CacheBackend) the backend being wrapped
+        :param codec: (str) "zstd", "lz4" or "gzip" codec new files are compressed with
+        :param level: (Optional[int]) the compression level, the default of the codec if None
+        :param threshold: (int) the fewest bytes that are compressed
+        """
+        _codec(name=codec)
+        self.backend: CacheBackend = backend
+        self.codec: str = codec
+        self.level: Optional[int] = level
+        self.threshold: int = threshold
+
+    @classmethod
+    def from_manager(
+        cls, manager: "CacheManager", existing_cache: Optional[str] = None
+    ) -> "CompressedBackend":
+        """
+        Creates or attaches to a cache with the backend and compression settings of a manager.
+
+        :param manager: (CacheManager) the manager the cache is for
+        :param existing_cache: (Optional[str]) path to existing cache
+        :return: (CompressedBackend) the backend pointing to the cache
+        """
+        return cls(
+            backend=get_backend(name=manager.backend).from_manager(
+                manager=manager, existing_cache=existing_cache
+            ),
+            codec=manager.compression,  # type: ignore
+            level=manager.compression_level,
+            threshold=manager.compression_threshold,
+        )
+
+    def __getattr__(self, name: str) -> Any:
+        """
+        Gets the attributes of the wrapped backend that are not part of the backend interface, such as base_dir.
+
+        :param name: (str) the name of the attribute
+        :return: (Any) the attribute of the wrapped backend
+        """
+        return getattr(self.backend, name)
+
+    @property
+    def locked(self) -> bool:
+        """
+        Dynamic property.
+
+        :return: (bool) True if the wrapped backend keeps the cache when it is finished with it
+        """
+        return self.backend.locked
+
+    def lock(self) -> None:
+        """
+        Locks the wrapped backend.
+
+        :return: None
+        """
+        self.backend.lock()
+
+    def unlock(self) -> None:
+        """
+        Unlocks the wrapped backend.
+
+        :return: None
+        """
+        self.backend.unlock()
+
+    def create_meta(self) -> None:
+        """
+        Writes an empty meta with the wrapped backend, the meta is not compressed.
+
+        :return: None
+        """
+        self.backend.create_meta()
+
+    def read_meta(self) -> Dict:
+        """
+        Reads the meta with the wrapped backend.
+
+        :return: (dict) the meta of the cache
+        """
+        return self.backend.read_meta()
+
+    def write_meta(self, data: Dict) -> None:
+        """
+        Replaces the meta with the wrapped backend.
+
+        :param data: (dict) the meta of the cache
+        :return: None
+        """
+        self.backend.write_meta(data=data)
+
+    def delete_directory(self) -> None:
+        """
+        Deletes the cache with the wrapped backend.
+
+        :return: None
+        """
+        self.backend.delete_directory()
+
+    def delete_file(self, key: str) -> None:
+        """
+        Deletes a file with the wrapped backend.
+
+        :param key: (str) the key of the file relative to the cache
+        :return: None
+        """
+        self.backend.delete_file(key=key)
+
+    def check_file(self, file: str) -> bool:
+        """
+        Checks to see if a file is present with the wrapped backend.
+
+        :param file: (str) key of the file being checked
+        :return: True if present, False if not
+        """
+        return self.backend.check_file(file=file)
+
+    def local_path(self, key: str) -> Optional[str]:
+        """
+        Gets the path to a local copy of a key if it was stored without compression or a header.
+
+        :param key: (str) the key of the file relative to the cache
+        :return: (Optional[str]) path to the local copy, None if there is none or it starts with a header
+        """
+        path: Optional[str] = self.backend.local_path(key=key)
+        if path is None:
+            return None
+        with open(path, "rb") as file:
+            return None if file.read(len(MAGIC)) == MAGIC else path
+
+    def codec_of(self, key: str) -> Optional[str]:
+        """
+        Reads the codec a file was compressed with from its header.
+
+        :param key: (str) the key of the file relative to the cache
+        :return: (Optional[str]) the name of the codec, None if the file is not compressed
+        """
+        with self.backend.open_read(key=key) as file:
+            return _DecompressingReader(file=file).codec
+
+    @contextmanager
+    def open_read(self, key: str) -> Iterator[BinaryIO]:
+        """
+        Opens a file of the cache for streaming reads of its decompressed data.
+
+        :param key: (str) the key of the file relative to the cache
+        :return: (Iterator[BinaryIO]) context manager yielding the file
+        """
+        with self.backend.open_read(key=key) as file:
+            with io.BufferedReader(
+                _DecompressingReader(file=file), CHUNK_SIZE
+            ) as reader:
+                yield reader  # type: ignore
+
+    @contextmanager
+    def open_write(self, key: str) -> Iterator[BinaryIO]:
+        """
+        Opens a file of the cache for streaming writes that are compressed once they reach the threshold. The
+        file appears in the cache once the block exits without an error.
+
+        :param key: (str) the key of the file relative to the cache
+        :return: (Iterator[BinaryIO]) context manager yielding the file
+        """
+        with self.backend.open_write(key=key) as file:
+            writer: _CompressingWriter = _CompressingWriter(
+                file=file, codec=self.codec, level=self.level, threshold=self.threshold
+            )
+            yield writer  # type: ignore
+            writer.finish()
+
+    def put_file(self, key: str, source_path: str) -> None:
+        """
+        Streams a file into the cache under the key through the compressor.
+
+        :param key: (str) the key of the file relative to the cache
+        :param source_path: (str) path to the file being stored
+        :return: None
+        """
+        with open(source_path, "rb") as source, self.open_write(key=key) as file:
+            for chunk in iter(lambda: source.read(CHUNK_SIZE), b""):
+                file.write(chunk)
+
+    def get_file(self, key: str, destination_path: str) -> None:
+        """
+        Streams the decompressed data of a file of the cache to the destination path.
+
+        :param key: (str) the key of the file relative to the cache
+        :param destination_path: (str) path the file is written to
+        :return: None
+        """
+        with self.open_read(key=key) as file, open(
+            destination_path, "wb"
+        ) as destination:
+            for chunk in iter(lambda: file.read(CHUNK_SIZE), b""):
+                destination.write(chunk)
+
+    def put_bytes(self, key: str, data: bytes) -> None:
+        """
+        Stores bytes in the cache under the key, compressed if they reach the threshold.
+
+        :param key: (str) the key of the file relative to the cache
+        :param data: (bytes) the data to be stored
+        :return: None
+        """
+        with self.open_write(key=key) as file:
+            file.write(data)
+
+    def get_bytes(self, key: str) -> bytes:
+        """
+        Reads the decompressed bytes of a file in the cache.
+
+        :param key: (str) the key of the file relative to the cache
+        :return: (bytes) the data of the file
+        """
+        with self.open_read(key=key) as file:
+            return file.read()
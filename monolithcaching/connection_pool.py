@@ -0,0 +1,92 @@
+"""this file defines the process wide Redis connection pools shared by the registers"""
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+from redis import ConnectionPool
+
+
+class RedisConnectionPools:
+    """
+    This class is responsible for handing out one Redis connection pool per (host, port, db) for each process.
+
+    Pools are keyed on the process ID as well so a forked child never reuses sockets opened by its parent.
+    """
+
+    DEFAULT_MAX_CONNECTIONS: Optional[int] = None
+    DEFAULT_HEALTH_CHECK_INTERVAL: int = 30
+
+    _pools: Dict[Tuple[int, str, int, int], ConnectionPool] = {}
+    _lock: threading.Lock = threading.Lock()
+
+    @classmethod
+    def get(
+        cls,
+        host: str,
+        port: int,
+        db: int = 0,
+        max_connections: Optional[int] = None,
+        health_check_interval: Optional[int] = None,
+    ) -> ConnectionPool:
+        """
+        Gets the pool for the connection parameters, creating it if it does not exist for this process.
+        The max_connections and health_check_interval are only applied when the pool is first created.
+
+        :param host: (str) host for the Redis connection
+        :param port: (int) port for the Redis connection
+        :param db: (int) the Redis database
+        :param max_connections: (Optional[int]) the max number of connections the pool can open
+        :param health_check_interval: (Optional[int]) seconds a connection can be idle before it is checked
+        :return: (ConnectionPool) the shared pool
+        """
+        # pylint: disable=invalid-name
+        key: Tuple[int, str, int, int] = (os.getpid(), host, port, db)
+        pool: Optional[ConnectionPool] = cls._pools.get(key)
+        if pool is not None:
+            return pool
+        with cls._lock:
+            pool = cls._pools.get(key)
+            if pool is None:
+                cls._drop_inherited_pools()
+                pool = ConnectionPool(
+                    host=host,
+                    port=port,
+                    db=db,
+                    max_connections=(
+                        cls.DEFAULT_MAX_CONNECTIONS
+                        if max_connections is None
+                        else max_connections
+                    ),
+                    health_check_interval=(
+                        cls.DEFAULT_HEALTH_CHECK_INTERVAL
+                        if health_check_interval is None
+                        else health_check_interval
+                    ),
+                )
+                cls._pools[key] = pool
+        return pool
+
+    @classmethod
+    def _drop_inherited_pools(cls) -> None:
+        """
+        Forgets pools created by a parent process without closing their sockets (private).
+
+        :return: None
+        """
+        pid: int = os.getpid()
+        for key in [key for key in cls._pools if key[0] != pid]:
+            del cls._pools[key]
+
+    @classmethod
+    def reset(cls) -> None:
+        """
+        Disconnects and forgets all the pools of this process.
+
+        :return: None
+        """
+        with cls._lock:
+            pid: int = os.getpid()
+            for key, pool in list(cls._pools.items()):
+                if key[0] == pid:
+                    pool.disconnect()
+                del cls._pools[key]
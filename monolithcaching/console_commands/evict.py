@@ -0,0 +1,40 @@
+"""this file defines the console command for evicting local caches"""
+import argparse
+from typing import List, Optional
+
+from ..cache_root import CacheRoot
+
+
+def main(args: Optional[List[str]] = None) -> None:
+    """
+    Evicts unlocked local caches under a cache root that is over its budget.
+
+    :param args: (Optional[List[str]]) the command line arguments, sys.argv if None
+    :return: None
+    """
+    parser = argparse.ArgumentParser(
+        description="evict unlocked local caches that nothing points to"
+    )
+    parser.add_argument("root", help="path to the root holding the cache directory")
+    parser.add_argument("--max-bytes", type=int, default=None)
+    parser.add_argument("--max-count", type=int, default=None)
+    parser.add_argument("--policy", choices=CacheRoot.POLICIES, default="lru")
+    parser.add_argument("--ttl", type=float, default=None, help="seconds")
+    parser.add_argument("--host", default=None, help="Redis host of the register")
+    parser.add_argument("--port", type=int, default=None, help="Redis port")
+    parser.add_argument("--local-register", action="store_true")
+    arguments = parser.parse_args(args)
+
+    evicted = CacheRoot(
+        path=arguments.root,
+        port=arguments.port,
+        host=arguments.host,
+        local_register=arguments.local_register,
+    ).evict(
+        max_bytes=arguments.max_bytes,
+        max_count=arguments.max_count,
+        policy=arguments.policy,
+        ttl=arguments.ttl,
+    )
+    for record in evicted:
+        print("evicted {} ({} bytes)".format(record.path, record.size))
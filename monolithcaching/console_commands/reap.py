@@ -0,0 +1,60 @@
+"""this file defines the console command for deleting expired caches"""
+import argparse
+import os
+from typing import List, Optional
+
+from ..cache_index import CacheIndex
+from ..reaper import Reaper
+
+
+def main(args: Optional[List[str]] = None) -> None:
+    """
+    Deletes the local and S3 caches whose ttl has passed.
+
+    :param args: (Optional[List[str]]) the command line arguments, sys.argv if None
+    :return: None
+    """
+    parser = argparse.ArgumentParser(
+        description="delete local and S3 caches whose ttl has passed, locked or not"
+    )
+    parser.add_argument(
+        "--root", default=None, help="path to the root holding the cache directory"
+    )
+    parser.add_argument(
+        "--s3",
+        default=None,
+        help="root path of the caches in S3, eg s3://bucket/caches/",
+    )
+    parser.add_argument("--host", default=None, help="Redis host of the register")
+    parser.add_argument("--port", type=int, default=None, help="Redis port")
+    parser.add_argument("--local-register", action="store_true")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument(
+        "--force", action="store_true", help="delete caches that are still pointed to"
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="list the expired caches only"
+    )
+    arguments = parser.parse_args(args)
+
+    index: Optional[CacheIndex] = None
+    if arguments.root is not None and os.path.isfile(
+        os.path.join(arguments.root, CacheIndex.FILE_NAME)
+    ):
+        index = CacheIndex(root=arguments.root)
+    reaper = Reaper(
+        local_cache_path=arguments.root,
+        s3_cache_path=arguments.s3,
+        port=arguments.port,
+        host=arguments.host,
+        index=index,
+        local_register=arguments.local_register,
+        max_workers=arguments.workers,
+        force=arguments.force,
+    )
+    if arguments.dry_run is True:
+        for cache in reaper.expired():
+            print("expired {}".format(cache.path))
+        return
+    for cache in reaper.reap():
+        print("reaped {}".format(cache.path))
@@ -36,3 +36,27 @@ class RegisterError(Exception):
         :param message: (str) the message for the error
         """
         super().__init__(message)
+
+
+class CacheRootError(Exception):
+    """The error for the CacheRoot class"""
+
+    def __init__(self, message: str) -> None:
+        """
+        The constructor for the CacheRootError class.
+
+        :param message: (str) the message for the error
+        """
+        super().__init__(message)
+
+
+class InstrumentationError(Exception):
+    """The error for the instrumentation hooks"""
+
+    def __init__(self, message: str) -> None:
+        """
+        The constructor for the InstrumentationError class.
+
+        :param message: (str) the message for the error
+        """
+        super().__init__(message)
@@ -0,0 +1,487 @@
+"""this file defines the hooks that receive the timings and byte counts of cache operations"""
+import os
+import time
+import warnings
+from contextlib import contextmanager
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    BinaryIO,
+    TYPE_CHECKING,
+)
+
+from .backend import CacheBackend, get_backend
+from .errors import InstrumentationError
+
+if TYPE_CHECKING:  # pragma: no cover
+    from . import CacheManager
+
+try:
+    import prometheus_client  # type: ignore
+except ImportError:  # pragma: no cover
+    prometheus_client = None  # type: ignore
+
+try:
+    from opentelemetry import metrics as otel_metrics  # type: ignore
+    from opentelemetry.trace import Status, StatusCode  # type: ignore
+except ImportError:  # pragma: no cover
+    otel_metrics = None  # type: ignore
+    Status = None  # type: ignore
+    StatusCode = None  # type: ignore
+
+
+class Event(NamedTuple):
+    """
+    The outcome of one cache operation.
+
+    Attributes:
+        operation (str): the name of the operation, eg "create", "put_bytes" or "register"
+        backend (str): the backend the operation ran against, eg "local", "s3", "redis" or "local_register"
+        seconds (float): wall time of the operation
+        size (Optional[int]): bytes moved by the operation, None if it moves no data
+        error (Optional[str]): the name of the exception the operation raised, None if it succeeded
+    """
+
+    operation: str
+    backend: str
+    seconds: float
+    size: Optional[int] = None
+    error: Optional[str] = None
+
+    @property
+    def outcome(self) -> str:
+        """
+        Dynamic property.
+
+        :return: (str) "error" if the operation raised an exception, "ok" otherwise
+        """
+        return "ok" if self.error is None else "error"
+
+
+HOOKS: List[Callable[[Event], None]] = []
+
+
+def add_hook(hook: Callable[[Event], None]) -> None:
+    """
+    Adds a hook that is called with the event of every cache operation. Caches created before the first hook
+    is added are not instrumented.
+
+    :param hook: (Callable[[Event], None]) the hook
+    :return: None
+    """
+    if hook not in HOOKS:
+        HOOKS.append(hook)
+
+
+def remove_hook(hook: Callable[[Event], None]) -> None:
+    """
+    Removes a hook added with add_hook.
+
+    :param hook: (Callable[[Event], None]) the hook
+    :return: None
+    """
+    if hook in HOOKS:
+        HOOKS.remove(hook)
+
+
+def emit(event: Event) -> None:
+    """
+    Calls every hook with an event. A hook that raises an error is reported with a warning so it cannot fail
+    the cache operation.
+
+    :param event: (Event) the event of the operation
+    :return: None
+    """
+    for hook in list(HOOKS):
+        try:
+            hook(event)
+        except Exception as error:  # pylint: disable=broad-except
+            warnings.warn(
+                "instrumentation hook {} raised {!r}".format(hook, error),
+                RuntimeWarning,
+            )
+
+
+@contextmanager
+def timed(
+    operation: str, backend: str, size: Optional[int] = None
+) -> Iterator[Dict[str, Any]]:
+    """
+    Times the block and emits its event once it exits. Bytes only known once the block has run can be set
+    under "size" in the yielded dictionary. Nothing is timed when there are no hooks.
+
+    :param operation: (str) the name of the operation
+    :param backend: (str) the backend the operation runs against
+    :param size: (Optional[int]) bytes moved by the operation if they are known up front
+    :return: (Iterator[Dict[str, Any]]) context manager yielding the details of the event
+    """
+    details: Dict[str, Any] = {"size": size}
+    if len(HOOKS) == 0:
+        yield details
+        return
+    error: Optional[str] = None
+    start: float = time.perf_counter()
+    try:
+        yield details
+    except BaseException as exception:
+        error = type(exception).__name__
+        raise
+    finally:
+        emit(
+            Event(
+                operation=operation,
+                backend=backend,
+                seconds=time.perf_counter() - start,
+                size=details["size"],
+                error=error,
+            )
+        )
+
+
+class InstrumentedBackend(CacheBackend):
+    """
+    This is a class for timing every call to another backend and counting the bytes it moves. Events are
+    labelled with the name the backend is registered under. Anything that is not part of the backend interface
+    is passed to the wrapped backend.
+
+    Attributes:
+        backend (CacheBackend): the wrapped backend
+        name (str): the name of the wrapped backend used as the backend of the events
+    """
+
+    def __init__(self, backend: CacheBackend, name: str) -> None:
+        """
+        The constructor for the InstrumentedBackend class.
+
+        :param backend: (CacheBackend) the backend being wrapped
+        :param name: (str) the name of the wrapped backend used as the backend of the events
+        """
+        self.backend: CacheBackend = backend
+        self.name: str = name
+
+    @classmethod
+    def from_manager(
+        cls, manager: "CacheManager", existing_cache: Optional[str] = None
+    ) -> "InstrumentedBackend":
+        """
+        Creates or attaches to a cache with the backend of a manager.
+
+        :param manager: (CacheManager) the manager the cache is for
+        :param existing_cache: (Optional[str]) path to existing cache
+        :return: (InstrumentedBackend) the backend pointing to the cache
+        """
+        return cls(
+            backend=get_backend(name=manager.backend).from_manager(
+                manager=manager, existing_cache=existing_cache
+            ),
+            name=manager.backend,
+        )
+
+    def __getattr__(self, name: str) -> Any:
+        """
+        Gets the attributes of the wrapped backend that are not part of the backend interface, such as base_dir.
+
+        :param name: (str) the name of the attribute
+        :return: (Any) the attribute of the wrapped backend
+        """
+        return getattr(self.backend, name)
+
+    @property
+    def locked(self) -> bool:
+        """
+        Dynamic property.
+
+        :return: (bool) True if the wrapped backend keeps the cache when it is finished with it
+        """
+        return self.backend.locked
+
+    def lock(self) -> None:
+        """
+        Locks the wrapped backend.
+
+        :return: None
+        """
+        with timed(operation="lock", backend=self.name):
+            self.backend.lock()
+
+    def unlock(self) -> None:
+        """
+        Unlocks the wrapped backend.
+
+        :return: None
+        """
+        with timed(operation="unlock", backend=self.name):
+            self.backend.unlock()
+
+    def create_meta(self) -> None:
+        """
+        Writes an empty meta with the wrapped backend.
+
+        :return: None
+        """
+        with timed(operation="meta_write", backend=self.name):
+            self.backend.create_meta()
+
+    def read_meta(self) -> Dict:
+        """
+        Reads the meta with the wrapped backend.
+
+        :return: (dict) the meta of the cache
+        """
+        with timed(operation="meta_read", backend=self.name):
+            return self.backend.read_meta()
+
+    def write_meta(self, data: Dict) -> None:
+        """
+        Replaces the meta with the wrapped backend.
+
+        :param data: (dict) the meta of the cache
+        :return: None
+        """
+        with timed(operation="meta_write", backend=self.name):
+            self.backend.write_meta(data=data)
+
+    def delete_directory(self) -> None:
+        """
+        Deletes the cache with the wrapped backend.
+
+        :return: None
+        """
+        with timed(operation="delete_directory", backend=self.name):
+            self.backend.delete_directory()
+
+    def delete_file(self, key: str) -> None:
+        """
+        Deletes a file with the wrapped backend.
+
+        :param key: (str) the key of the file relative to the cache
+        :return: None
+        """
+        with timed(operation="delete_file", backend=self.name):
+            self.backend.delete_file(key=key)
+
+    def check_file(self, file: str) -> bool:
+        """
+        Checks to see if a file is present with the wrapped backend.
+
+        :param file: (str) key of the file being checked
+        :return: True if present, False if not
+        """
+        with timed(operation="check_file", backend=self.name):
+            return self.backend.check_file(file=file)
+
+    def local_path(self, key: str) -> Optional[str]:
+        """
+        Gets the path to a local copy of a key from the wrapped backend.
+
+        :param key: (str) the key of the file relative to the cache
+        :return: (Optional[str]) path to the local copy, None if there is none
+        """
+        return self.backend.local_path(key=key)
+
+    def put_file(self, key: str, source_path: str) -> None:
+        """
+        Stores a file with the wrapped backend, counting the bytes of the file.
+
+        :param key: (str) the key of the file relative to the cache
+        :param source_path: (str) path to the file being stored
+        :return: None
+        """
+        with timed(operation="put_file", backend=self.name) as details:
+            self.backend.put_file(key=key, source_path=source_path)
+            details["size"] = os.path.getsize(source_path)
+
+    def get_file(self, key: str, destination_path: str) -> None:
+        """
+        Fetches a file with the wrapped backend, counting the bytes of the file.
+
+        :param key: (str) the key of the file relative to the cache
+        :param destination_path: (str) path the file is written to
+        :return: None
+        """
+        with timed(operation="get_file", backend=self.name) as details:
+            self.backend.get_file(key=key, destination_path=destination_path)
+            details["size"] = os.path.getsize(destination_path)
+
+    def put_bytes(self, key: str, data: bytes) -> None:
+        """
+        Stores bytes with the wrapped backend.
+
+        :param key: (str) the key of the file relative to the cache
+        :param data: (bytes) the data to be stored
+        :return: None
+        """
+        with timed(operation="put_bytes", backend=self.name, size=len(data)):
+            self.backend.put_bytes(key=key, data=data)
+
+    def get_bytes(self, key: str) -> bytes:
+        """
+        Reads bytes with the wrapped backend.
+
+        :param key: (str) the key of the file relative to the cache
+        :return: (bytes) the data of the file
+        """
+        with timed(operation="get_bytes", backend=self.name) as details:
+            data: bytes = self.backend.get_bytes(key=key)
+            details["size"] = len(data)
+            return data
+
+    @contextmanager
+    def open_read(self, key: str) -> Iterator[BinaryIO]:
+        """
+        Opens a file of the wrapped backend for streaming reads, timing the block the file is open for.
+
+        :param key: (str) the key of the file relative to the cache
+        :return: (Iterator[BinaryIO]) context manager yielding the file
+        """
+        with timed(operation="open_read", backend=self.name):
+            with self.backend.open_read(key=key) as file:
+                yield file
+
+    @contextmanager
+    def open_write(self, key: str) -> Iterator[BinaryIO]:
+        """
+        Opens a file of the wrapped backend for streaming writes, timing the block the file is open for.
+
+        :param key: (str) the key of the file relative to the cache
+        :return: (Iterator[BinaryIO]) context manager yielding the file
+        """
+        with timed(operation="open_write", backend=self.name):
+            with self.backend.open_write(key=key) as file:
+                yield file
+
+
+class PrometheusHook:
+    """
+    This is a class for recording events in Prometheus. Durations go to a histogram named
+    <namespace>_operation_seconds and bytes to a counter named <namespace>_bytes_total, both labelled by
+    operation and backend, and the histogram also by outcome.
+    """
+
+    DEFAULT_BUCKETS = (
+        0.0005,
+        0.001,
+        0.005,
+        0.01,
+        0.025,
+        0.05,
+        0.1,
+        0.25,
+        0.5,
+        1.0,
+        2.5,
+        5.0,
+        10.0,
+        30.0,
+        60.0,
+        300.0,
+    )
+
+    def __init__(
+        self,
+        registry: Any = None,
+        namespace: str = "monolithcaching",
+        buckets: Optional[tuple] = None,
+    ) -> None:
+        """
+        The constructor for the PrometheusHook class.
+
+        :param registry: (Any) the prometheus_client registry, the default registry if None
+        :param namespace: (str) the prefix of the metric names
+        :param buckets: (Optional[tuple]) the upper bounds of the histogram buckets in seconds
+        """
+        if prometheus_client is None:
+            raise InstrumentationError(
+                message="prometheus_client needs to be installed to record events in Prometheus"
+            )
+        registry = prometheus_client.REGISTRY if registry is None else registry
+        self.seconds = prometheus_client.Histogram(
+            "{}_operation_seconds".format(namespace),
+            "Wall time of cache operations",
+            ("operation", "backend", "outcome"),
+            registry=registry,
+            buckets=self.DEFAULT_BUCKETS if buckets is None else buckets,
+        )
+        self.bytes = prometheus_client.Counter(
+            "{}_bytes".format(namespace),
+            "Bytes moved by cache operations",
+            ("operation", "backend"),
+            registry=registry,
+        )
+
+    def __call__(self, event: Event) -> None:
+        """
+        Records an event.
+
+        :param event: (Event) the event of the operation
+        :return: None
+        """
+        self.seconds.labels(event.operation, event.backend, event.outcome).observe(
+            event.seconds
+        )
+        if event.size is not None:
+            self.bytes.labels(event.operation, event.backend).inc(event.size)
+
+
+class OpenTelemetryHook:
+    """
+    This is a class for recording events with OpenTelemetry. Durations go to a histogram named
+    monolithcaching.operation.duration and bytes to a counter named monolithcaching.bytes, with the operation,
+    backend and outcome as attributes. If a tracer is given every event is also recorded as a span.
+    """
+
+    def __init__(self, meter: Any = None, tracer: Any = None) -> None:
+        """
+        The constructor for the OpenTelemetryHook class.
+
+        :param meter: (Any) the OpenTelemetry meter, the meter of the global meter provider if None
+        :param tracer: (Any) the OpenTelemetry tracer spans are recorded with, no spans if None
+        """
+        if meter is None:
+            if otel_metrics is None:
+                raise InstrumentationError(
+                    message="opentelemetry-api needs to be installed to record events with OpenTelemetry"
+                )
+            meter = otel_metrics.get_meter("monolithcaching")
+        self.duration = meter.create_histogram(
+            "monolithcaching.operation.duration",
+            unit="s",
+            description="Wall time of cache operations",
+        )
+        self.bytes = meter.create_counter(
+            "monolithcaching.bytes",
+            unit="By",
+            description="Bytes moved by cache operations",
+        )
+        self.tracer: Any = tracer
+
+    def __call__(self, event: Event) -> None:
+        """
+        Records an event.
+
+        :param event: (Event) the event of the operation
+        :return: None
+        """
+        attributes: Dict[str, str] = {
+            "operation": event.operation,
+            "backend": event.backend,
+            "outcome": event.outcome,
+        }
+        self.duration.record(event.seconds, attributes=attributes)
+        if event.size is not None:
+            self.bytes.add(event.size, attributes=attributes)
+        if self.tracer is not None:
+            end: int = time.time_ns()
+            span = self.tracer.start_span(
+                "monolithcaching.{}".format(event.operation),
+                start_time=end - int(event.seconds * 1e9),
+                attributes=attributes,
+            )
+            if event.error is not None and Status is not None:
+                span.set_status(Status(StatusCode.ERROR, event.error))
+            span.end(end_time=end)
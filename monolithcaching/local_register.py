@@ -0,0 +1,214 @@
+"""this file defines the register for counting references to local caches without Redis"""
+import os
+import sqlite3
+import threading
+from typing import Dict, Optional, Tuple
+
+from .errors import RegisterError
+from .instrumentation import timed
+
+
+class LocalRegister:
+    """
+    This class is responsible for counting how many caches are pointing to a local cache in a SQLite database
+    under the cache root. SQLite locks the database file for every change so the counts are safe across
+    threads and processes on one machine. A cache claimed for eviction has a count of -1 and cannot be
+    registered until its entry is deleted.
+
+    One connection per database is opened for each process and shared by every register and thread of the
+    process, keyed on the process ID so a forked child never reuses the connection of its parent.
+    """
+
+    FILE_NAME = "register.sqlite3"
+
+    _connections: Dict[
+        Tuple[int, str], Tuple[sqlite3.Connection, threading.RLock, int]
+    ] = {}
+    _connections_lock: threading.Lock = threading.Lock()
+
+    def __init__(self, root: str) -> None:
+        """
+        The constructor for the LocalRegister class. The database is created at <root>/register.sqlite3.
+
+        :param root: (str) the path to the root holding the cache directory
+        """
+        self._connection, self._lock = self._connect(
+            path=os.path.abspath(os.path.join(str(root), self.FILE_NAME))
+        )
+
+    @classmethod
+    def _connect(cls, path: str) -> Tuple[sqlite3.Connection, threading.RLock]:
+        """
+        Gets the connection of this process to a database, opening it and creating the table if it is not open
+        or the database file was replaced since it was opened (private).
+
+        :param path: (str) the absolute path to the database
+        :return: (Tuple[sqlite3.Connection, threading.RLock]) the connection and the lock its transactions hold
+        """
+        key: Tuple[int, str] = (os.getpid(), path)
+        with cls._connections_lock:
+            try:
+                inode: Optional[int] = os.stat(path).st_ino
+            except FileNotFoundError:
+                inode = None
+            cached = cls._connections.get(key)
+            if cached is not None and cached[2] == inode:
+                return cached[0], cached[1]
+            if cached is not None:
+                cached[0].close()
+            for other in [other for other in cls._connections if other[0] != key[0]]:
+                del cls._connections[other]
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            connection: sqlite3.Connection = sqlite3.connect(
+                path, timeout=30, isolation_level=None, check_same_thread=False
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS cache_register "
+                "(path TEXT PRIMARY KEY, count INTEGER NOT NULL)"
+            )
+            lock: threading.RLock = threading.RLock()
+            cls._connections[key] = (connection, lock, os.stat(path).st_ino)
+        return connection, lock
+
+    @classmethod
+    def reset(cls) -> None:
+        """
+        Closes and forgets all the connections of this process.
+
+        :return: None
+        """
+        with cls._connections_lock:
+            pid: int = os.getpid()
+            for key, (connection, _, _) in list(cls._connections.items()):
+                if key[0] == pid:
+                    connection.close()
+                del cls._connections[key]
+
+    def get_count(self, cache_path: str) -> Optional[int]:
+        """
+        Gets the reference count for the cache.
+
+        :param cache_path: (str) the path to the cache
+        :return: (Optional[int]) number of count, or None if cache does not exist
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT count FROM cache_register WHERE path = ?", (cache_path,)
+            ).fetchone()
+        return None if row is None else int(row[0])
+
+    def register_cache(self, cache_path: str) -> int:
+        """
+        Registers the cache path if there isn't an entry or increasing the count by one if there is.
+
+        :param cache_path: (str) the path to the cache
+        :return: (int) the count of the references after the register
+        """
+        with timed(operation="register", backend="local_register"), self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                count: Optional[int] = self.get_count(cache_path=cache_path)
+                if count is not None and count < 0:
+                    raise RegisterError(
+                        message="cache {} is being evicted so it cannot be registered".format(
+                            cache_path
+                        )
+                    )
+                self._connection.execute(
+                    "INSERT INTO cache_register (path, count) VALUES (?, 1) "
+                    "ON CONFLICT (path) DO UPDATE SET count = count + 1",
+                    (cache_path,),
+                )
+                count = self.get_count(cache_path=cache_path)
+                self._connection.execute("COMMIT")
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+        return count  # type: ignore
+
+    def deregister_cache(self, cache_path: str, locked: bool) -> int:
+        """
+        Deletes the cache path from the register if the count goes to Zero or decreases the count by one if not
+        zero.
+
+        :param cache_path: (str) the path to the cache
+        :param locked: (bool) is set to True prevents deleting of cache even if it has a count of zero
+        :return: (int) the count of the references after the deregister.
+        """
+        with timed(operation="deregister", backend="local_register"), self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                count: Optional[int] = self.get_count(cache_path=cache_path)
+                if count is None:
+                    raise RegisterError(
+                        message="cache {} is not in cache register so it cannot be de-registered".format(
+                            cache_path
+                        )
+                    )
+                if count > 0:
+                    count -= 1
+                if count <= 0 and locked is False:
+                    self._connection.execute(
+                        "DELETE FROM cache_register WHERE path = ?", (cache_path,)
+                    )
+                else:
+                    self._connection.execute(
+                        "UPDATE cache_register SET count = ? WHERE path = ?",
+                        (count, cache_path),
+                    )
+                self._connection.execute("COMMIT")
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+        return count
+
+    def claim_cache(self, cache_path: str) -> bool:
+        """
+        Claims a cache for eviction if nothing points to it, so managers cannot register it until it is deleted.
+        The check and the claim are done in one transaction.
+
+        :param cache_path: (str) the path to the cache
+        :return: (bool) True if the cache was claimed
+        """
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                count: Optional[int] = self.get_count(cache_path=cache_path)
+                claimed: bool = count is None or count <= 0
+                if claimed is True:
+                    self._connection.execute(
+                        "INSERT INTO cache_register (path, count) VALUES (?, -1) "
+                        "ON CONFLICT (path) DO UPDATE SET count = -1",
+                        (cache_path,),
+                    )
+                self._connection.execute("COMMIT")
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+        return claimed
+
+    def delete_cache(self, cache_path: str) -> None:
+        """
+        Deletes the entry of a cache that has been deleted, whatever its count.
+
+        :param cache_path: (str) the path to the cache
+        :return: None
+        """
+        with self._lock:
+            self._connection.execute(
+                "DELETE FROM cache_register WHERE path = ?", (cache_path,)
+            )
+
+    def get_all_records(self) -> Dict[str, int]:
+        """
+        Get's all the cache paths and their counts.
+
+        :return: (Dict[str, int]) all cache entries
+        """
+        with self._lock:
+            return dict(
+                self._connection.execute(
+                    "SELECT path, count FROM cache_register"
+                ).fetchall()
+            )
@@ -0,0 +1,584 @@
+"""this file defines the manifest recording the size and checksum of every file put in a cache"""
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import (
+    Any,
+    BinaryIO,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    TYPE_CHECKING,
+)
+
+from .backend import CacheBackend, get_backend
+from .compression import CompressedBackend
+
+if TYPE_CHECKING:  # pragma: no cover
+    from . import CacheManager
+
+
+CHUNK_SIZE: int = 1024 * 1024
+
+
+class ManifestEntry(NamedTuple):
+    """
+    The record of a file in the manifest of a cache.
+
+    Attributes:
+        size (int): bytes of the file
+        modified (float): epoch seconds of when the file was put in the cache
+        checksum (str): sha256 hex digest of the content of the file
+    """
+
+    size: int
+    modified: float
+    checksum: str
+
+
+class VerifyStats(NamedTuple):
+    """
+    The outcome of checking the files of a cache against its manifest.
+
+    Attributes:
+        verified (int): number of files whose size and checksum match the manifest
+        missing (List[str]): the keys in the manifest that are not in the cache
+        mismatched (List[str]): the keys whose size or checksum do not match the manifest
+        seconds (float): wall time of the check
+    """
+
+    verified: int
+    missing: List[str]
+    mismatched: List[str]
+    seconds: float
+
+
+class Manifest:
+    """
+    This class is responsible for the entries of the manifest.json file of a cache, held in a dict so a key is
+    looked up in constant time. Changes made since the manifest was read are kept apart so they can be merged
+    into the stored manifest, which may have been changed by other processes since, when it is written.
+    """
+
+    FILE_NAME = "manifest.json"
+
+    def __init__(self, entries: Optional[Dict[str, ManifestEntry]] = None) -> None:
+        """
+        The constructor for the Manifest class.
+
+        :param entries: (Optional[Dict[str, ManifestEntry]]) the entry of every file, empty if None
+        """
+        self._entries: Dict[str, ManifestEntry] = {} if entries is None else entries
+        self._changes: Dict[str, Optional[ManifestEntry]] = {}
+
+    @classmethod
+    def loads(cls, data: bytes) -> "Manifest":
+        """
+        Reads a manifest from the content of a manifest.json file.
+
+        :param data: (bytes) the content of the file
+        :return: (Manifest) the manifest
+        """
+        files: Dict[str, Dict] = json.loads(data.decode("UTF-8"))["files"]
+        return cls(
+            entries={key: ManifestEntry(**entry) for key, entry in files.items()}
+        )
+
+    def dumps(self) -> bytes:
+        """
+        Writes the manifest as the content of a manifest.json file.
+
+        :return: (bytes) the content of the file
+        """
+        files: Dict[str, Dict] = {
+            key: entry._asdict() for key, entry in sorted(self._entries.items())
+        }
+        return json.dumps({"algorithm": "sha256", "files": files}).encode("UTF-8")
+
+    def get(self, key: str) -> Optional[ManifestEntry]:
+        """
+        Gets the entry of a file.
+
+        :param key: (str) the key of the file relative to the cache
+        :return: (Optional[ManifestEntry]) the entry of the file, None if the manifest does not hold it
+        """
+        return self._entries.get(key)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._entries))
+
+    def items(self) -> List[Tuple[str, ManifestEntry]]:
+        """
+        Lists the entries of the manifest.
+
+        :return: (List[Tuple[str, ManifestEntry]]) the key and entry of every file
+        """
+        return list(self._entries.items())
+
+    @property
+    def changed(self) -> bool:
+        """
+        Dynamic property.
+
+        :return: (bool) True if entries were recorded or removed since the manifest was last merged
+        """
+        return len(self._changes) > 0
+
+    def record(self, key: str, entry: ManifestEntry) -> None:
+        """
+        Records the entry of a file put in the cache.
+
+        :param key: (str) the key of the file relative to the cache
+        :param entry: (ManifestEntry) the entry of the file
+        :return: None
+        """
+        self._entries[key] = entry
+        self._changes[key] = entry
+
+    def remove(self, key: str) -> None:
+        """
+        Removes the entry of a file deleted from the cache.
+
+        :param key: (str) the key of the file relative to the cache
+        :return: None
+        """
+        self._entries.pop(key, None)
+        self._changes[key] = None
+
+    def clear(self) -> None:
+        """
+        Removes every entry, for instance when the cache is deleted.
+
+        :return: None
+        """
+        self._entries = {}
+        self._changes = {}
+
+    def merge(self, stored: "Manifest") -> None:
+        """
+        Replaces the entries with those of the stored manifest and the changes made since the last merge.
+
+        :param stored: (Manifest) the manifest read from the cache
+        :return: None
+        """
+        entries: Dict[str, ManifestEntry] = dict(stored._entries)
+        for key, entry in self._changes.items():
+            if entry is None:
+                entries.pop(key, None)
+            else:
+                entries[key] = entry
+        self._entries = entries
+        self._changes = {}
+
+
+class _HashingWriter(io.RawIOBase):
+    """
+    This is a class for writing to a file of a backend while counting and hashing the bytes written (private).
+    """
+
+    def __init__(self, file: BinaryIO) -> None:
+        """
+        The constructor for the _HashingWriter class.
+
+        :param file: (BinaryIO) the file of the backend being written to
+        """
+        super().__init__()
+        self._file: BinaryIO = file
+        self.digest: Any = hashlib.sha256()
+        self.size: int = 0
+
+    def writable(self) -> bool:
+        """
+        :return: (bool) True as the writer can be written to
+        """
+        return True
+
+    def write(self, data: Any) -> int:  # type: ignore
+        """
+        Writes data to the file, adding it to the hash.
+
+        :param data: (Any) the bytes like data
+        :return: (int) the number of bytes taken
+        """
+        self._file.write(data)
+        self.digest.update(data)
+        size: int = memoryview(data).nbytes
+        self.size += size
+        return size
+
+
+class ManifestBackend(CacheBackend):
+    """
+    This is a class for keeping a manifest of the files put in the cache of another backend, with the size,
+    time and sha256 checksum of each. Files are hashed as they are written, so no extra read is made. The
+    manifest is read from the cache once, on first use, after which checking that a file is present is a dict
+    lookup instead of a request to the backend, and only keys missing from the manifest are checked with the
+    backend. Changes are held in memory until save_manifest, which the manager calls when it flushes the
+    meta, merges them into the stored manifest. Anything that is not part of the backend interface is passed to
+    the wrapped backend.
+
+    Attributes:
+        backend (CacheBackend): the wrapped backend
+    """
+
+    def __init__(self, backend: CacheBackend) -> None:
+        """
+        The constructor for the ManifestBackend class.
+
+        :param backend: (CacheBackend) the backend being wrapped
+        """
+        self.backend: CacheBackend = backend
+        self._manifest: Optional[Manifest] = None
+        self._lock: threading.RLock = threading.RLock()
+
+    @classmethod
+    def from_manager(
+        cls, manager: "CacheManager", existing_cache: Optional[str] = None
+    ) -> "ManifestBackend":
+        """
+        Creates or attaches to a cache with the backend and compression settings of a manager.
+
+        :param manager: (CacheManager) the manager the cache is for
+        :param existing_cache: (Optional[str]) path to existing cache
+        :return: (ManifestBackend) the backend pointing to the cache
+        """
+        backend = (
+            get_backend(name=manager.backend)
+            if manager.compression is None
+            else CompressedBackend
+        )
+        return cls(
+            backend=backend.from_manager(manager=manager, existing_cache=existing_cache)
+        )
+
+    def __getattr__(self, name: str) -> Any:
+        """
+        Gets the attributes of the wrapped backend that are not part of the backend interface, such as base_dir.
+
+        :param name: (str) the name of the attribute
+        :return: (Any) the attribute of the wrapped backend
+        """
+        return getattr(self.backend, name)
+
+    def _read_manifest(self) -> Manifest:
+        """
+        Reads the manifest stored in the cache (private).
+
+        :return: (Manifest) the stored manifest, empty if the cache has none
+        """
+        if self.backend.check_file(file=Manifest.FILE_NAME) is False:
+            return Manifest()
+        return Manifest.loads(data=self.backend.get_bytes(key=Manifest.FILE_NAME))
+
+    @property
+    def manifest(self) -> Manifest:
+        """
+        Dynamic property.
+
+        :return: (Manifest) the manifest of the cache, read from the cache on first use
+        """
+        with self._lock:
+            if self._manifest is None:
+                self._manifest = self._read_manifest()
+            return self._manifest
+
+    def save_manifest(self) -> None:
+        """
+        Merges the changes made through this backend into the manifest stored in the cache and writes it.
+
+        :return: None
+        """
+        with self._lock:
+            if self._manifest is None or self._manifest.changed is False:
+                return
+            self._manifest.merge(stored=self._read_manifest())
+            self.backend.put_bytes(key=Manifest.FILE_NAME, data=self._manifest.dumps())
+
+    def _record(self, key: str, size: int, checksum: str) -> None:
+        """
+        Records a file put in the cache in the manifest (private).
+
+        :param key: (str) the key of the file relative to the cache
+        :param size: (int) bytes of the file
+        :param checksum: (str) sha256 hex digest of the content of the file
+        :return: None
+        """
+        with self._lock:
+            self.manifest.record(
+                key=key,
+                entry=ManifestEntry(size=size, modified=time.time(), checksum=checksum),
+            )
+
+    def _hash(self, key: str) -> Tuple[int, str]:
+        """
+        Counts and hashes the bytes of a file of the cache (private).
+
+        :param key: (str) the key of the file relative to the cache
+        :return: (Tuple[int, str]) the bytes and the sha256 hex digest of the file
+        """
+        digest = hashlib.sha256()
+        size: int = 0
+        with self.backend.open_read(key=key) as file:
+            for chunk in iter(lambda: file.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+                size += len(chunk)
+        return size, digest.hexdigest()
+
+    def _verify_file(self, key: str, entry: ManifestEntry) -> str:
+        """
+        Checks a file of the cache against its entry (private).
+
+        :param key: (str) the key of the file relative to the cache
+        :param entry: (ManifestEntry) the entry of the file
+        :return: (str) "verified", "missing" or "mismatched"
+        """
+        if self.backend.check_file(file=key) is False:
+            return "missing"
+        if (entry.size, entry.checksum) != self._hash(key=key):
+            return "mismatched"
+        return "verified"
+
+    def verify(self, max_workers: int = 8) -> VerifyStats:
+        """
+        Reads every file in the manifest in parallel, checking that it is present and that its size and
+        checksum match the manifest.
+
+        :param max_workers: (int) number of files read at once
+        :return: (VerifyStats) the number of files verified and the keys missing or mismatched
+        """
+        start: float = time.monotonic()
+        entries: List[Tuple[str, ManifestEntry]] = self.manifest.items()
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            outcomes: List[str] = list(
+                executor.map(lambda item: self._verify_file(*item), entries)
+            )
+        return VerifyStats(
+            verified=outcomes.count("verified"),
+            missing=[key for (key, _), o in zip(entries, outcomes) if o == "missing"],
+            mismatched=[
+                key for (key, _), o in zip(entries, outcomes) if o == "mismatched"
+            ],
+            seconds=time.monotonic() - start,
+        )
+
+    @property
+    def locked(self) -> bool:
+        """
+        Dynamic property.
+
+        :return: (bool) True if the wrapped backend keeps the cache when it is finished with it
+        """
+        return self.backend.locked
+
+    def lock(self) -> None:
+        """
+        Locks the wrapped backend.
+
+        :return: None
+        """
+        self.backend.lock()
+
+    def unlock(self) -> None:
+        """
+        Unlocks the wrapped backend.
+
+        :return: None
+        """
+        self.backend.unlock()
+
+    def create_meta(self) -> None:
+        """
+        Writes an empty meta with the wrapped backend.
+
+        :return: None
+        """
+        self.backend.create_meta()
+
+    def read_meta(self) -> Dict:
+        """
+        Reads the meta with the wrapped backend.
+
+        :return: (dict) the meta of the cache
+        """
+        return self.backend.read_meta()
+
+    def write_meta(self, data: Dict) -> None:
+        """
+        Replaces the meta with the wrapped backend.
+
+        :param data: (dict) the meta of the cache
+        :return: None
+        """
+        self.backend.write_meta(data=data)
+
+    def delete_directory(self) -> None:
+        """
+        Deletes the cache with the wrapped backend and empties the manifest.
+
+        :return: None
+        """
+        self.backend.delete_directory()
+        with self._lock:
+            self._manifest = Manifest()
+
+    def delete_file(self, key: str) -> None:
+        """
+        Deletes a file with the wrapped backend and removes it from the manifest.
+
+        :param key: (str) the key of the file relative to the cache
+        :return: None
+        """
+        self.backend.delete_file(key=key)
+        with self._lock:
+            self.manifest.remove(key=key)
+
+    def check_file(self, file: str) -> bool:
+        """
+        Checks to see if a file is present in the manifest, or in the wrapped backend if it is not.
+
+        :param file: (str) key of the file being checked
+        :return: True if present, False if not
+        """
+        return file in self.manifest or self.backend.check_file(file=file)
+
+    def local_path(self, key: str) -> Optional[str]:
+        """
+        Gets the path to a local copy of a key from the wrapped backend.
+
+        :param key: (str) the key of the file relative to the cache
+        :return: (Optional[str]) path to the local copy, None if there is none
+        """
+        return self.backend.local_path(key=key)
+
+    def put_file(self, key: str, source_path: str) -> None:
+        """
+        Stores a file with the wrapped backend and records its size and checksum. The file is hashed before it
+        is handed to the backend so the backend keeps its own transfer, such as a kernel copy or a multipart
+        upload.
+
+        :param key: (str) the key of the file relative to the cache
+        :param source_path: (str) path to the file being stored
+        :return: None
+        """
+        digest = hashlib.sha256()
+        size: int = 0
+        with open(source_path, "rb") as source:
+            for chunk in iter(lambda: source.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+                size += len(chunk)
+        self.backend.put_file(key=key, source_path=source_path)
+        self._record(key=key, size=size, checksum=digest.hexdigest())
+
+    def put_blob(self, key: str, source_path: str, algorithm: str = "sha256") -> str:
+        """
+        Stores a file as a blob with the wrapped backend and records its size and checksum.
+
+        :param key: (str) the key of the file relative to the cache
+        :param source_path: (str) path to the file being stored
+        :param algorithm: (str) "sha256" or "blake3" hash the blob is keyed by
+        :return: (str) hex digest of the content of the file
+        """
+        digest: str = self.backend.put_blob(  # type: ignore
+            key=key, source_path=source_path, algorithm=algorithm
+        )
+        self._record_blob(key=key, digest=digest, algorithm=algorithm)
+        return digest
+
+    def link_blob(self, key: str, digest: str, algorithm: str = "sha256") -> None:
+        """
+        Links a blob into the cache with the wrapped backend and records its size and checksum.
+
+        :param key: (str) the key of the file relative to the cache
+        :param digest: (str) hex digest of the content of the blob
+        :param algorithm: (str) "sha256" or "blake3" hash the blob is keyed by
+        :return: None
+        """
+        self.backend.link_blob(  # type: ignore
+            key=key, digest=digest, algorithm=algorithm
+        )
+        self._record_blob(key=key, digest=digest, algorithm=algorithm)
+
+    def _record_blob(self, key: str, digest: str, algorithm: str) -> None:
+        """
+        Records a blob linked into the cache, reusing its digest as the checksum when it is a sha256 (private).
+
+        :param key: (str) the key of the file relative to the cache
+        :param digest: (str) hex digest of the content of the blob
+        :param algorithm: (str) "sha256" or "blake3" hash the blob is keyed by
+        :return: None
+        """
+        if algorithm == "sha256":
+            size: int = os.path.getsize(self.backend.local_path(key=key))  # type: ignore
+            self._record(key=key, size=size, checksum=digest)
+        else:
+            size, checksum = self._hash(key=key)
+            self._record(key=key, size=size, checksum=checksum)
+
+    def get_file(self, key: str, destination_path: str) -> None:
+        """
+        Fetches a file with the wrapped backend.
+
+        :param key: (str) the key of the file relative to the cache
+        :param destination_path: (str) path the file is written to
+        :return: None
+        """
+        self.backend.get_file(key=key, destination_path=destination_path)
+
+    def put_bytes(self, key: str, data: bytes) -> None:
+        """
+        Stores bytes with the wrapped backend and records their size and checksum.
+
+        :param key: (str) the key of the file relative to the cache
+        :param data: (bytes) the data to be stored
+        :return: None
+        """
+        self.backend.put_bytes(key=key, data=data)
+        self._record(key=key, size=len(data), checksum=hashlib.sha256(data).hexdigest())
+
+    def get_bytes(self, key: str) -> bytes:
+        """
+        Reads bytes with the wrapped backend.
+
+        :param key: (str) the key of the file relative to the cache
+        :return: (bytes) the data of the file
+        """
+        return self.backend.get_bytes(key=key)
+
+    @contextmanager
+    def open_read(self, key: str) -> Iterator[BinaryIO]:
+        """
+        Opens a file of the wrapped backend for streaming reads.
+
+        :param key: (str) the key of the file relative to the cache
+        :return: (Iterator[BinaryIO]) context manager yielding the file
+        """
+        with self.backend.open_read(key=key) as file:
+            yield file
+
+    @contextmanager
+    def open_write(self, key: str) -> Iterator[BinaryIO]:
+        """
+        Opens a file of the wrapped backend for streaming writes that are hashed as they are written. The file
+        is recorded once the block exits without an error.
+
+        :param key: (str) the key of the file relative to the cache
+        :return: (Iterator[BinaryIO]) context manager yielding the file
+        """
+        with self.backend.open_write(key=key) as file:
+            writer: _HashingWriter = _HashingWriter(file=file)
+            yield writer  # type: ignore
+        self._record(key=key, size=writer.size, checksum=writer.digest.hexdigest())
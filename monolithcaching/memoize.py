@@ -0,0 +1,363 @@
+"""this file defines the decorator that memoizes the results of functions in the cache of a CacheManager"""
+import functools
+import hashlib
+import json
+import pickle
+import struct
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Type, TYPE_CHECKING
+
+import botocore  # type: ignore
+
+from .errors import CacheManagerError, WorkerCacheError
+
+if TYPE_CHECKING:  # pragma: no cover
+    from . import CacheManager
+
+try:
+    import numpy as np  # type: ignore
+except ImportError:  # pragma: no cover
+    np = None  # type: ignore
+
+try:
+    import pandas as pd  # type: ignore
+except ImportError:  # pragma: no cover
+    pd = None  # type: ignore
+
+
+MEMO_META_KEY: str = "memo"
+MEMO_DIRECTORY: str = "memo"
+MEMO_ENTRIES_FILE: str = "entries.json"
+
+HASHERS: Dict[Type, Callable[[Any, Any], None]] = {}
+
+
+def register_hasher(
+    value_type: Type,
+) -> Callable[[Callable[[Any, Any], None]], Callable[[Any, Any], None]]:
+    """
+    Registers a function that feeds values of a type and its subclasses into the digest of stable_hash.
+
+    :param value_type: (Type) the type the function hashes
+    :return: (Callable) decorator registering a function taking the hashlib digest and the value
+    """
+
+    def decorator(hasher: Callable[[Any, Any], None]) -> Callable[[Any, Any], None]:
+        HASHERS[value_type] = hasher
+        return hasher
+
+    return decorator
+
+
+def stable_hash(value: Any) -> str:
+    """
+    Hashes a value so equal values give the same hash in every process and on every machine, unlike hash().
+    Containers are hashed by their contents, types registered with register_hasher by their hasher and
+    anything else by its pickle.
+
+    :param value: (Any) the value to be hashed
+    :return: (str) hex BLAKE2b digest of the value
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    _feed(digest=digest, value=value)
+    return digest.hexdigest()
+
+
+def _feed(digest: Any, value: Any) -> None:
+    """
+    Feeds a value with its type into a digest (private).
+
+    :param digest: (Any) the hashlib digest
+    :param value: (Any) the value to be fed
+    :return: None
+    """
+    digest.update(type(value).__qualname__.encode("UTF-8") + b":")
+    for value_type in type(value).__mro__:
+        if value_type in HASHERS:
+            HASHERS[value_type](digest, value)
+            return
+    if value is None or isinstance(value, (bool, int, float, complex)):
+        digest.update(repr(value).encode("UTF-8"))
+    elif isinstance(value, str):
+        _feed_bytes(digest=digest, data=value.encode("UTF-8"))
+    elif isinstance(value, (bytes, bytearray, memoryview)):
+        _feed_bytes(digest=digest, data=value)
+    elif isinstance(value, (list, tuple)):
+        digest.update(struct.pack("<Q", len(value)))
+        for item in value:
+            _feed(digest=digest, value=item)
+    elif isinstance(value, dict):
+        digest.update(struct.pack("<Q", len(value)))
+        for item_hash, item in sorted(
+            (stable_hash(value=key), item) for key, item in value.items()
+        ):
+            digest.update(item_hash.encode("UTF-8"))
+            _feed(digest=digest, value=item)
+    elif isinstance(value, (set, frozenset)):
+        digest.update(struct.pack("<Q", len(value)))
+        for item_hash in sorted(stable_hash(value=item) for item in value):
+            digest.update(item_hash.encode("UTF-8"))
+    else:
+        _feed_bytes(digest=digest, data=pickle.dumps(value, protocol=4))
+
+
+def _feed_bytes(digest: Any, data: Any) -> None:
+    """
+    Feeds bytes prefixed with their length into a digest so neighbouring values cannot run into each other
+    (private).
+
+    :param digest: (Any) the hashlib digest
+    :param data: (Any) the bytes like object to be fed
+    :return: None
+    """
+    view: memoryview = memoryview(data).cast("B")
+    digest.update(struct.pack("<Q", view.nbytes))
+    digest.update(view)
+
+
+if np is not None:
+
+    @register_hasher(np.ndarray)
+    def _hash_ndarray(digest: Any, value: Any) -> None:
+        """
+        Feeds the dtype, shape and data of a NumPy array into a digest without copying contiguous arrays
+        (private).
+
+        :param digest: (Any) the hashlib digest
+        :param value: (numpy.ndarray) the array
+        :return: None
+        """
+        if value.dtype.hasobject:
+            _feed_bytes(digest=digest, data=pickle.dumps(value, protocol=4))
+            return
+        digest.update(repr((value.dtype.str, value.shape)).encode("UTF-8"))
+        _feed_bytes(digest=digest, data=np.ascontiguousarray(value).view(np.uint8))
+
+    @register_hasher(np.generic)
+    def _hash_numpy_scalar(digest: Any, value: Any) -> None:
+        """
+        Feeds a NumPy scalar into a digest (private).
+
+        :param digest: (Any) the hashlib digest
+        :param value: (numpy.generic) the scalar
+        :return: None
+        """
+        _hash_ndarray(digest, np.asarray(value))
+
+
+if pd is not None:
+
+    @register_hasher(pd.DataFrame)
+    @register_hasher(pd.Series)
+    @register_hasher(pd.Index)
+    def _hash_pandas(digest: Any, value: Any) -> None:
+        """
+        Feeds the names, dtypes and row hashes of a pandas object into a digest (private).
+
+        :param digest: (Any) the hashlib digest
+        :param value: (Union[pandas.DataFrame, pandas.Series, pandas.Index]) the pandas object
+        :return: None
+        """
+        if isinstance(value, pd.DataFrame):
+            _feed(digest=digest, value=[str(column) for column in value.columns])
+            _feed(digest=digest, value=[str(dtype) for dtype in value.dtypes])
+        else:
+            _feed(digest=digest, value=[str(value.name), str(value.dtype)])
+        _hash_ndarray(digest, pd.util.hash_pandas_object(value).to_numpy())
+
+
+def cached(
+    manager: "CacheManager",
+    key: Optional[Callable[..., Any]] = None,
+    name: Optional[str] = None,
+    hasher: Callable[[Any], str] = stable_hash,
+    ttl: Optional[float] = None,
+    max_entries: Optional[int] = None,
+    max_bytes: Optional[int] = None,
+) -> Callable[[Callable], Callable]:
+    """
+    Memoizes the results of a function in the cache the manager points to when the function is called. Results
+    are pickled under memo/<name>/ in the cache with an entries.json file recording their size, creation and
+    access times, which is read once and written on every miss. The hits and misses of the function are counted
+    under "memo" in the meta. A hit reads the result and nothing else, its access time is written with the next
+    miss and its count with the next flush of the manager, and meta_batch_size keeps the meta writes of misses
+    down.
+
+    :param manager: (CacheManager) the manager whose cache the results are stored in
+    :param key: (Optional[Callable[..., Any]]) function of the arguments returning the value that identifies a
+                call, all the arguments if None
+    :param name: (Optional[str]) name the results of the function are stored under, module.qualname if None
+    :param hasher: (Callable[[Any], str]) function hashing the value that identifies a call
+    :param ttl: (Optional[float]) seconds after which a stored result is computed again
+    :param max_entries: (Optional[int]) the most results stored before the least recently used are evicted
+    :param max_bytes: (Optional[int]) the most bytes of results stored before the least recently used are evicted
+    :return: (Callable[[Callable], Callable]) the decorator
+    """
+
+    def decorator(function: Callable) -> Callable:
+        function_name: str = (
+            "{}.{}".format(function.__module__, function.__qualname__)
+            if name is None
+            else name
+        )
+        lock: threading.Lock = threading.Lock()
+        loaded: Dict = {"cache_path": None, "entries": OrderedDict()}
+
+        def entries() -> "OrderedDict[str, Dict]":
+            if loaded["cache_path"] != manager.cache_path:
+                loaded["entries"] = _load_entries(manager, function_name)
+                loaded["cache_path"] = manager.cache_path
+            return loaded["entries"]
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if manager.worker is None:
+                raise CacheManagerError(
+                    message="you are trying to call the cached function {} when no cache is made".format(
+                        function_name
+                    )
+                )
+            digest: str = hasher(
+                (args, kwargs) if key is None else key(*args, **kwargs)
+            )
+            path: str = "{}/{}/{}.pkl".format(MEMO_DIRECTORY, function_name, digest)
+            now: float = time.time()
+
+            with lock:
+                entry: Optional[Dict] = entries().get(digest)
+            data: Optional[bytes] = None
+            if entry is not None and (ttl is None or now - entry["created"] < ttl):
+                try:
+                    data = manager.worker.get_bytes(key=path)
+                except Exception as error:  # pylint: disable=broad-except
+                    if not _is_missing(error=error):
+                        raise
+            if data is not None:
+                result: Any = pickle.loads(data)
+                with lock:
+                    stored: "OrderedDict[str, Dict]" = entries()
+                    stored[digest] = stored.pop(digest, entry)
+                    stored[digest]["last_access"] = now
+                _count(manager, function_name, field="hits")
+                return result
+
+            result = function(*args, **kwargs)
+            data: bytes = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+            manager.worker.put_bytes(key=path, data=data)
+            with lock:
+                stored = entries()
+                stored.pop(digest, None)
+                stored[digest] = {
+                    "size": len(data),
+                    "created": now,
+                    "last_access": now,
+                }
+                _evict(manager, function_name, stored, max_entries, max_bytes)
+                manager.worker.put_bytes(
+                    key=_entries_key(function_name=function_name),
+                    data=json.dumps(list(stored.items())).encode("UTF-8"),
+                )
+            _count(manager, function_name, field="misses")
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def _is_missing(error: Exception) -> bool:
+    """
+    Checks if an error raised reading a result means the result is not in the cache (private).
+
+    :param error: (Exception) the error raised by the backend
+    :return: (bool) True if the file of the result is missing
+    """
+    if isinstance(error, (FileNotFoundError, WorkerCacheError)):
+        return True
+    return isinstance(error, botocore.exceptions.ClientError) and error.response.get(
+        "Error", {}
+    ).get("Code") in ("404", "NoSuchKey", "NotFound")
+
+
+def _entries_key(function_name: str) -> str:
+    """
+    Gets the key of the file recording the stored results of a function (private).
+
+    :param function_name: (str) name the results of the function are stored under
+    :return: (str) the key of the file relative to the cache
+    """
+    return "{}/{}/{}".format(MEMO_DIRECTORY, function_name, MEMO_ENTRIES_FILE)
+
+
+def _load_entries(
+    manager: "CacheManager", function_name: str
+) -> "OrderedDict[str, Dict]":
+    """
+    Reads the size, creation and access times of the stored results of a function from the cache, falling back
+    to the entries older versions recorded in the meta (private).
+
+    :param manager: (CacheManager) the manager whose cache the results are stored in
+    :param function_name: (str) name the results of the function are stored under
+    :return: (OrderedDict[str, Dict]) the entries ordered from least to most recently used
+    """
+    try:
+        data: bytes = manager.worker.get_bytes(  # type: ignore
+            key=_entries_key(function_name=function_name)
+        )
+    except Exception as error:  # pylint: disable=broad-except
+        if not _is_missing(error=error):
+            raise
+        stats: Dict = manager.meta.get(MEMO_META_KEY, {}).get(function_name, {})
+        return OrderedDict(stats.get("entries", {}))
+    return OrderedDict(json.loads(data))
+
+
+def _count(manager: "CacheManager", function_name: str, field: str) -> None:
+    """
+    Adds one to the hits or misses of a function under "memo" in the meta of the manager. Hits are held until
+    the next flush and misses count as an insert of the meta (private).
+
+    :param manager: (CacheManager) the manager whose cache the results are stored in
+    :param function_name: (str) name the results of the function are stored under
+    :param field: (str) "hits" or "misses"
+    :return: None
+    """
+    with manager.meta_lock:
+        memo: Dict = dict(manager.meta.get(MEMO_META_KEY, {}))
+        stats: Dict = memo.get(function_name, {})
+        stats = {"hits": stats.get("hits", 0), "misses": stats.get("misses", 0)}
+        stats[field] += 1
+        memo[function_name] = stats
+        manager.update_meta(data={MEMO_META_KEY: memo}, hold=field == "hits")
+
+
+def _evict(
+    manager: "CacheManager",
+    function_name: str,
+    entries: "OrderedDict[str, Dict]",
+    max_entries: Optional[int],
+    max_bytes: Optional[int],
+) -> None:
+    """
+    Deletes the least recently used results of a function until it fits in max_entries and max_bytes, keeping
+    at least the latest result (private).
+
+    :param manager: (CacheManager) the manager whose cache the results are stored in
+    :param function_name: (str) name the results of the function are stored under
+    :param entries: (OrderedDict[str, Dict]) the entries of the function from least to most recently used
+    :param max_entries: (Optional[int]) the most results stored
+    :param max_bytes: (Optional[int]) the most bytes of results stored
+    :return: None
+    """
+    total: int = sum(entry["size"] for entry in entries.values())
+    while len(entries) > 1 and (
+        (max_entries is not None and len(entries) > max_entries)
+        or (max_bytes is not None and total > max_bytes)
+    ):
+        digest: str = next(iter(entries))
+        total -= entries.pop(digest)["size"]
+        manager.worker.delete_file(  # type: ignore
+            key="{}/{}/{}.pkl".format(MEMO_DIRECTORY, function_name, digest)
+        )
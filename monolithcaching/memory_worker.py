@@ -0,0 +1,252 @@
+"""this file defines the worker for caches held in the memory of the process"""
+import copy
+import os
+import threading
+from contextlib import contextmanager
+from io import BytesIO
+from typing import BinaryIO, Dict, Iterator, Optional, Set, TYPE_CHECKING
+from uuid import UUID
+
+from .backend import CacheBackend, register_backend
+from .errors import WorkerCacheError
+
+if TYPE_CHECKING:  # pragma: no cover
+    from . import CacheManager
+
+
+@register_backend("memory")
+class MemoryWorker(CacheBackend):
+    """
+    This is a class for managing a cache held in the memory of the process. Workers in the same process pointing
+    to the same cache share its files and its lock, and the cache is dropped when the last worker pointing to it
+    is deleted unless it is locked.
+
+    Attributes:
+        id (str): unique id for the worker
+        base_dir (str): memory:// path of the cache
+    """
+
+    PREFIX: str = "memory://"
+    _files: Dict[str, Dict[str, bytes]] = {}
+    _metas: Dict[str, Dict] = {}
+    _references: Dict[str, int] = {}
+    _locked_caches: Set[str] = set()
+    _class_lock: threading.Lock = threading.Lock()
+
+    def __init__(self, existing_cache: Optional[str] = None) -> None:
+        """
+        The constructor for the MemoryWorker class.
+
+        :param existing_cache: (Optional[str]) memory:// path to existing cache
+        """
+        # pylint: disable=invalid-name
+        if existing_cache is None:
+            self.id: str = str(UUID(bytes=os.urandom(16), version=4))
+            self.base_dir: str = self.PREFIX + "{}/".format(self.id)
+        else:
+            if existing_cache not in self._files:
+                raise WorkerCacheError(
+                    message="cache '{}' was supplied as an existing cache but does not exist".format(
+                        existing_cache
+                    )
+                )
+            self.base_dir = existing_cache
+            self.id = existing_cache[len(self.PREFIX) :].strip("/")
+        with self._class_lock:
+            self._files.setdefault(self.base_dir, {})
+            self._references[self.base_dir] = self._references.get(self.base_dir, 0) + 1
+        if existing_cache is None:
+            self.create_meta()
+
+    @classmethod
+    def from_manager(
+        cls, manager: "CacheManager", existing_cache: Optional[str] = None
+    ) -> "MemoryWorker":
+        """
+        Creates or attaches to a cache in memory.
+
+        :param manager: (CacheManager) the manager the cache is for
+        :param existing_cache: (Optional[str]) memory:// path to existing cache
+        :return: (MemoryWorker) the worker pointing to the cache
+        """
+        return cls(existing_cache=existing_cache)
+
+    @property
+    def locked(self) -> bool:
+        """
+        Dynamic property.
+
+        :return: (bool) True if the cache is kept when the last worker pointing to it is deleted
+        """
+        return self.base_dir in self._locked_caches
+
+    def lock(self) -> None:
+        """
+        Locks the cache for every worker pointing to it, preventing cleanup.
+
+        :return: None
+        """
+        self._locked_caches.add(self.base_dir)
+
+    def unlock(self) -> None:
+        """
+        Unlocks the cache for every worker pointing to it, enabling cleanup.
+
+        :return: None
+        """
+        self._locked_caches.discard(self.base_dir)
+
+    def create_meta(self) -> None:
+        """
+        Creates an empty meta for the cache.
+
+        :return: None
+        """
+        self.write_meta(data={})
+
+    def read_meta(self) -> Dict:
+        """
+        Reads a copy of the meta of the cache.
+
+        :return: (dict) the meta of the cache
+        """
+        return copy.deepcopy(self._metas[self.base_dir])
+
+    def write_meta(self, data: Dict) -> None:
+        """
+        Replaces the meta of the cache with a copy of the data.
+
+        :param data: (dict) the meta of the cache
+        :return: None
+        """
+        self._metas[self.base_dir] = copy.deepcopy(data)
+
+    def delete_directory(self) -> None:
+        """
+        Drops the cache whether or not it is locked or referenced elsewhere.
+
+        :return: None
+        """
+        with self._class_lock:
+            self._files.pop(self.base_dir, None)
+            self._metas.pop(self.base_dir, None)
+            self._locked_caches.discard(self.base_dir)
+
+    def _files_of_cache(self) -> Dict[str, bytes]:
+        """
+        Gets the files of the cache (private).
+
+        :return: (Dict[str, bytes]) the data of the files of the cache under their keys
+        """
+        if self.base_dir not in self._files:
+            raise WorkerCacheError(
+                message="cache {} has been deleted".format(self.base_dir)
+            )
+        return self._files[self.base_dir]
+
+    def check_file(self, file: str) -> bool:
+        """
+        Checks to see if a file is present in the cache.
+
+        :param file: (str) key of the file being checked
+        :return: True if present, False if not
+        """
+        return file in self._files_of_cache()
+
+    def put_file(self, key: str, source_path: str) -> None:
+        """
+        Reads a file into the cache under the key.
+
+        :param key: (str) the key of the file relative to the cache
+        :param source_path: (str) path to the file being stored
+        :return: None
+        """
+        with open(source_path, "rb") as file:
+            self.put_bytes(key=key, data=file.read())
+
+    def get_file(self, key: str, destination_path: str) -> None:
+        """
+        Writes a file of the cache to the destination path.
+
+        :param key: (str) the key of the file relative to the cache
+        :param destination_path: (str) path the file is written to
+        :return: None
+        """
+        with open(destination_path, "wb") as file:
+            file.write(self.get_bytes(key=key))
+
+    def put_bytes(self, key: str, data: bytes) -> None:
+        """
+        Stores bytes in the cache under the key.
+
+        :param key: (str) the key of the file relative to the cache
+        :param data: (bytes) the data to be stored
+        :return: None
+        """
+        self._files_of_cache()[key] = bytes(data)
+
+    def get_bytes(self, key: str) -> bytes:
+        """
+        Gets the bytes of a file in the cache.
+
+        :param key: (str) the key of the file relative to the cache
+        :return: (bytes) the data of the file
+        """
+        files: Dict[str, bytes] = self._files_of_cache()
+        if key not in files:
+            raise WorkerCacheError(
+                message="key '{}' is not in the cache {}".format(key, self.base_dir)
+            )
+        return files[key]
+
+    def delete_file(self, key: str) -> None:
+        """
+        Deletes a file from the cache if it is there.
+
+        :param key: (str) the key of the file relative to the cache
+        :return: None
+        """
+        self._files_of_cache().pop(key, None)
+
+    @contextmanager
+    def open_read(self, key: str) -> Iterator[BinaryIO]:
+        """
+        Opens a file in the cache for streaming reads.
+
+        :param key: (str) the key of the file relative to the cache
+        :return: (Iterator[BinaryIO]) context manager yielding the file
+        """
+        with BytesIO(self.get_bytes(key=key)) as file:
+            yield file
+
+    @contextmanager
+    def open_write(self, key: str) -> Iterator[BinaryIO]:
+        """
+        Opens a file in the cache for streaming writes. The file appears in the cache once the block exits
+        without an error.
+
+        :param key: (str) the key of the file relative to the cache
+        :return: (Iterator[BinaryIO]) context manager yielding the file
+        """
+        with BytesIO() as file:
+            yield file
+            self.put_bytes(key=key, data=file.getvalue())
+
+    def __del__(self):
+        """
+        Fires when self is deleted, drops the cache if no other worker points to it and it is not locked.
+
+        :return: None
+        """
+        if "base_dir" not in self.__dict__:
+            # the constructor raised before the cache was chosen
+            return
+        with self._class_lock:
+            count: int = self._references.get(self.base_dir, 1) - 1
+            if count > 0:
+                self._references[self.base_dir] = count
+                return
+            self._references.pop(self.base_dir, None)
+            if self.base_dir not in self._locked_caches:
+                self._files.pop(self.base_dir, None)
+                self._metas.pop(self.base_dir, None)
@@ -0,0 +1,279 @@
+"""this file defines the reaper deleting local and S3 caches whose time to live has passed"""
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Tuple, TYPE_CHECKING
+
+import boto3  # type: ignore
+import botocore  # type: ignore
+
+from .cache_root import CacheRoot
+from .register import Register
+from .s3_worker import DeleteStats, S3Worker
+from .trash import Trash
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .cache_index import CacheIndex
+
+
+EXPIRES_META_KEY: str = "expires"
+TTL_META_KEY: str = "ttl"
+
+
+class ExpiredCache(NamedTuple):
+    """
+    A cache whose time to live has passed.
+
+    Attributes:
+        path (str): the path to the cache
+        expires (float): epoch seconds of when the cache expired
+        locked (bool): if True, the cache is locked
+    """
+
+    path: str
+    expires: float
+    locked: bool
+
+
+def expiry(meta: Dict) -> Optional[float]:
+    """
+    Reads when a cache expires from its meta.
+
+    :param meta: (dict) the meta of the cache
+    :return: (Optional[float]) epoch seconds of when the cache expires, None if it never expires
+    """
+    expires = meta.get(EXPIRES_META_KEY)
+    return None if expires is None else float(expires)
+
+
+class Reaper:
+    """
+    This class is responsible for finding the local and S3 caches whose "expires" time in the meta has passed
+    and deleting them in parallel, locked or not. Local caches are found with the index of the cache root if
+    one is given, otherwise by reading the meta of every cache directory under the root. Caches that the
+    register counts as pointed to are kept unless force is True, S3 caches being counted in Redis. A cache is
+    claimed in the register before it is deleted, and an S3 cache with keys that failed to delete is not
+    reported as reaped and stays claimed until the next reap. Reaping also empties the trash of the cache
+    root, removing deferred deletions that were cut short.
+    """
+
+    def __init__(
+        self,
+        local_cache_path: Optional[str] = None,
+        s3_cache_path: Optional[str] = None,
+        port: Optional[int] = None,
+        host: Optional[str] = None,
+        index: Optional["CacheIndex"] = None,
+        local_register: bool = False,
+        max_workers: int = 8,
+        force: bool = False,
+    ) -> None:
+        """
+        The constructor for the Reaper class.
+
+        :param local_cache_path: (Optional[str]) the path to the root holding the local cache directory
+        :param s3_cache_path: (Optional[str]) the root path of all caches in S3, eg "s3://bucket/caches/"
+        :param port: (Optional[int]) port for the Redis connection tracking local and S3 caches
+        :param host: (Optional[str]) host for the Redis connection tracking local and S3 caches
+        :param index: (Optional[CacheIndex]) index of the local caches used instead of reading every meta
+        :param local_register: (bool) if True and no Redis is given, references are read from the local register
+        :param max_workers: (int) number of caches read or deleted at once
+        :param force: (bool) if True, expired caches are deleted even if the register counts them as pointed to
+        """
+        self.local_cache_path: Optional[str] = local_cache_path
+        self.s3_cache_path: Optional[str] = s3_cache_path
+        self.max_workers: int = max_workers
+        self.force: bool = force
+        self._port: Optional[int] = port
+        self._host: Optional[str] = host
+        self._root: Optional[CacheRoot] = (
+            None
+            if local_cache_path is None
+            else CacheRoot(
+                path=local_cache_path,
+                port=port,
+                host=host,
+                index=index,
+                local_register=local_register,
+            )
+        )
+        self._index: Optional["CacheIndex"] = index
+
+    @staticmethod
+    def _read_local_meta(path: str) -> Tuple[str, Dict]:
+        """
+        Reads the meta.json file of a local cache (private).
+
+        :param path: (str) path to the cache
+        :return: (Tuple[str, dict]) the path and the meta of the cache, empty if it cannot be read
+        """
+        try:
+            with open(path + "meta.json") as meta_file:
+                return path, json.load(meta_file)
+        except (OSError, ValueError):
+            return path, {}
+
+    def _expired_local(self, now: float) -> List[ExpiredCache]:
+        """
+        Finds the expired local caches (private).
+
+        :param now: (float) epoch seconds the expiry times are compared to
+        :return: (List[ExpiredCache]) the expired caches
+        """
+        if self._root is None:
+            return []
+        if self._index is not None:
+            metas: List[Tuple[str, Dict]] = [
+                (record.path, self._index.get_meta(path=record.path) or {})
+                for record in self._index.expired(now=now)
+            ]
+        else:
+            cache_dir: str = self._root.path + "/cache/"
+            if not os.path.isdir(cache_dir):
+                return []
+            paths: List[str] = [
+                entry.path + "/"
+                for entry in os.scandir(cache_dir)
+                if entry.is_dir(follow_symlinks=False)
+            ]
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                metas = list(executor.map(self._read_local_meta, paths))
+        return self._filter(metas=metas, now=now)
+
+    @staticmethod
+    def _read_s3_meta(
+        client: boto3.client, bucket: str, prefix: str
+    ) -> Tuple[str, Dict]:
+        """
+        Reads the meta.json file of a cache in S3 (private).
+
+        :param client: (boto3.client) the S3 client
+        :param bucket: (str) the bucket of the cache
+        :param prefix: (str) the prefix of the cache directory in the bucket
+        :return: (Tuple[str, dict]) the path and the meta of the cache, empty if it is missing, access to it is
+                 denied or it cannot be parsed
+        """
+        path: str = "s3://{}/{}".format(bucket, prefix)
+        try:
+            body: Dict = client.get_object(Bucket=bucket, Key=prefix + "meta.json")
+            return path, json.loads(body["Body"].read().decode("utf-8"))
+        except (botocore.exceptions.ClientError, ValueError):
+            return path, {}
+
+    def _expired_s3(self, now: float) -> List[ExpiredCache]:
+        """
+        Finds the expired caches in S3 by listing the cache directories and reading their meta in parallel
+        (private).
+
+        :param now: (float) epoch seconds the expiry times are compared to
+        :return: (List[ExpiredCache]) the expired caches
+        """
+        if self.s3_cache_path is None:
+            return []
+        bucket, prefix, _ = S3Worker._split_s3_path(storage_path=self.s3_cache_path)
+        client = boto3.client("s3")
+        paginator = client.get_paginator("list_objects_v2")
+        prefixes: List[str] = []
+        for page in paginator.paginate(Bucket=bucket, Prefix=prefix, Delimiter="/"):
+            prefixes.extend(item["Prefix"] for item in page.get("CommonPrefixes", []))
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            metas: List[Tuple[str, Dict]] = list(
+                executor.map(
+                    lambda cache_prefix: self._read_s3_meta(
+                        client=client, bucket=bucket, prefix=cache_prefix
+                    ),
+                    prefixes,
+                )
+            )
+        return self._filter(metas=metas, now=now)
+
+    @staticmethod
+    def _filter(metas: List[Tuple[str, Dict]], now: float) -> List[ExpiredCache]:
+        """
+        Keeps the caches whose meta has an expiry at or before now (private).
+
+        :param metas: (List[Tuple[str, dict]]) the path and meta of every cache
+        :param now: (float) epoch seconds the expiry times are compared to
+        :return: (List[ExpiredCache]) the expired caches
+        """
+        expired: List[ExpiredCache] = []
+        for path, meta in metas:
+            expires: Optional[float] = expiry(meta=meta)
+            if expires is not None and expires <= now:
+                expired.append(
+                    ExpiredCache(
+                        path=path,
+                        expires=expires,
+                        locked=meta.get("locked", False) is True,
+                    )
+                )
+        return expired
+
+    def expired(self, now: Optional[float] = None) -> List[ExpiredCache]:
+        """
+        Finds the local and S3 caches that have expired.
+
+        :param now: (Optional[float]) epoch seconds the expiry times are compared to, the current time if None
+        :return: (List[ExpiredCache]) the expired caches
+        """
+        now = time.time() if now is None else now
+        return self._expired_local(now=now) + self._expired_s3(now=now)
+
+    def _delete(self, cache: ExpiredCache) -> bool:
+        """
+        Deletes an expired cache unless something points to it and force is False (private).
+
+        :param cache: (ExpiredCache) the cache being deleted
+        :return: (bool) True if the cache was deleted
+        """
+        if cache.path.startswith("s3://"):
+            return self._delete_s3(cache=cache)
+        if self.force is False and self._root.claim(path=cache.path) is False:  # type: ignore
+            return False
+        self._root.delete(path=cache.path)  # type: ignore
+        return True
+
+    def _delete_s3(self, cache: ExpiredCache) -> bool:
+        """
+        Deletes an expired S3 cache unless the Redis register counts something pointing to it and force is
+        False (private).
+
+        :param cache: (ExpiredCache) the cache being deleted
+        :return: (bool) True if every key of the cache was deleted
+        """
+        register: Optional[Register] = (
+            Register(host=self._host, port=self._port)
+            if self._port is not None and self._host is not None
+            else None
+        )
+        if (
+            self.force is False
+            and register is not None
+            and register.claim_cache(cache_path=cache.path) is False
+        ):
+            return False
+        stats: DeleteStats = S3Worker(
+            cache_path=self.s3_cache_path,  # type: ignore
+            existing_cache=cache.path,
+        ).delete_directory_parallel()
+        if len(stats.failed) > 0:
+            return False
+        if register is not None:
+            register.delete_cache(cache_path=cache.path)
+        return True
+
+    def reap(self, now: Optional[float] = None) -> List[ExpiredCache]:
+        """
+        Deletes the local and S3 caches that have expired in parallel.
+
+        :param now: (Optional[float]) epoch seconds the expiry times are compared to, the current time if None
+        :return: (List[ExpiredCache]) the caches that were deleted
+        """
+        if self._root is not None:
+            Trash(root=self._root.path).empty()
+        expired: List[ExpiredCache] = self.expired(now=now)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            deleted: List[bool] = list(executor.map(self._delete, expired))
+        return [cache for cache, was_deleted in zip(expired, deleted) if was_deleted]
@@ -2,7 +2,9 @@ from typing import List, Optional
 
 from redis import StrictRedis
 
+from .connection_pool import RedisConnectionPools
 from .errors import RegisterError
+from .instrumentation import timed
 
 
 class Register:
@@ -12,14 +14,75 @@ class Register:
 
     TABLE = "CACHE_REGISTER"
 
-    def __init__(self, host: str, port: int) -> None:
+    # KEYS[1] = register table, ARGV[1] = cache path
+    # returns -1 if the cache is claimed for eviction, otherwise the count after the register
+    REGISTER_SCRIPT = """
+    local count = redis.call("HGET", KEYS[1], ARGV[1])
+    if count and tonumber(count) < 0 then
+        return -1
+    end
+    return redis.call("HINCRBY", KEYS[1], ARGV[1], 1)
+    """
+
+    # KEYS[1] = register table, ARGV[1] = cache path
+    # returns 1 and marks the cache with a count of -1 if nothing points to it, otherwise 0
+    CLAIM_SCRIPT = """
+    local count = redis.call("HGET", KEYS[1], ARGV[1])
+    if count and tonumber(count) > 0 then
+        return 0
+    end
+    redis.call("HSET", KEYS[1], ARGV[1], -1)
+    return 1
+    """
+
+    # KEYS[1] = register table, ARGV[1] = cache path, ARGV[2] = "1" if the cache is locked else "0"
+    # returns -1 if the cache is not in the register, otherwise the count after the deregister
+    DEREGISTER_SCRIPT = """
+    local count = redis.call("HGET", KEYS[1], ARGV[1])
+    if not count then
+        return -1
+    end
+    count = tonumber(count)
+    if count > 0 then
+        count = count - 1
+    end
+    if count <= 0 and ARGV[2] == "0" then
+        redis.call("HDEL", KEYS[1], ARGV[1])
+    else
+        redis.call("HSET", KEYS[1], ARGV[1], count)
+    end
+    return count
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        max_connections: Optional[int] = None,
+        health_check_interval: Optional[int] = None,
+    ) -> None:
         """
-        The constructor for the Register class.
+        The constructor for the Register class. Connections are taken from a pool shared across the process.
 
         :param host: (str) host for the Redis connection
         :param port: (int) port for the Redis connection
+        :param max_connections: (Optional[int]) max connections of the shared pool if it has not been created yet
+        :param health_check_interval: (Optional[int]) health check interval of the shared pool if not created yet
         """
-        self._connection: StrictRedis = StrictRedis(host=host, port=port, db=0)
+        self._connection: StrictRedis = StrictRedis(
+            connection_pool=RedisConnectionPools.get(
+                host=host,
+                port=port,
+                db=0,
+                max_connections=max_connections,
+                health_check_interval=health_check_interval,
+            )
+        )
+        self._register_script = self._connection.register_script(self.REGISTER_SCRIPT)
+        self._deregister_script = self._connection.register_script(
+            self.DEREGISTER_SCRIPT
+        )
+        self._claim_script = self._connection.register_script(self.CLAIM_SCRIPT)
 
     def get_count(self, cache_path: str) -> Optional[int]:
         """
@@ -28,49 +91,73 @@ class Register:
         :param cache_path: (str) the path to the cache
         :return: (Optional[int]) number of count, or None if cache does not exist
         """
-        count: Optional[str] = self._connection.hget(name=self.TABLE, key=cache_path)
+        count = self._connection.hget(name=self.TABLE, key=cache_path)
         if count is None:
             return None
         return int(count)
 
-    def register_cache(self, cache_path: str) -> None:
+    def register_cache(self, cache_path: str) -> int:
         """
         Registers the cache path if there isn't an entry or increasing the count by one if there is.
+        This is done atomically in one round trip with a Lua script, which refuses caches claimed for eviction.
 
         :param cache_path: (str) the path to the cache
-        :return: None
+        :return: (int) the count of the references after the register
         """
-        count: Optional[int] = self.get_count(cache_path=cache_path)
-        if count is None:
-            self._connection.hset(name=self.TABLE, key=cache_path, value="1")
-        else:
-            count += 1
-            self._connection.hset(name=self.TABLE, key=cache_path, value=str(count))
+        with timed(operation="register", backend="redis"):
+            count: int = int(
+                self._register_script(keys=[self.TABLE], args=[cache_path])
+            )
+        if count < 0:
+            raise RegisterError(
+                message="cache {} is being evicted so it cannot be registered".format(
+                    cache_path
+                )
+            )
+        return count
 
     def deregister_cache(self, cache_path: str, locked: bool) -> int:
         """
         Deletes the cache path from Redis if the count goes to Zero or decreases the count by one if not zero.
+        This is done atomically in one round trip with a Lua script.
 
         :param cache_path: (str) the path to the cache
         :param locked: (bool) is set to True prevents deleting of cache even if it has a count of zero
         :return: (int) the count of the references after the deregister.
         """
-        count: Optional[int] = self.get_count(cache_path=cache_path)
-        if count is None:
+        with timed(operation="deregister", backend="redis"):
+            count: int = int(
+                self._deregister_script(
+                    keys=[self.TABLE], args=[cache_path, "1" if locked else "0"]
+                )
+            )
+        if count < 0:
             raise RegisterError(
                 message="cache {} is not in cache register so it cannot be de-registered".format(
                     cache_path
                 )
             )
-        else:
-            if count > 0:
-                count -= 1
-            if count <= 0 and locked is False:
-                self._connection.hdel(self.TABLE, cache_path)
-            else:
-                self._connection.hset(name=self.TABLE, key=cache_path, value=str(count))
         return count
 
+    def claim_cache(self, cache_path: str) -> bool:
+        """
+        Claims a cache for eviction if nothing points to it, so managers cannot register it until it is deleted.
+        The check and the claim are done atomically in one round trip with a Lua script.
+
+        :param cache_path: (str) the path to the cache
+        :return: (bool) True if the cache was claimed
+        """
+        return int(self._claim_script(keys=[self.TABLE], args=[cache_path])) == 1
+
+    def delete_cache(self, cache_path: str) -> None:
+        """
+        Deletes the entry of a cache that has been deleted, whatever its count.
+
+        :param cache_path: (str) the path to the cache
+        :return: None
+        """
+        self._connection.hdel(self.TABLE, cache_path)
+
     def get_all_records(self) -> List[dict]:
         """
         Get's all the key entries for the LOCAL_CLOUD.
@@ -1,16 +1,75 @@
 """this file defines the worker for pointing to caches in s3 buckets"""
-import ast
 import json
 import os
-from typing import Tuple, Optional, Any, Dict, List
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, Future
+from contextlib import contextmanager
+from io import BytesIO
+from typing import (
+    Tuple,
+    Optional,
+    Dict,
+    List,
+    NamedTuple,
+    Iterator,
+    BinaryIO,
+    TYPE_CHECKING,
+)
 from uuid import UUID
 
 import boto3  # type: ignore
 import botocore  # type: ignore
+from boto3.s3.transfer import TransferConfig  # type: ignore
 
+from .backend import CacheBackend, register_backend
+from .errors import RegisterError, WorkerCacheError
+from .instrumentation import timed
+from .register import Register
 
-# pylint: disable=too-few-public-methods
-class S3Worker:
+if TYPE_CHECKING:  # pragma: no cover
+    from . import CacheManager
+
+
+class DeleteStats(NamedTuple):
+    """
+    The outcome of a parallel deletion of a cache directory in S3.
+
+    Attributes:
+        deleted (int): number of keys deleted
+        failed (List[Dict[str, str]]): the Key, Code and Message of every key that failed to delete
+        seconds (float): wall time of the deletion
+    """
+
+    deleted: int
+    failed: List[Dict[str, str]]
+    seconds: float
+
+    @property
+    def keys_per_second(self) -> float:
+        """
+        Dynamic property.
+
+        :return: (float) deleted keys per second
+        """
+        return self.deleted / self.seconds if self.seconds > 0 else 0.0
+
+
+class FileCheck(NamedTuple):
+    """
+    The outcome of checking which of a list of files are present in a cache in S3.
+
+    Attributes:
+        present (Dict[str, int]): the size of every file that is present, keyed by its key in the cache
+        missing (List[str]): the keys of the files that are not present
+    """
+
+    present: Dict[str, int]
+    missing: List[str]
+
+
+@register_backend("s3")
+class S3Worker(CacheBackend):
     """
     This is a class for managing a directory for temp files in S3.
 
@@ -19,12 +78,28 @@ class S3Worker:
         base_dir (str): directory path for the cache
     """
 
-    def __init__(self, cache_path: str, existing_cache: Optional[str] = None) -> None:
+    DELETE_BATCH_SIZE: int = 1000
+    HEAD_FAN_OUT_LIMIT: int = 32
+    SPOOL_SIZE: int = 8 * 1024 * 1024
+
+    def __init__(
+        self,
+        cache_path: str,
+        existing_cache: Optional[str] = None,
+        transfer_config: Optional[TransferConfig] = None,
+        port: Optional[int] = None,
+        host: Optional[str] = None,
+    ) -> None:
         """
-        The constructor for the S3Worker class.
+        The constructor for the S3Worker class. With a Redis port and host the cache is counted in the register
+        while the worker points to it, so the reaper keeps it, and the count is dropped when the worker is
+        deleted. The objects in S3 are never deleted with the worker.
 
         :param cache_path: (str) the root path for all caches
         :param existing_cache: (Optional[str]) points to an existing cache if entered
+        :param transfer_config: (Optional[TransferConfig]) multipart thresholds and concurrency of file transfers
+        :param port: (Optional[int]) port for the Redis connection tracking caches
+        :param host: (Optional[str]) host for the Redis connection tracking caches
         """
         # pylint: disable=invalid-name
         if existing_cache is None:
@@ -35,8 +110,37 @@ class S3Worker:
         self._client: boto3.client = boto3.client("s3")
         self._resource: boto3.resource = boto3.resource("s3")
         self._locked: bool = False
+        self.transfer_config: TransferConfig = (
+            TransferConfig() if transfer_config is None else transfer_config
+        )
         if existing_cache is None:
             self.create_meta()
+        self._register: Optional[Register] = None
+        if port is not None and host is not None:
+            register: Register = Register(host=host, port=port)
+            try:
+                register.register_cache(cache_path=self.base_dir)
+            except RegisterError as error:
+                raise WorkerCacheError(message=str(error)) from error
+            self._register = register
+
+    @classmethod
+    def from_manager(
+        cls, manager: "CacheManager", existing_cache: Optional[str] = None
+    ) -> "S3Worker":
+        """
+        Creates or attaches to a cache in S3 with the settings of a manager.
+
+        :param manager: (CacheManager) the manager the cache is for
+        :param existing_cache: (Optional[str]) points to an existing cache if entered
+        :return: (S3Worker) the worker pointing to the cache
+        """
+        return cls(
+            cache_path=manager.s3_cache_path,  # type: ignore
+            existing_cache=existing_cache,
+            port=manager.port,
+            host=manager.host,
+        )
 
     def delete_directory(self) -> None:
         """
@@ -50,32 +154,126 @@ class S3Worker:
         bucket_object = self._resource.Bucket(bucket)
         bucket_object.objects.filter(Prefix=cache_path).delete()
 
+    def delete_directory_parallel(self, max_workers: int = 8) -> DeleteStats:
+        """
+        Deletes cache directory by listing the keys and sending DeleteObjects batches to a thread pool as each
+        page is listed, so deletes run concurrently with the listing and with each other. A batch whose request
+        raises, such as when it is throttled, has every one of its keys reported as failed with the error.
+
+        :param max_workers: (int) number of DeleteObjects requests in flight at once
+        :return: (DeleteStats) number of deleted keys, keys that failed and time taken
+        """
+        bucket, cache_path, _ = self._split_s3_path(storage_path=self.base_dir)
+        start: float = time.monotonic()
+        futures: List[Tuple[Future, List[Dict[str, str]]]] = []
+        paginator = self._client.get_paginator("list_objects_v2")
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pages: Iterator[Dict] = iter(
+                paginator.paginate(Bucket=bucket, Prefix=cache_path)
+            )
+            while True:
+                with timed(operation="s3_list", backend="s3"):
+                    page: Optional[Dict] = next(pages, None)
+                if page is None:
+                    break
+                keys: List[Dict[str, str]] = [
+                    {"Key": item["Key"]} for item in page.get("Contents", [])
+                ]
+                for index in range(0, len(keys), self.DELETE_BATCH_SIZE):
+                    batch: List[Dict[str, str]] = keys[
+                        index : index + self.DELETE_BATCH_SIZE
+                    ]
+                    futures.append(
+                        (executor.submit(self._delete_batch, bucket, batch), batch)
+                    )
+
+        deleted: int = 0
+        failed: List[Dict[str, str]] = []
+        for future, batch in futures:
+            try:
+                batch_deleted, batch_failed = future.result()
+            except Exception as error:  # pylint: disable=broad-except
+                batch_deleted, batch_failed = 0, self._batch_errors(
+                    keys=batch, error=error
+                )
+            deleted += batch_deleted
+            failed.extend(batch_failed)
+        return DeleteStats(
+            deleted=deleted, failed=failed, seconds=time.monotonic() - start
+        )
+
+    @staticmethod
+    def _batch_errors(
+        keys: List[Dict[str, str]], error: Exception
+    ) -> List[Dict[str, str]]:
+        """
+        Reports every key of a batch whose DeleteObjects request raised as failed (private).
+
+        :param keys: (List[Dict[str, str]]) the keys of the batch
+        :param error: (Exception) the error raised by the request
+        :return: (List[Dict[str, str]]) the Key, Code and Message of every key of the batch
+        """
+        if isinstance(error, botocore.exceptions.ClientError):
+            code: str = error.response.get("Error", {}).get("Code", "ClientError")
+            message: str = error.response.get("Error", {}).get("Message", str(error))
+        else:
+            code, message = type(error).__name__, str(error)
+        return [{"Key": key["Key"], "Code": code, "Message": message} for key in keys]
+
+    def _delete_batch(
+        self, bucket: str, keys: List[Dict[str, str]]
+    ) -> Tuple[int, List[Dict[str, str]]]:
+        """
+        Deletes a batch of up to 1000 keys with one DeleteObjects request (private).
+
+        :param bucket: (str) the bucket the keys are in
+        :param keys: (List[Dict[str, str]]) the keys to be deleted
+        :return: (Tuple[int, List[Dict[str, str]]]) number of keys deleted and the errors of the keys that failed
+        """
+        with timed(operation="s3_delete_objects", backend="s3"):
+            response: Dict = self._client.delete_objects(
+                Bucket=bucket, Delete={"Objects": keys, "Quiet": True}
+            )
+        errors: List[Dict[str, str]] = response.get("Errors", [])
+        return len(keys) - len(errors), errors
+
     def create_meta(self) -> None:
         """
         Creates the meta file for the cache.
 
         :return: None
         """
-        bucket, cache_path, _ = self._split_s3_path(storage_path=self.base_dir)
-        file_path = cache_path + "meta.json"
-        meta_object = self._resource.Object(bucket, file_path)
-        meta_object.put(Body=(bytes(json.dumps({}).encode("UTF-8"))))
+        self.write_meta(data={})
+
+    def read_meta(self) -> Dict:
+        """
+        Reads the meta file of the cache with one GET.
 
-    def insert_meta(self, key: str, value: Any) -> None:
+        :return: (Dict) meta data of the cache
+        """
+        return self.meta
+
+    def write_meta(self, data: Dict) -> None:
         """
-        Inserts a value into the meta data file of the cache.
+        Replaces the meta file of the cache with one PUT.
 
-        :param key: (str) the key the value is denoted under
-        :param value: (Any) the value to be inserted
+        :param data: (Dict) meta data of the cache
         :return: None
         """
         bucket, cache_path, _ = self._split_s3_path(storage_path=self.base_dir)
         file_path = cache_path + "meta.json"
         meta_object = self._resource.Object(bucket, file_path)
-        meta_data = self.meta
-        meta_data[key] = value
+        meta_object.put(Body=(bytes(json.dumps(data).encode("UTF-8"))))
 
-        meta_object.put(Body=(bytes(json.dumps(meta_data).encode("UTF-8"))))
+    @property
+    def locked(self) -> bool:
+        """
+        Dynamic property.
+
+        :return: (bool) always True as caches in S3 are not deleted when the worker is deleted
+        """
+        return True
 
     def lock(self) -> None:
         """
@@ -85,6 +283,14 @@ class S3Worker:
         """
         pass
 
+    def unlock(self) -> None:
+        """
+        Placeholder for unlocking as all S3 is locked.
+
+        :return: None
+        """
+        pass
+
     def check_file(self, file: str) -> bool:
         """
         Checks to see if a file is present in the cache.
@@ -103,6 +309,180 @@ class S3Worker:
                 raise
         return True
 
+    def _head_size(self, bucket: str, object_key: str) -> Optional[int]:
+        """
+        Gets the size of an object with a HeadObject request (private).
+
+        :param bucket: (str) the bucket of the object
+        :param object_key: (str) the key of the object in the bucket
+        :return: (Optional[int]) the size of the object, None if it is not there
+        """
+        try:
+            return self._client.head_object(Bucket=bucket, Key=object_key)[
+                "ContentLength"
+            ]
+        except botocore.exceptions.ClientError as e:
+            if e.response["Error"]["Code"] in ("404", "NoSuchKey"):
+                return None
+            raise
+
+    def check_files(self, files: List[str], max_workers: int = 16) -> FileCheck:
+        """
+        Checks to see which of a list of files are present in the cache. Up to HEAD_FAN_OUT_LIMIT files are
+        checked with concurrent HeadObject requests, and longer lists with one paginated listing of the longest
+        prefix the files share, so hundreds of files are checked with a handful of requests.
+
+        :param files: (List[str]) keys of the files being checked
+        :param max_workers: (int) number of HeadObject requests in flight at once
+        :return: (FileCheck) the sizes of the files that are present and the keys of those that are missing
+        """
+        bucket, cache_path, _ = self._split_s3_path(storage_path=self.base_dir)
+        keys: List[str] = list(dict.fromkeys(files))
+        object_keys: Dict[str, str] = {
+            key: cache_path + key.lstrip("/") for key in keys
+        }
+        sizes: Dict[str, Optional[int]] = {}
+        if len(keys) <= self.HEAD_FAN_OUT_LIMIT:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                sizes.update(
+                    zip(
+                        keys,
+                        executor.map(
+                            lambda key: self._head_size(
+                                bucket=bucket, object_key=object_keys[key]
+                            ),
+                            keys,
+                        ),
+                    )
+                )
+        else:
+            wanted: Dict[str, str] = {
+                object_key: key for key, object_key in object_keys.items()
+            }
+            paginator = self._client.get_paginator("list_objects_v2")
+            pages: Iterator[Dict] = iter(
+                paginator.paginate(
+                    Bucket=bucket, Prefix=os.path.commonprefix(list(wanted))
+                )
+            )
+            while True:
+                with timed(operation="s3_list", backend="s3"):
+                    page: Optional[Dict] = next(pages, None)
+                if page is None:
+                    break
+                for item in page.get("Contents", []):
+                    if item["Key"] in wanted:
+                        sizes[wanted[item["Key"]]] = item["Size"]
+        present: Dict[str, int] = {
+            key: sizes[key] for key in keys if sizes.get(key) is not None  # type: ignore
+        }
+        return FileCheck(
+            present=present, missing=[key for key in keys if key not in present]
+        )
+
+    def _key(self, key: str) -> Tuple[str, str]:
+        """
+        Gets the bucket and object key of a key in the cache (private).
+
+        :param key: (str) the key of the file relative to the cache
+        :return: (Tuple[str, str]) the bucket and the object key
+        """
+        bucket, cache_path, _ = self._split_s3_path(storage_path=self.base_dir)
+        return bucket, cache_path + key.lstrip("/")
+
+    def delete_file(self, key: str) -> None:
+        """
+        Deletes a file from the cache with one DeleteObject request, which succeeds if the key is not there.
+
+        :param key: (str) the key of the file relative to the cache
+        :return: None
+        """
+        bucket, object_key = self._key(key=key)
+        self._client.delete_object(Bucket=bucket, Key=object_key)
+
+    def put_file(self, key: str, source_path: str) -> None:
+        """
+        Uploads a file to the cache under the key with a managed transfer that switches to concurrent
+        multipart uploads above the multipart threshold of the transfer config.
+
+        :param key: (str) the key of the file relative to the cache
+        :param source_path: (str) path to the file being stored
+        :return: None
+        """
+        bucket, object_key = self._key(key=key)
+        self._client.upload_file(
+            source_path, bucket, object_key, Config=self.transfer_config
+        )
+
+    def get_file(self, key: str, destination_path: str) -> None:
+        """
+        Downloads a file from the cache with a managed transfer that fetches byte ranges concurrently above
+        the multipart threshold of the transfer config.
+
+        :param key: (str) the key of the file relative to the cache
+        :param destination_path: (str) path the file is downloaded to
+        :return: None
+        """
+        bucket, object_key = self._key(key=key)
+        self._client.download_file(
+            bucket, object_key, destination_path, Config=self.transfer_config
+        )
+
+    def put_bytes(self, key: str, data: bytes) -> None:
+        """
+        Uploads bytes to the cache under the key.
+
+        :param key: (str) the key of the file relative to the cache
+        :param data: (bytes) the data to be stored
+        :return: None
+        """
+        bucket, object_key = self._key(key=key)
+        self._client.upload_fileobj(
+            BytesIO(data), bucket, object_key, Config=self.transfer_config
+        )
+
+    def get_bytes(self, key: str) -> bytes:
+        """
+        Downloads the bytes of a file in the cache.
+
+        :param key: (str) the key of the file relative to the cache
+        :return: (bytes) the data of the file
+        """
+        with self.open_read(key=key) as file:
+            return file.read()
+
+    @contextmanager
+    def open_read(self, key: str) -> Iterator[BinaryIO]:
+        """
+        Opens a file in the cache for streaming reads from the body of a GET request.
+
+        :param key: (str) the key of the file relative to the cache
+        :return: (Iterator[BinaryIO]) context manager yielding the streaming body
+        """
+        bucket, object_key = self._key(key=key)
+        body = self._client.get_object(Bucket=bucket, Key=object_key)["Body"]
+        try:
+            yield body
+        finally:
+            body.close()
+
+    @contextmanager
+    def open_write(self, key: str) -> Iterator[BinaryIO]:
+        """
+        Opens a file for streaming writes that is spooled in memory up to SPOOL_SIZE and then to disk. It is
+        uploaded to the cache when the block exits without an error.
+
+        :param key: (str) the key of the file relative to the cache
+        :return: (Iterator[BinaryIO]) context manager yielding the spooled file
+        """
+        bucket, object_key = self._key(key=key)
+        with tempfile.SpooledTemporaryFile(max_size=self.SPOOL_SIZE) as file:
+            yield file  # type: ignore
+            file.seek(0)
+            self._client.upload_fileobj(
+                file, bucket, object_key, Config=self.transfer_config
+            )
+
     @staticmethod
     def _split_s3_path(storage_path: str) -> Tuple[str, str, str]:
         """
@@ -121,12 +501,12 @@ class S3Worker:
     @staticmethod
     def extract_id(storage_path: str) -> str:
         """
-        Extracts the id of the cache from a previous cache path.
+        Extracts the id of the cache from a previous cache path, with or without the trailing slash of base_dir.
 
         :param storage_path: (str) the cache path for the ID to be extracted
         :return: (str) the ID of the cache
         """
-        return storage_path.split("/")[-1]
+        return storage_path.rstrip("/").split("/")[-1]
 
     @property
     def meta(self) -> Dict:
@@ -138,4 +518,14 @@ class S3Worker:
         bucket, cache_path, _ = self._split_s3_path(storage_path=self.base_dir)
         file_path = cache_path + "meta.json"
         meta_object = self._resource.Object(bucket, file_path)
-        return ast.literal_eval(meta_object.get()["Body"].read().decode("utf-8"))
+        return json.loads(meta_object.get()["Body"].read().decode("utf-8"))
+
+    def __del__(self):
+        """
+        Fires when self is deleted, drops the count of the cache in the register if it was counted.
+
+        :return: None
+        """
+        register: Optional[Register] = self.__dict__.get("_register")
+        if register is not None:
+            register.deregister_cache(cache_path=self.base_dir, locked=False)
@@ -0,0 +1,362 @@
+"""this file defines the worker for caches held in shared memory or another tmpfs with a byte budget"""
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator, Optional, Union, TYPE_CHECKING
+
+from .backend import register_backend
+from .errors import WorkerCacheError
+from .local_register import LocalRegister
+from .register import Register
+from .worker import Worker
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None  # type: ignore
+
+if TYPE_CHECKING:  # pragma: no cover
+    from . import CacheManager
+    from .cache_index import CacheIndex
+
+
+@register_backend("shm")
+class ShmWorker(Worker):
+    """
+    This is a class for managing a cache directory in /dev/shm or another tmpfs. Files are kept in RAM while the
+    cache holds less than max_shm_bytes and are spilled to a directory on disk under the local cache otherwise.
+    Reads look in RAM first and then in the spill directory. The bytes held in RAM are read from the tmpfs
+    directory under a file lock, so every worker and process attached to the cache shares the budget. The
+    local register of the cache is kept under the local cache on disk, next to the index the cache is
+    recorded in, so managers evicting the local cache see the references to it.
+
+    Attributes:
+        id (str): unique id for the worker
+        shm_bytes (int): the bytes the cache holds in RAM
+        max_shm_bytes (Optional[int]): the most bytes the cache holds in RAM, unbounded if None
+        spill_root (str): the local cache on disk holding the spill directory and the local register
+        spill_dir (str): directory on disk that files are spilled to
+    """
+
+    DEFAULT_SHM_PATH: str = "/dev/shm/monolithcaching"
+    LOCK_FILE: str = ".shm.lock"
+
+    def __init__(
+        self,
+        port: Optional[int],
+        host: Optional[str],
+        existing_cache: Optional[str] = None,
+        local_cache: Optional[str] = None,
+        shm_path: Optional[str] = None,
+        max_shm_bytes: Optional[int] = None,
+        index: Optional["CacheIndex"] = None,
+        local_register: bool = False,
+        access_interval: float = 0.0,
+        deferred_delete: bool = False,
+    ) -> None:
+        """
+        The constructor for the ShmWorker class.
+
+        :param port: (Optional[int]) port for the redis connection tracking caches
+        :param host: (Optional[str]) host for the redis connection tracking caches
+        :param existing_cache: (Optional[str]) path to existing cache in the tmpfs
+        :param local_cache: (Optional[str]) path to the local cache on disk that files are spilled to
+        :param shm_path: (Optional[str]) directory in a tmpfs the caches are created in, /dev/shm/monolithcaching
+                         if None
+        :param max_shm_bytes: (Optional[int]) the most bytes the cache holds in RAM, unbounded if None
+        :param index: (Optional[CacheIndex]) index of the caches to record the cache in
+        :param local_register: (bool) if True and no Redis is given, count references in a local register
+        :param access_interval: (float) the fewest seconds between accesses written to the access record
+        :param deferred_delete: (bool) if True, the cache is deregistered and deleted on a background thread
+                                when the worker is deleted, by renaming it into the trash under shm_path
+        """
+        if shm_path is None:
+            if not os.path.isdir(os.path.dirname(self.DEFAULT_SHM_PATH)):
+                raise WorkerCacheError(
+                    message="{} is not available, supply the shm_path of a tmpfs".format(
+                        os.path.dirname(self.DEFAULT_SHM_PATH)
+                    )
+                )
+            shm_path = self.DEFAULT_SHM_PATH
+        self.max_shm_bytes: Optional[int] = max_shm_bytes
+        self._lock: threading.Lock = threading.Lock()
+        self.spill_root: str = str(
+            self.CLASS_BASE_DIR if local_cache is None else local_cache
+        )
+        super().__init__(
+            port=port,
+            host=host,
+            existing_cache=existing_cache,
+            local_cache=shm_path,
+            index=index,
+            local_register=local_register,
+            access_interval=access_interval,
+            deferred_delete=deferred_delete,
+        )
+        # named after the cache directory so every worker attached to the cache shares the spill directory
+        self.spill_dir: str = self.spill_root + "/spill/{}/".format(
+            os.path.basename(os.path.normpath(self.base_dir))
+        )
+        self._spill_worker: Optional[Worker] = None
+
+    @classmethod
+    def from_manager(
+        cls, manager: "CacheManager", existing_cache: Optional[str] = None
+    ) -> "ShmWorker":
+        """
+        Creates or attaches to a cache in shared memory with the settings of a manager.
+
+        :param manager: (CacheManager) the manager the cache is for
+        :param existing_cache: (Optional[str]) path to existing cache in the tmpfs
+        :return: (ShmWorker) the worker pointing to the cache
+        """
+        return cls(
+            port=manager.port,
+            host=manager.host,
+            existing_cache=existing_cache,
+            local_cache=manager.local_cache_path,
+            shm_path=manager.shm_path,
+            max_shm_bytes=manager.max_shm_bytes,
+            index=manager.index,
+            local_register=manager.local_register,
+            access_interval=manager.access_interval,
+            deferred_delete=manager.deferred_delete,
+        )
+
+    def _get_register(self) -> Union[None, Register, LocalRegister]:
+        """
+        Gets the register counting the references to the cache, the local register being the one under the
+        local cache on disk rather than under the tmpfs (private).
+
+        :return: (Union[None, Register, LocalRegister]) Redis register if a port and host are given, local register
+                 under the local cache if enabled, None otherwise
+        """
+        if self._port is not None and self._host is not None:
+            return Register(host=self._host, port=self._port)
+        if self._local_register is True:
+            return LocalRegister(root=self.spill_root)
+        return None
+
+    @property
+    def shm_bytes(self) -> int:
+        """
+        Dynamic property read from the tmpfs directory, leaving out the temp files of writes in progress.
+
+        :return: (int) the bytes the cache holds in RAM
+        """
+        return self._directory_size(path=self.base_dir)
+
+    @classmethod
+    def _directory_size(cls, path: str) -> int:
+        """
+        Sums the size of the files under a directory apart from temp files (private).
+
+        :param path: (str) path to the directory
+        :return: (int) the bytes held under the directory
+        """
+        size: int = 0
+        for entry in os.scandir(path):
+            if entry.is_dir(follow_symlinks=False):
+                size += cls._directory_size(path=entry.path)
+            elif entry.is_file(follow_symlinks=False) and not (
+                entry.name.startswith(".put-") and entry.name.endswith(".tmp")
+            ):
+                size += entry.stat(follow_symlinks=False).st_size
+        return size
+
+    @contextmanager
+    def _budget_lock(self) -> Iterator[None]:
+        """
+        Holds the lock of the RAM budget of the cache, an exclusive lock on a file in the cache so it is shared
+        by every worker and process attached to it (private).
+
+        :return: (Iterator[None]) context manager holding the lock
+        """
+        with self._lock:
+            descriptor: int = os.open(
+                self.base_dir + self.LOCK_FILE, os.O_RDWR | os.O_CREAT
+            )
+            try:
+                if fcntl is not None:
+                    fcntl.flock(descriptor, fcntl.LOCK_EX)
+                yield
+            finally:
+                os.close(descriptor)
+
+    @property
+    def spill_worker(self) -> Worker:
+        """
+        Dynamic property that creates the spill directory the first time it is used.
+
+        :return: (Worker) locked worker for the spill directory of the cache
+        """
+        if self._spill_worker is None:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            self._spill_worker = Worker(
+                port=None, host=None, existing_cache=self.spill_dir
+            )
+            self._spill_worker.lock()
+        return self._spill_worker
+
+    def _read_path(self, key: str) -> str:
+        """
+        Gets the path of a key in RAM if it is there and in the spill directory otherwise (private).
+
+        :param key: (str) the key of the file relative to the cache
+        :return: (str) the path to the file
+        """
+        path: str = self._key_path(key=key)
+        if not os.path.isfile(path) and os.path.isfile(self.spill_dir + key):
+            return self.spill_dir + key
+        return path
+
+    def _fits(self, path: str, size: int) -> bool:
+        """
+        Checks if a file of a size can replace the file at a path in RAM without going over max_shm_bytes
+        (private).
+
+        :param path: (str) path of the file in RAM
+        :param size: (int) the size of the new file
+        :return: (bool) True if the file fits in RAM
+        """
+        if self.max_shm_bytes is None:
+            return True
+        previous: int = os.path.getsize(path) if os.path.isfile(path) else 0
+        return self.shm_bytes - previous + size <= self.max_shm_bytes
+
+    def _spill(self, key: str, source_path: str) -> None:
+        """
+        Stores a file in the spill directory and removes any copy of the key in RAM (private).
+
+        :param key: (str) the key of the file relative to the cache
+        :param source_path: (str) path to the file being stored
+        :return: None
+        """
+        self.spill_worker.put_file(key=key, source_path=source_path)
+        self._drop_from_shm(key=key)
+
+    def _drop_from_shm(self, key: str) -> None:
+        """
+        Removes the copy of a key in RAM if there is one (private).
+
+        :param key: (str) the key of the file relative to the cache
+        :return: None
+        """
+        path: str = self._key_path(key=key)
+        with self._budget_lock():
+            if os.path.isfile(path):
+                os.unlink(path)
+
+    def _commit(self, temp_path: str, path: str) -> None:
+        """
+        Renames a temp file in RAM over the file of its key if it fits in max_shm_bytes and moves it to the spill
+        directory otherwise (private).
+
+        :param temp_path: (str) path to the temp file
+        :param path: (str) path of the file in RAM
+        :return: None
+        """
+        key: str = os.path.relpath(path, self.base_dir)
+        size: int = os.path.getsize(temp_path)
+        with self._budget_lock():
+            fits: bool = self._fits(path=path, size=size)
+            if fits is True:
+                super()._commit(temp_path=temp_path, path=path)
+        if fits is True:
+            if os.path.isfile(self.spill_dir + key):
+                os.unlink(self.spill_dir + key)
+            return
+        try:
+            self._spill(key=key, source_path=temp_path)
+        finally:
+            os.unlink(temp_path)
+
+    def put_file(self, key: str, source_path: str) -> None:
+        """
+        Copies a file into the cache under the key, straight to the spill directory if it does not fit in RAM.
+
+        :param key: (str) the key of the file relative to the cache
+        :param source_path: (str) path to the file being stored
+        :return: None
+        """
+        if self._fits(path=self._key_path(key=key), size=os.path.getsize(source_path)):
+            super().put_file(key=key, source_path=source_path)
+        else:
+            self._spill(key=key, source_path=source_path)
+
+    def get_file(self, key: str, destination_path: str) -> None:
+        """
+        Copies a file from RAM or the spill directory to the destination path.
+
+        :param key: (str) the key of the file relative to the cache
+        :param destination_path: (str) path the file is copied to
+        :return: None
+        """
+        self._copy_file(source=self._read_path(key=key), destination=destination_path)
+
+    def put_bytes(self, key: str, data: bytes) -> None:
+        """
+        Writes bytes to a file in the cache under the key, straight to the spill directory if they do not fit in
+        RAM.
+
+        :param key: (str) the key of the file relative to the cache
+        :param data: (bytes) the data to be stored
+        :return: None
+        """
+        path: str = self._key_path(key=key)
+        if self._fits(path=path, size=len(data)):
+            super().put_bytes(key=key, data=data)
+            return
+        self.spill_worker.put_bytes(key=key, data=data)
+        self._drop_from_shm(key=key)
+
+    @contextmanager
+    def open_read(self, key: str) -> Iterator[BinaryIO]:
+        """
+        Opens a file in RAM or the spill directory for streaming reads.
+
+        :param key: (str) the key of the file relative to the cache
+        :return: (Iterator[BinaryIO]) context manager yielding the open file
+        """
+        with open(self._read_path(key=key), "rb") as file:
+            yield file
+
+    def delete_file(self, key: str) -> None:
+        """
+        Deletes a file from RAM and the spill directory if it is there.
+
+        :param key: (str) the key of the file relative to the cache
+        :return: None
+        """
+        self._drop_from_shm(key=key)
+        if os.path.isfile(self.spill_dir + key):
+            os.unlink(self.spill_dir + key)
+
+    def local_path(self, key: str) -> Optional[str]:
+        """
+        Gets the path to a file in RAM or the spill directory.
+
+        :param key: (str) the key of the file relative to the cache
+        :return: (Optional[str]) path to the file, None if it is not in the cache
+        """
+        path: str = self._read_path(key=key)
+        return path if os.path.isfile(path) else None
+
+    def check_file(self, file: str) -> bool:
+        """
+        Checks to see if a file is present in RAM or the spill directory.
+
+        :param file: (str) key of the file being checked
+        :return: True if present, False if not
+        """
+        return os.path.isfile(self._read_path(key=file))
+
+    def _remove_directory(self) -> None:
+        """
+        Removes the cache directory in RAM and the spill directory (private).
+
+        :return: None
+        """
+        super()._remove_directory()
+        shutil.rmtree(self.spill_dir, ignore_errors=True)
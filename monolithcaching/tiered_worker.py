@@ -0,0 +1,500 @@
+"""this file defines the worker for caches in s3 buckets with a local directory read-through tier"""
+import fnmatch
+import json
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from typing import (
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    BinaryIO,
+    Set,
+    Tuple,
+    TYPE_CHECKING,
+)
+
+from boto3.s3.transfer import TransferConfig  # type: ignore
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None  # type: ignore
+
+from .backend import register_backend
+from .s3_worker import S3Worker
+from .worker import Worker
+
+if TYPE_CHECKING:  # pragma: no cover
+    from . import CacheManager
+
+
+class PrefetchStats(NamedTuple):
+    """
+    The outcome of prefetching the objects of a cache in S3 into the local directory.
+
+    Attributes:
+        fetched (int): number of objects downloaded
+        skipped (int): number of objects whose local copy was already up to date
+        bytes (int): bytes downloaded
+        failed (List[Tuple[str, str]]): the key and error of every object that could not be downloaded
+        seconds (float): wall time of the prefetch
+    """
+
+    fetched: int
+    skipped: int
+    bytes: int
+    failed: List[Tuple[str, str]]
+    seconds: float
+
+
+@register_backend("tiered")
+class TieredWorker(S3Worker):
+    """
+    This is a class for managing a cache in S3 with a local directory in front of it. Reads are served from the
+    local directory when the local copy has the same ETag as the object in S3 and are fetched into the local
+    directory otherwise. Writes go to both. The local directory is kept under max_local_bytes by evicting the
+    least recently used files.
+
+    Attributes:
+        id (str): unique id for the worker
+        base_dir (str): directory path for the cache in S3
+        local_worker (Worker): worker for the local directory of the cache
+        local_bytes (int): the bytes held in the local directory
+        max_local_bytes (Optional[int]): the most bytes held in the local directory
+        validate (bool): if True, the ETag of a local copy is checked against S3 before it is read
+    """
+
+    INDEX_FILE: str = ".tier.json"
+    LOCK_FILE: str = ".tier.lock"
+    PREFETCH_SAVE_BATCH: int = 100
+
+    def __init__(
+        self,
+        cache_path: str,
+        existing_cache: Optional[str] = None,
+        local_cache: Optional[str] = None,
+        max_local_bytes: Optional[int] = None,
+        validate: bool = True,
+        transfer_config: Optional[TransferConfig] = None,
+        port: Optional[int] = None,
+        host: Optional[str] = None,
+    ) -> None:
+        """
+        The constructor for the TieredWorker class. The local directory is <local_cache>/tier/<id>/ so workers
+        pointing to the same S3 cache on the same machine share it, and it is kept when the worker is deleted.
+
+        :param cache_path: (str) the root path for all caches in S3
+        :param existing_cache: (Optional[str]) points to an existing cache if entered
+        :param local_cache: (Optional[str]) path to the local cache
+        :param max_local_bytes: (Optional[int]) the most bytes held in the local directory, unbounded if None
+        :param validate: (bool) if True, the ETag of a local copy is checked against S3 before it is read
+        :param transfer_config: (Optional[TransferConfig]) multipart thresholds and concurrency of file transfers
+        :param port: (Optional[int]) port for the Redis connection counting the cache
+        :param host: (Optional[str]) host for the Redis connection counting the cache
+        """
+        super().__init__(
+            cache_path=cache_path,
+            existing_cache=existing_cache,
+            transfer_config=transfer_config,
+            port=port,
+            host=host,
+        )
+        self.max_local_bytes: Optional[int] = max_local_bytes
+        self.validate: bool = validate
+        local_root: str = Worker.CLASS_BASE_DIR if local_cache is None else local_cache
+        local_dir: str = str(local_root) + "/tier/{}/".format(self.id)
+        os.makedirs(local_dir, exist_ok=True)
+        self.local_worker: Worker = Worker(
+            port=None, host=None, existing_cache=local_dir
+        )
+        self.local_worker.lock()
+        self._lock: threading.Lock = threading.Lock()
+        self._changes: "OrderedDict[str, Optional[Dict]]" = OrderedDict()
+        self._index: "OrderedDict[str, Dict]" = self._load_index()
+        self.local_bytes: int = sum(entry["size"] for entry in self._index.values())
+
+    @classmethod
+    def from_manager(
+        cls, manager: "CacheManager", existing_cache: Optional[str] = None
+    ) -> "TieredWorker":
+        """
+        Creates or attaches to a cache in S3 with a local directory with the settings of a manager.
+
+        :param manager: (CacheManager) the manager the cache is for
+        :param existing_cache: (Optional[str]) points to an existing cache if entered
+        :return: (TieredWorker) the worker pointing to the cache
+        """
+        return cls(
+            cache_path=manager.s3_cache_path,  # type: ignore
+            existing_cache=existing_cache,
+            local_cache=manager.local_cache_path,
+            max_local_bytes=manager.max_local_bytes,
+            port=manager.port,
+            host=manager.host,
+        )
+
+    def _load_index(self) -> "OrderedDict[str, Dict]":
+        """
+        Loads the ETag, size and recency order of the local copies from the local directory (private).
+
+        :return: (OrderedDict[str, Dict]) the entries from least to most recently used
+        """
+        try:
+            with open(self.local_worker.base_dir + self.INDEX_FILE) as index_file:
+                entries = json.load(index_file)
+        except (OSError, ValueError):
+            return OrderedDict()
+        return OrderedDict(
+            (key, entry)
+            for key, entry in entries
+            if self.local_worker.check_file(file=key)
+        )
+
+    @contextmanager
+    def _index_lock(self) -> Iterator[None]:
+        """
+        Holds the lock of the index of the local copies, an exclusive lock on a file in the local directory so
+        it is shared by every worker and process using the local directory (private).
+
+        :return: (Iterator[None]) context manager holding the lock
+        """
+        with self._lock:
+            descriptor: int = os.open(
+                self.local_worker.base_dir + self.LOCK_FILE, os.O_RDWR | os.O_CREAT
+            )
+            try:
+                if fcntl is not None:
+                    fcntl.flock(descriptor, fcntl.LOCK_EX)
+                yield
+            finally:
+                os.close(descriptor)
+
+    def _evict(self) -> None:
+        """
+        Evicts the least recently used local copies until the local directory fits in max_local_bytes. The
+        caller holds the lock (private).
+
+        :return: None
+        """
+        if self.max_local_bytes is None:
+            return
+        while self.local_bytes > self.max_local_bytes and len(self._index) > 1:
+            evicted_key, evicted = self._index.popitem(last=False)
+            self._changes.pop(evicted_key, None)
+            self.local_bytes -= evicted["size"]
+            try:
+                os.remove(self.local_worker._key_path(key=evicted_key))
+            except FileNotFoundError:
+                pass
+
+    def _save_index(self) -> None:
+        """
+        Reloads the index of the local copies from the local directory, merges in the copies this worker
+        recorded, used or deleted since it last saved, evicts down to max_local_bytes and writes the index back,
+        so workers in other processes sharing the local directory do not overwrite each other. The caller holds
+        the index lock (private).
+
+        :return: None
+        """
+        index: "OrderedDict[str, Dict]" = self._load_index()
+        for key, entry in self._changes.items():
+            index.pop(key, None)
+            if entry is not None and self.local_worker.check_file(file=key):
+                index[key] = entry
+        self._changes = OrderedDict()
+        self._index = index
+        self.local_bytes = sum(entry["size"] for entry in index.values())
+        self._evict()
+        with self.local_worker.open_write(key=self.INDEX_FILE) as index_file:
+            index_file.write(json.dumps(list(self._index.items())).encode("UTF-8"))
+
+    def _remote_etag(self, key: str) -> str:
+        """
+        Gets the ETag of the object of a key in S3 with a HEAD request (private).
+
+        :param key: (str) the key of the file relative to the cache
+        :return: (str) the ETag of the object
+        """
+        bucket, object_key = self._key(key=key)
+        return self._client.head_object(Bucket=bucket, Key=object_key)["ETag"]
+
+    def _record(self, key: str, etag: str, save: bool = True) -> None:
+        """
+        Records the local copy of a key as most recently used and evicts the least recently used copies until
+        the local directory fits in max_local_bytes (private).
+
+        :param key: (str) the key of the file relative to the cache
+        :param etag: (str) the ETag of the object the local copy was made from
+        :param save: (bool) if False, the index is not written and the caller saves it later
+        :return: None
+        """
+        with self._index_lock():
+            previous: Optional[Dict] = self._index.pop(key, None)
+            if previous is not None:
+                self.local_bytes -= previous["size"]
+            size: int = os.path.getsize(self.local_worker._key_path(key=key))
+            self._index[key] = {"etag": etag, "size": size}
+            self._changes.pop(key, None)
+            self._changes[key] = self._index[key]
+            self.local_bytes += size
+            self._evict()
+            if save is True:
+                self._save_index()
+
+    def _use(self, key: str) -> None:
+        """
+        Marks the local copy of a key as most recently used. The order is written with the next save of the
+        index (private).
+
+        :param key: (str) the key of the file relative to the cache
+        :return: None
+        """
+        with self._lock:
+            entry: Optional[Dict] = self._index.get(key)
+            if entry is None:
+                return
+            self._index.move_to_end(key)
+            self._changes.pop(key, None)
+            self._changes[key] = entry
+
+    def _fetch(self, key: str) -> None:
+        """
+        Makes sure the local directory holds an up to date copy of a key, downloading it if it does not (private).
+
+        :param key: (str) the key of the file relative to the cache
+        :return: None
+        """
+        entry: Optional[Dict] = self._index.get(key)
+        if entry is not None and self.local_worker.check_file(file=key):
+            if self.validate is False:
+                self._use(key=key)
+                return
+            etag: str = self._remote_etag(key=key)
+            if etag == entry["etag"]:
+                self._use(key=key)
+                return
+        else:
+            etag = self._remote_etag(key=key)
+        self._download(key=key, etag=etag)
+
+    def _download(self, key: str, etag: str, save: bool = True) -> None:
+        """
+        Downloads the object of a key into the local directory, through a temporary file so an interrupted
+        download never leaves a partial copy, and records it (private).
+
+        :param key: (str) the key of the file relative to the cache
+        :param etag: (str) the ETag of the object being downloaded
+        :param save: (bool) if False, the index is not written and the caller saves it later
+        :return: None
+        """
+        path: str = self.local_worker._key_path(key=key)
+        temp_path: str = self.local_worker._temp_path(path=path)
+        try:
+            S3Worker.get_file(self, key=key, destination_path=temp_path)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+        self._record(key=key, etag=etag, save=save)
+
+    def _list_objects(self) -> Iterator[Tuple[str, str, int]]:
+        """
+        Lists the objects of the cache in S3 apart from the meta (private).
+
+        :return: (Iterator[Tuple[str, str, int]]) the key relative to the cache, ETag and size of every object
+        """
+        bucket, cache_path, _ = self._split_s3_path(storage_path=self.base_dir)
+        paginator = self._client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=bucket, Prefix=cache_path):
+            for item in page.get("Contents", []):
+                key: str = item["Key"][len(cache_path) :]
+                if key != "meta.json" and not key.endswith("/"):
+                    yield key, item["ETag"], item["Size"]
+
+    def prefetch(
+        self,
+        pattern: Optional[str] = None,
+        keys: Optional[List[str]] = None,
+        max_workers: int = 8,
+    ) -> PrefetchStats:
+        """
+        Downloads the objects of the cache in S3 into the local directory in parallel. The objects are listed
+        once, and objects whose local copy has the ETag of the listing are skipped, so a prefetch that was cut
+        short resumes where it stopped when it is run again. Objects above the multipart threshold of the
+        transfer config are downloaded as concurrent byte ranges. The local directory still evicts the least
+        recently used copies beyond max_local_bytes. The index of the local copies is written once every
+        PREFETCH_SAVE_BATCH downloads and once at the end rather than after each download.
+
+        :param pattern: (Optional[str]) glob the keys need to match, eg "inputs/*.parquet", every key if None
+        :param keys: (Optional[List[str]]) the keys to download, every key if None
+        :param max_workers: (int) number of objects downloaded at once
+        :return: (PrefetchStats) the objects fetched, skipped and failed, bytes fetched and time taken
+        """
+        start: float = time.monotonic()
+        wanted: Optional[Set[str]] = None if keys is None else set(keys)
+        objects: List[Tuple[str, str, int]] = [
+            (key, etag, size)
+            for key, etag, size in self._list_objects()
+            if (wanted is None or key in wanted)
+            and (pattern is None or fnmatch.fnmatchcase(key, pattern))
+        ]
+        failed: List[Tuple[str, str]] = []
+        if wanted is not None:
+            listed: Set[str] = {key for key, _, _ in objects}
+            failed.extend((key, "not in the cache") for key in sorted(wanted - listed))
+
+        pending: List[Tuple[str, str, int]] = []
+        for key, etag, size in objects:
+            entry: Optional[Dict] = self._index.get(key)
+            if (
+                entry is None
+                or entry["etag"] != etag
+                or not self.local_worker.check_file(file=key)
+            ):
+                pending.append((key, etag, size))
+
+        fetched: int = 0
+        fetched_bytes: int = 0
+        unsaved: int = 0
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures: Dict[Future, Tuple[str, int]] = {
+                executor.submit(self._download, key, etag, False): (key, size)
+                for key, etag, size in pending
+            }
+            for future in as_completed(futures):
+                key, size = futures[future]
+                try:
+                    future.result()
+                except Exception as error:  # pylint: disable=broad-except
+                    failed.append((key, repr(error)))
+                else:
+                    fetched += 1
+                    fetched_bytes += size
+                    unsaved += 1
+                    if unsaved >= self.PREFETCH_SAVE_BATCH:
+                        with self._index_lock():
+                            self._save_index()
+                        unsaved = 0
+        if unsaved > 0:
+            with self._index_lock():
+                self._save_index()
+        return PrefetchStats(
+            fetched=fetched,
+            skipped=len(objects) - len(pending),
+            bytes=fetched_bytes,
+            failed=failed,
+            seconds=time.monotonic() - start,
+        )
+
+    def local_path(self, key: str) -> Optional[str]:
+        """
+        Gets the path to an up to date local copy of a key, fetching it from S3 if needed.
+
+        :param key: (str) the key of the file relative to the cache
+        :return: (str) path to the local copy
+        """
+        self._fetch(key=key)
+        return self.local_worker._key_path(key=key)
+
+    def put_file(self, key: str, source_path: str) -> None:
+        """
+        Uploads a file to the cache in S3 and copies it into the local directory.
+
+        :param key: (str) the key of the file relative to the cache
+        :param source_path: (str) path to the file being stored
+        :return: None
+        """
+        super().put_file(key=key, source_path=source_path)
+        self.local_worker.put_file(key=key, source_path=source_path)
+        self._record(key=key, etag=self._remote_etag(key=key))
+
+    def get_file(self, key: str, destination_path: str) -> None:
+        """
+        Copies a file of the cache from the local directory, fetching it from S3 first if needed.
+
+        :param key: (str) the key of the file relative to the cache
+        :param destination_path: (str) path the file is copied to
+        :return: None
+        """
+        self._fetch(key=key)
+        self.local_worker.get_file(key=key, destination_path=destination_path)
+
+    def put_bytes(self, key: str, data: bytes) -> None:
+        """
+        Uploads bytes to the cache in S3 and writes them into the local directory.
+
+        :param key: (str) the key of the file relative to the cache
+        :param data: (bytes) the data to be stored
+        :return: None
+        """
+        bucket, object_key = self._key(key=key)
+        response: Dict = self._client.put_object(
+            Bucket=bucket, Key=object_key, Body=data
+        )
+        self.local_worker.put_bytes(key=key, data=data)
+        self._record(key=key, etag=response["ETag"])
+
+    @contextmanager
+    def open_read(self, key: str) -> Iterator[BinaryIO]:
+        """
+        Opens the local copy of a file in the cache for streaming reads, fetching it from S3 first if needed.
+
+        :param key: (str) the key of the file relative to the cache
+        :return: (Iterator[BinaryIO]) context manager yielding the open file
+        """
+        self._fetch(key=key)
+        with self.local_worker.open_read(key=key) as file:
+            yield file
+
+    @contextmanager
+    def open_write(self, key: str) -> Iterator[BinaryIO]:
+        """
+        Opens a file in the local directory for streaming writes. It is uploaded to the cache in S3 when the
+        block exits without an error.
+
+        :param key: (str) the key of the file relative to the cache
+        :return: (Iterator[BinaryIO]) context manager yielding the open file
+        """
+        with self.local_worker.open_write(key=key) as file:
+            yield file
+        super().put_file(key=key, source_path=self.local_worker._key_path(key=key))
+        self._record(key=key, etag=self._remote_etag(key=key))
+
+    def delete_file(self, key: str) -> None:
+        """
+        Deletes a file from the cache in S3 and the local directory if it is there.
+
+        :param key: (str) the key of the file relative to the cache
+        :return: None
+        """
+        super().delete_file(key=key)
+        with self._index_lock():
+            entry: Optional[Dict] = self._index.pop(key, None)
+            if entry is not None:
+                self.local_bytes -= entry["size"]
+            if self.local_worker.check_file(file=key):
+                self.local_worker.delete_file(key=key)
+            self._changes.pop(key, None)
+            self._changes[key] = None
+            self._save_index()
+
+    def delete_directory(self) -> None:
+        """
+        Deletes cache directory in S3 and the local directory.
+
+        :return: None
+        """
+        super().delete_directory()
+        with self._lock:
+            self._index = OrderedDict()
+            self._changes = OrderedDict()
+            self.local_bytes = 0
+        shutil.rmtree(self.local_worker.base_dir, ignore_errors=True)
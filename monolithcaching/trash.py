@@ -0,0 +1,146 @@
+"""this file defines the trash area and background thread that local caches are deleted through when deferred"""
+import atexit
+import os
+import queue
+import shutil
+import threading
+import warnings
+from typing import Callable, List, Optional, Tuple
+from uuid import uuid4
+
+from .blob_store import BlobStore
+
+
+class Trash:
+    """
+    This class is responsible for the trash directory under a cache root and the background thread that runs
+    deferred deletions. A cache is renamed into the trash in one atomic step before it is removed, so a
+    deletion that is cut short leaves nothing at the path of the cache, and whatever is left in the trash can be
+    removed later with empty. There is one background thread per process, started on the first deferred job,
+    and pending jobs are drained when the interpreter exits.
+    """
+
+    DIRECTORY = "trash"
+
+    _queue: "queue.Queue[Callable[[], None]]" = queue.Queue()
+    _condition: threading.Condition = threading.Condition()
+    _pending: int = 0
+    _thread: Optional[threading.Thread] = None
+    _pid: Optional[int] = None
+    _drain_at_exit: bool = False
+
+    def __init__(self, root: str) -> None:
+        """
+        The constructor for the Trash class.
+
+        :param root: (str) the path to the root holding the cache directory
+        """
+        self.root: str = str(root)
+        self.path: str = os.path.join(self.root, self.DIRECTORY)
+
+    def move(self, path: str) -> str:
+        """
+        Renames a directory under the root into the trash.
+
+        :param path: (str) path to the directory being trashed
+        :return: (str) the path of the directory in the trash
+        """
+        os.makedirs(self.path, exist_ok=True)
+        name: str = os.path.basename(os.path.normpath(path))
+        destination: str = os.path.join(self.path, "{}-{}".format(name, uuid4().hex))
+        os.rename(os.path.normpath(path), destination)
+        return destination
+
+    def empty(self) -> int:
+        """
+        Removes everything in the trash, such as deletions that were cut short by the process exiting, and
+        deletes the blobs that only the removed caches linked to.
+
+        :return: (int) the number of directories removed
+        """
+        if not os.path.isdir(self.path):
+            return 0
+        removed: int = 0
+        for entry in os.scandir(self.path):
+            blobs: List[Tuple[str, str]] = BlobStore.cache_blobs(cache_path=entry.path)
+            shutil.rmtree(entry.path, ignore_errors=True)
+            if len(blobs) > 0:
+                BlobStore.release(root=self.root, blobs=blobs)
+            removed += 1
+        return removed
+
+    @classmethod
+    def _run(cls) -> None:
+        """
+        Runs the deferred jobs one at a time, reporting jobs that raise an error with a warning (private).
+
+        :return: None
+        """
+        while True:
+            job: Callable[[], None] = cls._queue.get()
+            try:
+                job()
+            except Exception as error:  # pylint: disable=broad-except
+                warnings.warn(
+                    "deferred cache deletion raised {!r}".format(error), RuntimeWarning
+                )
+            finally:
+                with cls._condition:
+                    cls._pending -= 1
+                    cls._condition.notify_all()
+
+    @classmethod
+    def defer(cls, job: Callable[[], None]) -> None:
+        """
+        Runs a job on the background thread, starting the thread if this process does not have one. The job
+        runs straight away if the thread cannot be started because the interpreter is shutting down.
+
+        :param job: (Callable[[], None]) the job
+        :return: None
+        """
+        with cls._condition:
+            if cls._pid != os.getpid() or cls._thread is None:
+                thread: threading.Thread = threading.Thread(
+                    target=cls._run, name="monolithcaching-trash", daemon=True
+                )
+                cls._queue = queue.Queue()
+                cls._pending = 0
+                try:
+                    thread.start()
+                except RuntimeError:
+                    # threads cannot be started while the interpreter shuts down
+                    thread = None  # type: ignore
+                if thread is not None:
+                    cls._pid = os.getpid()
+                    cls._thread = thread
+                    if cls._drain_at_exit is False:
+                        atexit.register(cls.drain)
+                        cls._drain_at_exit = True
+            if cls._thread is not None and cls._pid == os.getpid():
+                cls._pending += 1
+                cls._queue.put(job)
+                return
+        job()
+
+    @classmethod
+    def drain(cls, timeout: Optional[float] = None) -> bool:
+        """
+        Waits for the deferred jobs of this process to finish, for instance before shutting down.
+
+        :param timeout: (Optional[float]) the most seconds to wait, forever if None
+        :return: (bool) True if every job has finished
+        """
+        with cls._condition:
+            if cls._pid != os.getpid():
+                return True
+            return cls._condition.wait_for(lambda: cls._pending == 0, timeout)
+
+
+def drain(timeout: Optional[float] = None) -> bool:
+    """
+    Waits for the deferred cache deletions of this process to finish.
+
+    :param timeout: (Optional[float]) the most seconds to wait, forever if None
+    :return: (bool) True if every deletion has finished
+    """
+    return Trash.drain(timeout=timeout)
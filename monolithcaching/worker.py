@@ -1,15 +1,30 @@
 """this file defines the worker for managing local cache directories"""
-import datetime
+import errno
+import json
 import os
 import shutil
-from typing import Optional
+import tempfile
+from contextlib import contextmanager
+from typing import Optional, Iterator, BinaryIO, Union, Dict, List, Tuple, TYPE_CHECKING
 from uuid import UUID
 
-from .errors import WorkerCacheError
+from .access_record import AccessRecord
+from .backend import CacheBackend, register_backend
+from .blob_store import BlobStore
+from .cache_root import CacheRoot
+from .errors import RegisterError, WorkerCacheError
+from .instrumentation import timed
+from .local_register import LocalRegister
 from .register import Register
+from .trash import Trash
 
+if TYPE_CHECKING:  # pragma: no cover
+    from . import CacheManager
+    from .cache_index import CacheIndex
 
-class Worker:
+
+@register_backend("local")
+class Worker(CacheBackend):
     """
     This is a class for managing a directory and meta data for temp files.
 
@@ -25,6 +40,10 @@ class Worker:
         host: Optional[str],
         existing_cache: Optional[str] = None,
         local_cache: Optional[str] = None,
+        index: Optional["CacheIndex"] = None,
+        local_register: bool = False,
+        access_interval: float = 0.0,
+        deferred_delete: bool = False,
     ) -> None:
         """
         The constructor for the Worker class.
@@ -33,8 +52,17 @@ class Worker:
         :param host: (Optional[str]) host for the redis connection tracking caches
         :param existing_cache: (Optional[str]) path to existing cache
         :param local_cache: (Optional[str]) path to the local cache
+        :param index: (Optional[CacheIndex]) index of the caches to record the cache in
+        :param local_register: (bool) if True and no Redis is given, count references in a local register
+        :param access_interval: (float) the fewest seconds between accesses written to the access record
+        :param deferred_delete: (bool) if True, the cache is deregistered and deleted on a background thread
+                                when the worker is deleted, by renaming it into the trash under the cache root
         """
         self._locked: bool = False
+        self.access_interval: float = access_interval
+        self.deferred_delete: bool = deferred_delete
+        self._index: Optional["CacheIndex"] = index
+        self._local_register: bool = local_register
         self._port: Optional[int] = port
         self._host: Optional[str] = host
         # pylint: disable=invalid-name
@@ -45,21 +73,60 @@ class Worker:
         )
         self._base_dir: str = str(self.class_base_dir) + "/cache/{}/".format(self.id)
         self._connect_directory()
-        if self._port is not None and host is not None:
-            Register(host=self._host, port=self._port).register_cache(cache_path=self.base_dir)  # type: ignore
+        register: Union[None, Register, LocalRegister] = self._get_register()
+        if register is not None:
+            try:
+                register.register_cache(cache_path=self.base_dir)
+            except RegisterError as error:
+                # the cache is being evicted so it is not this worker's to deregister or delete
+                del self._base_dir
+                raise WorkerCacheError(message=str(error)) from error
+
+    @classmethod
+    def from_manager(
+        cls, manager: "CacheManager", existing_cache: Optional[str] = None
+    ) -> "Worker":
+        """
+        Creates or attaches to a local cache with the settings of a manager.
+
+        :param manager: (CacheManager) the manager the cache is for
+        :param existing_cache: (Optional[str]) path to existing cache
+        :return: (Worker) the worker pointing to the cache
+        """
+        return cls(
+            port=manager.port,
+            host=manager.host,
+            existing_cache=existing_cache,
+            local_cache=manager.local_cache_path,
+            index=manager.index,
+            local_register=manager.local_register,
+            access_interval=manager.access_interval,
+            deferred_delete=manager.deferred_delete,
+        )
+
+    def _get_register(self) -> Union[None, Register, LocalRegister]:
+        """
+        Gets the register counting the references to the cache (private).
+
+        :return: (Union[None, Register, LocalRegister]) Redis register if a port and host are given, local register
+                 under the cache root if enabled, None otherwise
+        """
+        if self._port is not None and self._host is not None:
+            return Register(host=self._host, port=self._port)
+        if self._local_register is True:
+            return LocalRegister(root=self.class_base_dir)
+        return None
 
     @staticmethod
-    def update_timestamp(cache_path: str) -> None:
+    def update_timestamp(cache_path: str, interval: float = 0.0) -> None:
         """
-        Updates the cache timestamp.txt log with a new timestamp
+        Records an access of the cache in its fixed size access record.
 
-        :param cache_path: (str) path to the cache being
-        :return:
+        :param cache_path: (str) path to the cache being accessed
+        :param interval: (float) the fewest seconds between written accesses
+        :return: None
         """
-        timestamp = datetime.datetime.now()
-        file = open(cache_path + "timestamp.txt", "a")
-        file.write("\n{}".format(timestamp))
-        file.close()
+        AccessRecord.touch(cache_path=cache_path, interval=interval)
 
     def lock(self) -> None:
         """
@@ -77,6 +144,52 @@ class Worker:
         """
         self._locked = False
 
+    @property
+    def locked(self) -> bool:
+        """
+        Dynamic property.
+
+        :return: (bool) True if the cache is kept when the worker is deleted
+        """
+        return self._locked
+
+    def create_meta(self) -> None:
+        """
+        Writes an empty meta file for the cache.
+
+        :return: None
+        """
+        self.write_meta(data={})
+
+    def read_meta(self) -> Dict:
+        """
+        Reads the meta file of the cache.
+
+        :return: (dict) the meta of the cache
+        """
+        with open(self.base_dir + "meta.json") as meta_file:
+            return json.load(meta_file)
+
+    def write_meta(self, data: Dict) -> None:
+        """
+        Writes the meta to a temp file next to the meta file and renames it over the meta file.
+
+        :param data: (dict) the meta to be written
+        :return: None
+        """
+        file_descriptor, temp_path = tempfile.mkstemp(
+            dir=self.base_dir, prefix=".meta-", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(file_descriptor, "w") as meta_file:
+                json.dump(data, meta_file)
+            os.replace(temp_path, self.base_dir + "meta.json")
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        if self._index is not None:
+            self._index.set_meta(path=self.base_dir, meta=data)
+
     def _connect_directory(self) -> None:
         """
         Checks existing path, creates new cache if existing path not supplied.
@@ -91,6 +204,12 @@ class Worker:
                     )
                 )
             self._base_dir = self._existing_cache
+            if AccessRecord.exists(cache_path=self._base_dir):
+                self.update_timestamp(
+                    cache_path=self._base_dir, interval=self.access_interval
+                )
+            if self._index is not None:
+                self._index.touch(path=self._base_dir)
         else:
             self._generate_directory()
 
@@ -108,6 +227,9 @@ class Worker:
             )
         os.makedirs(self._base_dir)
         self.update_timestamp(cache_path=self._base_dir)
+        if self._index is not None:
+            self._index.add(path=self._base_dir)
+        self.create_meta()
 
     def _delete_directory(self) -> None:
         """
@@ -115,14 +237,309 @@ class Worker:
 
         :return: None
         """
-        if self._port is None and self._locked is False:
-            shutil.rmtree(self.base_dir)
-        elif self._port is not None:
-            count: int = Register(host=self._host, port=self._port).deregister_cache(  # type: ignore
-                cache_path=self.base_dir, locked=self._locked  # type: ignore
-            )  # type: ignore
+        register: Union[None, Register, LocalRegister] = self._get_register()
+        if register is None and self._locked is False:
+            self._remove_directory()
+            return
+        if register is not None:
+            count: int = register.deregister_cache(
+                cache_path=self.base_dir, locked=self._locked
+            )
             if count == 0 and self._locked is False:
-                shutil.rmtree(self.base_dir)
+                self._remove_directory()
+                return
+        if self._index is not None and os.path.isdir(self.base_dir):
+            # the cache is left in place so the index gets its real size, files written to the path included
+            self._index.set_size(
+                path=self.base_dir, size=CacheRoot._directory_size(path=self.base_dir)
+            )
+
+    def delete_directory(self) -> None:
+        """
+        Deletes the cache directory whether or not it is locked or referenced elsewhere. The worker is locked
+        afterwards so it does not delete the directory again when it is deleted.
+
+        :return: None
+        """
+        self._remove_directory()
+        self._locked = True
+
+    def _remove_directory(self) -> None:
+        """
+        Removes the cache directory and its entry in the index, and deletes the blobs that only the cache linked
+        to (private).
+
+        :return: None
+        """
+        blobs: List[Tuple[str, str]] = BlobStore.cache_blobs(cache_path=self.base_dir)
+        if getattr(self, "deferred_delete", False) is True:
+            # the trash of the root holding the cache, which may not be the root of this worker if it attached
+            # to a cache on another filesystem
+            root: str = os.path.dirname(
+                os.path.dirname(os.path.normpath(self.base_dir))
+            )
+            try:
+                path: str = Trash(root=root).move(path=self.base_dir)
+            except OSError as error:
+                if error.errno != errno.EXDEV:
+                    raise
+                path = self.base_dir
+            Trash.defer(
+                job=lambda: self._purge(path=path, blobs=blobs, ignore_errors=True)
+            )
+        else:
+            self._purge(path=self.base_dir, blobs=blobs)
+        if self._index is not None:
+            self._index.remove(path=self.base_dir)
+
+    def _purge(
+        self, path: str, blobs: List[Tuple[str, str]], ignore_errors: bool = False
+    ) -> None:
+        """
+        Removes a cache directory and deletes the blobs that only the cache linked to (private).
+
+        :param path: (str) path to the cache directory, in the trash if the deletion is deferred
+        :param blobs: (List[Tuple[str, str]]) the algorithm and digest of the blobs the cache linked to
+        :param ignore_errors: (bool) if True, files that are already gone, such as ones the reaper emptied from
+                              the trash, are ignored
+        :return: None
+        """
+        with timed(operation="rmtree", backend="local"):
+            shutil.rmtree(path, ignore_errors=ignore_errors)
+        if len(blobs) > 0:
+            BlobStore.release(root=self.class_base_dir, blobs=blobs)
+
+    def _key_path(self, key: str) -> str:
+        """
+        Gets the path of a key in the cache, making sure it does not point outside of the cache (private).
+
+        :param key: (str) the key of the file relative to the cache
+        :return: (str) the path to the file
+        """
+        path: str = os.path.normpath(os.path.join(self.base_dir, key))
+        if os.path.isabs(key) or not path.startswith(
+            os.path.normpath(self.base_dir) + os.sep
+        ):
+            raise WorkerCacheError(
+                message="key '{}' is not inside the cache {}".format(key, self.base_dir)
+            )
+        return path
+
+    def _temp_path(self, path: str) -> str:
+        """
+        Creates the directory of a file in the cache and an empty temp file next to it (private).
+
+        :param path: (str) path of the file that the temp file will be renamed to
+        :return: (str) path to the temp file
+        """
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        file_descriptor, temp_path = tempfile.mkstemp(
+            dir=os.path.dirname(path), prefix=".put-", suffix=".tmp"
+        )
+        os.close(file_descriptor)
+        return temp_path
+
+    def _commit(self, temp_path: str, path: str) -> None:
+        """
+        Renames a temp file over a file in the cache and records the change in size in the index (private).
+
+        :param temp_path: (str) path to the temp file
+        :param path: (str) path of the file in the cache
+        :return: None
+        """
+        previous_size: int = 0
+        if self._index is not None and os.path.isfile(path):
+            previous_size = os.path.getsize(path)
+        os.replace(temp_path, path)
+        if self._index is not None:
+            self._index.add_size(
+                path=self.base_dir, size=os.path.getsize(path) - previous_size
+            )
+
+    @staticmethod
+    def _copy_file(source: str, destination: str) -> None:
+        """
+        Copies a file in the kernel with copy_file_range, falling back to shutil.copyfile (which uses sendfile
+        on Linux) if copy_file_range is not supported between the two files (private).
+
+        :param source: (str) path to the file being copied
+        :param destination: (str) path the file is copied to
+        :return: None
+        """
+        if hasattr(os, "copy_file_range"):
+            try:
+                with open(source, "rb") as source_file, open(
+                    destination, "wb"
+                ) as destination_file:
+                    remaining: int = os.fstat(source_file.fileno()).st_size
+                    while remaining > 0:
+                        copied: int = os.copy_file_range(
+                            source_file.fileno(), destination_file.fileno(), remaining
+                        )
+                        if copied == 0:
+                            break
+                        remaining -= copied
+                return
+            except OSError:
+                pass
+        shutil.copyfile(source, destination)
+
+    def put_file(self, key: str, source_path: str) -> None:
+        """
+        Copies a file into the cache under the key. The file appears in the cache once it is fully copied.
+
+        :param key: (str) the key of the file relative to the cache
+        :param source_path: (str) path to the file being stored
+        :return: None
+        """
+        path: str = self._key_path(key=key)
+        temp_path: str = self._temp_path(path=path)
+        try:
+            self._copy_file(source=source_path, destination=temp_path)
+            self._commit(temp_path=temp_path, path=path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def put_blob(self, key: str, source_path: str, algorithm: str = "sha256") -> str:
+        """
+        Stores a file in the blob store of the cache root and hard links it into the cache under the key, so
+        caches holding the same content share one copy of it on disk. The file must not be changed in place.
+
+        :param key: (str) the key of the file relative to the cache
+        :param source_path: (str) path to the file being stored
+        :param algorithm: (str) "sha256" or "blake3" hash the blob is keyed by
+        :return: (str) hex digest of the content, which can be passed to link_blob
+        """
+        self._key_path(key=key)
+        store: BlobStore = BlobStore(root=self.class_base_dir, algorithm=algorithm)
+        while True:
+            digest: str = store.add(source_path=source_path)
+            try:
+                self.link_blob(key=key, digest=digest, algorithm=algorithm)
+                return digest
+            except FileNotFoundError:
+                # the blob was collected between being found and being linked
+                continue
+
+    def link_blob(self, key: str, digest: str, algorithm: str = "sha256") -> None:
+        """
+        Hard links a blob of the blob store of the cache root into the cache under the key without reading it.
+        Raises FileNotFoundError if the store does not hold the blob.
+
+        :param key: (str) the key of the file relative to the cache
+        :param digest: (str) hex digest of the content of the blob
+        :param algorithm: (str) "sha256" or "blake3" hash the blob is keyed by
+        :return: None
+        """
+        store: BlobStore = BlobStore(root=self.class_base_dir, algorithm=algorithm)
+        path: str = self._key_path(key=key)
+        temp_path: str = self._temp_path(path=path)
+        os.unlink(temp_path)
+        try:
+            store.link(digest=digest, destination_path=temp_path)
+            self._commit(temp_path=temp_path, path=path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+        store.record(cache_path=self.base_dir, digest=digest, key=key)
+
+    def get_file(self, key: str, destination_path: str) -> None:
+        """
+        Copies a file from the cache to the destination path.
+
+        :param key: (str) the key of the file relative to the cache
+        :param destination_path: (str) path the file is copied to
+        :return: None
+        """
+        self._copy_file(source=self._key_path(key=key), destination=destination_path)
+
+    def put_bytes(self, key: str, data: bytes) -> None:
+        """
+        Writes bytes to a file in the cache under the key.
+
+        :param key: (str) the key of the file relative to the cache
+        :param data: (bytes) the data to be stored
+        :return: None
+        """
+        with self.open_write(key=key) as file:
+            file.write(data)
+
+    def get_bytes(self, key: str) -> bytes:
+        """
+        Reads the bytes of a file in the cache.
+
+        :param key: (str) the key of the file relative to the cache
+        :return: (bytes) the data of the file
+        """
+        with self.open_read(key=key) as file:
+            return file.read()
+
+    @contextmanager
+    def open_read(self, key: str) -> Iterator[BinaryIO]:
+        """
+        Opens a file in the cache for streaming reads.
+
+        :param key: (str) the key of the file relative to the cache
+        :return: (Iterator[BinaryIO]) context manager yielding the open file
+        """
+        with open(self._key_path(key=key), "rb") as file:
+            yield file
+
+    @contextmanager
+    def open_write(self, key: str) -> Iterator[BinaryIO]:
+        """
+        Opens a file in the cache for streaming writes. The file appears in the cache once the block exits
+        without an error.
+
+        :param key: (str) the key of the file relative to the cache
+        :return: (Iterator[BinaryIO]) context manager yielding the open file
+        """
+        path: str = self._key_path(key=key)
+        temp_path: str = self._temp_path(path=path)
+        try:
+            with open(temp_path, "wb") as file:
+                yield file
+            self._commit(temp_path=temp_path, path=path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def delete_file(self, key: str) -> None:
+        """
+        Deletes a file from the cache if it is there and records the change in size in the index.
+
+        :param key: (str) the key of the file relative to the cache
+        :return: None
+        """
+        path: str = self._key_path(key=key)
+        try:
+            size: int = os.path.getsize(path)
+            os.unlink(path)
+        except FileNotFoundError:
+            return
+        if self._index is not None:
+            self._index.add_size(path=self.base_dir, size=-size)
+
+    def local_path(self, key: str) -> Optional[str]:
+        """
+        Gets the path to a file in the cache.
+
+        :param key: (str) the key of the file relative to the cache
+        :return: (Optional[str]) path to the file, None if it is not in the cache
+        """
+        path: str = self._key_path(key=key)
+        return path if os.path.isfile(path) else None
+
+    def check_file(self, file: str) -> bool:
+        """
+        Checks to see if a file is present in the cache.
+
+        :param file: (str) key of the file being checked
+        :return: True if present, False if not
+        """
+        return os.path.isfile(self._key_path(key=file))
 
     @property
     def base_dir(self) -> str:
@@ -135,8 +552,14 @@ class Worker:
 
     def __del__(self):
         """
-        Fires when self is deleted, deletes the directory.
+        Fires when self is deleted, deletes the directory, on the background thread if the deletion is deferred.
 
         :return: None
         """
-        self._delete_directory()
+        if "_base_dir" not in self.__dict__:
+            # the constructor raised before the cache directory was chosen
+            return
+        if getattr(self, "deferred_delete", False) is True:
+            Trash.defer(job=self._delete_directory)
+        else:
+            self._delete_directory()
@@ -39,7 +39,19 @@ setuptools.setup(
         "boto3>=1.9.243",
         "botocore>=1.11.1"
     ],
-    packages=find_packages(exclude=("tests",)),
+    extras_require={
+        "async": ["redis>=4.2.0", "aiobotocore>=2.0.0"],
+        "arrays": ["numpy>=1.17.0", "pyarrow>=1.0.0"],
+        "compression": ["zstandard>=0.15.0", "lz4>=3.1.0"],
+        "prometheus": ["prometheus_client>=0.8.0"],
+        "opentelemetry": ["opentelemetry-api>=1.0.0"],
+        "benchmark": [
+            "pytest-benchmark>=3.4.0",
+            "fakeredis[lua]>=2.0.0",
+            "moto[s3]>=5.0.0",
+        ],
+    },
+    packages=find_packages(exclude=("tests", "benchmarks", "benchmarks.*")),
     classifiers=[
         "Development Status :: 4 - Beta",
         "Programming Language :: Python :: 3",
@@ -50,6 +62,8 @@ setuptools.setup(
     entry_points={
         'console_scripts': [
             'caching-hello = monolithcaching.console_commands.hello:print_logo',
+            'caching-evict = monolithcaching.console_commands.evict:main',
+            'caching-reap = monolithcaching.console_commands.reap:main',
         ],
     }
 )
@@ -0,0 +1,69 @@
+import datetime
+import os
+import tempfile
+from unittest import TestCase, main
+
+from monolithcaching.access_record import Access, AccessRecord
+
+
+class TestAccessRecord(TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = self.directory.name + "/"
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def write_legacy(self, accesses):
+        with open(self.path + "timestamp.txt", "w") as file:
+            for access in accesses:
+                file.write("\n{}".format(datetime.datetime.fromtimestamp(access)))
+
+    def test_create_read(self):
+        self.assertEqual(False, AccessRecord.exists(cache_path=self.path))
+        self.assertEqual(None, AccessRecord.read(cache_path=self.path))
+
+        AccessRecord.create(cache_path=self.path, now=1000.0)
+        self.assertEqual(True, AccessRecord.exists(cache_path=self.path))
+        self.assertEqual(Access(created=1000.0, last_access=1000.0, access_count=1),
+                         AccessRecord.read(cache_path=self.path))
+        self.assertEqual(24, os.path.getsize(self.path + "access.bin"))
+
+    def test_touch(self):
+        AccessRecord.touch(cache_path=self.path, now=1000.0)
+        self.assertEqual(Access(created=1000.0, last_access=1000.0, access_count=1),
+                         AccessRecord.read(cache_path=self.path))
+
+        for second in range(1, 1001):
+            AccessRecord.touch(cache_path=self.path, now=1000.0 + second)
+        self.assertEqual(Access(created=1000.0, last_access=2000.0, access_count=1001),
+                         AccessRecord.read(cache_path=self.path))
+        self.assertEqual(24, os.path.getsize(self.path + "access.bin"))
+
+    def test_touch_interval(self):
+        AccessRecord.create(cache_path=self.path, now=1000.0)
+
+        AccessRecord.touch(cache_path=self.path, interval=60.0, now=1030.0)
+        self.assertEqual(Access(created=1000.0, last_access=1000.0, access_count=1),
+                         AccessRecord.read(cache_path=self.path))
+
+        AccessRecord.touch(cache_path=self.path, interval=60.0, now=1060.0)
+        self.assertEqual(Access(created=1000.0, last_access=1060.0, access_count=2),
+                         AccessRecord.read(cache_path=self.path))
+
+    def test_legacy(self):
+        self.write_legacy(accesses=[1000.0, 2000.0, 3000.0])
+
+        self.assertEqual(True, AccessRecord.exists(cache_path=self.path))
+        self.assertEqual(Access(created=1000.0, last_access=3000.0, access_count=3),
+                         AccessRecord.read(cache_path=self.path))
+
+        AccessRecord.touch(cache_path=self.path, interval=60.0, now=3010.0)
+        self.assertEqual(Access(created=1000.0, last_access=3010.0, access_count=4),
+                         AccessRecord.read(cache_path=self.path))
+        self.assertEqual(False, os.path.exists(self.path + "timestamp.txt"))
+
+
+if __name__ == "__main__":
+    main()
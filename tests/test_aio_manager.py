@@ -0,0 +1,144 @@
+"""
+performs unit tests on the AsyncCacheManager object.
+"""
+import threading
+from unittest import IsolatedAsyncioTestCase, main
+from unittest.mock import patch, AsyncMock, MagicMock
+
+from monolithcaching.aio import AsyncCacheManager, AsyncWorker, AsyncS3Worker
+from monolithcaching.errors import CacheManagerError
+
+
+class TestAsyncCacheManager(IsolatedAsyncioTestCase):
+
+    @patch("monolithcaching.aio.AsyncRegister")
+    @patch("monolithcaching.aio.RootDirectory")
+    def setUp(self, mock_directory, mock_register):
+        self.test = AsyncCacheManager(host="localhost", port=6379)
+        self.s3_test = AsyncCacheManager(s3=True, s3_cache_path="s3://bucket/caches/")
+        self.mock_directory = mock_directory
+        self.mock_register = mock_register
+
+    def test___init__(self):
+        self.mock_register.assert_called_once_with(host="localhost", port=6379, max_connections=None)
+        self.assertEqual(self.mock_register.return_value, self.test._register)
+        self.assertEqual(None, self.s3_test._register)
+        self.assertEqual(self.mock_directory.return_value.path, self.test.local_cache_path)
+
+    @patch("monolithcaching.aio.AsyncS3Worker")
+    @patch("monolithcaching.aio.AsyncWorker")
+    async def test_create_cache(self, mock_worker, mock_s3):
+        mock_worker.return_value = MagicMock(spec=AsyncWorker)
+        mock_worker.return_value.base_dir = "some/dir/"
+        mock_worker.return_value.connect = AsyncMock()
+
+        await self.test.create_cache()
+        mock_worker.assert_called_once_with(register=self.test._register, existing_cache=None,
+                                            local_cache=self.test.local_cache_path)
+        mock_worker.return_value.connect.assert_awaited_once_with()
+        self.assertEqual({}, self.test._meta)
+        self.test.worker = None
+
+        self.test.get_meta = AsyncMock(return_value={"locked": True})
+        await self.test.create_cache(existing_cache="some/dir/")
+        mock_worker.return_value.lock.assert_called_once_with()
+        self.test.worker = None
+
+        mock_s3.return_value.connect = AsyncMock()
+        await self.s3_test.create_cache()
+        mock_s3.assert_called_once_with(cache_path="s3://bucket/caches/", existing_cache=None)
+        mock_s3.return_value.connect.assert_awaited_once_with()
+        self.assertEqual(mock_s3.return_value, self.s3_test.worker)
+        self.s3_test.worker = None
+
+    async def test_lock_cache(self):
+        with self.assertRaises(CacheManagerError) as e:
+            await self.test.lock_cache()
+        self.assertEqual("cache worker is not defined so cannot be locked", str(e.exception))
+
+        self.test.worker = MagicMock(spec=AsyncWorker)
+        self.test._meta = {}
+        self.test.flush = AsyncMock()
+        await self.test.lock_cache()
+        self.test.worker.lock.assert_called_once_with()
+        self.assertEqual({"locked": True}, self.test._meta)
+
+        await self.test.unlock_cache()
+        self.test.worker.unlock.assert_called_once_with()
+        self.assertEqual({"locked": False}, self.test._meta)
+        self.test.worker = None
+
+    async def test_update_meta(self):
+        self.test.worker = MagicMock(spec=AsyncWorker)
+        self.test._meta = {"one": 1}
+        self.test.meta_batch_size = 2
+        self.test.flush = AsyncMock()
+
+        await self.test.update_meta(data={"two": 2})
+        self.assertEqual({"one": 1, "two": 2}, await self.test.get_meta())
+        self.assertEqual(0, len(self.test.flush.call_args_list))
+        await self.test.insert_meta(key="three", value=3)
+        self.test.flush.assert_awaited_once_with()
+        self.test.worker = None
+
+        self.s3_test.worker = MagicMock(spec=AsyncS3Worker)
+        self.s3_test.worker.update_meta = AsyncMock()
+        self.s3_test.worker.get_meta = AsyncMock(return_value={"one": 1})
+        await self.s3_test.update_meta(data={"two": 2})
+        self.s3_test.worker.update_meta.assert_awaited_once_with(data={"two": 2})
+        self.assertEqual({"one": 1}, await self.s3_test.get_meta())
+        self.s3_test.worker = None
+
+    async def test_meta_io_in_executor(self):
+        loop_thread = threading.get_ident()
+        threads = []
+        worker = MagicMock(spec=AsyncWorker)
+        worker.read_meta.side_effect = lambda: threads.append(threading.get_ident()) or {"one": 1}
+        worker.write_meta.side_effect = lambda data: threads.append(threading.get_ident())
+        self.test.worker = worker
+
+        self.assertEqual({"one": 1}, await self.test.get_meta())
+        await self.test.insert_meta(key="two", value=2)
+        await self.test.flush()
+        worker.read_meta.assert_called_once_with()
+        worker.write_meta.assert_called_once_with(data={"one": 1, "two": 2})
+        self.assertEqual(2, len(threads))
+        self.assertNotIn(loop_thread, threads)
+        self.test.worker = None
+        self.test._meta = None
+
+    async def test_wipe_cache(self):
+        worker = MagicMock(spec=AsyncWorker)
+        worker.base_dir = "some/dir/"
+        worker.delete_directory = AsyncMock()
+        self.test.worker = worker
+        self.test._meta = {"one": 1}
+        self.test._pending_meta_writes = 1
+
+        await self.test.wipe_cache()
+        worker.write_meta.assert_called_once_with(data={"one": 1})
+        worker.delete_directory.assert_awaited_once_with()
+        self.assertEqual(None, self.test.worker)
+        self.assertEqual(None, self.test._meta)
+
+        s3_worker = MagicMock(spec=AsyncS3Worker)
+        s3_worker.close = AsyncMock()
+        self.s3_test.worker = s3_worker
+        await self.s3_test.wipe_cache()
+        s3_worker.close.assert_awaited_once_with()
+
+    async def test___aenter__(self):
+        self.test.create_cache = AsyncMock()
+        self.test.wipe_cache = AsyncMock()
+        self.test._register.close = AsyncMock()
+
+        async with self.test as cache:
+            self.assertEqual(self.test, cache)
+
+        self.test.create_cache.assert_awaited_once_with()
+        self.test.wipe_cache.assert_awaited_once_with()
+        self.test._register.close.assert_awaited_once_with()
+
+
+if __name__ == "__main__":
+    main()
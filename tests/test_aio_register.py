@@ -0,0 +1,73 @@
+from unittest import IsolatedAsyncioTestCase, main
+from unittest.mock import call, patch, AsyncMock
+
+from monolithcaching.aio.register import AsyncRegister
+from monolithcaching.errors import RegisterError
+from monolithcaching.register import Register
+
+
+class TestAsyncRegister(IsolatedAsyncioTestCase):
+
+    @patch("monolithcaching.aio.register.StrictRedis")
+    def test___init__(self, mock_redis):
+        test = AsyncRegister(host="localhost", port=12345, max_connections=5)
+        self.assertEqual(mock_redis.return_value, test._connection)
+        mock_redis.assert_called_once_with(host="localhost", port=12345, db=0, max_connections=5)
+        self.assertEqual([call(Register.REGISTER_SCRIPT), call(Register.DEREGISTER_SCRIPT)],
+                         mock_redis.return_value.register_script.call_args_list)
+
+    @patch("monolithcaching.aio.register.AsyncRegister.__init__")
+    async def test_get_count(self, mock_init):
+        mock_init.return_value = None
+        test = AsyncRegister(host="localhost", port=12345)
+        test._connection = AsyncMock()
+        test._connection.hget.return_value = b"3"
+
+        self.assertEqual(3, await test.get_count(cache_path="test path"))
+        test._connection.hget.assert_awaited_once_with(name="CACHE_REGISTER", key="test path")
+
+        test._connection.hget.return_value = None
+        self.assertEqual(None, await test.get_count(cache_path="test path"))
+
+    @patch("monolithcaching.aio.register.AsyncRegister.__init__")
+    async def test_register_cache(self, mock_init):
+        mock_init.return_value = None
+        test = AsyncRegister(host="localhost", port=12345)
+        test._register_script = AsyncMock()
+        test._register_script.return_value = 2
+
+        self.assertEqual(2, await test.register_cache(cache_path="test path"))
+        test._register_script.assert_awaited_once_with(keys=["CACHE_REGISTER"], args=["test path"])
+
+        test._register_script.return_value = -1
+        with self.assertRaises(RegisterError):
+            await test.register_cache(cache_path="test path")
+
+    @patch("monolithcaching.aio.register.AsyncRegister.__init__")
+    async def test_deregister_cache(self, mock_init):
+        mock_init.return_value = None
+        test = AsyncRegister(host="localhost", port=12345)
+        test._deregister_script = AsyncMock()
+
+        test._deregister_script.return_value = 1
+        self.assertEqual(1, await test.deregister_cache(cache_path="test path", locked=True))
+        test._deregister_script.assert_awaited_once_with(keys=["CACHE_REGISTER"], args=["test path", "1"])
+
+        test._deregister_script.return_value = -1
+        with self.assertRaises(RegisterError) as context:
+            await test.deregister_cache(cache_path="test path", locked=False)
+        self.assertEqual("cache test path is not in cache register so it cannot be de-registered",
+                         str(context.exception))
+
+    @patch("monolithcaching.aio.register.AsyncRegister.__init__")
+    async def test_close(self, mock_init):
+        mock_init.return_value = None
+        test = AsyncRegister(host="localhost", port=12345)
+        test._connection = AsyncMock()
+
+        await test.close()
+        test._connection.close.assert_awaited_once_with()
+
+
+if __name__ == "__main__":
+    main()
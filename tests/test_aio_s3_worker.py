@@ -0,0 +1,116 @@
+import json
+from unittest import IsolatedAsyncioTestCase, main
+from unittest.mock import patch, AsyncMock, MagicMock
+
+from monolithcaching.aio.s3_worker import AsyncS3Worker
+from monolithcaching.errors import WorkerCacheError
+
+
+class AsyncPages:
+
+    def __init__(self, pages):
+        self.pages = pages
+
+    def __aiter__(self):
+        self._iter = iter(self.pages)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class TestAsyncS3Worker(IsolatedAsyncioTestCase):
+
+    def setUp(self) -> None:
+        self.test = AsyncS3Worker(cache_path="s3://bucket/caches/", existing_cache="s3://bucket/caches/test")
+        self.test._client = AsyncMock()
+
+    @patch("monolithcaching.aio.s3_worker.UUID")
+    def test___init__(self, mock_uuid):
+        mock_uuid.return_value = "new"
+        test = AsyncS3Worker(cache_path="s3://bucket/caches/")
+        self.assertEqual("new", test.id)
+        self.assertEqual("s3://bucket/caches/new/", test.base_dir)
+        self.assertEqual("test", self.test.id)
+        self.assertEqual("s3://bucket/caches/test/", self.test.base_dir)
+
+    @patch("monolithcaching.aio.s3_worker.AsyncS3Worker.create_meta")
+    @patch("monolithcaching.aio.s3_worker.get_session")
+    async def test_connect(self, mock_get_session, mock_create_meta):
+        context = mock_get_session.return_value.create_client.return_value
+        context.__aenter__ = AsyncMock()
+        context.__aexit__ = AsyncMock()
+
+        await self.test.connect()
+        mock_get_session.return_value.create_client.assert_called_once_with("s3")
+        self.assertEqual(context.__aenter__.return_value, self.test._client)
+        self.assertEqual(0, len(mock_create_meta.call_args_list))
+
+        self.test._existing_cache = None
+        await self.test.connect()
+        mock_create_meta.assert_awaited_once_with()
+
+        await self.test.close()
+        context.__aexit__.assert_awaited_once_with(None, None, None)
+        self.assertEqual(None, self.test._client)
+
+    @patch("monolithcaching.aio.s3_worker.get_session", None)
+    async def test_connect_without_aiobotocore(self):
+        with self.assertRaises(WorkerCacheError) as context:
+            await self.test.connect()
+        self.assertEqual("aiobotocore is required for async S3 caching, install monolithcaching[async]",
+                         str(context.exception))
+
+    async def test_delete_directory(self):
+        self.test.DELETE_BATCH_SIZE = 2
+        self.test._client.get_paginator = MagicMock()
+        self.test._client.get_paginator.return_value.paginate.return_value = AsyncPages(
+            [{"Contents": [{"Key": "one"}, {"Key": "two"}, {"Key": "three"}]}, {}]
+        )
+
+        await self.test.delete_directory()
+        self.test._client.get_paginator.return_value.paginate.assert_called_once_with(Bucket="bucket",
+                                                                                      Prefix="caches/test/")
+        self.assertEqual(2, len(self.test._client.delete_objects.call_args_list))
+        self.test._client.delete_objects.assert_awaited_with(
+            Bucket="bucket", Delete={"Objects": [{"Key": "three"}], "Quiet": True}
+        )
+
+    async def test_update_meta(self):
+        body = MagicMock()
+        body.__aenter__ = AsyncMock(return_value=body)
+        body.__aexit__ = AsyncMock()
+        body.read = AsyncMock(return_value=b'{"one": 1}')
+        self.test._client.get_object.return_value = {"Body": body}
+
+        await self.test.update_meta(data={"two": 2, "three": 3})
+        self.test._client.get_object.assert_awaited_once_with(Bucket="bucket", Key="caches/test/meta.json")
+        self.test._client.put_object.assert_awaited_once_with(
+            Bucket="bucket", Key="caches/test/meta.json",
+            Body=bytes(json.dumps({"one": 1, "two": 2, "three": 3}).encode("UTF-8"))
+        )
+
+    async def test_check_file(self):
+        class ClientError(Exception):
+            def __init__(self, code):
+                self.response = {"Error": {"Code": code}}
+
+        self.test._client.exceptions = MagicMock()
+        self.test._client.exceptions.ClientError = ClientError
+
+        self.assertEqual(True, await self.test.check_file(file="meta.json"))
+        self.test._client.head_object.assert_awaited_once_with(Bucket="bucket", Key="caches/test/meta.json")
+
+        self.test._client.head_object.side_effect = ClientError("404")
+        self.assertEqual(False, await self.test.check_file(file="meta.json"))
+
+        self.test._client.head_object.side_effect = ClientError("403")
+        with self.assertRaises(ClientError):
+            await self.test.check_file(file="meta.json")
+
+
+if __name__ == "__main__":
+    main()
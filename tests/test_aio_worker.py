@@ -0,0 +1,58 @@
+from unittest import IsolatedAsyncioTestCase, main
+from unittest.mock import patch, AsyncMock
+
+from monolithcaching.aio.worker import AsyncWorker
+
+
+class TestAsyncWorker(IsolatedAsyncioTestCase):
+
+    @patch("monolithcaching.aio.worker.Worker.__init__")
+    def setUp(self, mock_init) -> None:
+        mock_init.return_value = None
+        self.register = AsyncMock()
+        self.test = AsyncWorker(register=self.register, local_cache="some/dir")
+        mock_init.assert_called_once_with(port=None, host=None, existing_cache=None, local_cache="some/dir")
+        self.test._base_dir = "some/dir/cache/test/"
+        self.test._locked = False
+
+    def tearDown(self) -> None:
+        self.test._deleted = True
+
+    async def test_connect(self):
+        await self.test.connect()
+        self.register.register_cache.assert_awaited_once_with(cache_path="some/dir/cache/test/")
+
+    @patch("monolithcaching.aio.worker.shutil")
+    async def test_delete_directory(self, mock_shutil):
+        self.register.deregister_cache.return_value = 1
+        await self.test.delete_directory()
+        self.register.deregister_cache.assert_awaited_once_with(cache_path="some/dir/cache/test/", locked=False)
+        self.assertEqual(0, len(mock_shutil.rmtree.call_args_list))
+
+        await self.test.delete_directory()
+        self.register.deregister_cache.assert_awaited_once()
+
+        self.test._deleted = False
+        self.register.deregister_cache.return_value = 0
+        await self.test.delete_directory()
+        mock_shutil.rmtree.assert_called_once_with("some/dir/cache/test/")
+        mock_shutil.reset_mock()
+
+        self.test._deleted = False
+        self.test._locked = True
+        await self.test.delete_directory()
+        self.assertEqual(0, len(mock_shutil.rmtree.call_args_list))
+
+    @patch("monolithcaching.aio.worker.shutil")
+    def test__delete_directory(self, mock_shutil):
+        self.test._delete_directory()
+        self.assertEqual(0, len(mock_shutil.rmtree.call_args_list))
+
+        self.test._register = None
+        self.test._delete_directory()
+        mock_shutil.rmtree.assert_called_once_with("some/dir/cache/test/")
+        self.assertEqual(True, self.test._deleted)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import tempfile
+from unittest import TestCase, main, skipIf
+
+from monolithcaching import CacheManager, CacheManagerError
+from monolithcaching.arrays import np, pa, put_array
+from monolithcaching.errors import WorkerCacheError
+
+
+@skipIf(np is None, "numpy is not installed")
+class TestArrays(TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.test = CacheManager(local_cache_path=self.directory.name)
+        self.test.create_cache()
+        self.array = np.arange(12, dtype=np.float32).reshape(3, 4)
+
+    def tearDown(self) -> None:
+        self.test.wipe_cache()
+        self.directory.cleanup()
+
+    def test_put_array_get_array(self):
+        self.test.put_array(key="one.npy", array=self.array)
+        self.test.put_array(key="two.npy", array=np.asfortranarray(self.array))
+        self.assertEqual({"one.npy": {"format": "npy", "dtype": "float32", "shape": [3, 4]},
+                          "two.npy": {"format": "npy", "dtype": "float32", "shape": [3, 4]}},
+                         self.test.meta["arrays"])
+
+        outcome = self.test.get_array(key="one.npy")
+        self.assertIsInstance(outcome, np.memmap)
+        self.assertEqual(0, outcome.offset % 64)
+        self.assertEqual(False, outcome.flags.writeable)
+        np.testing.assert_array_equal(self.array, outcome)
+        self.assertEqual(True, self.test.get_array(key="two.npy").flags.f_contiguous)
+        self.assertNotIsInstance(self.test.get_array(key="one.npy", mmap_mode=None), np.memmap)
+
+        with self.assertRaises(CacheManagerError) as e:
+            self.test.get_array(key="three.npy")
+        self.assertEqual("array three.npy is not recorded in the meta of the cache", str(e.exception))
+
+    def test_put_array_replaces_mapped_file(self):
+        self.test.put_array(key="one.npy", array=self.array)
+        mapped = self.test.get_array(key="one.npy")
+        self.test.put_array(key="one.npy", array=self.array * 2)
+        np.testing.assert_array_equal(self.array, mapped)
+        np.testing.assert_array_equal(self.array * 2, self.test.get_array(key="one.npy"))
+
+    def test_memory_backend(self):
+        test = CacheManager(backend="memory")
+        test.create_cache()
+        test.put_array(key="one.npy", array=np.asfortranarray(self.array))
+
+        outcome = test.get_array(key="one.npy")
+        self.assertEqual(False, outcome.flags.owndata)
+        self.assertEqual(True, outcome.flags.f_contiguous)
+        np.testing.assert_array_equal(self.array, outcome)
+        test.wipe_cache()
+
+    def test_put_array_errors(self):
+        with self.assertRaises(WorkerCacheError) as e:
+            put_array(backend=self.test.worker, key="one.npy", array=[1, 2])
+        self.assertEqual("array one.npy is not a numpy.ndarray, pyarrow.Table or pyarrow.RecordBatch",
+                         str(e.exception))
+
+        with self.assertRaises(WorkerCacheError) as e:
+            put_array(backend=self.test.worker, key="one.npy", array=np.array([1, "two"], dtype=object))
+        self.assertEqual("array one.npy has an object dtype that cannot be memory mapped", str(e.exception))
+
+        self.test.worker = None
+        with self.assertRaises(CacheManagerError) as e:
+            self.test.put_array(key="one.npy", array=self.array)
+        self.assertEqual("you are trying to store an array when no cache is made", str(e.exception))
+
+    @skipIf(pa is None, "pyarrow is not installed")
+    def test_arrow(self):
+        table = pa.table({"one": [1, 2, 3], "two": ["a", "b", "c"]})
+        self.test.put_array(key="table.arrow", array=table)
+        self.assertEqual({"format": "arrow", "dtype": {"one": "int64", "two": "string"}, "shape": [3, 2]},
+                         self.test.meta["arrays"]["table.arrow"])
+        self.assertEqual(True, self.test.get_array(key="table.arrow").equals(table))
+
+        test = CacheManager(backend="memory")
+        test.create_cache()
+        test.put_array(key="batch.arrow", array=table.to_batches()[0])
+        self.assertEqual(True, test.get_array(key="batch.arrow").equals(table))
+        test.wipe_cache()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+from unittest import TestCase, main
+
+from monolithcaching import CacheManagerError, MemoryWorker, S3Worker, ShmWorker, TieredWorker, Worker
+from monolithcaching.backend import BACKENDS, CacheBackend, get_backend, register_backend
+
+
+class TestBackend(TestCase):
+
+    def tearDown(self) -> None:
+        BACKENDS.pop("test", None)
+
+    def test_registered_backends(self):
+        self.assertEqual(Worker, get_backend(name="local"))
+        self.assertEqual(S3Worker, get_backend(name="s3"))
+        self.assertEqual(TieredWorker, get_backend(name="tiered"))
+        self.assertEqual(MemoryWorker, get_backend(name="memory"))
+        self.assertEqual(ShmWorker, get_backend(name="shm"))
+
+    def test_register_backend(self):
+        @register_backend("test")
+        class TestWorker(MemoryWorker):
+            pass
+
+        self.assertEqual(TestWorker, get_backend(name="test"))
+        self.assertTrue(issubclass(TestWorker, CacheBackend))
+
+    def test_get_backend_unknown(self):
+        with self.assertRaises(CacheManagerError) as e:
+            get_backend(name="test")
+        self.assertEqual("backend test is not one of the registered backends ['local', 'memory', 's3', 'shm', 'tiered']",
+                         str(e.exception))
+
+
+if __name__ == "__main__":
+    main()
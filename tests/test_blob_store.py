@@ -0,0 +1,80 @@
+import hashlib
+import os
+import tempfile
+from unittest import TestCase, main
+
+from monolithcaching import CacheRoot, Worker
+from monolithcaching.blob_store import BlobStore
+from monolithcaching.errors import WorkerCacheError
+
+
+class TestBlobStore(TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.directory.name, "source.bin")
+        with open(self.source, "wb") as file:
+            file.write(b"some data" * 1000)
+        self.digest = hashlib.sha256(b"some data" * 1000).hexdigest()
+        self.store = BlobStore(root=self.directory.name)
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test___init__(self):
+        self.assertEqual(os.path.join(self.directory.name, "blobs", "sha256"), self.store.path)
+        with self.assertRaises(WorkerCacheError) as e:
+            BlobStore(root=self.directory.name, algorithm="md5")
+        self.assertIn("blob hash md5 is not one of the available hashes", str(e.exception))
+
+    def test_add(self):
+        self.assertEqual(self.digest, self.store.add(source_path=self.source))
+        self.assertEqual(self.digest, self.store.add(source_path=self.source))
+        path = self.store.blob_path(digest=self.digest)
+        self.assertEqual(os.path.join(self.store.path, self.digest[:2], self.digest), path)
+        self.assertEqual(0o444, os.stat(path).st_mode & 0o777)
+        self.assertEqual([self.digest], os.listdir(os.path.dirname(path)))
+
+    def test_collect(self):
+        self.store.add(source_path=self.source)
+        linked = os.path.join(self.directory.name, "linked.bin")
+        self.store.link(digest=self.digest, destination_path=linked)
+
+        self.assertEqual(0, self.store.collect(digests=[self.digest, "missing"]))
+        os.unlink(linked)
+        self.assertEqual(1, self.store.collect_all())
+        self.assertEqual(False, os.path.exists(self.store.blob_path(digest=self.digest)))
+
+    def test_worker(self):
+        one = Worker(port=None, host=None, local_cache=self.directory.name)
+        two = Worker(port=None, host=None, local_cache=self.directory.name)
+        self.assertEqual(self.digest, one.put_blob(key="data/source.bin", source_path=self.source))
+        two.link_blob(key="source.bin", digest=self.digest)
+
+        blob = self.store.blob_path(digest=self.digest)
+        self.assertEqual(3, os.stat(blob).st_nlink)
+        self.assertEqual(os.stat(blob).st_ino, os.stat(one.base_dir + "data/source.bin").st_ino)
+        self.assertEqual(b"some data" * 1000, two.get_bytes(key="source.bin"))
+        self.assertEqual([("sha256", self.digest)], BlobStore.cache_blobs(cache_path=two.base_dir))
+
+        with self.assertRaises(FileNotFoundError):
+            two.link_blob(key="missing.bin", digest="00" * 32)
+        self.assertEqual(False, two.check_file(file="missing.bin"))
+
+        del one
+        self.assertEqual(2, os.stat(blob).st_nlink)
+        del two
+        self.assertEqual(False, os.path.exists(blob))
+
+    def test_cache_root_evict(self):
+        worker = Worker(port=None, host=None, local_cache=self.directory.name)
+        worker.put_blob(key="source.bin", source_path=self.source)
+        worker.lock()
+        del worker
+
+        evicted = CacheRoot(path=self.directory.name, local_register=True).evict(max_count=0)
+        self.assertEqual(1, len(evicted))
+        self.assertEqual(False, os.path.exists(self.store.blob_path(digest=self.digest)))
+
+if __name__ == "__main__":
+    main()
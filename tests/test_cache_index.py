@@ -0,0 +1,109 @@
+import json
+import os
+import tempfile
+from unittest import TestCase, main
+from mock import patch
+
+from monolithcaching.cache_index import CacheIndex
+from monolithcaching.cache_root import CacheRoot
+from monolithcaching.worker import Worker
+
+
+class TestCacheIndex(TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.test = CacheIndex(root=self.directory.name)
+        self.path = self.directory.name + "/cache/one/"
+
+    def tearDown(self) -> None:
+        self.test.close()
+        self.directory.cleanup()
+
+    def test___init__(self):
+        self.assertEqual(True, os.path.isfile(os.path.join(self.directory.name, "index.sqlite3")))
+        self.assertEqual("wal", self.test._connection.execute("PRAGMA journal_mode").fetchone()[0])
+
+    @patch("monolithcaching.cache_index.time")
+    def test_add_touch(self, mock_time):
+        mock_time.time.return_value = 100.0
+        self.test.add(path=self.path)
+        self.test.add(path=self.path)
+
+        record = self.test.get(path=self.path)
+        self.assertEqual("one", record.id)
+        self.assertEqual(self.path, record.path)
+        self.assertEqual((0, 100.0, 100.0, 1, False),
+                         (record.size, record.created, record.last_access, record.access_count, record.locked))
+
+        mock_time.time.return_value = 200.0
+        self.test.touch(path=self.path)
+        record = self.test.get(path=self.path)
+        self.assertEqual((100.0, 200.0, 2), (record.created, record.last_access, record.access_count))
+
+        self.test.touch(path=self.directory.name + "/cache/two/")
+        self.assertEqual(1, self.test.get(path=self.directory.name + "/cache/two/").access_count)
+        self.assertEqual(None, self.test.get(path="missing"))
+
+    def test_size_lock_and_meta(self):
+        self.test.add(path=self.path)
+        self.test.add_size(path=self.path, size=100)
+        self.test.add_size(path=self.path, size=-40)
+        self.test.set_locked(path=self.path, locked=True)
+
+        record = self.test.get(path=self.path)
+        self.assertEqual(60, record.size)
+        self.assertEqual(True, record.locked)
+        self.test.set_size(path=self.path, size=500)
+        self.assertEqual(500, self.test.get(path=self.path).size)
+
+        self.test.set_meta(path=self.path, meta={"locked": False, "stage": "train"})
+        self.assertEqual({"locked": False, "stage": "train"}, self.test.get_meta(path=self.path))
+        self.assertEqual(False, self.test.get(path=self.path).locked)
+        self.assertEqual(None, self.test.get_meta(path="missing"))
+
+    def test_detached_size(self):
+        worker = Worker(port=None, host=None, local_cache=self.directory.name, index=self.test)
+        worker.put_bytes(key="api.bin", data=b"0" * 10)
+        with open(worker.base_dir + "direct.bin", "wb") as file:
+            file.write(b"0" * 1000)
+        worker.lock()
+        path = worker.base_dir
+        del worker
+
+        self.assertEqual(CacheRoot._directory_size(path=path), self.test.get(path=path).size)
+        self.assertLess(1010, self.test.get(path=path).size)
+
+    @patch("monolithcaching.cache_index.time")
+    def test_records_search_remove(self, mock_time):
+        for number, name in enumerate(["three", "one", "two"]):
+            mock_time.time.return_value = float(number)
+            self.test.add(path=name)
+            self.test.set_meta(path=name, meta={"stage": "train" if name != "two" else "test", "weird key": 1})
+
+        self.assertEqual(["three", "one", "two"], [record.path for record in self.test.records()])
+        self.assertEqual(["three", "one"], [record.path for record in self.test.search(key="stage", value="train")])
+        self.assertEqual(3, len(self.test.search(key="weird key", value=1)))
+        self.assertEqual([], self.test.search(key="stage", value="missing"))
+
+        self.test.remove(path="one")
+        self.assertEqual(["three", "two"], [record.path for record in self.test.records()])
+
+    def test_rebuild(self):
+        self.test.add(path="stale")
+        os.makedirs(self.path)
+        with open(self.path + "meta.json", "w") as file:
+            json.dump({"locked": True}, file)
+        with open(self.path + "data.bin", "wb") as file:
+            file.write(b"0" * 100)
+
+        self.test.rebuild()
+        records = self.test.records()
+        self.assertEqual([self.path], [record.path for record in records])
+        self.assertEqual(True, records[0].locked)
+        self.assertEqual(100 + os.path.getsize(self.path + "meta.json"), records[0].size)
+        self.assertEqual({"locked": True}, self.test.get_meta(path=self.path))
+
+
+if __name__ == "__main__":
+    main()
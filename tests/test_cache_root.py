@@ -0,0 +1,166 @@
+import datetime
+import gc
+import json
+import os
+import tempfile
+from unittest import TestCase, main
+from mock import patch, MagicMock
+
+from monolithcaching.access_record import AccessRecord
+from monolithcaching.cache_root import CacheRoot, CacheRecord
+from monolithcaching.errors import CacheRootError, WorkerCacheError
+from monolithcaching.local_register import LocalRegister
+from monolithcaching.worker import Worker
+
+
+class TestCacheRoot(TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.test = CacheRoot(path=self.directory.name, local_register=True)
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def make_cache(self, cache_id, size, accesses, locked=False):
+        path = self.directory.name + "/cache/{}/".format(cache_id)
+        os.makedirs(path + "nested")
+        with open(path + "nested/data.bin", "wb") as file:
+            file.write(b"0" * size)
+        with open(path + "timestamp.txt", "w") as file:
+            for access in accesses:
+                file.write("\n{}".format(datetime.datetime.fromtimestamp(access)))
+        with open(path + "meta.json", "w") as file:
+            json.dump({"locked": locked}, file)
+        return path
+
+    def test_record(self):
+        path = self.make_cache(cache_id="one", size=100, accesses=[1000.0, 2000.0, 3000.0])
+
+        record = self.test.record(cache_id="one")
+        self.assertEqual("one", record.id)
+        self.assertEqual(path, record.path)
+        self.assertEqual(100 + os.path.getsize(path + "timestamp.txt") + os.path.getsize(path + "meta.json"),
+                         record.size)
+        self.assertEqual(1000.0, record.created)
+        self.assertEqual(3000.0, record.last_access)
+        self.assertEqual(3, record.access_count)
+        self.assertEqual(False, record.locked)
+
+        os.remove(path + "timestamp.txt")
+        record = self.test.record(cache_id="one")
+        self.assertEqual(os.stat(path).st_mtime, record.last_access)
+        self.assertEqual(1, record.access_count)
+
+    def test_record_access_record(self):
+        path = self.make_cache(cache_id="one", size=100, accesses=[1000.0, 2000.0])
+        AccessRecord.touch(cache_path=path, now=5000.0)
+
+        record = self.test.record(cache_id="one")
+        self.assertEqual(False, os.path.exists(path + "timestamp.txt"))
+        self.assertEqual(100 + 24 + os.path.getsize(path + "meta.json"), record.size)
+        self.assertEqual(1000.0, record.created)
+        self.assertEqual(5000.0, record.last_access)
+        self.assertEqual(3, record.access_count)
+
+    def test_caches(self):
+        self.assertEqual([], self.test.caches())
+        self.make_cache(cache_id="one", size=1, accesses=[1000.0])
+        self.make_cache(cache_id="two", size=1, accesses=[1000.0])
+        self.assertEqual(["one", "two"], sorted(record.id for record in self.test.caches()))
+
+    def test_evict(self):
+        self.make_cache(cache_id="old", size=1000, accesses=[1000.0])
+        self.make_cache(cache_id="frequent", size=1000, accesses=[1500.0, 1600.0, 1700.0])
+        self.make_cache(cache_id="locked", size=1000, accesses=[500.0], locked=True)
+        self.make_cache(cache_id="new", size=1000, accesses=[2000.0])
+
+        self.assertEqual([], self.test.evict(max_count=4))
+        evicted = self.test.evict(max_count=2)
+        self.assertEqual(["old", "frequent"], [record.id for record in evicted])
+        self.assertEqual(["locked", "new"], sorted(record.id for record in self.test.caches()))
+
+    def test_evict_lfu_and_ttl(self):
+        self.make_cache(cache_id="old", size=1000, accesses=[1000.0])
+        self.make_cache(cache_id="frequent", size=1000, accesses=[1500.0, 1600.0, 1700.0])
+        self.make_cache(cache_id="new", size=1000, accesses=[2000.0])
+
+        evicted = self.test.evict(max_bytes=2500, policy="lfu")
+        self.assertEqual(["old"], [record.id for record in evicted])
+
+        self.make_cache(cache_id="recent", size=1000, accesses=[9999999999.0])
+        evicted = self.test.evict(policy="lfu", ttl=60)
+        self.assertEqual(["new", "frequent"], [record.id for record in evicted])
+
+        with self.assertRaises(CacheRootError) as context:
+            self.test.evict(policy="fifo")
+        self.assertEqual("eviction policy fifo is not one of ('lru', 'lfu')", str(context.exception))
+
+    def test_evict_without_register(self):
+        self.make_cache(cache_id="old", size=1000, accesses=[1000.0])
+        with self.assertRaises(CacheRootError) as context:
+            CacheRoot(path=self.directory.name).evict(max_count=0)
+        self.assertEqual("evicting caches needs Redis or the local register to count the managers pointing to them",
+                         str(context.exception))
+        self.assertEqual(["old"], [record.id for record in self.test.caches()])
+
+    def test_evict_with_index(self):
+        index = MagicMock()
+        old = self.make_cache(cache_id="old", size=1000, accesses=[1000.0])
+        index.records.return_value = [CacheRecord(id="old", path=old, size=1000, created=1000.0, last_access=1000.0,
+                                                  access_count=1, locked=False)]
+        test = CacheRoot(path=self.directory.name, index=index, local_register=True)
+
+        evicted = test.evict(max_bytes=10)
+        self.assertEqual(["old"], [record.id for record in evicted])
+        index.records.assert_called_once_with()
+        index.remove.assert_called_once_with(path=old)
+        self.assertEqual(False, os.path.isdir(old))
+
+    @patch("monolithcaching.cache_root.Register")
+    def test_evict_referenced(self, mock_register):
+        self.make_cache(cache_id="old", size=1000, accesses=[1000.0])
+        self.make_cache(cache_id="new", size=1000, accesses=[2000.0])
+        test = CacheRoot(path=self.directory.name, port=6379, host="localhost")
+        mock_register.return_value.claim_cache.side_effect = lambda cache_path: "old" not in cache_path
+
+        evicted = test.evict(max_count=1)
+        self.assertEqual(["new"], [record.id for record in evicted])
+        mock_register.assert_called_with(host="localhost", port=6379)
+
+    @patch("monolithcaching.cache_root.LocalRegister")
+    def test_evict_referenced_local_register(self, mock_local_register):
+        self.make_cache(cache_id="old", size=1000, accesses=[1000.0])
+        self.make_cache(cache_id="new", size=1000, accesses=[2000.0])
+        test = CacheRoot(path=self.directory.name, local_register=True)
+        mock_local_register.return_value.claim_cache.side_effect = lambda cache_path: "old" not in cache_path
+
+        evicted = test.evict(max_count=1)
+        self.assertEqual(["new"], [record.id for record in evicted])
+        mock_local_register.assert_called_with(root=self.directory.name)
+
+    def test_evict_attached_after_listing(self):
+        old = self.make_cache(cache_id="old", size=1000, accesses=[1000.0])
+        caches = self.test.caches
+
+        def attach_after_listing():
+            records = caches()
+            LocalRegister(root=self.directory.name).register_cache(cache_path=old)
+            return records
+
+        with patch.object(self.test, "caches", side_effect=attach_after_listing):
+            self.assertEqual([], self.test.evict(max_count=0))
+        self.assertEqual(True, os.path.isdir(old))
+
+        LocalRegister(root=self.directory.name).deregister_cache(cache_path=old, locked=False)
+        self.assertEqual(True, self.test.claim(path=old))
+        with self.assertRaises(WorkerCacheError) as context:
+            Worker(port=None, host=None, existing_cache=old, local_cache=self.directory.name, local_register=True)
+        self.assertEqual("cache {} is being evicted so it cannot be registered".format(old), str(context.exception))
+        gc.collect()
+        self.assertEqual(True, os.path.isdir(old))
+        self.assertEqual(-1, self.test.reference_count(path=old))
+
+
+if __name__ == "__main__":
+    main()
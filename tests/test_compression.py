@@ -0,0 +1,139 @@
+import os
+import tempfile
+from unittest import TestCase, main, skipIf
+
+from monolithcaching import CacheManager
+from monolithcaching.compression import CODECS, IDENTITY, MAGIC, CompressedBackend, header
+from monolithcaching.errors import WorkerCacheError
+from monolithcaching.memory_worker import MemoryWorker
+from monolithcaching.worker import Worker
+
+
+class TestCompressedBackend(TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.worker = Worker(port=None, host=None, local_cache=self.directory.name)
+        self.test = CompressedBackend(backend=self.worker, codec="gzip", threshold=10)
+
+    def tearDown(self) -> None:
+        del self.test
+        del self.worker
+        self.directory.cleanup()
+
+    def _round_trip(self, codec):
+        test = CompressedBackend(backend=self.worker, codec=codec, level=1, threshold=10)
+        data = b"monolith" * 10000
+        test.put_bytes(key="data.bin", data=data)
+
+        with open(os.path.join(self.worker.base_dir, "data.bin"), "rb") as file:
+            stored = file.read()
+        self.assertEqual(header(codec=codec), stored[:len(header(codec=codec))])
+        self.assertLess(len(stored), len(data))
+        self.assertEqual(codec, test.codec_of(key="data.bin"))
+        self.assertEqual(data, test.get_bytes(key="data.bin"))
+
+    def test_gzip(self):
+        self._round_trip(codec="gzip")
+
+    @skipIf("zstd" not in CODECS, "zstandard is not installed")
+    def test_zstd(self):
+        self._round_trip(codec="zstd")
+
+    @skipIf("lz4" not in CODECS, "lz4 is not installed")
+    def test_lz4(self):
+        self._round_trip(codec="lz4")
+
+    def test___init__(self):
+        with self.assertRaises(WorkerCacheError) as e:
+            CompressedBackend(backend=self.worker, codec="snappy")
+        self.assertIn("compression codec snappy is not one of the available codecs", str(e.exception))
+
+    def test_threshold(self):
+        self.test.put_bytes(key="small.bin", data=b"small")
+
+        with open(os.path.join(self.worker.base_dir, "small.bin"), "rb") as file:
+            self.assertEqual(header(codec=IDENTITY) + b"small", file.read())
+        self.assertEqual(None, self.test.codec_of(key="small.bin"))
+        self.assertEqual(b"small", self.test.get_bytes(key="small.bin"))
+        self.assertEqual(None, self.test.local_path(key="small.bin"))
+
+    def test_magic_collision(self):
+        data = MAGIC + b"\x04gzip"
+        self.test.put_bytes(key="small.bin", data=data)
+        self.assertEqual(data, self.test.get_bytes(key="small.bin"))
+
+        for data in (MAGIC + b"\x03abcdef", MAGIC + b"\x00", MAGIC):
+            self.worker.put_bytes(key="legacy.bin", data=data)
+            self.assertEqual(None, self.test.codec_of(key="legacy.bin"))
+            self.assertEqual(data, self.test.get_bytes(key="legacy.bin"))
+
+    def test_uncompressed_files(self):
+        data = b"written before compression" * 100
+        self.worker.put_bytes(key="legacy.bin", data=data)
+
+        self.assertEqual(None, self.test.codec_of(key="legacy.bin"))
+        self.assertEqual(data, self.test.get_bytes(key="legacy.bin"))
+
+    def test_files(self):
+        data = os.urandom(100) * 1000
+        source = os.path.join(self.directory.name, "source.bin")
+        destination = os.path.join(self.directory.name, "destination.bin")
+        with open(source, "wb") as file:
+            file.write(data)
+
+        self.test.put_file(key="file.bin", source_path=source)
+        self.test.get_file(key="file.bin", destination_path=destination)
+
+        with open(destination, "rb") as file:
+            self.assertEqual(data, file.read())
+        self.assertEqual(None, self.test.local_path(key="file.bin"))
+        self.assertEqual(None, self.test.local_path(key="missing.bin"))
+        with self.test.open_read(key="file.bin") as file:
+            self.assertEqual(data[:10], file.read(10))
+
+    def test_delegation(self):
+        self.test.update_meta(data={"one": 1})
+
+        self.assertEqual({"one": 1}, self.worker.read_meta())
+        self.assertEqual(self.worker.base_dir, self.test.base_dir)
+        self.assertEqual(True, self.test.check_file(file="meta.json"))
+        self.test.lock()
+        self.assertEqual(True, self.worker.locked)
+        self.test.unlock()
+        self.assertEqual(False, self.test.locked)
+
+
+class TestCompressedManager(TestCase):
+
+    def test_memory(self):
+        manager = CacheManager(backend="memory", compression="gzip", compression_threshold=0)
+        manager.create_cache()
+        manager.worker.put_bytes(key="data.bin", data=b"data")
+
+        self.assertIsInstance(manager.worker, CompressedBackend)
+        self.assertIsInstance(manager.worker.backend, MemoryWorker)
+        self.assertEqual(b"data", manager.worker.get_bytes(key="data.bin"))
+        self.assertEqual(MAGIC, manager.worker.backend.get_bytes(key="data.bin")[:len(MAGIC)])
+        manager.wipe_cache()
+
+    def test_local(self):
+        with tempfile.TemporaryDirectory() as directory:
+            manager = CacheManager(local_cache_path=directory, compression="gzip", compression_threshold=0)
+            manager.create_cache()
+            manager.lock_cache()
+            manager.worker.put_bytes(key="data.bin", data=b"data")
+            manager.update_meta(data={"one": 1})
+            path = manager.cache_path
+
+            attached = CacheManager(local_cache_path=directory)
+            attached.create_cache(existing_cache=path)
+            self.assertEqual(b"data", CompressedBackend(backend=attached.worker, codec="gzip")
+                             .get_bytes(key="data.bin"))
+            self.assertEqual(1, attached.meta["one"])
+            manager.unlock_cache()
+            manager.wipe_cache()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+from unittest import TestCase, main
+from unittest.mock import patch, MagicMock
+
+from monolithcaching.connection_pool import RedisConnectionPools
+
+
+class TestRedisConnectionPools(TestCase):
+
+    def tearDown(self) -> None:
+        RedisConnectionPools._pools = {}
+
+    @patch("monolithcaching.connection_pool.os")
+    @patch("monolithcaching.connection_pool.ConnectionPool")
+    def test_get(self, mock_pool, mock_os):
+        mock_os.getpid.return_value = 10
+        RedisConnectionPools._pools = {}
+
+        outcome = RedisConnectionPools.get(host="localhost", port=6379, max_connections=5, health_check_interval=2)
+        self.assertEqual(mock_pool.return_value, outcome)
+        mock_pool.assert_called_once_with(host="localhost", port=6379, db=0, max_connections=5,
+                                          health_check_interval=2)
+
+        outcome = RedisConnectionPools.get(host="localhost", port=6379)
+        self.assertEqual(mock_pool.return_value, outcome)
+        mock_pool.assert_called_once()
+        mock_pool.reset_mock()
+
+        RedisConnectionPools.get(host="localhost", port=6380)
+        mock_pool.assert_called_once_with(host="localhost", port=6380, db=0, max_connections=None,
+                                          health_check_interval=30)
+        mock_pool.reset_mock()
+
+        mock_os.getpid.return_value = 11
+        RedisConnectionPools.get(host="localhost", port=6379)
+        mock_pool.assert_called_once_with(host="localhost", port=6379, db=0, max_connections=None,
+                                          health_check_interval=30)
+        self.assertEqual([(11, "localhost", 6379, 0)], list(RedisConnectionPools._pools.keys()))
+
+    @patch("monolithcaching.connection_pool.os")
+    def test_reset(self, mock_os):
+        mock_os.getpid.return_value = 10
+        own_pool = MagicMock()
+        parent_pool = MagicMock()
+        RedisConnectionPools._pools = {(10, "localhost", 6379, 0): own_pool, (9, "localhost", 6379, 0): parent_pool}
+
+        RedisConnectionPools.reset()
+        own_pool.disconnect.assert_called_once_with()
+        self.assertEqual(0, len(parent_pool.disconnect.call_args_list))
+        self.assertEqual({}, RedisConnectionPools._pools)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+import os
+import tempfile
+import warnings
+from unittest import TestCase, main, skipIf
+from mock import patch, MagicMock
+
+from monolithcaching import CacheManager
+from monolithcaching import instrumentation
+from monolithcaching.errors import InstrumentationError
+from monolithcaching.instrumentation import (Event, InstrumentedBackend, OpenTelemetryHook, PrometheusHook,
+                                             add_hook, remove_hook, timed)
+from monolithcaching.s3_worker import S3Worker
+
+
+class TestInstrumentation(TestCase):
+
+    def setUp(self) -> None:
+        self.events = []
+        add_hook(self.events.append)
+
+    def tearDown(self) -> None:
+        remove_hook(self.events.append)
+
+    def operations(self):
+        return [(event.operation, event.backend) for event in self.events]
+
+    def test_add_remove_hook(self):
+        add_hook(self.events.append)
+        self.assertEqual(1, instrumentation.HOOKS.count(self.events.append))
+        remove_hook(self.events.append)
+        remove_hook(self.events.append)
+        self.assertEqual([], instrumentation.HOOKS)
+
+        with timed(operation="create", backend="local") as details:
+            details["size"] = 1
+        self.assertEqual([], self.events)
+        add_hook(self.events.append)
+
+    def test_timed(self):
+        with timed(operation="put_bytes", backend="local", size=10):
+            pass
+        with timed(operation="get_bytes", backend="local") as details:
+            details["size"] = 5
+        with self.assertRaises(KeyError):
+            with timed(operation="get_bytes", backend="memory"):
+                raise KeyError("missing")
+
+        self.assertEqual([("put_bytes", "local", 10, None, "ok"), ("get_bytes", "local", 5, None, "ok"),
+                          ("get_bytes", "memory", None, "KeyError", "error")],
+                         [(event.operation, event.backend, event.size, event.error, event.outcome)
+                          for event in self.events])
+        self.assertTrue(all(event.seconds >= 0 for event in self.events))
+
+    def test_hook_error(self):
+        hook = MagicMock(side_effect=ValueError("broken"))
+        add_hook(hook)
+        try:
+            with warnings.catch_warnings(record=True) as caught:
+                warnings.simplefilter("always")
+                with timed(operation="create", backend="local"):
+                    pass
+        finally:
+            remove_hook(hook)
+        self.assertEqual(1, len(self.events))
+        self.assertIn("raised ValueError('broken')", str(caught[0].message))
+
+    def test_manager(self):
+        manager = CacheManager(backend="memory")
+        manager.create_cache()
+        manager.worker.put_bytes(key="data.bin", data=b"data")
+        self.assertEqual(b"data", manager.worker.get_bytes(key="data.bin"))
+        manager.insert_meta(key="one", value=1)
+        manager.wipe_cache()
+
+        self.assertEqual([("create", "memory"), ("put_bytes", "memory"), ("get_bytes", "memory"),
+                          ("meta_write", "memory"), ("wipe", "memory")], self.operations())
+        self.assertEqual([None, 4, 4, None, None], [event.size for event in self.events])
+
+    def test_local_worker(self):
+        with tempfile.TemporaryDirectory() as directory:
+            manager = CacheManager(local_cache_path=directory, local_register=True)
+            manager.create_cache()
+            self.assertIsInstance(manager.worker, InstrumentedBackend)
+            self.assertEqual(manager.worker.backend.base_dir, manager.cache_path)
+
+            source = os.path.join(directory, "source.bin")
+            with open(source, "wb") as file:
+                file.write(b"0" * 100)
+            manager.worker.put_file(key="data.bin", source_path=source)
+            manager.worker.get_file(key="data.bin", destination_path=source + ".copy")
+            manager.wipe_cache()
+
+        self.assertEqual([("register", "local_register"), ("create", "local"), ("put_file", "local"),
+                          ("get_file", "local"), ("deregister", "local_register"), ("rmtree", "local"),
+                          ("wipe", "local")], self.operations())
+        self.assertEqual([100, 100], [event.size for event in self.events if event.size is not None])
+
+    @patch("monolithcaching.s3_worker.S3Worker.__init__")
+    def test_s3_delete_directory_parallel(self, mock_init):
+        mock_init.return_value = None
+        test = S3Worker(cache_path="s3://bucket/caches/")
+        test.base_dir = "s3://bucket/caches/one/"
+        test._client = MagicMock()
+        test._client.get_paginator.return_value.paginate.return_value = [
+            {"Contents": [{"Key": "caches/one/a"}]}, {"Contents": [{"Key": "caches/one/b"}]}
+        ]
+        test._client.delete_objects.return_value = {}
+
+        test.delete_directory_parallel()
+        self.assertEqual(["s3_delete_objects", "s3_delete_objects", "s3_list", "s3_list", "s3_list"],
+                         sorted(operation for operation, _ in self.operations()))
+
+
+class TestHooks(TestCase):
+
+    @patch("monolithcaching.instrumentation.prometheus_client", None)
+    def test_prometheus_missing(self):
+        with self.assertRaises(InstrumentationError) as e:
+            PrometheusHook()
+        self.assertEqual("prometheus_client needs to be installed to record events in Prometheus",
+                         str(e.exception))
+
+    @skipIf(instrumentation.prometheus_client is None, "prometheus_client is not installed")
+    def test_prometheus(self):
+        registry = instrumentation.prometheus_client.CollectorRegistry()
+        hook = PrometheusHook(registry=registry)
+        hook(Event(operation="put_bytes", backend="s3", seconds=0.2, size=100))
+        hook(Event(operation="put_bytes", backend="s3", seconds=0.1, size=50, error="ClientError"))
+
+        self.assertEqual(150, registry.get_sample_value(
+            "monolithcaching_bytes_total", {"operation": "put_bytes", "backend": "s3"}))
+        self.assertEqual(1, registry.get_sample_value(
+            "monolithcaching_operation_seconds_count",
+            {"operation": "put_bytes", "backend": "s3", "outcome": "error"}))
+
+    @patch("monolithcaching.instrumentation.otel_metrics", None)
+    def test_open_telemetry_missing(self):
+        with self.assertRaises(InstrumentationError) as e:
+            OpenTelemetryHook()
+        self.assertEqual("opentelemetry-api needs to be installed to record events with OpenTelemetry",
+                         str(e.exception))
+
+    def test_open_telemetry(self):
+        meter = MagicMock()
+        tracer = MagicMock()
+        hook = OpenTelemetryHook(meter=meter, tracer=tracer)
+        hook(Event(operation="wipe", backend="local", seconds=1.5))
+        hook(Event(operation="get_bytes", backend="s3", seconds=0.5, size=10))
+
+        attributes = {"operation": "get_bytes", "backend": "s3", "outcome": "ok"}
+        meter.create_histogram.return_value.record.assert_called_with(0.5, attributes=attributes)
+        meter.create_counter.return_value.add.assert_called_once_with(10, attributes=attributes)
+        self.assertEqual(2, tracer.start_span.call_count)
+        name = tracer.start_span.call_args_list[0][0][0]
+        start_time = tracer.start_span.call_args_list[0][1]["start_time"]
+        end_time = tracer.start_span.return_value.end.call_args_list[0][1]["end_time"]
+        self.assertEqual("monolithcaching.wipe", name)
+        self.assertEqual(1.5 * 1e9, end_time - start_time)
+
+
+if __name__ == "__main__":
+    main()
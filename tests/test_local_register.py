@@ -0,0 +1,115 @@
+import os
+import tempfile
+import threading
+from multiprocessing import Pool
+from unittest import TestCase, main
+
+from mock import patch
+
+from monolithcaching.local_register import LocalRegister, RegisterError
+
+
+def register_many(arguments):
+    root, cache_path, times = arguments
+    register = LocalRegister(root=root)
+    for _ in range(times):
+        register.register_cache(cache_path=cache_path)
+
+
+class TestLocalRegister(TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.test = LocalRegister(root=self.directory.name)
+
+    def tearDown(self) -> None:
+        del self.test
+        self.directory.cleanup()
+
+    def test_register_cache(self):
+        self.assertEqual(None, self.test.get_count(cache_path="test path"))
+        self.assertEqual(1, self.test.register_cache(cache_path="test path"))
+        self.assertEqual(2, self.test.register_cache(cache_path="test path"))
+        self.assertEqual(2, LocalRegister(root=self.directory.name).get_count(cache_path="test path"))
+        self.assertEqual({"test path": 2}, self.test.get_all_records())
+
+    def test_deregister_cache(self):
+        self.test.register_cache(cache_path="test path")
+        self.test.register_cache(cache_path="test path")
+
+        self.assertEqual(1, self.test.deregister_cache(cache_path="test path", locked=False))
+        self.assertEqual(0, self.test.deregister_cache(cache_path="test path", locked=False))
+        self.assertEqual(None, self.test.get_count(cache_path="test path"))
+
+        self.test.register_cache(cache_path="locked path")
+        self.assertEqual(0, self.test.deregister_cache(cache_path="locked path", locked=True))
+        self.assertEqual(0, self.test.get_count(cache_path="locked path"))
+        self.assertEqual(0, self.test.deregister_cache(cache_path="locked path", locked=False))
+        self.assertEqual(None, self.test.get_count(cache_path="locked path"))
+
+        with self.assertRaises(RegisterError) as context:
+            self.test.deregister_cache(cache_path="test path", locked=True)
+        self.assertEqual("cache test path is not in cache register so it cannot be de-registered",
+                         str(context.exception))
+
+    def test_delete_cache(self):
+        self.test.register_cache(cache_path="locked path")
+        self.test.deregister_cache(cache_path="locked path", locked=True)
+        self.test.delete_cache(cache_path="locked path")
+        self.assertEqual(None, self.test.get_count(cache_path="locked path"))
+        self.test.delete_cache(cache_path="missing path")
+
+    def test_claim_cache(self):
+        self.test.register_cache(cache_path="live path")
+        self.assertEqual(False, self.test.claim_cache(cache_path="live path"))
+        self.assertEqual(True, self.test.claim_cache(cache_path="unused path"))
+        self.assertEqual(-1, self.test.get_count(cache_path="unused path"))
+        with self.assertRaises(RegisterError) as context:
+            self.test.register_cache(cache_path="unused path")
+        self.assertEqual("cache unused path is being evicted so it cannot be registered", str(context.exception))
+        self.assertEqual(-1, self.test.get_count(cache_path="unused path"))
+
+        self.test.delete_cache(cache_path="unused path")
+        self.assertEqual(1, self.test.register_cache(cache_path="unused path"))
+
+    def test_connection_per_process(self):
+        other = LocalRegister(root=self.directory.name)
+        self.assertIs(self.test._connection, other._connection)
+        self.assertIs(self.test._lock, other._lock)
+
+        with patch("monolithcaching.local_register.os.getpid", return_value=os.getpid() + 1):
+            child = LocalRegister(root=self.directory.name)
+        self.assertIsNot(self.test._connection, child._connection)
+        self.assertEqual(False, any(key[0] == os.getpid() for key in LocalRegister._connections))
+        self.test._connection.close()
+        child._connection.close()
+        LocalRegister.reset()
+
+        self.test = LocalRegister(root=self.directory.name)
+        self.test.register_cache(cache_path="test path")
+        os.remove(os.path.join(self.directory.name, LocalRegister.FILE_NAME))
+        replaced = LocalRegister(root=self.directory.name)
+        self.assertIsNot(self.test._connection, replaced._connection)
+        self.assertEqual(None, replaced.get_count(cache_path="test path"))
+
+    def test_register_cache_across_threads(self):
+        def register_many():
+            register = LocalRegister(root=self.directory.name)
+            for _ in range(50):
+                register.register_cache(cache_path="test path")
+
+        threads = [threading.Thread(target=register_many) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(200, self.test.get_count(cache_path="test path"))
+
+    def test_register_cache_across_processes(self):
+        with Pool(4) as pool:
+            pool.map(register_many, [(self.directory.name, "test path", 25)] * 4)
+        self.assertEqual(100, self.test.get_count(cache_path="test path"))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,23 @@
 """
 performs unit tests on the CacheManager object. Use: self.test = CacheManager() to ensure memory safety
 """
+import gc
+import io
+import os
+import tempfile
 from unittest import TestCase, main
 from mock import patch, MagicMock, PropertyMock
 
-from monolithcaching import CacheManager, CacheManagerError, S3Worker, Worker
+from monolithcaching import CacheManager, CacheManagerError, MemoryWorker, S3Worker, TieredWorker, Worker
+from monolithcaching.errors import WorkerCacheError
 
 
 class TestCacheManager(TestCase):
 
     @patch("monolithcaching.RootDirectory")
     def setUp(self, mock_directory):
+        # managers left in reference cycles by earlier tests would otherwise flush into the patches of a test
+        gc.collect()
         self.test = CacheManager(host="localhost", port=6379)
         self.s3_test = CacheManager(host="localhost", port=6379, s3=True, s3_cache_path="/test/cache/path/")
         self.mock_directory = mock_directory
@@ -19,6 +26,16 @@ class TestCacheManager(TestCase):
         self.test.worker = MagicMock()
         self.s3_test.worker = MagicMock()
 
+    @patch("monolithcaching.RedisConnectionPools")
+    def test___init___connection_pool(self, mock_pools):
+        CacheManager(host="localhost", port=6379, max_connections=20, health_check_interval=5)
+        mock_pools.get.assert_called_once_with(host="localhost", port=6379, max_connections=20,
+                                               health_check_interval=5)
+        mock_pools.reset_mock()
+
+        CacheManager()
+        self.assertEqual(0, len(mock_pools.get.call_args_list))
+
     def test___init__(self):
         self.assertEqual(None, self.test.worker)
         self.assertEqual(False, self.test.s3)
@@ -28,46 +45,155 @@ class TestCacheManager(TestCase):
         self.assertEqual(True, self.s3_test.s3)
         self.assertEqual("/test/cache/path/", self.s3_test.s3_cache_path)
 
+    def test___init___backend(self):
+        self.assertEqual("local", self.test.backend)
+        self.assertEqual("s3", self.s3_test.backend)
+        self.assertEqual("tiered", CacheManager(s3=True, s3_cache_path="/path/", tiered=True).backend)
+        self.assertEqual("memory", CacheManager(backend="memory").backend)
+
     @patch("monolithcaching.CacheManager.meta", new_callable=PropertyMock)
-    @patch("monolithcaching.CacheManager._create_meta")
-    @patch("monolithcaching.S3Worker")
-    @patch("monolithcaching.Worker")
-    def test_create_cache(self, mock_worker, mock_s3, mock_create_meta, mock_meta):
+    @patch("monolithcaching.get_backend")
+    def test_create_cache(self, mock_get_backend, mock_meta):
         mock_meta.return_value = {}
-        path = self.mock_directory.return_value.path
+        mock_from_manager = mock_get_backend.return_value.from_manager
 
         self.test.create_cache()
-        self.assertEqual(mock_worker.return_value, self.test.worker)
-        mock_worker.assert_called_once_with(host="localhost", port=6379, existing_cache=None, local_cache=path)
-        mock_worker.reset_mock()
-        mock_create_meta.assert_called_once_with()
-
-        self.test.create_cache(existing_cache="test cache")
-        self.assertEqual(mock_worker.return_value, self.test.worker)
-        mock_worker.assert_called_once_with(host="localhost", port=6379, existing_cache="test cache", local_cache=path)
-        mock_create_meta.assert_called_once_with()
-        mock_worker.reset_mock()
+        self.assertEqual(mock_from_manager.return_value, self.test.worker)
+        mock_get_backend.assert_called_once_with(name="local")
+        mock_from_manager.assert_called_once_with(manager=self.test, existing_cache=None)
+        self.assertEqual({}, self.test._meta)
+        self.assertEqual(0, len(mock_meta.call_args_list))
+        mock_from_manager.reset_mock()
 
-        mock_meta.return_value = {"locked": False}
         self.test.create_cache(existing_cache="test cache")
-        self.assertEqual(mock_worker.return_value, self.test.worker)
-        mock_worker.assert_called_once_with(host="localhost", port=6379, existing_cache="test cache", local_cache=path)
-        mock_create_meta.assert_called_once_with()
-        mock_worker.reset_mock()
+        mock_from_manager.assert_called_once_with(manager=self.test, existing_cache="test cache")
+        self.assertEqual(None, self.test._meta)
+        self.assertEqual(0, len(mock_from_manager.return_value.lock.call_args_list))
+        mock_from_manager.reset_mock()
 
         mock_meta.return_value = {"locked": True}
         self.test.create_cache(existing_cache="test cache")
-        self.assertEqual(mock_worker.return_value, self.test.worker)
-        mock_worker.assert_called_once_with(host="localhost", port=6379, existing_cache="test cache", local_cache=path)
-        mock_create_meta.assert_called_once_with()
-        mock_worker.return_value.lock.assert_called_once_with()
-        mock_create_meta.reset_mock()
-        mock_worker.reset_mock()
+        mock_from_manager.return_value.lock.assert_called_once_with()
+        mock_get_backend.reset_mock()
 
         self.s3_test.create_cache()
-        self.assertEqual(mock_s3.return_value, self.s3_test.worker)
-        mock_s3.assert_called_once_with(cache_path="/test/cache/path/", existing_cache=None)
-        self.assertEqual(0, len(mock_create_meta.call_args_list))
+        self.assertEqual(mock_from_manager.return_value, self.s3_test.worker)
+        mock_get_backend.assert_called_once_with(name="s3")
+
+    def test_create_cache_unknown_backend(self):
+        test = CacheManager(backend="not a backend")
+        with self.assertRaises(CacheManagerError) as e:
+            test.create_cache()
+        self.assertIn("backend not a backend is not one of the registered backends", str(e.exception))
+
+    def test_create_cache_memory(self):
+        test = CacheManager(backend="memory")
+        test.create_cache()
+        self.assertIsInstance(test.worker, MemoryWorker)
+        test.insert_meta(key="one", value=1)
+        test.lock_cache()
+        path = test.cache_path
+
+        other = CacheManager(backend="memory")
+        other.create_cache(existing_cache=path)
+        self.assertEqual({"one": 1, "locked": True}, other.meta)
+        self.assertEqual(True, other.worker.locked)
+        other.unlock_cache()
+        other.wipe_cache()
+        test.wipe_cache()
+
+        with self.assertRaises(WorkerCacheError):
+            other.create_cache(existing_cache=path)
+
+    @patch("monolithcaching.s3_worker.boto3")
+    def test_create_cache_s3_attach(self, mock_boto3):
+        objects = {}
+        requests = []
+
+        def _put(key, Body):
+            requests.append(("PUT", key[1]))
+            objects[key] = Body
+
+        def _get(key):
+            requests.append(("GET", key[1]))
+            return {"Body": io.BytesIO(objects[key])}
+
+        def _object(bucket, key):
+            s3_object = MagicMock()
+            s3_object.put.side_effect = lambda Body: _put((bucket, key), Body)
+            s3_object.get.side_effect = lambda: _get((bucket, key))
+            return s3_object
+
+        mock_boto3.resource.return_value.Object.side_effect = _object
+        test = CacheManager(s3=True, s3_cache_path="s3://bucket/caches/")
+        test.create_cache()
+        test.lock_cache()
+        meta_key = "caches/{}/meta.json".format(test.worker.id)
+        self.assertEqual([("PUT", meta_key), ("PUT", meta_key)], requests)
+
+        other = CacheManager(s3=True, s3_cache_path="s3://bucket/caches/")
+        other.create_cache(existing_cache=test.cache_path)
+        self.assertEqual(test.cache_path, other.cache_path)
+        self.assertEqual(("GET", meta_key), requests[-1])
+        self.assertEqual({"locked": True}, other.meta)
+
+    @patch("monolithcaching.CacheManager.evict_caches")
+    @patch("monolithcaching.get_backend")
+    def test_create_cache_evicts(self, mock_get_backend, mock_evict_caches):
+        self.test.create_cache()
+        self.assertEqual(0, len(mock_evict_caches.call_args_list))
+
+        self.test.max_root_caches = 10
+        self.test.create_cache()
+        mock_evict_caches.assert_called_once_with()
+
+    @patch("monolithcaching.CacheRoot")
+    def test_evict_caches(self, mock_cache_root):
+        self.test.max_root_bytes = 100
+        self.test.eviction_policy = "lfu"
+        outcome = self.test.evict_caches(ttl=5)
+
+        self.assertEqual(mock_cache_root.return_value.evict.return_value, outcome)
+        mock_cache_root.assert_called_once_with(path=self.test.local_cache_path, port=6379, host="localhost",
+                                                index=None, local_register=False)
+        mock_cache_root.return_value.evict.assert_called_once_with(max_bytes=100, max_count=None, policy="lfu",
+                                                                   ttl=5)
+
+    def test_evict_caches_live_managers(self):
+        with tempfile.TemporaryDirectory() as directory:
+            first = CacheManager(local_cache_path=directory, local_register=True)
+            first.create_cache()
+            second = CacheManager(local_cache_path=directory, local_register=True)
+            second.create_cache()
+            evicting = CacheManager(local_cache_path=directory, local_register=True, max_root_caches=0)
+            evicting.create_cache()
+
+            self.assertEqual(True, os.path.isdir(first.cache_path))
+            self.assertEqual(True, os.path.isdir(second.cache_path))
+            first.insert_meta(key="still", value="usable")
+            first.flush()
+            self.assertEqual("usable", first.meta["still"])
+            first.wipe_cache()
+            second.wipe_cache()
+            evicting.wipe_cache()
+
+        with self.assertRaises(CacheManagerError) as e:
+            CacheManager(local_cache_path="/tmp", max_root_caches=0)
+        self.assertEqual("max_root_bytes and max_root_caches need Redis or local_register to tell which caches "
+                         "are in use", str(e.exception))
+
+    @patch("monolithcaching.CacheManager.meta", new_callable=PropertyMock)
+    @patch("monolithcaching.tiered_worker.TieredWorker.__init__")
+    def test_create_cache_tiered(self, mock_tiered, mock_meta):
+        mock_tiered.return_value = None
+        mock_meta.return_value = {}
+        test = CacheManager(s3=True, s3_cache_path="/test/cache/path/", tiered=True, max_local_bytes=100)
+        test.create_cache(existing_cache="test cache")
+        self.assertIsInstance(test.worker, TieredWorker)
+        mock_tiered.assert_called_once_with(cache_path="/test/cache/path/", existing_cache="test cache",
+                                            local_cache=test.local_cache_path, max_local_bytes=100, port=None,
+                                            host=None)
+        test.worker = None
 
     @patch("monolithcaching.CacheManager.insert_meta")
     def test_lock_cache(self, mock_insert_meta):
@@ -83,37 +209,138 @@ class TestCacheManager(TestCase):
 
         mock_insert_meta.assert_called_once_with(key="locked", value=True)
 
+    @patch("monolithcaching.time")
+    def test_set_ttl(self, mock_time):
+        mock_time.time.return_value = 1000.0
+        self.test.worker = MagicMock()
+        self.test.update_meta = MagicMock()
+        self.test.flush = MagicMock()
+
+        self.test.set_ttl(ttl=60)
+        self.test.update_meta.assert_called_once_with(data={"ttl": 60, "expires": 1060.0})
+        self.test.flush.assert_called_once_with()
+
+        self.test.set_ttl = MagicMock()
+        self.test.lock_cache(ttl=30)
+        self.test.set_ttl.assert_called_once_with(ttl=30)
+
+        self.test.worker = None
+        with self.assertRaises(CacheManagerError) as e:
+            CacheManager(local_cache_path=self.test.local_cache_path).set_ttl(ttl=60)
+        self.assertEqual("you are trying to set the ttl of a cache when no cache is made", str(e.exception))
+
+    @patch("monolithcaching.Reaper")
+    def test_reap_caches(self, mock_reaper):
+        outcome = self.s3_test.reap_caches(force=True)
+
+        self.assertEqual(mock_reaper.return_value.reap.return_value, outcome)
+        mock_reaper.assert_called_once_with(local_cache_path=self.s3_test.local_cache_path,
+                                            s3_cache_path=self.s3_test.s3_cache_path, port=self.s3_test.port,
+                                            host=self.s3_test.host, index=None, local_register=False, force=True)
+
+    def test_prefetch(self):
+        self.s3_test.worker = MagicMock()
+        outcome = self.s3_test.prefetch(pattern="*.parquet", max_workers=4)
+        self.assertEqual(self.s3_test.worker.prefetch.return_value, outcome)
+        self.s3_test.worker.prefetch.assert_called_once_with(pattern="*.parquet", keys=None, max_workers=4)
+
+        self.s3_test.worker = MagicMock(spec=S3Worker)
+        with self.assertRaises(CacheManagerError) as e:
+            self.s3_test.prefetch()
+        self.assertEqual("prefetching needs the tiered backend, not s3", str(e.exception))
+
+        self.s3_test.worker = None
+        with self.assertRaises(CacheManagerError) as e:
+            self.s3_test.prefetch()
+        self.assertEqual("you are trying to prefetch a cache when no cache is made", str(e.exception))
+
+    def test_unlock_cache(self):
+        self.s3_test.worker = MagicMock(spec=S3Worker)
+        self.s3_test.insert_meta = MagicMock()
+        self.s3_test.flush = MagicMock()
+        self.s3_test.unlock_cache()
+        self.s3_test.worker.unlock.assert_called_once_with()
+        self.s3_test.insert_meta.assert_called_once_with(key="locked", value=False)
+        self.s3_test.flush.assert_called_once_with()
+
     def test_wipe_cache(self):
         self.test.worker = "testing"
         self.test.s3 = True
         self.test.wipe_cache()
         self.assertEqual(None, self.test.worker)
 
-    @patch("monolithcaching.json")
-    @patch("monolithcaching.open")
-    def test_insert_meta(self, mock_open, mock_json):
+    @patch("monolithcaching.CacheManager.flush")
+    @patch("monolithcaching.CacheManager._load_meta")
+    def test_insert_meta(self, mock_load_meta, mock_flush):
+        mock_load_meta.return_value = {"one": 1}
         self.test.worker = MagicMock(spec=Worker)
         self.test.worker.base_dir = "some/base/dir/"
-        mock_json.load.return_value = {"one": 1}
 
         self.test.insert_meta(key="test key", value="test value")
-        mock_json.load.assert_called_once_with(mock_open.return_value.__enter__.return_value)
-        mock_json.dump.assert_called_once_with({'one': 1, 'test key': 'test value'},
-                                               mock_open.return_value.__enter__.return_value)
+        self.assertEqual({"one": 1, "test key": "test value"}, mock_load_meta.return_value)
+        mock_flush.assert_called_once_with()
+        mock_flush.reset_mock()
+
+        self.test._pending_meta_writes = 0
+        self.test.meta_batch_size = 3
+        self.test.insert_meta(key="two", value=2)
+        self.test.insert_meta(key="three", value=3)
+        self.assertEqual(0, len(mock_flush.call_args_list))
+        self.assertEqual(2, self.test._pending_meta_writes)
+        self.test.insert_meta(key="four", value=4)
+        mock_flush.assert_called_once_with()
+        mock_flush.reset_mock()
+
+        self.test._pending_meta_writes = 0
+        self.test.meta_flush_interval = 0
+        self.test.insert_meta(key="five", value=5)
+        mock_flush.assert_called_once_with()
 
-        self.s3_test.worker = MagicMock(spec=S3Worker)
-        self.s3_test.worker.base_dir = "some/base/dir/"
-        self.s3_test.insert_meta(key="test key", value="test value")
-        self.s3_test.worker.insert_meta.assert_called_once_with(key="test key", value="test value")
 
-    @patch("monolithcaching.json")
-    @patch("monolithcaching.open")
-    def test___create_meta(self, mock_open, mock_json):
+    @patch("monolithcaching.CacheManager.flush")
+    @patch("monolithcaching.CacheManager._load_meta")
+    def test_update_meta(self, mock_load_meta, mock_flush):
+        mock_load_meta.return_value = {"one": 1}
         self.test.worker = MagicMock(spec=Worker)
-        self.test.worker.base_dir = "some/dir/"
-        self.test._create_meta()
-        mock_open.assert_called_once_with(self.test.worker.base_dir + "meta.json", "w")
-        mock_json.dump.assert_called_once_with({}, mock_open.return_value.__enter__.return_value)
+        self.test.meta_batch_size = 2
+
+        self.test.update_meta(data={"two": 2, "three": 3})
+        self.assertEqual({"one": 1, "two": 2, "three": 3}, mock_load_meta.return_value)
+        mock_load_meta.assert_called_once_with()
+        self.assertEqual(1, self.test._pending_meta_writes)
+        self.assertEqual(0, len(mock_flush.call_args_list))
+
+        self.test.meta_batch_size = 1
+        self.test.update_meta(data={"four": 4}, hold=True)
+        self.assertEqual(4, mock_load_meta.return_value["four"])
+        self.assertEqual(1, self.test._pending_meta_writes)
+        self.assertEqual(True, self.test._meta_held)
+        self.assertEqual(0, len(mock_flush.call_args_list))
+
+        self.test.worker = None
+        with self.assertRaises(CacheManagerError) as e:
+            self.test.update_meta(data={"two": 2})
+        self.assertEqual("you are trying to insert meta data when no cache is made", str(e.exception))
+
+    def test__load_meta(self):
+        self.test.worker = MagicMock(spec=Worker)
+        self.test.worker.read_meta.return_value = {"one": 1}
+
+        self.assertEqual({"one": 1}, self.test._load_meta())
+        self.assertEqual({"one": 1}, self.test._load_meta())
+        self.test.worker.read_meta.assert_called_once_with()
+
+    def test_flush(self):
+        self.test.worker = MagicMock(spec=Worker)
+        self.test._meta = {"one": 1}
+
+        self.test.flush()
+        self.assertEqual(0, len(self.test.worker.write_meta.call_args_list))
+
+        self.test._pending_meta_writes = 2
+        self.test.flush()
+        self.test.worker.write_meta.assert_called_once_with(data={"one": 1})
+        self.assertEqual(0, self.test._pending_meta_writes)
 
     def test_cache_path(self):
         self.assertEqual(None, self.test.cache_path)
@@ -122,14 +349,39 @@ class TestCacheManager(TestCase):
         self.test.worker.base_dir = "test dir"
         self.assertEqual("test dir", self.test.cache_path)
 
-    @patch("monolithcaching.json")
-    @patch("monolithcaching.open")
-    def test_meta(self, mock_open, mock_json):
+    @patch("monolithcaching.CacheManager._load_meta")
+    def test_meta(self, mock_load_meta):
+        mock_load_meta.return_value = {"one": 1}
         self.test.worker = MagicMock(spec=Worker)
-        self.assertEqual(self.test.meta, mock_json.load.return_value)
 
-        mock_open.assert_called_once_with(self.test.worker.base_dir + "meta.json")
-        mock_json.load.assert_called_once_with(mock_open.return_value.__enter__.return_value)
+        outcome = self.test.meta
+        self.assertEqual({"one": 1}, outcome)
+        outcome["two"] = 2
+        self.assertEqual({"one": 1}, mock_load_meta.return_value)
+
+    @patch("monolithcaching.CacheManager.flush")
+    def test_refresh_meta(self, mock_flush):
+        with self.assertRaises(CacheManagerError) as e:
+            self.test.refresh_meta()
+        self.assertEqual("worker is not present for meta data", str(e.exception))
+
+        self.test.worker = MagicMock(spec=Worker)
+        self.test._meta = {"one": 1}
+        self.test.worker.read_meta.return_value = {"one": 1, "two": 2}
+
+        self.assertEqual({"one": 1, "two": 2}, self.test.refresh_meta())
+        mock_flush.assert_called_once_with()
+        self.test.worker.read_meta.assert_called_once_with()
+        self.assertEqual({"one": 1, "two": 2}, self.test.meta)
+
+    @patch("monolithcaching.CacheManager.flush")
+    def test_wipe_cache_flushes_meta(self, mock_flush):
+        self.test.worker = MagicMock(spec=Worker)
+        self.test._meta = {"one": 1}
+        self.test.wipe_cache()
+        mock_flush.assert_called_once_with()
+        self.assertEqual(None, self.test._meta)
+        self.assertEqual(None, self.test.worker)
 
     @patch("monolithcaching.CacheManager.wipe_cache")
     @patch("monolithcaching.CacheManager.create_cache")
@@ -0,0 +1,190 @@
+import hashlib
+import os
+import tempfile
+from unittest import TestCase, main
+from mock import MagicMock
+
+from monolithcaching import CacheManager
+from monolithcaching.compression import CompressedBackend
+from monolithcaching.errors import CacheManagerError
+from monolithcaching.manifest import Manifest, ManifestBackend, ManifestEntry
+from monolithcaching.memory_worker import MemoryWorker
+from monolithcaching.worker import Worker
+
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class TestManifest(TestCase):
+
+    def test_dumps_loads(self):
+        test = Manifest()
+        test.record(key="one", entry=ManifestEntry(size=3, modified=1.0, checksum="abc"))
+        self.assertEqual(True, test.changed)
+
+        loaded = Manifest.loads(data=test.dumps())
+        self.assertEqual(ManifestEntry(size=3, modified=1.0, checksum="abc"), loaded.get(key="one"))
+        self.assertEqual(False, loaded.changed)
+        self.assertEqual(None, loaded.get(key="two"))
+        self.assertEqual(["one"], list(loaded))
+
+    def test_merge(self):
+        stored = Manifest(entries={"theirs": ManifestEntry(size=1, modified=1.0, checksum="a"),
+                                   "removed": ManifestEntry(size=2, modified=1.0, checksum="b")})
+        test = Manifest(entries={"removed": ManifestEntry(size=2, modified=1.0, checksum="b")})
+        test.record(key="ours", entry=ManifestEntry(size=3, modified=2.0, checksum="c"))
+        test.remove(key="removed")
+
+        test.merge(stored=stored)
+        self.assertEqual(["ours", "theirs"], sorted(test))
+        self.assertEqual(False, test.changed)
+        self.assertEqual(False, "removed" in test)
+
+
+class TestManifestBackend(TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.worker = Worker(port=None, host=None, local_cache=self.directory.name)
+        self.test = ManifestBackend(backend=self.worker)
+
+    def tearDown(self) -> None:
+        del self.test
+        del self.worker
+        self.directory.cleanup()
+
+    def test_files(self):
+        self.test.put_bytes(key="bytes.bin", data=b"bytes")
+        with self.test.open_write(key="stream.bin") as file:
+            file.write(b"str")
+            file.write(b"eam")
+        source = os.path.join(self.directory.name, "source.bin")
+        with open(source, "wb") as file:
+            file.write(b"file")
+        self.test.put_file(key="file.bin", source_path=source)
+
+        self.assertEqual((5, _sha256(b"bytes")), self.test.manifest.get(key="bytes.bin")[::2])
+        self.assertEqual((6, _sha256(b"stream")), self.test.manifest.get(key="stream.bin")[::2])
+        self.assertEqual((4, _sha256(b"file")), self.test.manifest.get(key="file.bin")[::2])
+        self.assertEqual(b"stream", self.test.get_bytes(key="stream.bin"))
+        self.assertEqual(False, self.worker.check_file(file=Manifest.FILE_NAME))
+
+        self.test.delete_file(key="bytes.bin")
+        self.assertEqual(False, "bytes.bin" in self.test.manifest)
+
+        with self.assertRaises(ValueError):
+            with self.test.open_write(key="failed.bin") as file:
+                file.write(b"partial")
+                raise ValueError("failed")
+        self.assertEqual(False, "failed.bin" in self.test.manifest)
+
+    def test_put_file_delegates(self):
+        source = os.path.join(self.directory.name, "source.bin")
+        with open(source, "wb") as file:
+            file.write(b"file")
+        self.assertEqual(0, len(self.test.manifest))
+        self.test.backend = MagicMock()
+        self.test.put_file(key="file.bin", source_path=source)
+
+        self.test.backend.put_file.assert_called_once_with(key="file.bin", source_path=source)
+        self.test.backend.open_write.assert_not_called()
+        self.assertEqual((4, _sha256(b"file")), self.test.manifest.get(key="file.bin")[::2])
+
+    def test_check_file(self):
+        self.test.put_bytes(key="one", data=b"1")
+        self.test.backend = MagicMock()
+        self.test.backend.check_file.return_value = False
+
+        self.assertEqual(True, self.test.check_file(file="one"))
+        self.test.backend.check_file.assert_not_called()
+        self.assertEqual(False, self.test.check_file(file="two"))
+        self.test.backend.check_file.assert_called_once_with(file="two")
+
+    def test_save_manifest(self):
+        self.test.put_bytes(key="one", data=b"1")
+        other = ManifestBackend(backend=self.worker)
+        other.put_bytes(key="two", data=b"2")
+        other.save_manifest()
+
+        self.test.save_manifest()
+        self.assertEqual(["one", "two"], sorted(self.test.manifest))
+        self.assertEqual(["one", "two"], sorted(ManifestBackend(backend=self.worker).manifest))
+
+        self.test.backend = MagicMock()
+        self.test.save_manifest()
+        self.test.backend.put_bytes.assert_not_called()
+
+    def test_blobs(self):
+        source = os.path.join(self.directory.name, "source.bin")
+        with open(source, "wb") as file:
+            file.write(b"blob")
+        digest = self.test.put_blob(key="one.bin", source_path=source)
+        self.test.link_blob(key="two.bin", digest=digest)
+
+        self.assertEqual(_sha256(b"blob"), digest)
+        self.assertEqual((4, digest), self.test.manifest.get(key="one.bin")[::2])
+        self.assertEqual((4, digest), self.test.manifest.get(key="two.bin")[::2])
+
+    def test_verify(self):
+        for index in range(10):
+            self.test.put_bytes(key="file-{}".format(index), data=str(index).encode())
+        os.remove(self.worker.base_dir + "file-3")
+        with open(self.worker.base_dir + "file-5", "wb") as file:
+            file.write(b"changed")
+
+        stats = self.test.verify(max_workers=4)
+        self.assertEqual(8, stats.verified)
+        self.assertEqual(["file-3"], stats.missing)
+        self.assertEqual(["file-5"], stats.mismatched)
+
+    def test_delete_directory(self):
+        self.test.put_bytes(key="one", data=b"1")
+        self.test.delete_directory()
+        self.assertEqual(0, len(self.test.manifest))
+
+
+class TestManifestManager(TestCase):
+
+    def test_memory(self):
+        manager = CacheManager(backend="memory", manifest=True, compression="gzip", compression_threshold=0)
+        manager.create_cache()
+        manager.worker.put_bytes(key="data.bin", data=b"data")
+
+        self.assertIsInstance(manager.worker, ManifestBackend)
+        self.assertIsInstance(manager.worker.backend, CompressedBackend)
+        self.assertIsInstance(manager.worker.backend.backend, MemoryWorker)
+        self.assertEqual(_sha256(b"data"), manager.manifest.get(key="data.bin").checksum)
+        self.assertEqual(1, manager.verify().verified)
+        manager.wipe_cache()
+
+    def test_local(self):
+        with tempfile.TemporaryDirectory() as directory:
+            manager = CacheManager(local_cache_path=directory, manifest=True)
+            manager.create_cache()
+            manager.lock_cache()
+            manager.worker.put_bytes(key="data.bin", data=b"data")
+            manager.flush()
+            path = manager.cache_path
+
+            attached = CacheManager(local_cache_path=directory, manifest=True)
+            attached.create_cache(existing_cache=path)
+            self.assertEqual(4, attached.manifest.get(key="data.bin").size)
+            manager.unlock_cache()
+            manager.wipe_cache()
+
+    def test_disabled(self):
+        manager = CacheManager(backend="memory")
+        manager.create_cache()
+        with self.assertRaises(CacheManagerError) as e:
+            manager.manifest
+        self.assertEqual("the manifest needs a cache made by a manager with manifest set to True",
+                         str(e.exception))
+        with self.assertRaises(CacheManagerError) as e:
+            manager.verify()
+        self.assertEqual("verifying needs a cache made by a manager with manifest set to True", str(e.exception))
+        manager.wipe_cache()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+import json
+import tempfile
+import time
+from unittest import TestCase, main, skipIf
+from mock import patch
+
+from monolithcaching import CacheManager, CacheManagerError, cached, stable_hash
+from monolithcaching.memoize import HASHERS, np, pd, register_hasher
+
+
+class TestStableHash(TestCase):
+
+    def test_stable_hash(self):
+        self.assertEqual(stable_hash({"one": 1, "two": [2, 2.0]}), stable_hash({"two": [2, 2.0], "one": 1}))
+        self.assertEqual(stable_hash({1, 2, 3}), stable_hash({3, 2, 1}))
+        self.assertNotEqual(stable_hash(1), stable_hash(1.0))
+        self.assertNotEqual(stable_hash(1), stable_hash(True))
+        self.assertNotEqual(stable_hash("one"), stable_hash(b"one"))
+        self.assertNotEqual(stable_hash(["ab", "c"]), stable_hash(["a", "bc"]))
+        self.assertNotEqual(stable_hash((1, 2)), stable_hash([1, 2]))
+        self.assertEqual(40, len(stable_hash(None)))
+
+    def test_register_hasher(self):
+        class Point:
+            def __init__(self, x):
+                self.x = x
+                self.cache = object()
+
+        @register_hasher(Point)
+        def _hash_point(digest, value):
+            digest.update(str(value.x).encode("UTF-8"))
+
+        self.assertEqual(stable_hash(Point(x=1)), stable_hash(Point(x=1)))
+        self.assertNotEqual(stable_hash(Point(x=1)), stable_hash(Point(x=2)))
+        del HASHERS[Point]
+
+    @skipIf(np is None, "numpy is not installed")
+    def test_numpy(self):
+        array = np.arange(12).reshape(3, 4)
+        self.assertEqual(stable_hash(array), stable_hash(array.copy()))
+        self.assertEqual(stable_hash(array), stable_hash(np.asfortranarray(array)))
+        self.assertNotEqual(stable_hash(array), stable_hash(array.reshape(4, 3)))
+        self.assertNotEqual(stable_hash(array), stable_hash(array.astype(np.int32)))
+        self.assertEqual(stable_hash(np.float64(1.5)), stable_hash(np.float64(1.5)))
+
+    @skipIf(pd is None, "pandas is not installed")
+    def test_pandas(self):
+        frame = pd.DataFrame({"one": [1, 2], "two": ["a", "b"]})
+        self.assertEqual(stable_hash(frame), stable_hash(frame.copy()))
+        self.assertNotEqual(stable_hash(frame), stable_hash(frame.rename(columns={"one": "three"})))
+        self.assertNotEqual(stable_hash(frame), stable_hash(frame.astype({"one": "float64"})))
+        self.assertNotEqual(stable_hash(frame["one"]), stable_hash(frame["one"].rename("three")))
+
+
+class TestCached(TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.manager = CacheManager(local_cache_path=self.directory.name)
+        self.manager.create_cache()
+        self.calls = []
+
+    def tearDown(self) -> None:
+        self.manager.wipe_cache()
+        self.directory.cleanup()
+
+    def _function(self, **kwargs):
+        @cached(self.manager, name="multiply", **kwargs)
+        def multiply(x, y=2):
+            self.calls.append(x)
+            return x * y
+
+        return multiply
+
+    def _entries(self):
+        return dict(json.loads(self.manager.worker.get_bytes(key="memo/multiply/entries.json")))
+
+    def test_cached(self):
+        multiply = self._function()
+        self.assertEqual(4, multiply(2))
+        self.assertEqual(4, multiply(2))
+        self.assertEqual(4, multiply(x=2))
+        self.assertEqual(6, multiply(2, y=3))
+        self.assertEqual([2, 2, 2], self.calls)
+        self.assertEqual("multiply", multiply.__name__)
+
+        stats = self.manager.meta["memo"]["multiply"]
+        self.assertEqual(1, stats["hits"])
+        self.assertEqual(3, stats["misses"])
+        self.assertEqual({"hits": 1, "misses": 3}, stats)
+        self.assertEqual(3, len(self._entries()))
+        self.assertEqual(True, self.manager.worker.check_file(
+            file="memo/multiply/{}.pkl".format(stable_hash(((2,), {})))))
+
+    def test_cached_hit_reads_once(self):
+        multiply = self._function()
+        multiply(2)
+        with patch.object(self.manager.worker, "check_file", side_effect=AssertionError("checked")):
+            self.assertEqual(4, multiply(2))
+        self.assertEqual(0, self.manager.worker.read_meta()["memo"]["multiply"]["hits"])
+
+        self.manager.flush()
+        self.assertEqual(1, self.manager.worker.read_meta()["memo"]["multiply"]["hits"])
+
+    def test_cached_missing_result(self):
+        multiply = self._function()
+        multiply(2)
+        self.manager.worker.delete_file(key="memo/multiply/{}.pkl".format(stable_hash(((2,), {}))))
+        self.assertEqual(4, multiply(2))
+        self.assertEqual([2, 2], self.calls)
+
+        with patch.object(self.manager.worker, "get_bytes", side_effect=PermissionError("denied")):
+            with self.assertRaises(PermissionError):
+                multiply(2)
+
+    def test_cached_legacy_entries(self):
+        self._function()(2)
+        digest = stable_hash(((2,), {}))
+        self.manager.update_meta(data={"memo": {"multiply": {"hits": 0, "misses": 1,
+                                                             "entries": {digest: self._entries()[digest]}}}})
+        self.manager.worker.delete_file(key="memo/multiply/entries.json")
+
+        multiply = self._function()
+        self.assertEqual(4, multiply(2))
+        self.assertEqual([2], self.calls)
+        self.assertEqual({"hits": 1, "misses": 1}, self.manager.meta["memo"]["multiply"])
+
+    def test_cached_key(self):
+        multiply = self._function(key=lambda x, y=2: x)
+        self.assertEqual(4, multiply(2))
+        self.assertEqual(4, multiply(2, y=3))
+        self.assertEqual([2], self.calls)
+
+    def test_cached_shared_between_managers(self):
+        self.manager.lock_cache()
+        self._function()(2)
+        other = CacheManager(local_cache_path=self.directory.name)
+        other.create_cache(existing_cache=self.manager.cache_path)
+
+        @cached(other, name="multiply")
+        def multiply(x, y=2):
+            raise ValueError("not cached")
+
+        self.assertEqual(4, multiply(2))
+        self.manager.unlock_cache()
+
+    @patch("monolithcaching.memoize.time")
+    def test_cached_ttl(self, mock_time):
+        mock_time.time.return_value = 100.0
+        multiply = self._function(ttl=10)
+        multiply(2)
+        mock_time.time.return_value = 109.0
+        multiply(2)
+        mock_time.time.return_value = 111.0
+        multiply(2)
+        self.assertEqual([2, 2], self.calls)
+        self.assertEqual(111.0, self._entries()[stable_hash(((2,), {}))]["created"])
+
+    def test_cached_max_entries(self):
+        multiply = self._function(max_entries=2)
+        multiply(1)
+        multiply(2)
+        multiply(1)
+        multiply(3)
+        multiply(1)
+        multiply(2)
+        self.assertEqual([1, 2, 3, 2], self.calls)
+        self.assertEqual(2, len(self._entries()))
+        self.assertEqual(False, self.manager.worker.check_file(
+            file="memo/multiply/{}.pkl".format(stable_hash(((3,), {})))))
+
+    def test_cached_max_bytes(self):
+        multiply = self._function(max_bytes=1)
+        multiply(1)
+        multiply(2)
+        self.assertEqual([stable_hash(((2,), {}))], list(self._entries()))
+
+    def test_cached_memory_backend(self):
+        manager = CacheManager(backend="memory", meta_batch_size=10)
+        manager.create_cache()
+
+        @cached(manager)
+        def add(x):
+            self.calls.append(x)
+            return x + 1
+
+        self.assertEqual(2, add(1))
+        self.assertEqual(2, add(1))
+        self.assertEqual([1], self.calls)
+        self.assertEqual(1, manager._pending_meta_writes)
+        manager.flush()
+        self.assertEqual(1, manager.worker.read_meta()["memo"][add.__module__ + "." + add.__qualname__]["hits"])
+        manager.wipe_cache()
+
+        with self.assertRaises(CacheManagerError) as e:
+            add(1)
+        self.assertEqual("you are trying to call the cached function {}.{} when no cache is made".format(
+            __name__, add.__qualname__), str(e.exception))
+
+
+if __name__ == "__main__":
+    main()
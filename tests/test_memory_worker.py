@@ -0,0 +1,81 @@
+import os
+import tempfile
+from unittest import TestCase, main
+
+from monolithcaching.errors import WorkerCacheError
+from monolithcaching.memory_worker import MemoryWorker
+
+
+class TestMemoryWorker(TestCase):
+
+    def setUp(self) -> None:
+        self.test = MemoryWorker()
+
+    def tearDown(self) -> None:
+        self.test.unlock()
+        del self.test
+
+    def test___init__(self):
+        self.assertEqual("memory://{}/".format(self.test.id), self.test.base_dir)
+        self.assertEqual({}, self.test.read_meta())
+
+        attached = MemoryWorker(existing_cache=self.test.base_dir)
+        self.assertEqual(self.test.id, attached.id)
+
+        with self.assertRaises(WorkerCacheError) as e:
+            MemoryWorker(existing_cache="memory://missing/")
+        self.assertEqual("cache 'memory://missing/' was supplied as an existing cache but does not exist",
+                         str(e.exception))
+
+    def test_meta(self):
+        self.test.update_meta(data={"one": {"two": 2}})
+        meta = self.test.read_meta()
+        meta["one"]["two"] = 3
+        self.assertEqual({"one": {"two": 2}}, self.test.read_meta())
+
+    def test_files(self):
+        self.test.put_bytes(key="one.bin", data=b"one")
+        with self.test.open_write(key="two.bin") as file:
+            file.write(b"two")
+            self.assertEqual(False, self.test.check_file(file="two.bin"))
+        with self.test.open_read(key="two.bin") as file:
+            self.assertEqual(b"two", file.read())
+        self.assertEqual(b"one", self.test.get_bytes(key="one.bin"))
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "three.bin")
+            self.test.get_file(key="one.bin", destination_path=path)
+            self.test.put_file(key="three.bin", source_path=path)
+        self.assertEqual(b"one", self.test.get_bytes(key="three.bin"))
+
+        with self.assertRaises(WorkerCacheError) as e:
+            self.test.get_bytes(key="missing.bin")
+        self.assertEqual("key 'missing.bin' is not in the cache {}".format(self.test.base_dir), str(e.exception))
+
+    def test_delete_file(self):
+        self.test.put_bytes(key="one.bin", data=b"one")
+        self.test.delete_file(key="one.bin")
+        self.assertEqual(False, self.test.check_file(file="one.bin"))
+        self.test.delete_file(key="one.bin")
+
+    def test___del__(self):
+        path = self.test.base_dir
+        attached = MemoryWorker(existing_cache=path)
+        attached.lock()
+        self.assertEqual(True, self.test.locked)
+        del attached
+        self.test.unlock()
+        del self.test
+        self.assertEqual(False, path in MemoryWorker._files)
+        self.test = MemoryWorker()
+
+    def test_delete_directory(self):
+        self.test.lock()
+        self.test.delete_directory()
+        self.assertEqual(False, self.test.locked)
+        with self.assertRaises(WorkerCacheError):
+            self.test.check_file(file="one.bin")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+import io
+import json
+import os
+import tempfile
+from unittest import TestCase, main
+from mock import patch, MagicMock
+
+from botocore.exceptions import ClientError
+
+from monolithcaching.cache_index import CacheIndex
+from monolithcaching.local_register import LocalRegister
+from monolithcaching.reaper import ExpiredCache, Reaper, expiry
+from monolithcaching.s3_worker import DeleteStats
+
+
+class TestReaper(TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = self.directory.name
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def make_cache(self, cache_id, meta):
+        path = self.root + "/cache/{}/".format(cache_id)
+        os.makedirs(path)
+        with open(path + "meta.json", "w") as file:
+            json.dump(meta, file)
+        return path
+
+    def test_expiry(self):
+        self.assertEqual(None, expiry(meta={"locked": True}))
+        self.assertEqual(10.0, expiry(meta={"expires": 10}))
+
+    def test_reap_local(self):
+        expired = self.make_cache(cache_id="expired", meta={"locked": True, "expires": 100.0})
+        alive = self.make_cache(cache_id="alive", meta={"locked": True, "expires": 300.0})
+        forever = self.make_cache(cache_id="forever", meta={"locked": True})
+
+        test = Reaper(local_cache_path=self.root)
+        self.assertEqual([ExpiredCache(path=expired, expires=100.0, locked=True)], test.expired(now=200.0))
+        self.assertEqual([ExpiredCache(path=expired, expires=100.0, locked=True)], test.reap(now=200.0))
+        self.assertEqual(False, os.path.exists(expired))
+        self.assertEqual(True, os.path.exists(alive))
+        self.assertEqual(True, os.path.exists(forever))
+        self.assertEqual([], Reaper(local_cache_path=self.root + "/missing").reap(now=200.0))
+
+    def test_reap_local_index(self):
+        index = CacheIndex(root=self.root)
+        expired = self.make_cache(cache_id="expired", meta={"expires": 100.0})
+        alive = self.make_cache(cache_id="alive", meta={"expires": 300.0})
+        unindexed = self.make_cache(cache_id="unindexed", meta={"expires": 100.0})
+        for path in (expired, alive):
+            index.add(path=path)
+            with open(path + "meta.json") as file:
+                index.set_meta(path=path, meta=json.load(file))
+
+        self.assertEqual([expired], [record.path for record in index.expired(now=200.0)])
+        outcome = Reaper(local_cache_path=self.root, index=index).reap(now=200.0)
+        self.assertEqual([expired], [cache.path for cache in outcome])
+        self.assertEqual(False, os.path.exists(expired))
+        self.assertEqual(True, os.path.exists(unindexed))
+        self.assertEqual(None, index.get(path=expired))
+
+    def test_reap_referenced(self):
+        expired = self.make_cache(cache_id="expired", meta={"expires": 100.0})
+        register = LocalRegister(root=self.root)
+        register.register_cache(cache_path=expired)
+
+        self.assertEqual([], Reaper(local_cache_path=self.root, local_register=True).reap(now=200.0))
+        self.assertEqual(True, os.path.exists(expired))
+
+        outcome = Reaper(local_cache_path=self.root, local_register=True, force=True).reap(now=200.0)
+        self.assertEqual([expired], [cache.path for cache in outcome])
+        self.assertEqual(False, os.path.exists(expired))
+        self.assertEqual(None, register.get_count(cache_path=expired))
+
+    @patch("monolithcaching.reaper.S3Worker")
+    @patch("monolithcaching.reaper.boto3")
+    def test_reap_s3(self, mock_boto3, mock_s3_worker):
+        mock_s3_worker._split_s3_path.return_value = ("bucket", "caches/", "")
+        client = mock_boto3.client.return_value
+        client.get_paginator.return_value.paginate.return_value = [
+            {"CommonPrefixes": [{"Prefix": "caches/one/"}, {"Prefix": "caches/two/"}]},
+            {"CommonPrefixes": [{"Prefix": "caches/three/"}, {"Prefix": "caches/four/"}]},
+        ]
+        metas = {
+            "caches/one/meta.json": {"locked": True, "expires": 100.0},
+            "caches/two/meta.json": {"expires": 300.0},
+        }
+
+        def get_object(Bucket, Key):
+            if Key == "caches/four/meta.json":
+                raise ClientError({"Error": {"Code": "AccessDenied", "Message": "denied"}}, "GetObject")
+            if Key not in metas:
+                raise ClientError({"Error": {"Code": "NoSuchKey", "Message": "missing"}}, "GetObject")
+            return {"Body": io.BytesIO(json.dumps(metas[Key]).encode("utf-8"))}
+
+        client.get_object.side_effect = get_object
+
+        test = Reaper(s3_cache_path="s3://bucket/caches/")
+        outcome = test.reap(now=200.0)
+
+        self.assertEqual([ExpiredCache(path="s3://bucket/caches/one/", expires=100.0, locked=True)], outcome)
+        client.get_paginator.assert_called_once_with("list_objects_v2")
+        client.get_paginator.return_value.paginate.assert_called_once_with(
+            Bucket="bucket", Prefix="caches/", Delimiter="/"
+        )
+        mock_s3_worker.assert_called_once_with(cache_path="s3://bucket/caches/",
+                                               existing_cache="s3://bucket/caches/one/")
+        mock_s3_worker.return_value.delete_directory_parallel.assert_called_once_with()
+
+    def _s3_client(self, mock_boto3, mock_s3_worker):
+        mock_s3_worker._split_s3_path.return_value = ("bucket", "caches/", "")
+        client = mock_boto3.client.return_value
+        client.get_paginator.return_value.paginate.return_value = [
+            {"CommonPrefixes": [{"Prefix": "caches/one/"}]},
+        ]
+        client.get_object.side_effect = lambda Bucket, Key: {
+            "Body": io.BytesIO(json.dumps({"expires": 100.0}).encode("utf-8"))
+        }
+        return client
+
+    @patch("monolithcaching.reaper.S3Worker")
+    @patch("monolithcaching.reaper.boto3")
+    def test_reap_s3_failed_delete(self, mock_boto3, mock_s3_worker):
+        self._s3_client(mock_boto3, mock_s3_worker)
+        mock_s3_worker.return_value.delete_directory_parallel.return_value = DeleteStats(
+            deleted=3, failed=[{"Key": "caches/one/data.bin", "Code": "SlowDown", "Message": "Slow down"}],
+            seconds=1.0)
+
+        self.assertEqual([], Reaper(s3_cache_path="s3://bucket/caches/").reap(now=200.0))
+
+        mock_s3_worker.return_value.delete_directory_parallel.return_value = DeleteStats(
+            deleted=1, failed=[], seconds=1.0)
+        self.assertEqual(["s3://bucket/caches/one/"],
+                         [cache.path for cache in Reaper(s3_cache_path="s3://bucket/caches/").reap(now=200.0)])
+
+    @patch("monolithcaching.reaper.Register")
+    @patch("monolithcaching.reaper.S3Worker")
+    @patch("monolithcaching.reaper.boto3")
+    def test_reap_s3_referenced(self, mock_boto3, mock_s3_worker, mock_register):
+        self._s3_client(mock_boto3, mock_s3_worker)
+        mock_s3_worker.return_value.delete_directory_parallel.return_value = DeleteStats(
+            deleted=1, failed=[], seconds=1.0)
+        mock_register.return_value.claim_cache.return_value = False
+
+        test = Reaper(s3_cache_path="s3://bucket/caches/", port=6379, host="localhost")
+        self.assertEqual([], test.reap(now=200.0))
+        mock_register.assert_called_once_with(host="localhost", port=6379)
+        mock_register.return_value.claim_cache.assert_called_once_with(cache_path="s3://bucket/caches/one/")
+        self.assertEqual(0, len(mock_s3_worker.return_value.delete_directory_parallel.call_args_list))
+
+        test.force = True
+        self.assertEqual(1, len(test.reap(now=200.0)))
+        self.assertEqual(1, len(mock_register.return_value.claim_cache.call_args_list))
+        mock_register.return_value.delete_cache.assert_called_once_with(cache_path="s3://bucket/caches/one/")
+
+        mock_register.return_value.claim_cache.return_value = True
+        test.force = False
+        self.assertEqual(1, len(test.reap(now=200.0)))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,28 @@
-from unittest import TestCase, main
-from unittest.mock import patch, MagicMock
+from unittest import TestCase, main, skipIf
+from unittest.mock import call, patch, MagicMock
+
+try:
+    import fakeredis
+    import lupa  # noqa: F401
+except ImportError:
+    fakeredis = None
 
 from monolithcaching.register import Register, RegisterError
 
 
 class TestRegister(TestCase):
 
+    @patch("monolithcaching.register.RedisConnectionPools")
     @patch("monolithcaching.register.StrictRedis")
-    def test___init__(self, mock_redis):
+    def test___init__(self, mock_redis, mock_pools):
         test = Register(host="localhost", port=12345)
         self.assertEqual(mock_redis.return_value, test._connection)
-        mock_redis.assert_called_once_with(host="localhost", port=12345, db=0)
+        mock_pools.get.assert_called_once_with(host="localhost", port=12345, db=0, max_connections=None,
+                                               health_check_interval=None)
+        mock_redis.assert_called_once_with(connection_pool=mock_pools.get.return_value)
+        self.assertEqual([call(Register.REGISTER_SCRIPT), call(Register.DEREGISTER_SCRIPT),
+                          call(Register.CLAIM_SCRIPT)], mock_redis.return_value.register_script.call_args_list)
+        self.assertEqual(mock_redis.return_value.register_script.return_value, test._deregister_script)
 
     @patch("monolithcaching.register.Register.__init__")
     def test_get_count(self, mock_init):
@@ -29,55 +41,75 @@ class TestRegister(TestCase):
         self.assertEqual(None, outcome)
         test._connection.hget.assert_called_once_with(name="CACHE_REGISTER", key="test path")
 
-    @patch("monolithcaching.register.Register.get_count")
     @patch("monolithcaching.register.Register.__init__")
-    def test_register_cache(self, mock_init, mock_get_count):
+    def test_register_cache(self, mock_init):
         mock_init.return_value = None
         test = Register(host="localhost", port=12345)
         test._connection = MagicMock()
+        test._register_script = MagicMock()
+        test._register_script.return_value = 4
+
+        outcome = test.register_cache(cache_path="test path")
+        self.assertEqual(4, outcome)
+        test._register_script.assert_called_once_with(keys=["CACHE_REGISTER"], args=["test path"])
+        self.assertEqual(0, len(test._connection.hget.call_args_list))
+        self.assertEqual(0, len(test._connection.hset.call_args_list))
+
+        test._register_script.return_value = -1
+        with self.assertRaises(RegisterError) as e:
+            test.register_cache(cache_path="test path")
+        self.assertEqual("cache test path is being evicted so it cannot be registered", str(e.exception))
+
+    @skipIf(fakeredis is None, "needs fakeredis with lua")
+    @patch("monolithcaching.register.RedisConnectionPools")
+    def test_claim_cache(self, mock_pools):
+        mock_pools.get.return_value = fakeredis.FakeStrictRedis().connection_pool
+        test = Register(host="localhost", port=12345)
 
-        mock_get_count.return_value = 3
-        test.register_cache(cache_path="test path")
-        test._connection.hset.assert_called_once_with(name="CACHE_REGISTER", key="test path", value="4")
-
-        test._connection.hset.reset_mock()
-        mock_get_count.return_value = None
-        test.register_cache(cache_path="test path")
-        test._connection.hset.assert_called_once_with(name="CACHE_REGISTER", key="test path", value="1")
+        self.assertEqual(1, test.register_cache(cache_path="live path"))
+        self.assertEqual(False, test.claim_cache(cache_path="live path"))
+        self.assertEqual(True, test.claim_cache(cache_path="unused path"))
+        self.assertEqual(-1, test.get_count(cache_path="unused path"))
+        with self.assertRaises(RegisterError):
+            test.register_cache(cache_path="unused path")
+        test.delete_cache(cache_path="unused path")
+        self.assertEqual(1, test.register_cache(cache_path="unused path"))
+        self.assertEqual(0, test.deregister_cache(cache_path="live path", locked=True))
+        self.assertEqual(True, test.claim_cache(cache_path="live path"))
 
-    @patch("monolithcaching.register.Register.get_count")
     @patch("monolithcaching.register.Register.__init__")
-    def test_deregister_cache(self, mock_init, mock_get_count):
+    def test_deregister_cache(self, mock_init):
         mock_init.return_value = None
         test = Register(host="localhost", port=12345)
-        test._connection = MagicMock()
-
-        mock_get_count.return_value = 3
-        test.deregister_cache(cache_path="test path", locked=False)
-        test._connection.hset.assert_called_once_with(name="CACHE_REGISTER", key="test path", value="2")
-        test._connection.hset.reset_mock()
-
-        mock_get_count.return_value = 1
-        test.deregister_cache(cache_path="test path", locked=False)
-        test._connection.hdel.assert_called_once_with("CACHE_REGISTER", "test path")
-        test._connection.hdel.reset_mock()
+        test._deregister_script = MagicMock()
 
-        mock_get_count.return_value = 3
-        test.deregister_cache(cache_path="test path", locked=True)
-        test._connection.hset.assert_called_once_with(name="CACHE_REGISTER", key="test path", value="2")
-        test._connection.hset.reset_mock()
+        test._deregister_script.return_value = 2
+        outcome = test.deregister_cache(cache_path="test path", locked=False)
+        self.assertEqual(2, outcome)
+        test._deregister_script.assert_called_once_with(keys=["CACHE_REGISTER"], args=["test path", "0"])
+        test._deregister_script.reset_mock()
 
-        mock_get_count.return_value = 1
-        test.deregister_cache(cache_path="test path", locked=True)
-        self.assertEqual(0, len(test._connection.hdel.call_args_list))
+        test._deregister_script.return_value = 0
+        outcome = test.deregister_cache(cache_path="test path", locked=True)
+        self.assertEqual(0, outcome)
+        test._deregister_script.assert_called_once_with(keys=["CACHE_REGISTER"], args=["test path", "1"])
 
-        mock_get_count.return_value = None
+        test._deregister_script.return_value = -1
         with self.assertRaises(RegisterError) as context:
             test.deregister_cache(cache_path="test path", locked=True)
 
         self.assertEqual("cache test path is not in cache register so it cannot be de-registered",
                          str(context.exception))
 
+    @patch("monolithcaching.register.Register.__init__")
+    def test_delete_cache(self, mock_init):
+        mock_init.return_value = None
+        test = Register(host="localhost", port=12345)
+        test._connection = MagicMock()
+
+        test.delete_cache(cache_path="test path")
+        test._connection.hdel.assert_called_once_with("CACHE_REGISTER", "test path")
+
     @patch("monolithcaching.register.Register.__init__")
     def test_get_all_records(self, mock_init):
         mock_init.return_value = None
@@ -1,9 +1,11 @@
 import json
 
+import botocore
 from unittest import TestCase, main
-from mock import patch, MagicMock, PropertyMock
+from mock import patch, MagicMock, PropertyMock, call
 
-from monolithcaching.s3_worker import S3Worker
+from monolithcaching.errors import RegisterError, WorkerCacheError
+from monolithcaching.s3_worker import S3Worker, DeleteStats
 
 
 class TestS3Worker(TestCase):
@@ -28,6 +30,7 @@ class TestS3Worker(TestCase):
         mock_create_meta.assert_called_once_with()
         mock_boto.client.assert_called_once_with("s3")
         mock_boto.resource.assert_called_once_with("s3")
+        self.assertEqual(8 * 1024 * 1024, test.transfer_config.multipart_threshold)
 
         mock_boto.reset_mock()
 
@@ -59,6 +62,96 @@ class TestS3Worker(TestCase):
         connection.Bucket.return_value.objects.filter.assert_called_once_with(Prefix="test/file/path.txt")
         connection.Bucket.return_value.objects.filter.return_value.delete.assert_called_once_with()
 
+    @patch("monolithcaching.s3_worker.S3Worker.__init__")
+    def test_delete_directory_parallel(self, mock_init):
+        mock_init.return_value = None
+        test = S3Worker(cache_path="some cache path")
+        test.base_dir = "s3://bucket/directory/to/cache/"
+        test.DELETE_BATCH_SIZE = 2
+        test._client = MagicMock()
+        test._client.get_paginator.return_value.paginate.return_value = [
+            {"Contents": [{"Key": "one"}, {"Key": "two"}, {"Key": "three"}]},
+            {},
+        ]
+        test._client.delete_objects.side_effect = [
+            {},
+            {"Errors": [{"Key": "three", "Code": "AccessDenied", "Message": "Access Denied"}]},
+        ]
+
+        outcome = test.delete_directory_parallel(max_workers=1)
+
+        test._client.get_paginator.assert_called_once_with("list_objects_v2")
+        test._client.get_paginator.return_value.paginate.assert_called_once_with(Bucket="bucket",
+                                                                                 Prefix="directory/to/cache/")
+        self.assertEqual(
+            [
+                call(Bucket="bucket", Delete={"Objects": [{"Key": "one"}, {"Key": "two"}], "Quiet": True}),
+                call(Bucket="bucket", Delete={"Objects": [{"Key": "three"}], "Quiet": True}),
+            ],
+            test._client.delete_objects.call_args_list
+        )
+        self.assertEqual(2, outcome.deleted)
+        self.assertEqual([{"Key": "three", "Code": "AccessDenied", "Message": "Access Denied"}], outcome.failed)
+
+    @patch("monolithcaching.s3_worker.S3Worker.__init__")
+    def test_delete_directory_parallel_batch_error(self, mock_init):
+        mock_init.return_value = None
+        test = S3Worker(cache_path="some cache path")
+        test.base_dir = "s3://bucket/directory/to/cache/"
+        test.DELETE_BATCH_SIZE = 2
+        test._client = MagicMock()
+        test._client.get_paginator.return_value.paginate.return_value = [
+            {"Contents": [{"Key": "one"}, {"Key": "two"}, {"Key": "three"}, {"Key": "four"}, {"Key": "five"}]},
+        ]
+        test._client.delete_objects.side_effect = [
+            {},
+            botocore.exceptions.ClientError({"Error": {"Code": "SlowDown", "Message": "Slow down"}}, "DeleteObjects"),
+            ConnectionError("connection reset"),
+        ]
+
+        outcome = test.delete_directory_parallel(max_workers=1)
+
+        self.assertEqual(2, outcome.deleted)
+        self.assertEqual(
+            [
+                {"Key": "three", "Code": "SlowDown", "Message": "Slow down"},
+                {"Key": "four", "Code": "SlowDown", "Message": "Slow down"},
+                {"Key": "five", "Code": "ConnectionError", "Message": "connection reset"},
+            ],
+            outcome.failed
+        )
+
+    @patch("monolithcaching.s3_worker.Register")
+    @patch("monolithcaching.s3_worker.boto3")
+    def test___init___register(self, mock_boto, mock_register):
+        test = S3Worker(cache_path="s3://bucket/caches/", port=6379, host="localhost")
+        mock_register.assert_called_once_with(host="localhost", port=6379)
+        mock_register.return_value.register_cache.assert_called_once_with(cache_path=test.base_dir)
+
+        path = test.base_dir
+        del test
+        mock_register.return_value.deregister_cache.assert_called_once_with(cache_path=path, locked=False)
+
+        mock_register.return_value.register_cache.side_effect = RegisterError(message="being evicted")
+        with self.assertRaises(WorkerCacheError):
+            S3Worker(cache_path="s3://bucket/caches/", existing_cache=path, port=6379, host="localhost")
+        self.assertEqual(1, len(mock_register.return_value.deregister_cache.call_args_list))
+
+    def test_extract_id(self):
+        self.assertEqual("one", S3Worker.extract_id(storage_path="s3://bucket/caches/one"))
+        self.assertEqual("one", S3Worker.extract_id(storage_path="s3://bucket/caches/one/"))
+
+    @patch("monolithcaching.s3_worker.boto3")
+    def test___init___attach_base_dir(self, mock_boto):
+        test = S3Worker(cache_path="s3://bucket/caches/")
+        attached = S3Worker(cache_path="s3://bucket/caches/", existing_cache=test.base_dir)
+        self.assertEqual(test.id, attached.id)
+        self.assertEqual(test.base_dir, attached.base_dir)
+
+    def test_delete_stats(self):
+        self.assertEqual(50.0, DeleteStats(deleted=100, failed=[], seconds=2.0).keys_per_second)
+        self.assertEqual(0.0, DeleteStats(deleted=0, failed=[], seconds=0.0).keys_per_second)
+
     @patch("monolithcaching.s3_worker.S3Worker._split_s3_path")
     @patch("monolithcaching.s3_worker.S3Worker.__init__")
     def test_create_meta(self, mock_init, mock_split_path):
@@ -93,6 +186,163 @@ class TestS3Worker(TestCase):
         connection.Object.assert_called_once_with("test bucket", "test/file/meta.json")
         connection.Object.return_value.put.assert_called_once_with(Body=data_dump)
 
+    @patch("monolithcaching.s3_worker.S3Worker.update_meta")
+    @patch("monolithcaching.s3_worker.S3Worker.__init__")
+    def test_insert_meta_delegates(self, mock_init, mock_update_meta):
+        mock_init.return_value = None
+        test = S3Worker(cache_path="some cache path")
+        test.insert_meta(key="three", value=3)
+        mock_update_meta.assert_called_once_with(data={"three": 3})
+
+    @patch("monolithcaching.s3_worker.S3Worker.meta", new_callable=PropertyMock)
+    @patch("monolithcaching.s3_worker.S3Worker._split_s3_path")
+    @patch("monolithcaching.s3_worker.S3Worker.__init__")
+    def test_update_meta(self, mock_init, mock_split_path, mock_meta):
+        mock_meta.return_value = {"one": 1, "two": 2}
+        mock_split_path.return_value = ("test bucket", "test/file/", "path.txt")
+        mock_init.return_value = None
+        test = S3Worker(cache_path="some cache path")
+        connection = MagicMock()
+        test._resource = connection
+        test.base_dir = "s3://bucket/directory/to/cache/"
+        data_dump = bytes(json.dumps({"one": 1, "two": 22, "three": 3, "four": 4}).encode('UTF-8'))
+
+        test.update_meta(data={"two": 22, "three": 3, "four": 4})
+        mock_meta.assert_called_once_with()
+        connection.Object.assert_called_once_with("test bucket", "test/file/meta.json")
+        connection.Object.return_value.put.assert_called_once_with(Body=data_dump)
+
+    @patch("monolithcaching.s3_worker.S3Worker.meta", new_callable=PropertyMock)
+    @patch("monolithcaching.s3_worker.S3Worker.__init__")
+    def test_read_meta_write_meta(self, mock_init, mock_meta):
+        mock_init.return_value = None
+        mock_meta.return_value = {"one": 1}
+        test = S3Worker(cache_path="some cache path")
+        test._resource = MagicMock()
+        test.base_dir = "s3://bucket/directory/to/cache/"
+
+        self.assertEqual({"one": 1}, test.read_meta())
+        test.write_meta(data={"two": 2})
+        test._resource.Object.assert_called_once_with("bucket", "directory/to/cache/meta.json")
+        test._resource.Object.return_value.put.assert_called_once_with(Body=json.dumps({"two": 2}).encode("UTF-8"))
+
+        test.unlock()
+        self.assertEqual(True, test.locked)
+
+    @patch("monolithcaching.s3_worker.S3Worker.__init__")
+    def test_delete_file(self, mock_init):
+        mock_init.return_value = None
+        test = S3Worker(cache_path="some cache path")
+        test.base_dir = "s3://bucket/directory/to/cache/"
+        test._client = MagicMock()
+        test.delete_file(key="one/two.bin")
+        test._client.delete_object.assert_called_once_with(Bucket="bucket", Key="directory/to/cache/one/two.bin")
+
+    @patch("monolithcaching.s3_worker.S3Worker.__init__")
+    def test_check_files_head(self, mock_init):
+        mock_init.return_value = None
+        test = S3Worker(cache_path="some cache path")
+        test.base_dir = "s3://bucket/directory/to/cache/"
+        test._client = MagicMock()
+        sizes = {"directory/to/cache/one": 1, "directory/to/cache/two": 2}
+
+        def head_object(Bucket, Key):
+            if Key not in sizes:
+                raise botocore.exceptions.ClientError({"Error": {"Code": "404"}}, "HeadObject")
+            return {"ContentLength": sizes[Key]}
+
+        test._client.head_object.side_effect = head_object
+        outcome = test.check_files(files=["one", "three", "two", "one"])
+
+        self.assertEqual({"one": 1, "two": 2}, outcome.present)
+        self.assertEqual(["three"], outcome.missing)
+        self.assertEqual(3, len(test._client.head_object.call_args_list))
+        test._client.get_paginator.assert_not_called()
+
+        test._client.head_object.side_effect = botocore.exceptions.ClientError({"Error": {"Code": "403"}},
+                                                                               "HeadObject")
+        with self.assertRaises(botocore.exceptions.ClientError):
+            test.check_files(files=["one"])
+
+    @patch("monolithcaching.s3_worker.S3Worker.__init__")
+    def test_check_files_list(self, mock_init):
+        mock_init.return_value = None
+        test = S3Worker(cache_path="some cache path")
+        test.base_dir = "s3://bucket/directory/to/cache/"
+        test.HEAD_FAN_OUT_LIMIT = 2
+        test._client = MagicMock()
+        test._client.get_paginator.return_value.paginate.return_value = [
+            {"Contents": [{"Key": "directory/to/cache/outputs/one", "Size": 1},
+                          {"Key": "directory/to/cache/outputs/other", "Size": 5}]},
+            {"Contents": [{"Key": "directory/to/cache/outputs/two", "Size": 2}]},
+        ]
+
+        outcome = test.check_files(files=["outputs/one", "outputs/two", "outputs/three"])
+
+        test._client.get_paginator.return_value.paginate.assert_called_once_with(
+            Bucket="bucket", Prefix="directory/to/cache/outputs/"
+        )
+        self.assertEqual({"outputs/one": 1, "outputs/two": 2}, outcome.present)
+        self.assertEqual(["outputs/three"], outcome.missing)
+        test._client.head_object.assert_not_called()
+
+    @patch("monolithcaching.s3_worker.S3Worker.__init__")
+    def test_put_file_get_file(self, mock_init):
+        mock_init.return_value = None
+        test = S3Worker(cache_path="some cache path")
+        test.base_dir = "s3://bucket/directory/to/cache/"
+        test._client = MagicMock()
+        test.transfer_config = MagicMock()
+
+        test.put_file(key="one/two.bin", source_path="local/two.bin")
+        test._client.upload_file.assert_called_once_with("local/two.bin", "bucket", "directory/to/cache/one/two.bin",
+                                                         Config=test.transfer_config)
+
+        test.get_file(key="one/two.bin", destination_path="local/two.bin")
+        test._client.download_file.assert_called_once_with("bucket", "directory/to/cache/one/two.bin",
+                                                           "local/two.bin", Config=test.transfer_config)
+
+    @patch("monolithcaching.s3_worker.S3Worker.__init__")
+    def test_put_bytes_get_bytes(self, mock_init):
+        mock_init.return_value = None
+        test = S3Worker(cache_path="some cache path")
+        test.base_dir = "s3://bucket/directory/to/cache/"
+        test._client = MagicMock()
+        test.transfer_config = MagicMock()
+
+        test.put_bytes(key="two.bin", data=b"one two")
+        args, kwargs = test._client.upload_fileobj.call_args
+        self.assertEqual(b"one two", args[0].read())
+        self.assertEqual(("bucket", "directory/to/cache/two.bin"), args[1:])
+        self.assertEqual({"Config": test.transfer_config}, kwargs)
+
+        body = test._client.get_object.return_value["Body"]
+        body.read.return_value = b"one two"
+        self.assertEqual(b"one two", test.get_bytes(key="two.bin"))
+        test._client.get_object.assert_called_once_with(Bucket="bucket", Key="directory/to/cache/two.bin")
+        body.close.assert_called_once_with()
+
+    @patch("monolithcaching.s3_worker.S3Worker.__init__")
+    def test_open_write(self, mock_init):
+        mock_init.return_value = None
+        test = S3Worker(cache_path="some cache path")
+        test.base_dir = "s3://bucket/directory/to/cache/"
+        test._client = MagicMock()
+        test.transfer_config = MagicMock()
+        uploaded = []
+        test._client.upload_fileobj.side_effect = lambda file, bucket, key, Config: uploaded.append(file.read())
+
+        with test.open_write(key="two.bin") as file:
+            file.write(b"one ")
+            file.write(b"two")
+            self.assertEqual(0, len(test._client.upload_fileobj.call_args_list))
+        self.assertEqual([b"one two"], uploaded)
+
+        with self.assertRaises(ValueError):
+            with test.open_write(key="two.bin") as file:
+                raise ValueError("failed")
+        self.assertEqual(1, len(test._client.upload_fileobj.call_args_list))
+
     def test__split_s3_path(self):
         bucket_name, file_name, short_file_name = S3Worker._split_s3_path(
             storage_path="s3://mybucket/some/other/path.txt")
@@ -101,6 +351,22 @@ class TestS3Worker(TestCase):
         self.assertEqual("some/other/path.txt", file_name)
         self.assertEqual("path.txt", short_file_name)
 
+    @patch("monolithcaching.s3_worker.Register")
+    @patch("monolithcaching.s3_worker.boto3")
+    def test___init___register(self, mock_boto, mock_register):
+        test = S3Worker(cache_path="s3://bucket/caches/", port=6379, host="localhost")
+        mock_register.assert_called_once_with(host="localhost", port=6379)
+        mock_register.return_value.register_cache.assert_called_once_with(cache_path=test.base_dir)
+
+        path = test.base_dir
+        del test
+        mock_register.return_value.deregister_cache.assert_called_once_with(cache_path=path, locked=False)
+
+        mock_register.return_value.register_cache.side_effect = RegisterError(message="being evicted")
+        with self.assertRaises(WorkerCacheError):
+            S3Worker(cache_path="s3://bucket/caches/", existing_cache=path, port=6379, host="localhost")
+        self.assertEqual(1, len(mock_register.return_value.deregister_cache.call_args_list))
+
     def test_extract_id(self):
         self.assertEqual("test.txt", S3Worker.extract_id(storage_path="testing/test.txt"))
 
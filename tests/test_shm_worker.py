@@ -0,0 +1,156 @@
+import os
+import tempfile
+from unittest import TestCase, main
+from mock import patch
+
+from monolithcaching import CacheManager, CacheRoot
+from monolithcaching.errors import WorkerCacheError
+from monolithcaching.local_register import LocalRegister
+from monolithcaching.shm_worker import ShmWorker
+
+
+class TestShmWorker(TestCase):
+
+    def setUp(self) -> None:
+        self.disk = tempfile.TemporaryDirectory()
+        self.shm = tempfile.TemporaryDirectory()
+        self.test = ShmWorker(port=None, host=None, local_cache=self.disk.name, shm_path=self.shm.name,
+                              max_shm_bytes=300)
+        self.base_size = self.test.shm_bytes
+
+    def tearDown(self) -> None:
+        del self.test
+        self.disk.cleanup()
+        self.shm.cleanup()
+
+    def test___init__(self):
+        self.assertEqual(self.shm.name + "/cache/{}/".format(self.test.id), self.test.base_dir)
+        self.assertEqual(self.disk.name + "/spill/{}/".format(self.test.id), self.test.spill_dir)
+        self.assertEqual(False, os.path.isdir(self.test.spill_dir))
+        self.assertEqual({}, self.test.read_meta())
+
+        self.test.put_bytes(key="one.bin", data=b"1" * 10)
+        attached = ShmWorker(port=None, host=None, existing_cache=self.test.base_dir, local_cache=self.disk.name,
+                             shm_path=self.shm.name)
+        self.assertEqual(CacheRoot._directory_size(path=self.test.base_dir), attached.shm_bytes)
+        attached.lock()
+
+    @patch("monolithcaching.shm_worker.os.path.isdir")
+    def test___init___no_shm(self, mock_isdir):
+        mock_isdir.return_value = False
+        with self.assertRaises(WorkerCacheError) as e:
+            ShmWorker(port=None, host=None)
+        self.assertEqual("/dev/shm is not available, supply the shm_path of a tmpfs", str(e.exception))
+        worker = ShmWorker.__new__(ShmWorker)
+        worker.__del__()
+
+    def test_attached_spill(self):
+        self.test.max_shm_bytes = self.base_size
+        self.test.put_bytes(key="big.bin", data=b"1" * 100)
+        attached = ShmWorker(port=None, host=None, existing_cache=self.test.base_dir.rstrip("/"),
+                             local_cache=self.disk.name, shm_path=self.shm.name)
+
+        self.assertEqual(self.test.spill_dir, attached.spill_dir)
+        self.assertEqual(True, attached.check_file(file="big.bin"))
+        self.assertEqual(b"1" * 100, attached.get_bytes(key="big.bin"))
+        self.test.lock()
+        attached.delete_directory()
+        self.assertEqual(False, os.path.isdir(self.test.spill_dir))
+
+    def test_shared_budget(self):
+        self.test.max_shm_bytes = self.base_size + 150
+        attached = ShmWorker(port=None, host=None, existing_cache=self.test.base_dir, local_cache=self.disk.name,
+                             shm_path=self.shm.name, max_shm_bytes=self.test.max_shm_bytes)
+        self.test.put_bytes(key="one.bin", data=b"1" * 100)
+        attached.put_bytes(key="two.bin", data=b"2" * 100)
+
+        self.assertEqual(self.base_size + 100, attached.shm_bytes)
+        self.assertEqual(False, os.path.isfile(self.test.base_dir + "two.bin"))
+        self.assertEqual(["two.bin"], os.listdir(self.test.spill_dir))
+        attached.lock()
+
+    def test_spill(self):
+        self.test.max_shm_bytes = self.base_size + 200
+        self.test.put_bytes(key="one.bin", data=b"1" * 100)
+        with self.test.open_write(key="two.bin") as file:
+            file.write(b"2" * 100)
+        with self.test.open_write(key="three.bin") as file:
+            file.write(b"3" * 100)
+
+        source = os.path.join(self.disk.name, "four.bin")
+        with open(source, "wb") as file:
+            file.write(b"4" * 100)
+        self.test.put_file(key="four.bin", source_path=source)
+
+        self.assertEqual(self.base_size + 200, self.test.shm_bytes)
+        self.assertEqual(["three.bin", "four.bin"], sorted(os.listdir(self.test.spill_dir), reverse=True))
+        self.assertEqual(b"3" * 100, self.test.get_bytes(key="three.bin"))
+        self.assertEqual(True, self.test.check_file(file="four.bin"))
+        self.test.get_file(key="four.bin", destination_path=source + ".copy")
+        with open(source + ".copy", "rb") as file:
+            self.assertEqual(b"4" * 100, file.read())
+
+        self.test.put_bytes(key="one.bin", data=b"1")
+        self.test.put_bytes(key="three.bin", data=b"3")
+        self.assertEqual(self.base_size + 102, self.test.shm_bytes)
+        self.assertEqual(["four.bin"], os.listdir(self.test.spill_dir))
+        self.assertEqual(b"3", self.test.get_bytes(key="three.bin"))
+
+        self.test.put_bytes(key="one.bin", data=b"1" * 200)
+        self.assertEqual(self.base_size + 101, self.test.shm_bytes)
+        self.assertEqual(False, os.path.isfile(self.test.base_dir + "one.bin"))
+        self.assertEqual(b"1" * 200, self.test.get_bytes(key="one.bin"))
+
+    def test_delete_file(self):
+        self.test.max_shm_bytes = self.base_size + 100
+        self.test.put_bytes(key="one.bin", data=b"1" * 100)
+        self.test.put_bytes(key="two.bin", data=b"2" * 100)
+        self.test.delete_file(key="one.bin")
+        self.test.delete_file(key="two.bin")
+        self.assertEqual(self.base_size, self.test.shm_bytes)
+        self.assertEqual([], os.listdir(self.test.spill_dir))
+        self.assertEqual(False, self.test.check_file(file="one.bin"))
+
+    def test__remove_directory(self):
+        self.test.max_shm_bytes = 0
+        self.test.put_bytes(key="one.bin", data=b"1")
+        self.test.delete_directory()
+        self.assertEqual(False, os.path.isdir(self.test.base_dir))
+        self.assertEqual(False, os.path.isdir(self.test.spill_dir))
+
+    def test_manager(self):
+        manager = CacheManager(local_cache_path=self.disk.name, backend="shm", shm_path=self.shm.name,
+                               max_shm_bytes=1000)
+        manager.create_cache()
+        self.assertIsInstance(manager.worker, ShmWorker)
+        self.assertEqual(1000, manager.worker.max_shm_bytes)
+        self.assertEqual(self.disk.name + "/spill/{}/".format(manager.worker.id), manager.worker.spill_dir)
+        manager.wipe_cache()
+
+        manager = CacheManager(local_cache_path=self.disk.name, backend="shm", shm_path=self.shm.name,
+                               access_interval=60, deferred_delete=True)
+        manager.create_cache()
+        self.assertEqual(60, manager.worker.access_interval)
+        self.assertEqual(True, manager.worker.deferred_delete)
+        manager.wipe_cache()
+
+    def test_evicted_while_live(self):
+        live = CacheManager(local_cache_path=self.disk.name, backend="shm", shm_path=self.shm.name, index=True,
+                            local_register=True)
+        live.create_cache()
+        path = live.cache_path
+        evicting = CacheManager(local_cache_path=self.disk.name, index=True, local_register=True,
+                                max_root_caches=0)
+
+        self.assertEqual([], evicting.evict_caches())
+        self.assertEqual(True, os.path.isdir(path))
+        self.assertEqual(1, LocalRegister(root=self.disk.name).get_count(cache_path=path))
+
+        live.wipe_cache()
+        self.assertEqual(False, os.path.isdir(path))
+        self.assertEqual(None, LocalRegister(root=self.disk.name).get_count(cache_path=path))
+        self.assertEqual([], evicting.index.records())
+
+
+if __name__ == "__main__":
+    main()
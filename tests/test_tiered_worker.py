@@ -0,0 +1,213 @@
+import json
+import os
+import tempfile
+from unittest import TestCase, main
+from mock import patch, MagicMock
+
+from monolithcaching.tiered_worker import TieredWorker
+
+
+class TestTieredWorker(TestCase):
+
+    @patch("monolithcaching.s3_worker.S3Worker.create_meta")
+    @patch("monolithcaching.s3_worker.boto3")
+    def setUp(self, mock_boto, mock_create_meta) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.test = TieredWorker(cache_path="s3://bucket/caches/", existing_cache="s3://bucket/caches/test",
+                                 local_cache=self.directory.name, max_local_bytes=25)
+        self.test._client = MagicMock()
+        self.remote = {}
+        self.test._client.head_object.side_effect = lambda Bucket, Key: {"ETag": self.remote[Key][0]}
+        self.test._client.put_object.side_effect = self._put_object
+        self.test._client.download_file.side_effect = self._download_file
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def _put_object(self, Bucket, Key, Body):
+        etag = '"{}"'.format(len(self.remote))
+        self.remote[Key] = (etag, Body)
+        return {"ETag": etag}
+
+    def _download_file(self, bucket, key, destination, Config):
+        with open(destination, "wb") as file:
+            file.write(self.remote[key][1])
+
+    def test___init__(self):
+        self.assertEqual("s3://bucket/caches/test/", self.test.base_dir)
+        self.assertEqual(self.directory.name + "/tier/test/", self.test.local_worker.base_dir)
+        self.assertEqual(True, self.test.local_worker._locked)
+        self.assertEqual(True, os.path.isdir(self.test.local_worker.base_dir))
+        self.assertEqual(0, self.test.local_bytes)
+
+    def test_put_bytes_get_bytes(self):
+        self.test.put_bytes(key="one", data=b"1" * 10)
+        self.test._client.put_object.assert_called_once_with(Bucket="bucket", Key="caches/test/one", Body=b"1" * 10)
+        self.assertEqual({"one": {"etag": '"0"', "size": 10}}, dict(self.test._index))
+
+        self.assertEqual(b"1" * 10, self.test.get_bytes(key="one"))
+        self.test._client.head_object.assert_called_once_with(Bucket="bucket", Key="caches/test/one")
+        self.assertEqual(0, len(self.test._client.download_file.call_args_list))
+
+        self.remote["caches/test/one"] = ('"changed"', b"changed")
+        self.assertEqual(b"changed", self.test.get_bytes(key="one"))
+        self.assertEqual(1, len(self.test._client.download_file.call_args_list))
+        self.assertEqual({"one": {"etag": '"changed"', "size": 7}}, dict(self.test._index))
+
+        self.test.validate = False
+        self.remote["caches/test/one"] = ('"ignored"', b"ignored")
+        self.test._client.head_object.reset_mock()
+        self.assertEqual(b"changed", self.test.get_bytes(key="one"))
+        self.assertEqual(0, len(self.test._client.head_object.call_args_list))
+
+    def test_read_through(self):
+        self.remote["caches/test/remote"] = ('"remote"', b"from s3")
+
+        self.assertEqual(self.test.local_worker.base_dir + "remote", self.test.local_path(key="remote"))
+        destination = os.path.join(self.directory.name, "copy")
+        self.test.get_file(key="remote", destination_path=destination)
+        with open(destination, "rb") as file:
+            self.assertEqual(b"from s3", file.read())
+        self.assertEqual(1, len(self.test._client.download_file.call_args_list))
+        self.assertEqual({"remote": {"etag": '"remote"', "size": 7}}, dict(self.test._index))
+
+    def test_delete_file(self):
+        self.test.put_bytes(key="one.bin", data=b"1" * 10)
+        self.test.delete_file(key="one.bin")
+        self.test._client.delete_object.assert_called_once_with(Bucket="bucket", Key="caches/test/one.bin")
+        self.assertEqual(0, self.test.local_bytes)
+        self.assertEqual(False, self.test.local_worker.check_file(file="one.bin"))
+        self.assertEqual([], json.loads(self.test.local_worker.get_bytes(key=".tier.json")))
+
+        self.test.delete_file(key="two.bin")
+        self.assertEqual(2, len(self.test._client.delete_object.call_args_list))
+
+    def test_eviction(self):
+        self.test.put_bytes(key="one", data=b"1" * 10)
+        self.test.put_bytes(key="two", data=b"2" * 10)
+        self.test.get_bytes(key="one")
+        self.test.put_bytes(key="three", data=b"3" * 10)
+
+        self.assertEqual(["one", "three"], list(self.test._index))
+        self.assertEqual(20, self.test.local_bytes)
+        self.assertEqual(False, self.test.local_worker.check_file(file="two"))
+
+        with open(self.test.local_worker.base_dir + TieredWorker.INDEX_FILE) as index_file:
+            self.assertEqual(["one", "three"], [key for key, _ in json.load(index_file)])
+
+    def _list_pages(self):
+        paginator = MagicMock()
+        paginator.paginate.return_value = [{"Contents": [{"Key": key, "ETag": etag, "Size": len(body)}
+                                                         for key, (etag, body) in self.remote.items()]}]
+        return paginator
+
+    def test_prefetch(self):
+        self.test.max_local_bytes = None
+        self.test._client.get_paginator.side_effect = lambda name: self._list_pages()
+        self.remote["caches/test/meta.json"] = ('"meta"', b"{}")
+        self.remote["caches/test/inputs/one.parquet"] = ('"one"', b"1" * 10)
+        self.remote["caches/test/inputs/two.parquet"] = ('"two"', b"2" * 20)
+        self.remote["caches/test/inputs/three.csv"] = ('"three"', b"3" * 30)
+
+        stats = self.test.prefetch(pattern="inputs/*.parquet", max_workers=2)
+        self.assertEqual((2, 0, 30, []), (stats.fetched, stats.skipped, stats.bytes, stats.failed))
+        self.assertEqual({"inputs/one.parquet", "inputs/two.parquet"}, set(self.test._index))
+        self.assertEqual(b"2" * 20, self.test.local_worker.get_bytes(key="inputs/two.parquet"))
+
+        self.remote["caches/test/inputs/two.parquet"] = ('"changed"', b"changed")
+        stats = self.test.prefetch()
+        self.assertEqual((2, 1, 37, []), (stats.fetched, stats.skipped, stats.bytes, stats.failed))
+        self.assertEqual(4, len(self.test._client.download_file.call_args_list))
+        self.assertEqual({"etag": '"changed"', "size": 7}, self.test._index["inputs/two.parquet"])
+        self.assertEqual(False, "meta.json" in self.test._index)
+        self.assertEqual(0, len(self.test._client.head_object.call_args_list))
+
+    def test_prefetch_saves_index_in_batches(self):
+        self.test.max_local_bytes = None
+        self.test.PREFETCH_SAVE_BATCH = 2
+        self.test._client.get_paginator.side_effect = lambda name: self._list_pages()
+        for index in range(5):
+            self.remote["caches/test/{}".format(index)] = ('"{}"'.format(index), b"1")
+
+        with patch.object(self.test, "_save_index", wraps=self.test._save_index) as mock_save_index:
+            stats = self.test.prefetch(max_workers=2)
+        self.assertEqual(5, stats.fetched)
+        self.assertEqual(3, mock_save_index.call_count)
+        with open(self.test.local_worker.base_dir + TieredWorker.INDEX_FILE) as index_file:
+            self.assertEqual(["0", "1", "2", "3", "4"], sorted(key for key, _ in json.load(index_file)))
+
+    def test_prefetch_keys(self):
+        self.test._client.get_paginator.side_effect = lambda name: self._list_pages()
+        self.remote["caches/test/one"] = ('"one"', b"1" * 10)
+        self.remote["caches/test/broken"] = ('"broken"', b"2" * 10)
+        download_file = self.test._client.download_file.side_effect
+
+        def _download_file(bucket, key, destination, Config):
+            if key.endswith("broken"):
+                with open(destination, "wb") as file:
+                    file.write(b"partial")
+                raise OSError("connection reset")
+            download_file(bucket, key, destination, Config)
+
+        self.test._client.download_file.side_effect = _download_file
+        stats = self.test.prefetch(keys=["one", "broken", "absent"])
+        self.assertEqual(1, stats.fetched)
+        self.assertEqual([("absent", "not in the cache"), ("broken", "OSError('connection reset')")],
+                         sorted(stats.failed))
+        self.assertEqual(["one"], list(self.test._index))
+        self.assertEqual(["one"], [name for name in os.listdir(self.test.local_worker.base_dir)
+                                   if not name.startswith(".")])
+
+    @patch("monolithcaching.s3_worker.S3Worker.create_meta")
+    @patch("monolithcaching.s3_worker.boto3")
+    def test__load_index(self, mock_boto, mock_create_meta):
+        self.test.put_bytes(key="one", data=b"1" * 10)
+        self.test.put_bytes(key="two", data=b"2" * 10)
+        os.remove(self.test.local_worker.base_dir + "two")
+
+        test = TieredWorker(cache_path="s3://bucket/caches/", existing_cache="s3://bucket/caches/test",
+                            local_cache=self.directory.name)
+        self.assertEqual(["one"], list(test._index))
+        self.assertEqual(10, test.local_bytes)
+
+    @patch("monolithcaching.s3_worker.S3Worker.create_meta")
+    @patch("monolithcaching.s3_worker.boto3")
+    def test_shared_index(self, mock_boto, mock_create_meta):
+        other = TieredWorker(cache_path="s3://bucket/caches/", existing_cache="s3://bucket/caches/test",
+                             local_cache=self.directory.name, max_local_bytes=25)
+        other._client = self.test._client
+        self.test.put_bytes(key="one", data=b"1" * 10)
+        other.put_bytes(key="two", data=b"2" * 10)
+        self.test.put_bytes(key="three", data=b"3" * 10)
+
+        index = json.loads(self.test.local_worker.get_bytes(key=".tier.json"))
+        self.assertEqual(["two", "three"], [key for key, _ in index])
+        self.assertEqual(["two", "three"], list(self.test._index))
+        self.assertEqual(20, self.test.local_bytes)
+        self.assertEqual(False, self.test.local_worker.check_file(file="one"))
+
+        other.delete_file(key="three")
+        index = json.loads(self.test.local_worker.get_bytes(key=".tier.json"))
+        self.assertEqual(["two"], [key for key, _ in index])
+        self.assertEqual(False, self.test.local_worker.check_file(file="three"))
+
+    @patch("monolithcaching.tiered_worker.S3Worker.put_file")
+    def test_open_write(self, mock_put_file):
+        self.remote["caches/test/written"] = ('"written"', b"")
+        with self.test.open_write(key="written") as file:
+            file.write(b"some data")
+        mock_put_file.assert_called_once_with(key="written",
+                                              source_path=self.test.local_worker.base_dir + "written")
+        self.assertEqual({"written": {"etag": '"written"', "size": 9}}, dict(self.test._index))
+
+    @patch("monolithcaching.tiered_worker.S3Worker.delete_directory")
+    def test_delete_directory(self, mock_delete_directory):
+        self.test.put_bytes(key="one", data=b"1" * 10)
+        self.test.delete_directory()
+        mock_delete_directory.assert_called_once_with()
+        self.assertEqual(False, os.path.isdir(self.test.local_worker.base_dir))
+        self.assertEqual(0, self.test.local_bytes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+import errno
+import os
+import tempfile
+import threading
+import warnings
+from unittest import TestCase, main
+from mock import patch
+
+from monolithcaching import CacheManager
+from monolithcaching.blob_store import BlobStore
+from monolithcaching.local_register import LocalRegister
+from monolithcaching.reaper import Reaper
+from monolithcaching.trash import Trash, drain
+
+
+class TestTrash(TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = self.directory.name
+        self.test = Trash(root=self.root)
+
+    def tearDown(self) -> None:
+        drain()
+        self.directory.cleanup()
+
+    def test_move_empty(self):
+        self.assertEqual(0, self.test.empty())
+        path = self.root + "/cache/one/"
+        os.makedirs(path + "nested")
+
+        moved = self.test.move(path=path)
+        self.assertEqual(False, os.path.exists(path))
+        self.assertEqual(True, os.path.isdir(moved + "/nested"))
+        self.assertEqual(os.path.join(self.root, "trash"), os.path.dirname(moved))
+        self.assertTrue(os.path.basename(moved).startswith("one-"))
+
+        self.assertEqual(1, self.test.empty())
+        self.assertEqual([], os.listdir(self.test.path))
+
+    def test_defer_drain(self):
+        release = threading.Event()
+        finished = []
+        Trash.defer(job=release.wait)
+        Trash.defer(job=lambda: finished.append(threading.current_thread().name))
+
+        self.assertEqual(False, drain(timeout=0.05))
+        release.set()
+        self.assertEqual(True, drain(timeout=5))
+        self.assertEqual(["monolithcaching-trash"], finished)
+
+    def test_defer_error(self):
+        def fail():
+            raise OSError("broken")
+
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            Trash.defer(job=fail)
+            self.assertEqual(True, drain(timeout=5))
+        self.assertIn("deferred cache deletion raised OSError('broken')", str(caught[0].message))
+
+    def test_deferred_manager(self):
+        manager = CacheManager(local_cache_path=self.root, deferred_delete=True, local_register=True)
+        manager.create_cache()
+        path = manager.cache_path
+        source = os.path.join(self.root, "source.bin")
+        with open(source, "wb") as file:
+            file.write(b"0" * 100)
+        digest = manager.worker.put_blob(key="data.bin", source_path=source)
+        self.assertEqual(True, manager.worker.deferred_delete)
+
+        release = threading.Event()
+        Trash.defer(job=release.wait)
+        manager.wipe_cache()
+        self.assertEqual(True, os.path.isdir(path))
+        release.set()
+        self.assertEqual(True, drain(timeout=5))
+
+        self.assertEqual(False, os.path.exists(path))
+        self.assertEqual([], os.listdir(self.test.path))
+        self.assertEqual(None, LocalRegister(root=self.root).get_count(cache_path=path))
+        self.assertEqual(False, os.path.exists(BlobStore(root=self.root).blob_path(digest=digest)))
+
+    def test_deferred_other_root(self):
+        with tempfile.TemporaryDirectory() as other:
+            owner = CacheManager(local_cache_path=other)
+            owner.create_cache()
+            owner.lock_cache()
+            path = owner.cache_path
+
+            manager = CacheManager(local_cache_path=self.root, deferred_delete=True)
+            manager.create_cache(existing_cache=path)
+            manager.worker.delete_directory()
+            self.assertEqual(True, drain(timeout=5))
+            self.assertEqual(False, os.path.exists(path))
+            self.assertEqual([], os.listdir(os.path.join(other, Trash.DIRECTORY)))
+            self.assertEqual(False, os.path.exists(self.test.path))
+
+    @patch("monolithcaching.trash.os.rename")
+    def test_deferred_cross_device(self, mock_rename):
+        mock_rename.side_effect = OSError(errno.EXDEV, "Invalid cross-device link")
+        manager = CacheManager(local_cache_path=self.root, deferred_delete=True)
+        manager.create_cache()
+        path = manager.cache_path
+
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            manager.wipe_cache()
+            self.assertEqual(True, drain(timeout=5))
+        self.assertEqual([], caught)
+        self.assertEqual(False, os.path.exists(path))
+
+    def test_reaper_empties_trash(self):
+        os.makedirs(self.root + "/cache/one/")
+        self.test.move(path=self.root + "/cache/one/")
+
+        Reaper(local_cache_path=self.root).reap()
+        self.assertEqual([], os.listdir(self.test.path))
+
+    def test_empty_releases_blobs(self):
+        path = self.root + "/cache/one/"
+        os.makedirs(path)
+        source = os.path.join(self.root, "source.bin")
+        with open(source, "wb") as file:
+            file.write(b"blob")
+        store = BlobStore(root=self.root)
+        digest = store.add(source_path=source)
+        store.link(digest=digest, destination_path=path + "data.bin")
+        store.record(cache_path=path, digest=digest, key="data.bin")
+        self.test.move(path=path)
+
+        self.assertEqual(1, self.test.empty())
+        self.assertEqual(False, os.path.exists(store.blob_path(digest=digest)))
+
+
+if __name__ == "__main__":
+    main()
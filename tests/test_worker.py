@@ -1,5 +1,8 @@
+import os
+import tempfile
 from unittest import TestCase, main
 from mock import patch, PropertyMock, MagicMock
+from monolithcaching.local_register import LocalRegister
 from monolithcaching.worker import Worker, WorkerCacheError
 
 
@@ -48,27 +51,28 @@ class TestWorker(TestCase):
         test = Worker(port=None, host=None)
         self.assertEqual(0, len(mock_register.call_args_list))
 
-    @patch("monolithcaching.worker.datetime")
-    @patch("monolithcaching.worker.open")
-    def test_update_timestamp(self, mock_open, mock_datetime):
-        test = Worker
-        test.id = 20
-        test.update_timestamp(cache_path="test/path/")
-        mock_open.assert_called_once_with("test/path/" + "timestamp.txt", "a")
-        mock_open.return_value.write.assert_called_once_with("\n" + str(mock_datetime.datetime.now.return_value))
-        mock_open.return_value.close.assert_called_once_with()
+    @patch("monolithcaching.worker.AccessRecord")
+    def test_update_timestamp(self, mock_access_record):
+        Worker.update_timestamp(cache_path="test/path/")
+        mock_access_record.touch.assert_called_once_with(cache_path="test/path/", interval=0.0)
 
+    @patch("monolithcaching.worker.AccessRecord")
+    @patch("monolithcaching.worker.Worker.update_timestamp")
     @patch("monolithcaching.worker.Worker._delete_directory")
     @patch("monolithcaching.worker.Worker._generate_directory")
     @patch("monolithcaching.worker.os")
     @patch("monolithcaching.worker.Worker.__init__")
-    def test__connect_directory(self, mock_init, mock_os, mock_generate, mock_delete):
+    def test__connect_directory(self, mock_init, mock_os, mock_generate, mock_delete, mock_update,
+                                mock_access_record):
         mock_init.return_value = None
         mock_os.path.isdir.return_value = False
+        mock_access_record.exists.return_value = True
 
         test = Worker(host="localhost", port=1234)
         test.id = 20
+        test.access_interval = 5.0
         test._locked = True
+        test._index = None
         test._existing_cache = None
         test._connect_directory()
 
@@ -89,6 +93,8 @@ class TestWorker(TestCase):
 
         self.assertEqual(test._base_dir, test._existing_cache)
         mock_generate.assert_called_once_with()
+        mock_access_record.exists.assert_called_once_with(cache_path="test")
+        mock_update.assert_called_once_with(cache_path="test", interval=5.0)
 
         del test
 
@@ -106,6 +112,8 @@ class TestWorker(TestCase):
         test._base_dir = "test dir"
         test.timestamp = "test timestamp"
         test._locked = False
+        test._index = None
+        test.create_meta = MagicMock()
         test._generate_directory()
         test._port = None
         test._delete_directory = MagicMock()
@@ -113,6 +121,7 @@ class TestWorker(TestCase):
         mock_os.path.isdir.assert_called_once_with(test._base_dir)
         mock_os.makedirs.assert_called_once_with(test._base_dir)
         mock_update.assert_called_once_with(cache_path=test._base_dir)
+        test.create_meta.assert_called_once_with()
 
         mock_os.path.isdir.return_value = True
 
@@ -123,17 +132,20 @@ class TestWorker(TestCase):
 
         del test
 
+    @patch("monolithcaching.worker.BlobStore")
     @patch("monolithcaching.worker.Worker.base_dir", spec=PropertyMock)
     @patch("monolithcaching.worker.shutil")
     @patch("monolithcaching.worker.Register")
     @patch("monolithcaching.worker.Worker.__init__")
-    def test__delete_directory(self, mock_init, mock_register, mock_shutil, mock_base_dir):
+    def test__delete_directory(self, mock_init, mock_register, mock_shutil, mock_base_dir, mock_blob_store):
         mock_init.return_value = None
+        mock_blob_store.cache_blobs.return_value = []
         mock_base_dir.return_value = "base dir"
 
         test = Worker(host="localhost", port=1234)
         test.id = "test id"
         test._locked = False
+        test._index = None
         test._host = "test host"
         test._port = 1234
 
@@ -150,7 +162,7 @@ class TestWorker(TestCase):
         mock_register.return_value.deregister_cache.assert_called_once_with(cache_path=test.base_dir,
                                                                             locked=test._locked)
         mock_register.reset_mock()
-        mock_shutil.rmtree.assert_called_once_with(test.base_dir)
+        mock_shutil.rmtree.assert_called_once_with(test.base_dir, ignore_errors=False)
         mock_shutil.reset_mock()
 
         test._locked = True
@@ -197,5 +209,100 @@ class TestWorker(TestCase):
         mock_delete.assert_called_once_with()
 
 
+class TestWorkerFiles(TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.test = Worker(port=None, host=None, local_cache=self.directory.name)
+        self.source = os.path.join(self.directory.name, "source.bin")
+        with open(self.source, "wb") as file:
+            file.write(b"some data" * 1000)
+
+    def tearDown(self) -> None:
+        del self.test
+        self.directory.cleanup()
+
+    def test__key_path(self):
+        self.assertEqual(self.test.base_dir + "one/two.txt", self.test._key_path(key="one/two.txt"))
+
+        for key in ["../escape.txt", "/etc/passwd", "one/../../escape.txt"]:
+            with self.assertRaises(WorkerCacheError) as context:
+                self.test._key_path(key=key)
+            self.assertEqual("key '{}' is not inside the cache {}".format(key, self.test.base_dir),
+                             str(context.exception))
+
+    def test_meta(self):
+        self.assertEqual({}, self.test.read_meta())
+        self.test.update_meta(data={"one": 1})
+        self.test.insert_meta(key="two", value=2)
+        self.assertEqual({"one": 1, "two": 2}, self.test.read_meta())
+        self.assertEqual(["access.bin", "meta.json"], sorted(os.listdir(self.test.base_dir)))
+
+    def test_delete_file(self):
+        self.test.put_bytes(key="one/two.bin", data=b"two")
+        self.test.delete_file(key="one/two.bin")
+        self.assertEqual(False, self.test.check_file(file="one/two.bin"))
+        self.assertEqual(None, self.test.local_path(key="one/two.bin"))
+        self.test.delete_file(key="one/two.bin")
+
+    def test_delete_directory(self):
+        self.test.delete_directory()
+        self.assertEqual(False, os.path.isdir(self.test.base_dir))
+        self.assertEqual(True, self.test.locked)
+
+    def test_local_register(self):
+        shared = Worker(port=None, host=None, local_cache=self.directory.name, local_register=True)
+        attached = Worker(port=None, host=None, local_cache=self.directory.name, existing_cache=shared.base_dir,
+                          local_register=True)
+        path = shared.base_dir
+        self.assertEqual(2, LocalRegister(root=self.directory.name).get_count(cache_path=path))
+
+        del shared
+        self.assertEqual(True, os.path.isdir(path))
+        self.assertEqual(1, LocalRegister(root=self.directory.name).get_count(cache_path=path))
+
+        del attached
+        self.assertEqual(False, os.path.isdir(path))
+        self.assertEqual(None, LocalRegister(root=self.directory.name).get_count(cache_path=path))
+
+    def test_put_file_get_file(self):
+        self.test.put_file(key="nested/data.bin", source_path=self.source)
+        self.assertEqual(True, self.test.check_file(file="nested/data.bin"))
+        self.assertEqual(False, self.test.check_file(file="nested/missing.bin"))
+        self.assertEqual([], [name for name in os.listdir(self.test.base_dir + "nested") if name.startswith(".")])
+
+        destination = os.path.join(self.directory.name, "destination.bin")
+        self.test.get_file(key="nested/data.bin", destination_path=destination)
+        with open(destination, "rb") as file:
+            self.assertEqual(b"some data" * 1000, file.read())
+
+    @patch("monolithcaching.worker.os.copy_file_range", create=True)
+    def test__copy_file_fallback(self, mock_copy_file_range):
+        mock_copy_file_range.side_effect = OSError(18, "Invalid cross-device link")
+        destination = os.path.join(self.directory.name, "destination.bin")
+
+        Worker._copy_file(source=self.source, destination=destination)
+        with open(destination, "rb") as file:
+            self.assertEqual(b"some data" * 1000, file.read())
+
+    def test_put_bytes_get_bytes(self):
+        self.test.put_bytes(key="data.bin", data=b"one two")
+        self.assertEqual(b"one two", self.test.get_bytes(key="data.bin"))
+
+    def test_open_write(self):
+        with self.test.open_write(key="data.bin") as file:
+            file.write(b"one ")
+            file.write(b"two")
+            self.assertEqual(False, self.test.check_file(file="data.bin"))
+        with self.test.open_read(key="data.bin") as file:
+            self.assertEqual(b"one two", file.read())
+
+        with self.assertRaises(ValueError):
+            with self.test.open_write(key="failed.bin") as file:
+                file.write(b"one")
+                raise ValueError("failed")
+        self.assertEqual(["access.bin", "data.bin", "meta.json"], sorted(os.listdir(self.test.base_dir)))
+
+
 if __name__ == "__main__":
     main()